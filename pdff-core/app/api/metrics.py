@@ -0,0 +1,98 @@
+from fastapi import APIRouter
+from fastapi.responses import Response
+
+from app.dependencies import collection, storage, loader, inbox_watcher, extraction_engine, thumbnails, events, suggestions, coordinator
+from app.models.document_collection import NAVIGATION_FILTERS
+from app.utils.metrics import CONTENT_TYPE, REGISTRY
+
+router = APIRouter(tags=["metrics"])
+
+
+def _documents():
+    # Filter-Indizes erst nach dem Laden abfragen, sonst würde der Abruf sie vorzeitig aufbauen
+    if not loader.is_ready:
+        return {("all",): len(collection)}
+    return {(name,): collection.count(name) for name in NAVIGATION_FILTERS}
+
+
+def _extraction(attribute: str):
+    return lambda: getattr(extraction_engine.stats(), attribute) if extraction_engine is not None else None
+
+
+# Werte, die die Dienste bereits selbst zählen, werden erst beim Abruf gelesen (kein Aufwand im Hot Path)
+REGISTRY.gauge_callback("pdff_documents", "Documents in der Collection je Navigations-Filter", _documents, ("filter",))
+REGISTRY.gauge_callback("pdff_archive_ready", "1 sobald das Archiv geladen ist", lambda: int(loader.is_ready))
+REGISTRY.gauge_callback(
+    "pdff_metadata_pending_writes",
+    "Metadaten-Änderungen, die noch auf das verzögerte Schreiben warten",
+    lambda: getattr(storage.metadata_store, "pending", None)
+)
+
+REGISTRY.gauge_callback("pdff_ingest_queue_depth", "Eingereihte PDFs des Inbox-Watchers", lambda: inbox_watcher.stats().queue_depth)
+REGISTRY.gauge_callback("pdff_ingest_in_flight", "Laufende Ingests des Inbox-Watchers", lambda: inbox_watcher.stats().in_flight)
+REGISTRY.counter_callback(
+    "pdff_inbox_files_total",
+    "Vom Inbox-Watcher verarbeitete Dateien",
+    lambda: {("ingested",): inbox_watcher.stats().ingested_total, ("failed",): inbox_watcher.stats().failed_total},
+    ("result",)
+)
+
+REGISTRY.gauge_callback("pdff_extraction_queued", "Wartende Extraktions-Jobs", _extraction("queued"))
+REGISTRY.gauge_callback("pdff_extraction_in_flight", "Laufende Extraktions-Jobs", _extraction("in_flight"))
+REGISTRY.gauge_callback("pdff_extraction_waiting_for_retry", "Extraktions-Jobs im Backoff", _extraction("waiting_for_retry"))
+REGISTRY.counter_callback(
+    "pdff_extraction_jobs_total",
+    "Abgeschlossene Extraktions-Jobs und Wiederholungen",
+    lambda: None if extraction_engine is None else {
+        ("succeeded",): extraction_engine.stats().succeeded_total,
+        ("failed",): extraction_engine.stats().failed_total,
+        ("retried",): extraction_engine.stats().retries_total,
+    },
+    ("result",)
+)
+REGISTRY.counter_callback("pdff_extraction_tokens_total", "Vom Provider abgerechnete Tokens", _extraction("tokens_total"))
+REGISTRY.counter_callback(
+    "pdff_extraction_cache_lookups_total",
+    "Lookups im Extraktions-Cache",
+    lambda: None if extraction_engine is None or extraction_engine.cache is None else {
+        ("hit",): extraction_engine.cache.hits,
+        ("miss",): extraction_engine.cache.misses,
+    },
+    ("result",)
+)
+
+REGISTRY.counter_callback(
+    "pdff_thumbnails_total",
+    "Gerenderte bzw. fehlgeschlagene Vorschaubilder",
+    lambda: {("rendered",): thumbnails.rendered_total, ("failed",): thumbnails.failed_total},
+    ("result",)
+)
+REGISTRY.gauge_callback("pdff_suggestions_ready", "1 sobald die Eingabevorschläge aufgebaut sind", lambda: int(suggestions.ready))
+REGISTRY.gauge_callback("pdff_event_subscribers", "Verbundene Event-Streams", lambda: events.subscribers)
+REGISTRY.counter_callback("pdff_events_published_total", "Veröffentlichte Change-Events", lambda: events.published_total)
+REGISTRY.counter_callback(
+    "pdff_event_clients_dropped_total",
+    "Wegen Rückstau beendete Event-Streams",
+    lambda: events.dropped_clients_total
+)
+
+REGISTRY.gauge_callback(
+    "pdff_worker_leader",
+    "1 im Leader-Prozess (Ingest, Inbox-Watcher, Extraktion), 0 in den übrigen Worker-Prozessen",
+    lambda: None if coordinator is None else int(coordinator.is_leader)
+)
+REGISTRY.counter_callback(
+    "pdff_worker_changes_total",
+    "Über den Change-Feed veröffentlichte bzw. von anderen Worker-Prozessen übernommene Änderungen",
+    lambda: None if coordinator is None else {
+        ("published",): coordinator.published_total,
+        ("applied",): coordinator.applied_total,
+    },
+    ("direction",)
+)
+
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Kennzahlen im Prometheus-Textformat"""
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
\ No newline at end of file
@@ -1,10 +1,18 @@
 from fastapi import APIRouter
 from app.api.v1.documents import router as documents_router
+from app.api.v1.ingest import router as ingest_router
+from app.api.v1.extraction import router as extraction_router
+from app.api.v1.suggestions import router as suggestions_router
+from app.api.v1.events import router as events_router
 # from app.api.v1.metadata import router as metadata_router
 
 # Haupt-Router für v1
 api_v1_router = APIRouter(prefix="/api/v1")
 api_v1_router.include_router(documents_router)
+api_v1_router.include_router(ingest_router)
+api_v1_router.include_router(extraction_router)
+api_v1_router.include_router(suggestions_router)
+api_v1_router.include_router(events_router)
 # api_v1_router.include_router(metadata_router)
 
 __all__ = ["api_v1_router"]
\ No newline at end of file
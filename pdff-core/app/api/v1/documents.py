@@ -1,14 +1,23 @@
-from fastapi import APIRouter, HTTPException, Depends
-from fastapi.responses import Response
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
+from fastapi.responses import Response, FileResponse, JSONResponse
+from pathlib import Path
 from uuid import UUID
 import base64
+import functools
+import hashlib
+import json
 from pydantic import BaseModel
-from typing import Optional
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 from datetime import date
 
-from app.models import DocumentCollection
-from app.services.local_storage_service import LocalStorageService
-from app.dependencies import get_collection, get_storage
+from app.config import settings
+from app.models import Document, DocumentCollection, DocumentFilter, FieldSource, VersionConflict
+from app.services.async_storage_service import AsyncStorageService, OutputPlan
+from app.services.thumbnail_service import THUMBNAIL_SIZES, ThumbnailService
+from app.dependencies import get_collection, get_async_storage, get_thumbnails
+from app.utils.http_cache import etag_matches, file_etag, http_date, not_modified
+from app.utils.pdf_render import PageNotFound, RenderError, RenderUnavailable
+from app.utils.multipart import MultipartError, StreamingMultipartParser, parse_header_params
 
 router = APIRouter(prefix="/documents", tags=["documents"])
 
@@ -31,6 +40,8 @@ class DocumentResponse(BaseModel):
     current_filename: str
     is_saved: bool
     metadata: MetadataResponse
+    field_sources: Dict[str, FieldSource] = {}
+    version: int = 0
 
 
 class MetadataUpdateRequest(BaseModel):
@@ -49,28 +60,29 @@ class SaveResponse(BaseModel):
     generated_filename: str
     saved_to_output: bool
     output_path: str
+    version: int = 0
 
 
-@router.get("")
-def list_documents(collection: DocumentCollection = Depends(get_collection)):
-    """Liste aller Dokument-IDs"""
-    return {
-        "count": len(collection),
-        "document_ids": [str(doc.id) for doc in collection.all()]
-    }
+class DocumentListResponse(BaseModel):
+    """Seite einer Cursor-paginierten Dokumentliste"""
+    # Anzahl aller Documents, die dem Filter entsprechen (über alle Seiten)
+    count: int
+    document_ids: List[UUID]
+    items: List[Dict[str, Any]]
+    next_cursor: Optional[str] = None
 
 
-@router.get("/{document_id}", response_model=DocumentResponse)
-def get_document_metadata(
-    document_id: UUID,
-    collection: DocumentCollection = Depends(get_collection)
-):
-    """Metadaten eines Dokuments abrufen"""
-    doc = collection.get(document_id)
-    
-    if not doc:
-        raise HTTPException(status_code=404, detail="Document not found")
-    
+class SearchResponse(BaseModel):
+    """Seite der Suchtreffer"""
+    total: int
+    total_exact: bool = True
+    document_ids: List[UUID]
+    items: List[Dict[str, Any]]
+    next_cursor: Optional[str] = None
+
+
+def build_document_response(doc) -> DocumentResponse:
+    """Baut die DocumentResponse für ein Document"""
     return DocumentResponse(
         id=doc.id,
         original_filename=doc.original_filename,
@@ -83,86 +95,651 @@ def get_document_metadata(
             customer_id=doc.customer_id,
             document_number=doc.document_number,
             document_date=doc.document_date
+        ),
+        field_sources=doc.field_sources,
+        version=doc.version
+    )
+
+
+def document_etag(doc: Document) -> str:
+    """Starker ETag aus der Document-Version"""
+    return f'"v{doc.version}"'
+
+
+def version_conflict(doc: Document) -> HTTPException:
+    """412 mit der aktuellen Version des Documents"""
+    return HTTPException(
+        status_code=412,
+        detail=f"Document was modified in the meantime (current version {doc.version})",
+        headers={"ETag": document_etag(doc)}
+    )
+
+
+def check_if_match(doc: Document, if_match: Optional[str]) -> Optional[int]:
+    """
+    Optimistische Nebenläufigkeit: Mit If-Match darf nur geändert werden,
+    wenn der Client die aktuelle Version kennt, sonst 412 (kein stilles Überschreiben).
+    Ohne Header wird wie bisher ohne Prüfung geschrieben.
+    Liefert die erwartete Version für collection.update (None ohne Header) - dort
+    wird sie gegen den Stand aller Worker-Prozesse erneut geprüft.
+    """
+    if if_match is None:
+        return None
+    if not etag_matches(if_match, document_etag(doc), weak=False):
+        raise version_conflict(doc)
+    return doc.version
+
+
+def with_manual_sources(doc: Document, update_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Ergänzt ein Metadaten-Update um die Herkunft 'manual' der geänderten Felder"""
+    return {**update_data, "field_sources": doc.updated_sources(update_data, FieldSource(source="manual"))}
+
+
+def encode_cursor(key: Tuple[str, str]) -> str:
+    """Kodiert einen Sortierschlüssel als opaken Cursor"""
+    return base64.urlsafe_b64encode(json.dumps(key).encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
+    """Dekodiert einen Cursor, wirft ValueError bei ungültigem Format oder ungültiger ID"""
+    try:
+        filename, document_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return str(filename), str(UUID(document_id))
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {e}")
+
+
+def parse_projection(fields: Optional[str]) -> Optional[Dict[str, Any]]:
+    """
+    Wandelt ?fields=a,b,c in ein include-Mapping für model_dump.
+    Metadaten-Felder können direkt (correspondent) oder mit Präfix
+    (metadata.correspondent) angegeben werden. Die ID ist immer enthalten.
+    """
+    if not fields:
+        return None
+    
+    include: Dict[str, Any] = {"id": True}
+    metadata_fields = set()
+    for field in (f.strip() for f in fields.split(",")):
+        if not field:
+            continue
+        name = field.removeprefix("metadata.")
+        if field == "metadata":
+            include["metadata"] = True
+        elif name in MetadataResponse.model_fields:
+            metadata_fields.add(name)
+        elif field in DocumentResponse.model_fields:
+            include[field] = True
+        else:
+            raise ValueError(f"Unknown field: {field}")
+    
+    if metadata_fields and include.get("metadata") is not True:
+        include["metadata"] = {name: True for name in metadata_fields}
+    return include
+
+
+@router.get("", response_model=DocumentListResponse)
+async def list_documents(
+    filters: DocumentFilter = Depends(),
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    fields: Optional[str] = Query(None, description="Kommagetrennte Feldliste, z.B. original_filename,correspondent"),
+    collection: DocumentCollection = Depends(get_collection)
+):
+    """
+    Cursor-paginierte Dokumentliste in stabiler Reihenfolge (original_filename, id).
+    Unterstützt Filter und Feld-Projektion; next_cursor für die Folgeseite übergeben.
+    count ist die Anzahl der Treffer des Filters, nicht die Größe des Archivs.
+    """
+    try:
+        after = decode_cursor(cursor) if cursor else None
+        include = parse_projection(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    documents, next_key = collection.page(filters, after=after, limit=limit)
+    
+    return DocumentListResponse(
+        count=collection.count_matching(filters),
+        document_ids=[doc.id for doc in documents],
+        items=[
+            build_document_response(doc).model_dump(mode="json", include=include)
+            for doc in documents
+        ],
+        next_cursor=encode_cursor(next_key) if next_key else None
+    )
+
+
+@router.get("/search", response_model=SearchResponse)
+async def search_documents(
+    q: str = Query("", description="Suchbegriffe (alle müssen vorkommen), letzter Begriff als Präfix"),
+    date_from: Optional[date] = Query(None, description="Dokumentdatum ab (inklusive)"),
+    date_to: Optional[date] = Query(None, description="Dokumentdatum bis (inklusive)"),
+    prefix: bool = Query(True, description="Letzten Begriff als Präfix suchen"),
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=1000),
+    fields: Optional[str] = Query(None, description="Kommagetrennte Feldliste, z.B. original_filename,correspondent"),
+    collection: DocumentCollection = Depends(get_collection)
+):
+    """
+    Suche über Korrespondent, Thema, Dokumenttyp, Dokument- und Kundennummer
+    sowie den Original-Dateinamen, optional eingeschränkt auf einen Datumsbereich.
+    Treffer in der Reihenfolge der Dokumentliste; next_cursor für die Folgeseite übergeben.
+    """
+    try:
+        after = decode_cursor(cursor) if cursor else None
+        include = parse_projection(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    page = collection.search(q, date_from=date_from, date_to=date_to, prefix=prefix, after=after, limit=limit)
+    
+    return SearchResponse(
+        total=page.total,
+        total_exact=page.total_exact,
+        document_ids=[doc.id for doc in page.documents],
+        items=[
+            build_document_response(doc).model_dump(mode="json", include=include)
+            for doc in page.documents
+        ],
+        next_cursor=encode_cursor(page.next_key) if page.next_key else None
+    )
+
+
+PDF_MAGIC = b"%PDF-"
+
+
+class UploadItemResult(BaseModel):
+    """Ergebnis des Uploads einer einzelnen Datei"""
+    filename: str
+    success: bool
+    status_code: int
+    detail: Optional[str] = None
+    sha256: Optional[str] = None
+    size: Optional[int] = None
+    duplicate_of: Optional[UUID] = None
+    document: Optional[DocumentResponse] = None
+
+
+class UploadResponse(BaseModel):
+    """Response eines (Multi-)Datei-Uploads"""
+    total: int
+    succeeded: int
+    failed: int
+    results: List[UploadItemResult]
+
+
+class UploadRejected(Exception):
+    """Upload einer Datei abgelehnt (z.B. keine PDF, zu groß)"""
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+async def receive_upload(
+    chunks: AsyncIterator[bytes],
+    filename: str,
+    collection: DocumentCollection,
+    storage: AsyncStorageService
+) -> UploadItemResult:
+    """
+    Streamt eine hochgeladene Datei chunkweise in eine temporäre Datei im Archive,
+    prüft die PDF-Signatur und berechnet SHA-256 während des Streamens.
+    Erst danach wird die Datei atomar ins Archive übernommen.
+    """
+    filename = Path(filename.replace("\\", "/")).name or "upload.pdf"
+    upload_path = storage.create_upload_path()
+    digest = hashlib.sha256()
+    size = 0
+    head = b""
+    
+    try:
+        # Auch open/close können auf Netzlaufwerken blockieren
+        upload_file = await storage.run_io(open, upload_path, "wb")
+        try:
+            def write_chunk(chunk: bytes) -> None:
+                digest.update(chunk)
+                upload_file.write(chunk)
+            
+            async for chunk in chunks:
+                if len(head) < len(PDF_MAGIC):
+                    head += chunk[:len(PDF_MAGIC) - len(head)]
+                    if not PDF_MAGIC.startswith(head):
+                        raise UploadRejected(415, "Not a PDF file")
+                size += len(chunk)
+                if size > settings.upload_max_bytes:
+                    raise UploadRejected(413, f"File exceeds {settings.upload_max_bytes} bytes")
+                await storage.run_io(write_chunk, chunk)
+        finally:
+            await storage.run_io(upload_file.close)
+        
+        if head != PDF_MAGIC:
+            raise UploadRejected(415, "Not a PDF file")
+        
+        result = await storage.ingest_upload(collection, upload_path, filename, digest.hexdigest())
+    except UploadRejected as e:
+        return UploadItemResult(filename=filename, success=False, status_code=e.status_code, detail=e.detail)
+    finally:
+        await storage.run_io(functools.partial(upload_path.unlink, missing_ok=True))
+    
+    return UploadItemResult(
+        filename=filename,
+        success=True,
+        status_code=201 if result.created else 200,
+        sha256=digest.hexdigest(),
+        size=size,
+        duplicate_of=result.duplicate_of,
+        document=build_document_response(result.document)
+    )
+
+
+@router.post("", response_model=UploadResponse, status_code=201)
+async def upload_documents(
+    request: Request,
+    filename: Optional[str] = Query(None, description="Dateiname bei Upload als application/pdf-Body"),
+    collection: DocumentCollection = Depends(get_collection),
+    storage: AsyncStorageService = Depends(get_async_storage)
+):
+    """
+    PDF-Upload direkt ins Archive, ohne den Body im Speicher zu puffern.
+    - multipart/form-data: beliebig viele Datei-Felder
+    - application/pdf: Body ist die PDF (Dateiname per ?filename= oder Content-Disposition)
+    """
+    content_type = request.headers.get("content-type", "")
+    results: List[UploadItemResult] = []
+    
+    if content_type.startswith("multipart/form-data"):
+        try:
+            parser = StreamingMultipartParser(request.stream(), content_type)
+            async for part in parser.parts():
+                if part.filename is None:
+                    continue
+                results.append(await receive_upload(part.chunks(), part.filename, collection, storage))
+        except MultipartError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    elif content_type.startswith(("application/pdf", "application/octet-stream")):
+        name = (
+            filename
+            or parse_header_params(request.headers.get("content-disposition", "")).get("filename")
+            or "upload.pdf"
         )
+        results.append(await receive_upload(request.stream(), name, collection, storage))
+    else:
+        raise HTTPException(status_code=415, detail="Expected multipart/form-data or application/pdf")
+    
+    if not results:
+        raise HTTPException(status_code=400, detail="No files in request")
+    
+    succeeded = sum(1 for result in results if result.success)
+    response = UploadResponse(
+        total=len(results),
+        succeeded=succeeded,
+        failed=len(results) - succeeded,
+        results=results
     )
+    
+    if not succeeded:
+        return JSONResponse(status_code=results[0].status_code, content=response.model_dump(mode="json"))
+    return response
+
+
+class BulkSelection(BaseModel):
+    """Auswahl für Bulk-Operationen: explizite IDs oder ein Filter"""
+    ids: Optional[List[UUID]] = None
+    filter: Optional[DocumentFilter] = None
+
+
+class BulkMetadataUpdateRequest(BulkSelection):
+    """Request für Bulk-Metadaten-Update"""
+    update: MetadataUpdateRequest
+    # Erwartete Version je Document (wie If-Match); abweichende werden einzeln mit 412 gemeldet
+    versions: Optional[Dict[UUID, int]] = None
+
+
+class BulkItemResult(BaseModel):
+    """Ergebnis einer Bulk-Operation für ein einzelnes Dokument"""
+    id: UUID
+    success: bool
+    status_code: int
+    detail: Optional[str] = None
+    document: Optional[DocumentResponse] = None
+    output_path: Optional[str] = None
+
+
+class BulkResponse(BaseModel):
+    """Response einer Bulk-Operation mit Ergebnissen pro Dokument"""
+    total: int
+    succeeded: int
+    failed: int
+    results: List[BulkItemResult]
+
+
+def build_bulk_response(results: List[BulkItemResult]) -> BulkResponse:
+    """Fasst Einzel-Ergebnisse zu einer BulkResponse zusammen"""
+    succeeded = sum(1 for result in results if result.success)
+    return BulkResponse(
+        total=len(results),
+        succeeded=succeeded,
+        failed=len(results) - succeeded,
+        results=results
+    )
+
+
+def resolve_bulk_selection(
+    selection: BulkSelection,
+    collection: DocumentCollection
+) -> Tuple[List[Document], List[BulkItemResult]]:
+    """
+    Löst IDs oder Filter zu Documents auf.
+    Unbekannte IDs werden als 404-Ergebnis zurückgegeben statt abzubrechen.
+    Ein leerer Filter würde alle Documents treffen und wird abgelehnt.
+    """
+    if selection.ids is None and selection.filter is None:
+        raise HTTPException(status_code=400, detail="Either ids or filter is required")
+    if selection.ids is None and selection.filter.is_empty:
+        raise HTTPException(status_code=400, detail="Filter must set at least one criterion")
+    
+    documents: List[Document] = []
+    failures: List[BulkItemResult] = []
+    
+    if selection.ids is not None:
+        if len(selection.ids) > settings.bulk_max_items:
+            raise HTTPException(status_code=400, detail=f"Too many documents (max {settings.bulk_max_items})")
+        for document_id in dict.fromkeys(selection.ids):
+            doc = collection.get(document_id)
+            if doc:
+                documents.append(doc)
+            else:
+                failures.append(BulkItemResult(
+                    id=document_id, success=False, status_code=404, detail="Document not found"
+                ))
+    else:
+        documents, next_key = collection.page(selection.filter, limit=settings.bulk_max_items)
+        if next_key is not None:
+            raise HTTPException(status_code=400, detail=f"Filter matches too many documents (max {settings.bulk_max_items})")
+    
+    return documents, failures
+
+
+@router.patch("/bulk", response_model=BulkResponse)
+async def bulk_update_document_metadata(
+    request: BulkMetadataUpdateRequest,
+    collection: DocumentCollection = Depends(get_collection),
+    storage: AsyncStorageService = Depends(get_async_storage)
+):
+    """
+    Partielles Metadaten-Update für viele Dokumente (IDs oder Filter).
+    Teilfehler werden pro Dokument gemeldet und brechen den Batch nicht ab.
+    Mit versions werden nur Documents geändert, die noch die angegebene Version haben.
+    """
+    update_data = request.update.model_dump(exclude_unset=True)
+    if not update_data:
+        raise HTTPException(status_code=400, detail="Empty update")
+    
+    documents, results = resolve_bulk_selection(request, collection)
+    versions = request.versions or {}
+    
+    # In-Memory-Update in einem Durchlauf, danach gruppierte Schreibvorgänge
+    updated: List[Document] = []
+    for doc in documents:
+        try:
+            collection.update(doc, with_manual_sources(doc, update_data), versions.get(doc.id))
+        except VersionConflict:
+            conflict = version_conflict(doc)
+            results.append(BulkItemResult(id=doc.id, success=False, status_code=conflict.status_code, detail=conflict.detail))
+            continue
+        updated.append(doc)
+    
+    errors = await storage.update_metadata_many(updated, max_workers=settings.bulk_max_workers)
+    
+    for doc in updated:
+        error = errors.get(doc.id)
+        if error is not None:
+            results.append(BulkItemResult(
+                id=doc.id, success=False, status_code=500, detail=f"Metadata write failed: {error}"
+            ))
+        else:
+            results.append(BulkItemResult(
+                id=doc.id, success=True, status_code=200, document=build_document_response(doc)
+            ))
+    
+    return build_bulk_response(results)
+
+
+@router.post("/bulk/save", response_model=BulkResponse)
+async def bulk_save_documents_to_output(
+    selection: BulkSelection,
+    collection: DocumentCollection = Depends(get_collection),
+    storage: AsyncStorageService = Depends(get_async_storage)
+):
+    """
+    Generiert Dateinamen und speichert viele Dokumente nach /data/out.
+    Kopien laufen mit begrenzter Parallelität, Teilfehler werden pro Dokument gemeldet.
+    """
+    documents, results = resolve_bulk_selection(selection, collection)
+    
+    # Vor dem ersten await belegen, damit parallele Saves und PATCHes die reservierte Version sehen
+    plans: List[OutputPlan] = []
+    for doc in documents:
+        if not doc.is_complete:
+            results.append(BulkItemResult(
+                id=doc.id,
+                success=False,
+                status_code=400,
+                detail="Incomplete metadata: document_type and correspondent required"
+            ))
+            continue
+        plan = storage.claim_save(collection, doc)
+        if plan is None:
+            results.append(BulkItemResult(id=doc.id, success=False, status_code=409, detail="Save already in progress"))
+        else:
+            plans.append(plan)
+    
+    outcomes = await storage.save_many_to_output(collection, plans, max_workers=settings.bulk_max_workers)
+    
+    for plan in plans:
+        doc = collection.get(plan.id) or plan.document
+        outcome = outcomes.get(doc.id)
+        if isinstance(outcome, FileNotFoundError):
+            results.append(BulkItemResult(id=doc.id, success=False, status_code=404, detail=str(outcome)))
+        elif isinstance(outcome, Exception):
+            results.append(BulkItemResult(
+                id=doc.id, success=False, status_code=500, detail=f"Save failed: {outcome}"
+            ))
+        else:
+            results.append(BulkItemResult(
+                id=doc.id,
+                success=True,
+                status_code=200,
+                document=build_document_response(doc),
+                output_path=str(outcome)
+            ))
+    
+    return build_bulk_response(results)
+
+
+@router.get("/{document_id}", response_model=DocumentResponse)
+async def get_document_metadata(
+    document_id: UUID,
+    request: Request,
+    response: Response,
+    collection: DocumentCollection = Depends(get_collection)
+):
+    """
+    Metadaten eines Dokuments abrufen.
+    Liefert die Version als ETag; bei unverändertem Document (If-None-Match) 304 ohne Body.
+    """
+    doc = collection.get(document_id)
+    
+    if not doc:
+        raise HTTPException(status_code=404, detail="Document not found")
+    
+    etag = document_etag(doc)
+    cache_headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=cache_headers)
+    
+    response.headers.update(cache_headers)
+    return build_document_response(doc)
 
 
 @router.get("/{document_id}/pdf")
-def get_document_pdf(
+async def get_document_pdf(
     document_id: UUID,
+    request: Request,
     collection: DocumentCollection = Depends(get_collection),
-    storage: LocalStorageService = Depends(get_storage)
+    storage: AsyncStorageService = Depends(get_async_storage)
 ):
-    """PDF-Datei im Browser anzeigen"""
+    """
+    PDF-Datei im Browser anzeigen.
+    Streamt direkt aus dem Archive (sendfile/pathsend, falls vom Server unterstützt),
+    unterstützt Range-Requests für pdf.js und beantwortet bedingte GETs mit 304.
+    """
     doc = collection.get(document_id)
     
     if not doc:
         raise HTTPException(status_code=404, detail="Document not found")
     
     try:
-        base64_pdf = storage.load_pdf_as_base64(doc)
-        pdf_bytes = base64.b64decode(base64_pdf)
-        
-        return Response(
-            content=pdf_bytes,
-            media_type="application/pdf",
-            headers={
-                "Content-Disposition": f"inline; filename={doc.current_filename}"
-            }
-        )
+        pdf_path, stat_result = await storage.pdf_path_and_stat(doc)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="PDF file not found in archive")
+    
+    etag = file_etag(str(doc.id), stat_result)
+    cache_headers = {
+        "ETag": etag,
+        "Last-Modified": http_date(stat_result.st_mtime),
+        "Cache-Control": "private, no-cache",
+    }
+    
+    if not_modified(
+        etag,
+        stat_result.st_mtime,
+        request.headers.get("if-none-match"),
+        request.headers.get("if-modified-since")
+    ):
+        return Response(status_code=304, headers=cache_headers)
+    
+    return FileResponse(
+        pdf_path,
+        media_type="application/pdf",
+        filename=doc.current_filename,
+        content_disposition_type="inline",
+        stat_result=stat_result,
+        headers=cache_headers
+    )
+
+
+@router.get("/{document_id}/thumbnail")
+async def get_document_thumbnail(
+    document_id: UUID,
+    request: Request,
+    page: int = Query(1, ge=1, description="Seite (1-basiert)"),
+    size: str = Query("small", description=f"Größe: {', '.join(f'{name} ({width}px)' for name, width in THUMBNAIL_SIZES.items())}"),
+    collection: DocumentCollection = Depends(get_collection),
+    thumbnails: ThumbnailService = Depends(get_thumbnails)
+):
+    """
+    Vorschaubild einer Seite als PNG aus dem inhaltsadressierten Cache,
+    fehlende Bilder werden beim ersten Abruf gerendert.
+    Das Bild zu einem Document ändert sich nie (Archiv-PDFs sind unveränderlich),
+    daher langlebige Cache-Header.
+    """
+    width = THUMBNAIL_SIZES.get(size)
+    if width is None:
+        raise HTTPException(status_code=400, detail=f"Unknown size '{size}' (allowed: {', '.join(THUMBNAIL_SIZES)})")
+    
+    doc = collection.get(document_id)
+    
+    if not doc:
+        raise HTTPException(status_code=404, detail="Document not found")
+    
+    try:
+        path, stat_result = await thumbnails.get(doc, page, width)
+    except RenderUnavailable as e:
+        raise HTTPException(status_code=503, detail=f"Thumbnails unavailable: {e}")
+    except PageNotFound as e:
+        raise HTTPException(status_code=404, detail=str(e))
     except FileNotFoundError:
         raise HTTPException(status_code=404, detail="PDF file not found in archive")
+    except RenderError as e:
+        raise HTTPException(status_code=422, detail=f"PDF could not be rendered: {e}")
+    
+    # Dateiname enthält Content-Hash, Seite, Breite und Renderer-Version
+    etag = f'"{path.stem}"'
+    cache_headers = {
+        "ETag": etag,
+        "Last-Modified": http_date(stat_result.st_mtime),
+        "Cache-Control": "private, max-age=31536000, immutable",
+    }
+    
+    if not_modified(
+        etag,
+        stat_result.st_mtime,
+        request.headers.get("if-none-match"),
+        request.headers.get("if-modified-since")
+    ):
+        return Response(status_code=304, headers=cache_headers)
+    
+    return FileResponse(path, media_type="image/png", stat_result=stat_result, headers=cache_headers)
 
 
 @router.patch("/{document_id}", response_model=DocumentResponse)
-def update_document_metadata(
+async def update_document_metadata(
     document_id: UUID,
     metadata: MetadataUpdateRequest,
+    request: Request,
+    response: Response,
     collection: DocumentCollection = Depends(get_collection),
-    storage: LocalStorageService = Depends(get_storage)
+    storage: AsyncStorageService = Depends(get_async_storage)
 ):
-    """Metadaten aktualisieren (speichert nur, generiert noch keine Datei)"""
+    """
+    Metadaten aktualisieren (speichert nur, generiert noch keine Datei).
+    Mit If-Match nur, wenn die Version noch aktuell ist (sonst 412).
+    """
     doc = collection.get(document_id)
     
     if not doc:
         raise HTTPException(status_code=404, detail="Document not found")
     
-    # Partial update der Metadaten
+    # Prüfung und Änderung ohne await dazwischen, damit kein anderer Request dazwischenkommt
+    expected_version = check_if_match(doc, request.headers.get("if-match"))
+    
+    # Partial update der Metadaten (pflegt auch die Navigations-Indizes)
     update_data = metadata.model_dump(exclude_unset=True)
-    for field, value in update_data.items():
-        setattr(doc, field, value)
+    try:
+        collection.update(doc, with_manual_sources(doc, update_data), expected_version)
+    except VersionConflict:
+        # In einem anderen Worker-Prozess geändert
+        raise version_conflict(doc)
     
     # Metadaten im Storage aktualisieren
-    storage.update_metadata(doc)
+    await storage.update_metadata(doc)
     
-    return DocumentResponse(
-        id=doc.id,
-        original_filename=doc.original_filename,
-        current_filename=doc.current_filename,
-        is_saved=doc.is_saved,
-        metadata=MetadataResponse(
-            document_type=doc.document_type,
-            correspondent=doc.correspondent,
-            topic=doc.topic,
-            customer_id=doc.customer_id,
-            document_number=doc.document_number,
-            document_date=doc.document_date
-        )
-    )
+    response.headers["ETag"] = document_etag(doc)
+    return build_document_response(doc)
 
 
 @router.post("/{document_id}/save", response_model=SaveResponse)
-def save_document_to_output(
+async def save_document_to_output(
     document_id: UUID,
+    request: Request,
+    response: Response,
     collection: DocumentCollection = Depends(get_collection),
-    storage: LocalStorageService = Depends(get_storage)
+    storage: AsyncStorageService = Depends(get_async_storage)
 ):
-    """Generiert Dateinamen und speichert PDF nach /data/out"""
+    """
+    Generiert Dateinamen und speichert PDF nach /data/out.
+    Mit If-Match nur, wenn die Metadaten-Version noch der des Clients entspricht (sonst 412).
+    """
     doc = collection.get(document_id)
     
     if not doc:
         raise HTTPException(status_code=404, detail="Document not found")
     
+    expected_version = check_if_match(doc, request.headers.get("if-match"))
+    
     # Validierung: Mindestens document_type und correspondent müssen vorhanden sein
     if not doc.document_type or not doc.correspondent:
         raise HTTPException(
@@ -170,14 +747,25 @@ def save_document_to_output(
             detail="Incomplete metadata: document_type and correspondent required"
         )
     
+    # Synchron nach der If-Match-Prüfung belegen: ein zweiter Save mit demselben If-Match bekommt 412
+    try:
+        plan = storage.claim_save(collection, doc, expected_version)
+    except VersionConflict:
+        raise version_conflict(doc)
+    if plan is None:
+        raise HTTPException(status_code=409, detail="Save already in progress")
+    
     try:
-        output_path = storage.save_to_output(doc)
+        output_path = await storage.save_to_output(collection, plan)
+        doc = collection.get(document_id) or doc
         
+        response.headers["ETag"] = document_etag(doc)
         return SaveResponse(
             id=doc.id,
             generated_filename=doc.current_filename,
             saved_to_output=True,
-            output_path=str(output_path)
+            output_path=str(output_path),
+            version=doc.version
         )
     except FileNotFoundError as e:
         raise HTTPException(status_code=404, detail=str(e))
@@ -186,7 +774,7 @@ def save_document_to_output(
 
 
 @router.post("/{document_id}/preview-filename")
-def preview_filename(
+async def preview_filename(
     document_id: UUID,
     metadata: MetadataUpdateRequest,
     collection: DocumentCollection = Depends(get_collection)
@@ -232,14 +820,17 @@ class NavigationResponse(BaseModel):
     current: NavigationDocumentInfo
     next: Optional[NavigationDocumentInfo] = None
     previous: Optional[NavigationDocumentInfo] = None
+    previous_window: List[NavigationDocumentInfo] = []  # nächster Vorgänger zuerst
+    next_window: List[NavigationDocumentInfo] = []
     total_unprocessed: int
     current_position: int
 
 
 @router.get("/{document_id}/navigation", response_model=NavigationResponse)
-def get_navigation(
+async def get_navigation(
     document_id: UUID,
     filter: str = "unprocessed",
+    window: int = Query(1, ge=1, le=100),
     collection: DocumentCollection = Depends(get_collection)
 ):
     """
@@ -248,47 +839,31 @@ def get_navigation(
     - 'unprocessed': Dokumente ohne vollständige Metadaten
     - 'unsaved': Dokumente die noch nie gespeichert wurden
     - 'all': Alle Dokumente
+    window: Anzahl der Nachbarn je Richtung (previous_window/next_window)
     """
     current_doc = collection.get(document_id)
     
     if not current_doc:
         raise HTTPException(status_code=404, detail="Document not found")
     
-    all_docs = collection.all()
-    
-    if filter == "unprocessed":
-        filtered_docs = [
-            doc for doc in all_docs 
-            if not doc.document_type or not doc.correspondent
-        ]
-    elif filter == "unsaved":
-        filtered_docs = [doc for doc in all_docs if not doc.is_saved]
-    else:
-        filtered_docs = all_docs
-    
-    if current_doc not in filtered_docs:
-        filtered_docs.append(current_doc)
+    # O(log n) über die inkrementell gepflegten Indizes der Collection
+    nav = collection.navigate(document_id, filter=filter, window=window)
     
-    filtered_docs.sort(key=lambda d: d.original_filename)
+    if nav is None:
+        raise HTTPException(status_code=404, detail="Document not found")
     
-    current_index = next(i for i, doc in enumerate(filtered_docs) if doc.id == document_id)
+    def info(doc) -> NavigationDocumentInfo:
+        return NavigationDocumentInfo(id=doc.id, original_filename=doc.original_filename)
     
-    previous_doc = filtered_docs[current_index - 1] if current_index > 0 else None
-    next_doc = filtered_docs[current_index + 1] if current_index < len(filtered_docs) - 1 else None
+    previous_window = [info(doc) for doc in nav.previous]
+    next_window = [info(doc) for doc in nav.next]
     
     return NavigationResponse(
-        current=NavigationDocumentInfo(
-            id=current_doc.id,
-            original_filename=current_doc.original_filename
-        ),
-        next=NavigationDocumentInfo(
-            id=next_doc.id,
-            original_filename=next_doc.original_filename
-        ) if next_doc else None,
-        previous=NavigationDocumentInfo(
-            id=previous_doc.id,
-            original_filename=previous_doc.original_filename
-        ) if previous_doc else None,
-        total_unprocessed=len(filtered_docs),
-        current_position=current_index + 1
+        current=info(current_doc),
+        next=next_window[0] if next_window else None,
+        previous=previous_window[0] if previous_window else None,
+        previous_window=previous_window,
+        next_window=next_window,
+        total_unprocessed=nav.total,
+        current_position=nav.position
     )
\ No newline at end of file
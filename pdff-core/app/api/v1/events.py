@@ -0,0 +1,60 @@
+from fastapi import APIRouter, Depends, Request
+from fastapi.responses import StreamingResponse
+from typing import AsyncIterator, Optional
+import asyncio
+import json
+
+from app.config import settings
+from app.services.event_bus import DocumentEvent, EventBus
+from app.dependencies import get_events
+
+router = APIRouter(prefix="/events", tags=["events"])
+
+
+def format_event(bus: EventBus, event: DocumentEvent) -> str:
+    """SSE-Frame: id (für Last-Event-ID), Event-Typ und JSON-Daten"""
+    return f"id: {bus.event_id(event)}\nevent: {event.type}\ndata: {event.model_dump_json()}\n\n"
+
+
+async def stream_events(bus: EventBus, request: Request, last_event_id: Optional[str]) -> AsyncIterator[str]:
+    subscription, missed, gap = bus.subscribe(last_event_id)
+    try:
+        # Reconnect-Verzögerung für EventSource
+        yield f"retry: {settings.events_retry_ms}\n\n"
+        if gap:
+            # Verpasste Events sind nicht mehr im Replay-Puffer: Client lädt seinen Zustand neu
+            data = json.dumps({"seq": bus.last_seq, "reason": "replay buffer exceeded or server restarted"})
+            yield f"id: {bus.epoch}-{bus.last_seq}\nevent: reset\ndata: {data}\n\n"
+        for event in missed:
+            yield format_event(bus, event)
+        
+        while True:
+            try:
+                event = await asyncio.wait_for(subscription.queue.get(), timeout=settings.events_keepalive)
+            except asyncio.TimeoutError:
+                if await request.is_disconnected():
+                    break
+                # Kommentar hält Proxies und Verbindung offen
+                yield ": keepalive\n\n"
+                continue
+            if event is None:
+                # Zu langsamer Client: Stream beenden, EventSource verbindet sich neu und setzt fort
+                break
+            yield format_event(bus, event)
+    finally:
+        bus.unsubscribe(subscription)
+
+
+@router.get("")
+async def get_events(request: Request, bus: EventBus = Depends(get_events)):
+    """
+    Server-Sent Events für Änderungen an Documents (created, updated, removed).
+    Jedes Event trägt eine fortlaufende ID; nach einem Reconnect liefert der
+    Server mit Last-Event-ID die verpassten Events aus dem Replay-Puffer nach
+    oder ein reset-Event, wenn die Lücke zu groß ist.
+    """
+    return StreamingResponse(
+        stream_events(bus, request, request.headers.get("last-event-id")),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
\ No newline at end of file
@@ -0,0 +1,64 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from pydantic import BaseModel
+from typing import List, Optional
+from uuid import UUID
+
+from app.config import settings
+from app.models import DocumentCollection
+from app.services.extraction_engine import ExtractionEngine, ExtractionStats
+from app.services.extraction_jobs import ExtractionJob
+from app.dependencies import get_collection, get_extraction_engine
+
+router = APIRouter(prefix="/extraction", tags=["extraction"])
+
+
+class ExtractionRequest(BaseModel):
+    """Documents für die Extraktion einreihen"""
+    ids: List[UUID]
+
+
+def require_engine(engine: Optional[ExtractionEngine] = Depends(get_extraction_engine)) -> ExtractionEngine:
+    """Extraktion muss per PDFF_EXTRACTION_PROVIDER aktiviert sein"""
+    if engine is None:
+        raise HTTPException(status_code=503, detail="Extraction is disabled (PDFF_EXTRACTION_PROVIDER=none)")
+    return engine
+
+
+@router.get("/stats", response_model=ExtractionStats)
+async def get_extraction_stats(engine: ExtractionEngine = Depends(require_engine)):
+    """Queue, laufende Jobs, Retries, Token-Verbrauch und Durchsatz"""
+    return engine.stats()
+
+
+@router.post("/jobs", response_model=List[ExtractionJob], status_code=202)
+async def create_extraction_jobs(
+    request: ExtractionRequest,
+    engine: ExtractionEngine = Depends(require_engine),
+    collection: DocumentCollection = Depends(get_collection)
+):
+    """Reiht Documents ein (bestehende aktive Jobs werden wiederverwendet)"""
+    if len(request.ids) > settings.bulk_max_items:
+        raise HTTPException(status_code=400, detail=f"Too many documents (max {settings.bulk_max_items})")
+    missing = [str(document_id) for document_id in request.ids if collection.get(document_id) is None]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Documents not found: {', '.join(missing)}")
+    return [engine.enqueue(document_id) for document_id in dict.fromkeys(request.ids)]
+
+
+@router.get("/jobs", response_model=List[ExtractionJob])
+async def list_extraction_jobs(
+    state: Optional[str] = Query(None, description="queued, running, succeeded oder failed"),
+    limit: int = Query(100, ge=1, le=1000),
+    engine: ExtractionEngine = Depends(require_engine)
+):
+    """Neueste Jobs zuerst"""
+    return engine.list_jobs(state=state, limit=limit)
+
+
+@router.get("/jobs/{job_id}", response_model=ExtractionJob)
+async def get_extraction_job(job_id: UUID, engine: ExtractionEngine = Depends(require_engine)):
+    """Status eines Jobs"""
+    job = engine.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
\ No newline at end of file
@@ -0,0 +1,12 @@
+from fastapi import APIRouter, Depends
+
+from app.services.inbox_watcher import InboxWatcher, IngestStats
+from app.dependencies import get_inbox_watcher
+
+router = APIRouter(prefix="/ingest", tags=["ingest"])
+
+
+@router.get("/stats", response_model=IngestStats)
+async def get_ingest_stats(watcher: InboxWatcher = Depends(get_inbox_watcher)):
+    """Queue-Tiefe, laufende Ingests und Durchsatz des Inbox-Watchers"""
+    return watcher.stats()
\ No newline at end of file
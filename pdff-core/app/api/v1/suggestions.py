@@ -0,0 +1,28 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from pydantic import BaseModel
+from typing import List
+
+from app.services.suggestion_service import Suggestion, SuggestionService
+from app.dependencies import get_suggestions
+
+router = APIRouter(prefix="/suggestions", tags=["suggestions"])
+
+
+class SuggestionResponse(BaseModel):
+    """Vorschläge für ein Metadaten-Feld, häufigste zuerst"""
+    field: str
+    ready: bool  # False solange die Vorschläge nach dem Start noch aufgebaut werden
+    items: List[Suggestion]
+
+
+@router.get("/{field}", response_model=SuggestionResponse)
+async def get_suggestions_for_field(
+    field: str,
+    q: str = Query("", description="Bisherige Eingabe (Präfix, Groß-/Kleinschreibung und Umlaute egal)"),
+    limit: int = Query(10, ge=1, le=100),
+    suggestions: SuggestionService = Depends(get_suggestions)
+):
+    """Typeahead: bekannte Werte mit diesem Anfang, sortiert nach Anzahl der Documents"""
+    if field not in suggestions.fields:
+        raise HTTPException(status_code=404, detail=f"No suggestions for field '{field}'")
+    return SuggestionResponse(field=field, ready=suggestions.ready, items=suggestions.suggest(field, q, limit))
\ No newline at end of file
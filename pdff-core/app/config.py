@@ -0,0 +1,115 @@
+from pydantic import BaseModel, Field
+from pathlib import Path
+import os
+
+
+def _env(name: str, default: str) -> str:
+    """Liest eine Einstellung aus der Umgebung (Präfix PDFF_)"""
+    return os.getenv(f"PDFF_{name}", default)
+
+
+class Settings(BaseModel):
+    """Anwendungskonfiguration, überschreibbar per Umgebungsvariablen"""
+    
+    # Verzeichnisse
+    data_in: Path = Field(default_factory=lambda: Path(_env("DATA_IN", "/data/in")))
+    data_archive: Path = Field(default_factory=lambda: Path(_env("DATA_ARCHIVE", "/data/archive")))
+    data_out: Path = Field(default_factory=lambda: Path(_env("DATA_OUT", "/data/out")))
+    # Ablage im Archive: 'flat' ({id}.pdf) oder 'sharded' (ab/cd/{id}.pdf, 'sharded:N' für N Ebenen);
+    # bestehende Archive mit python -m app.tools.layout migrate im laufenden Betrieb umziehen
+    archive_layout: str = Field(default_factory=lambda: _env("ARCHIVE_LAYOUT", "flat"))
+    
+    # Metadaten-Backend: 'json' (ein {id}.json pro Document) oder 'journal' (Journal + Snapshot)
+    metadata_backend: str = Field(default_factory=lambda: _env("METADATA_BACKEND", "json"))
+    journal_compact_threshold: int = Field(default_factory=lambda: int(_env("JOURNAL_COMPACT_THRESHOLD", "50000")))
+    # Metadaten verzögert und zusammengefasst schreiben (alle flush_interval Sekunden oder ab flush_max_pending Änderungen)
+    metadata_write_behind: bool = Field(default_factory=lambda: _env("METADATA_WRITE_BEHIND", "true").lower() in ("1", "true", "yes"))
+    metadata_flush_interval: float = Field(default_factory=lambda: float(_env("METADATA_FLUSH_INTERVAL", "1.0")))
+    metadata_flush_max_pending: int = Field(default_factory=lambda: int(_env("METADATA_FLUSH_MAX_PENDING", "500")))
+    # fsync nach jedem Flush (Group Commit) - aus für schnellere, aber weniger absturzsichere Writes
+    metadata_fsync: bool = Field(default_factory=lambda: _env("METADATA_FSYNC", "true").lower() in ("1", "true", "yes"))
+    
+    # Start: 'blocking' (Archiv vor dem ersten Request laden) oder 'background' (sofort erreichbar, /ready meldet Fortschritt)
+    startup_mode: str = Field(default_factory=lambda: _env("STARTUP_MODE", "blocking"))
+    # Threads zum parallelen Lesen/Parsen der Metadaten beim Start
+    load_workers: int = Field(default_factory=lambda: int(_env("LOAD_WORKERS", "8")))
+    # Ablage der Documents im Speicher: 'objects' (Pydantic-Modelle) oder 'compact' (spaltenweise, Modelle erst beim Zugriff)
+    collection_store: str = Field(default_factory=lambda: _env("COLLECTION_STORE", "objects"))
+    # Anzahl uvicorn-Worker-Prozesse (gleicher Wert wie --workers). Ab 2 gleichen die Prozesse ihre
+    # Collections über einen Change-Feed im Archiv ab, Ingest/Watcher/Extraktion laufen nur im Leader.
+    workers: int = Field(default_factory=lambda: int(_env("WORKERS", "1")))
+    # Wie oft Änderungen der anderen Worker-Prozesse übernommen werden (Sekunden)
+    worker_sync_interval: float = Field(default_factory=lambda: float(_env("WORKER_SYNC_INTERVAL", "0.1")))
+    
+    # Inbox-Watcher: kontinuierliche Ingestion aus data_in
+    inbox_watch: bool = Field(default_factory=lambda: _env("INBOX_WATCH", "true").lower() in ("1", "true", "yes"))
+    inbox_watch_mode: str = Field(default_factory=lambda: _env("INBOX_WATCH_MODE", "auto"))  # auto | inotify | poll
+    inbox_poll_interval: float = Field(default_factory=lambda: float(_env("INBOX_POLL_INTERVAL", "2.0")))
+    inbox_debounce_seconds: float = Field(default_factory=lambda: float(_env("INBOX_DEBOUNCE_SECONDS", "2.0")))
+    ingest_queue_size: int = Field(default_factory=lambda: int(_env("INGEST_QUEUE_SIZE", "100")))
+    ingest_concurrency: int = Field(default_factory=lambda: int(_env("INGEST_CONCURRENCY", "2")))
+    
+    # Deduplizierung inhaltsgleicher PDFs: 'skip', 'link' oder 'keep'
+    duplicate_policy: str = Field(default_factory=lambda: _env("DUPLICATE_POLICY", "keep"))
+    # Fehlende Content-Hashes von Bestandsdokumenten nach dem Start im Hintergrund berechnen
+    content_hash_backfill: bool = Field(default_factory=lambda: _env("CONTENT_HASH_BACKFILL", "true").lower() in ("1", "true", "yes"))
+    
+    # Uploads: maximale Größe pro Datei
+    upload_max_bytes: int = Field(default_factory=lambda: int(_env("UPLOAD_MAX_BYTES", str(512 * 1024 * 1024))))
+    
+    # Metadaten-Extraktion: Provider 'none' (aus), 'fake' (lokal, zum Testen) oder 'anthropic'
+    extraction_provider: str = Field(default_factory=lambda: _env("EXTRACTION_PROVIDER", "none"))
+    extraction_model: str = Field(default_factory=lambda: _env("EXTRACTION_MODEL", "claude-sonnet-4-5"))
+    anthropic_api_key: str = Field(default_factory=lambda: _env("ANTHROPIC_API_KEY", os.getenv("ANTHROPIC_API_KEY", "")))
+    extraction_concurrency: int = Field(default_factory=lambda: int(_env("EXTRACTION_CONCURRENCY", "4")))
+    # Rate-Limits des Providers (0 = unbegrenzt)
+    extraction_requests_per_minute: int = Field(default_factory=lambda: int(_env("EXTRACTION_REQUESTS_PER_MINUTE", "50")))
+    extraction_tokens_per_minute: int = Field(default_factory=lambda: int(_env("EXTRACTION_TOKENS_PER_MINUTE", "40000")))
+    extraction_max_attempts: int = Field(default_factory=lambda: int(_env("EXTRACTION_MAX_ATTEMPTS", "5")))
+    extraction_backoff_base: float = Field(default_factory=lambda: float(_env("EXTRACTION_BACKOFF_BASE", "1.0")))
+    extraction_backoff_max: float = Field(default_factory=lambda: float(_env("EXTRACTION_BACKOFF_MAX", "60.0")))
+    # Persistenter LRU-Cache der Ergebnisse (Content-Hash + Modell + Prompt-Version)
+    extraction_cache: bool = Field(default_factory=lambda: _env("EXTRACTION_CACHE", "true").lower() in ("1", "true", "yes"))
+    extraction_cache_max_entries: int = Field(default_factory=lambda: int(_env("EXTRACTION_CACHE_MAX_ENTRIES", "100000")))
+    # Text-Layer der ersten Seiten lokal lesen (Datum/Nummern per Regeln), nur den Rest per Provider
+    extraction_text_layer: bool = Field(default_factory=lambda: _env("EXTRACTION_TEXT_LAYER", "true").lower() in ("1", "true", "yes"))
+    extraction_text_max_pages: int = Field(default_factory=lambda: int(_env("EXTRACTION_TEXT_MAX_PAGES", "3")))
+    extraction_text_max_bytes: int = Field(default_factory=lambda: int(_env("EXTRACTION_TEXT_MAX_BYTES", str(50 * 1024 * 1024))))
+    # Mindestmenge Text, ab der der Provider nur den Text statt der PDF bekommt
+    extraction_text_min_chars: int = Field(default_factory=lambda: int(_env("EXTRACTION_TEXT_MIN_CHARS", "50")))
+    # Fake-Provider: simulierte Latenz und Fehlerquote
+    extraction_fake_latency: float = Field(default_factory=lambda: float(_env("EXTRACTION_FAKE_LATENCY", "0.2")))
+    extraction_fake_failure_rate: float = Field(default_factory=lambda: float(_env("EXTRACTION_FAKE_FAILURE_RATE", "0.0")))
+    
+    # Ausgabe-Dateien: 'auto' (Hardlink -> Reflink -> copy_file_range -> Kopie), 'hardlink', 'reflink' oder 'copy'
+    output_materialization: str = Field(default_factory=lambda: _env("OUTPUT_MATERIALIZATION", "auto"))
+    
+    # Feste Executor-Größen für Datei-I/O der API (PDF-Kopien/Uploads bzw. Metadaten-Writes)
+    storage_io_workers: int = Field(default_factory=lambda: int(_env("STORAGE_IO_WORKERS", "16")))
+    storage_metadata_workers: int = Field(default_factory=lambda: int(_env("STORAGE_METADATA_WORKERS", "4")))
+    
+    # Bulk-Operationen: maximale parallele Datei-Schreibvorgänge/Kopien
+    bulk_max_workers: int = Field(default_factory=lambda: int(_env("BULK_MAX_WORKERS", "8")))
+    bulk_max_items: int = Field(default_factory=lambda: int(_env("BULK_MAX_ITEMS", "10000")))
+    
+    # Vorschaubilder (benötigt pypdfium2): Cache-Verzeichnis, Render-Threads für Abrufe, Vorberechnung nach Ingestion
+    thumbnails: bool = Field(default_factory=lambda: _env("THUMBNAILS", "true").lower() in ("1", "true", "yes"))
+    thumbnail_dir: str = Field(default_factory=lambda: _env("THUMBNAIL_DIR", ""))  # leer: {data_archive}/thumbnails
+    thumbnail_workers: int = Field(default_factory=lambda: int(_env("THUMBNAIL_WORKERS", "2")))
+    thumbnail_pregenerate: str = Field(default_factory=lambda: _env("THUMBNAIL_PREGENERATE", "small"))  # Größe oder 'none'
+    
+    # Server-Sent Events: Replay-Puffer für Reconnects, max. ausstehende Events je Client, Keepalive (s)
+    events_replay_size: int = Field(default_factory=lambda: int(_env("EVENTS_REPLAY_SIZE", "1000")))
+    events_client_queue_size: int = Field(default_factory=lambda: int(_env("EVENTS_CLIENT_QUEUE_SIZE", "256")))
+    events_keepalive: float = Field(default_factory=lambda: float(_env("EVENTS_KEEPALIVE", "15.0")))
+    events_retry_ms: int = Field(default_factory=lambda: int(_env("EVENTS_RETRY_MS", "3000")))
+    
+    # Eingabevorschläge: maximale Anzahl Vorschläge pro Anfrage (vorberechnet je Präfix)
+    suggestion_max_results: int = Field(default_factory=lambda: int(_env("SUGGESTION_MAX_RESULTS", "20")))
+    
+    # Betrieb: Log-Level (DEBUG protokolliert jede Metadaten-Änderung) und /metrics im Prometheus-Format
+    log_level: str = Field(default_factory=lambda: _env("LOG_LEVEL", "INFO").upper())
+    metrics: bool = Field(default_factory=lambda: _env("METRICS", "true").lower() in ("1", "true", "yes"))
+
+
+settings = Settings()
\ No newline at end of file
@@ -1,9 +1,119 @@
+from pathlib import Path
+from typing import Optional
+from app.config import settings
 from app.models import DocumentCollection
+from app.services.archive_layout import create_archive_layout
+from app.services.archive_loader import ArchiveLoader
+from app.services.async_storage_service import AsyncStorageService
+from app.services.event_bus import EventBus
+from app.services.extraction_cache import ExtractionCache
+from app.services.extraction_engine import ExtractionEngine
+from app.services.extraction_jobs import ExtractionJobStore
+from app.services.extraction_providers import create_extraction_provider
+from app.services.inbox_watcher import InboxWatcher
 from app.services.local_storage_service import LocalStorageService
+from app.services.metadata_store import check_metadata_backend, create_metadata_store
+from app.services.suggestion_service import SuggestionService
+from app.services.thumbnail_service import ThumbnailService
+from app.services.worker_coordination import WorkerCoordinator
+from app.utils.rate_limiter import RateLimiter
+
+# Mehrere Worker-Prozesse (uvicorn --workers): Abgleich über einen Change-Feed, ein Leader für Ingest/Watcher/Extraktion
+coordinator: Optional[WorkerCoordinator] = None
+if settings.workers > 1:
+    coordinator = WorkerCoordinator(settings.data_archive / ".pdff", poll_interval=settings.worker_sync_interval)
 
 # Globale Instanzen
-collection = DocumentCollection()
-storage = LocalStorageService()
+collection = DocumentCollection(
+    store=settings.collection_store,
+    version_lock=coordinator.version_lock if coordinator is not None else None
+)
+# Änderungen an der Collection als Server-Sent Events
+events = EventBus(replay_size=settings.events_replay_size, client_queue_size=settings.events_client_queue_size)
+collection.change_listeners.append(events.publish_change)
+archive_layout = create_archive_layout(settings.archive_layout)
+# Falsches Backend für ein bestehendes Archive: nicht leer starten
+check_metadata_backend(settings.metadata_backend, settings.data_archive, archive_layout)
+storage = LocalStorageService(
+    data_in=settings.data_in,
+    data_archive=settings.data_archive,
+    data_out=settings.data_out,
+    metadata_store=create_metadata_store(
+        settings.metadata_backend,
+        settings.data_archive,
+        compact_threshold=settings.journal_compact_threshold,
+        load_workers=settings.load_workers,
+        fsync=settings.metadata_fsync,
+        write_behind=settings.metadata_write_behind,
+        flush_interval=settings.metadata_flush_interval,
+        flush_max_pending=settings.metadata_flush_max_pending,
+        layout=archive_layout
+    ),
+    duplicate_policy=settings.duplicate_policy,
+    output_materialization=settings.output_materialization,
+    ingest_lock=coordinator.ingest_lock if coordinator is not None else None,
+    archive_layout=archive_layout
+)
+async_storage = AsyncStorageService(
+    storage,
+    io_workers=settings.storage_io_workers,
+    metadata_workers=settings.storage_metadata_workers
+)
+loader = ArchiveLoader(storage, collection)
+inbox_watcher = InboxWatcher(
+    storage,
+    collection,
+    mode=settings.inbox_watch_mode,
+    poll_interval=settings.inbox_poll_interval,
+    debounce_seconds=settings.inbox_debounce_seconds,
+    queue_size=settings.ingest_queue_size,
+    concurrency=settings.ingest_concurrency
+)
+
+# Vorschaubilder (erste Seite wird nach der Ingestion vorberechnet)
+thumbnails = ThumbnailService(
+    async_storage,
+    Path(settings.thumbnail_dir) if settings.thumbnail_dir else settings.data_archive / "thumbnails",
+    enabled=settings.thumbnails,
+    workers=settings.thumbnail_workers,
+    pregenerate_size=None if settings.thumbnail_pregenerate == "none" else settings.thumbnail_pregenerate
+)
+storage.ingest_listeners.append(thumbnails.notify_ingested)
+
+# Eingabevorschläge je Metadaten-Feld (nach dem Laden aufgebaut, danach inkrementell gepflegt)
+suggestions = SuggestionService(size=settings.suggestion_max_results)
+suggestions.attach(collection)
+if coordinator is not None:
+    coordinator.attach(collection, storage)
+
+# Metadaten-Extraktion (None, wenn kein Provider konfiguriert ist)
+extraction_engine: Optional[ExtractionEngine] = None
+extraction_provider = create_extraction_provider(
+    settings.extraction_provider,
+    model=settings.extraction_model,
+    api_key=settings.anthropic_api_key,
+    fake_latency=settings.extraction_fake_latency,
+    fake_failure_rate=settings.extraction_fake_failure_rate
+)
+if extraction_provider is not None:
+    extraction_engine = ExtractionEngine(
+        async_storage,
+        collection,
+        extraction_provider,
+        ExtractionJobStore(settings.data_archive),
+        concurrency=settings.extraction_concurrency,
+        rate_limiter=RateLimiter(settings.extraction_requests_per_minute, settings.extraction_tokens_per_minute),
+        max_attempts=settings.extraction_max_attempts,
+        backoff_base=settings.extraction_backoff_base,
+        backoff_max=settings.extraction_backoff_max,
+        cache=ExtractionCache(settings.data_archive, settings.extraction_cache_max_entries) if settings.extraction_cache else None,
+        text_layer=settings.extraction_text_layer,
+        text_max_pages=settings.extraction_text_max_pages,
+        text_max_bytes=settings.extraction_text_max_bytes,
+        text_min_chars=settings.extraction_text_min_chars,
+        shared=coordinator is not None
+    )
+    storage.ingest_listeners.append(extraction_engine.notify_ingested)
 
 
 def get_collection() -> DocumentCollection:
@@ -13,4 +123,39 @@ def get_collection() -> DocumentCollection:
 
 def get_storage() -> LocalStorageService:
     """Dependency für LocalStorageService"""
-    return storage
\ No newline at end of file
+    return storage
+
+
+def get_async_storage() -> AsyncStorageService:
+    """Dependency für AsyncStorageService (API-Handler)"""
+    return async_storage
+
+
+def get_extraction_engine() -> Optional[ExtractionEngine]:
+    """Dependency für ExtractionEngine (None wenn deaktiviert)"""
+    return extraction_engine
+
+
+def get_thumbnails() -> ThumbnailService:
+    """Dependency für ThumbnailService"""
+    return thumbnails
+
+
+def get_suggestions() -> SuggestionService:
+    """Dependency für SuggestionService"""
+    return suggestions
+
+
+def get_events() -> EventBus:
+    """Dependency für EventBus"""
+    return events
+
+
+def get_coordinator() -> Optional[WorkerCoordinator]:
+    """Dependency für WorkerCoordinator (None mit nur einem Worker-Prozess)"""
+    return coordinator
+
+
+def get_inbox_watcher() -> InboxWatcher:
+    """Dependency für InboxWatcher"""
+    return inbox_watcher
\ No newline at end of file
@@ -1,13 +1,19 @@
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse
 from contextlib import asynccontextmanager
+from typing import Optional
+import asyncio
 import logging
 from app.pages import pages_router , app_static
 from app.api.v1 import api_v1_router
-from app.dependencies import collection, storage
+from app.api.metrics import router as metrics_router
+from app.config import settings
+from app.dependencies import collection, storage, async_storage, loader, inbox_watcher, extraction_engine, suggestions, thumbnails, events, coordinator
+from app.utils.metrics import MetricsMiddleware
 import sys
 
 logging.basicConfig(
-    level=logging.DEBUG,
+    level=settings.log_level,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
     stream=sys.stdout
 )
@@ -21,22 +27,83 @@ logger.debug("Logging debug active")
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    """Startup: Dokumente laden"""
+    """Startup: Dokumente laden (blockierend oder im Hintergrund)"""
     print("LIFESPAN STARTUP")  # Simpler print statt logger
+    events.attach(asyncio.get_running_loop())
     logger.info("Starte Dokumenten-Ingestion...")
     
-    # Erst neue PDFs einlesen
-    storage.ingest_documents(collection)
-    logger.info(f"{len(collection)} neue Dokumente ingested")
+    # Mit mehreren Worker-Prozessen ingestiert und überwacht nur der Leader
+    leader = True
+    if coordinator is not None:
+        coordinator.open()
+        leader = coordinator.try_lead()
     
-    # Dann existierende laden
-    storage.load_documents(collection)
-    logger.info(f"Insgesamt {len(collection)} Dokumente geladen")
+    load_task = None
+    if settings.startup_mode == "background":
+        # Sofort Verbindungen annehmen, Fortschritt über /ready
+        load_task = loader.start_background(ingest=leader)
+        logger.info("Archiv wird im Hintergrund geladen")
+    else:
+        loader.run(ingest=leader)
+    
+    watcher_task = None
+    extraction_task = None
+    
+    def start_leader_services(wait_for: Optional[asyncio.Task] = None) -> None:
+        nonlocal watcher_task, extraction_task
+        if settings.content_hash_backfill:
+            loader.start_hash_backfill(wait_for=wait_for)
+        
+        # Inbox-Watcher erst nach der initialen Ingestion starten
+        if settings.inbox_watch:
+            watcher_task = asyncio.create_task(inbox_watcher.start(wait_for=wait_for))
+        
+        # Extraktion ebenfalls erst nach dem Laden (Jobs beziehen sich auf Documents der Collection)
+        if extraction_engine is not None:
+            extraction_task = asyncio.create_task(extraction_engine.start(wait_for=wait_for))
+    
+    coordinator_tasks = []
+    if leader:
+        start_leader_services(load_task)
+    else:
+        if extraction_engine is not None:
+            extraction_engine.follow(wait_for=load_task)
+        # Übernehmen, sobald der bisherige Leader endet
+        coordinator_tasks.append(asyncio.create_task(
+            coordinator.wait_for_leadership(start_leader_services, wait_for=load_task)
+        ))
+    if coordinator is not None:
+        coordinator_tasks.append(asyncio.create_task(coordinator.start(wait_for=load_task)))
+    
+    # Vorschläge aus den geladenen Metadaten aufbauen
+    suggestion_task = asyncio.create_task(suggestions.start(collection, wait_for=load_task))
     
     yield
     
     # Shutdown (optional cleanup)
     logger.info("Shutting down...")
+    events.close()
+    for task in coordinator_tasks:
+        task.cancel()
+    await asyncio.gather(*coordinator_tasks, return_exceptions=True)
+    if watcher_task is not None:
+        watcher_task.cancel()
+        await asyncio.gather(watcher_task, return_exceptions=True)
+        await inbox_watcher.stop()
+    if extraction_task is not None:
+        extraction_task.cancel()
+        await asyncio.gather(extraction_task, return_exceptions=True)
+    if extraction_engine is not None:
+        await extraction_engine.stop()
+    suggestion_task.cancel()
+    await asyncio.gather(suggestion_task, return_exceptions=True)
+    await loader.stop()
+    await asyncio.to_thread(thumbnails.close)
+    await asyncio.to_thread(async_storage.shutdown)
+    storage.close()
+    if coordinator is not None:
+        # Leader-Lock erst nach dem letzten Schreibvorgang freigeben
+        coordinator.close()
 
 app = FastAPI(
     title="PDFF Core",
@@ -49,12 +116,29 @@ app = FastAPI(
 app.include_router(pages_router)
 app.include_router(api_v1_router)
 
+if settings.metrics:
+    app.include_router(metrics_router)
+    # Event-Streams laufen beliebig lange und würden die Latenz-Histogramme verzerren
+    app.add_middleware(MetricsMiddleware, exclude=("/api/v1/events", "/metrics"))
+
 
 #from fastapi.staticfiles import StaticFiles
 #app_static = StaticFiles(directory="app/pages/static")
 app.mount("/static", app_static, name="static")
 
 @app.get("/health")
-def health():
+async def health():
     """Root health check"""
-    return {"status": "ok"}
\ No newline at end of file
+    return {"status": "ok"}
+
+
+@app.get("/ready")
+async def ready():
+    """Readiness-Check: 200 sobald das Archiv geladen ist, sonst 503 mit Fortschritt"""
+    progress = loader.progress.model_dump(mode="json")
+    progress["documents"] = len(collection)
+    if coordinator is not None:
+        progress["worker"] = coordinator.status().model_dump()
+    if not loader.is_ready:
+        return JSONResponse(status_code=503, content=progress)
+    return progress
\ No newline at end of file
@@ -1,8 +1,20 @@
-from app.models.document import Document, SavedAs
-from app.models.document_collection import DocumentCollection
+from app.models.document import Document, SavedAs, FieldSource, METADATA_FIELDS
+from app.models.document_filter import DocumentFilter
+from app.models.search_index import SearchIndex, SearchMatches
+from app.models.document_store import CompactDocumentStore, ObjectDocumentStore
+from app.models.document_collection import DocumentCollection, SearchPage, VersionConflict
 
 __all__ = [
     "Document",
     "SavedAs",
+    "FieldSource",
+    "METADATA_FIELDS",
+    "DocumentFilter",
+    "SearchIndex",
+    "SearchMatches",
+    "CompactDocumentStore",
+    "ObjectDocumentStore",
     "DocumentCollection",
+    "SearchPage",
+    "VersionConflict",
 ]
\ No newline at end of file
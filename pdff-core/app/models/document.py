@@ -1,12 +1,22 @@
 from pydantic import BaseModel, Field
 from datetime import date, datetime
 from pathlib import Path
-from typing import Optional, List
+from typing import Dict, Iterable, Optional, List
 from uuid import UUID, uuid4
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Inhaltliche Metadaten-Felder (ohne ID, Dateinamen und Historie)
+METADATA_FIELDS = (
+    "document_type",
+    "correspondent",
+    "topic",
+    "customer_id",
+    "document_number",
+    "document_date",
+)
+
 
 class SavedAs(BaseModel):
     """Speicherhistorie eines Dokuments"""
@@ -14,11 +24,21 @@ class SavedAs(BaseModel):
     timestamp: datetime = Field(default_factory=datetime.utcnow)
 
 
+class FieldSource(BaseModel):
+    """Herkunft eines Metadaten-Felds"""
+    source: str  # text (Regeln auf dem Text-Layer) | llm | manual
+    detail: Optional[str] = Field(None, description="Regel bzw. Provider/Modell")
+    page: Optional[int] = Field(None, description="Seite (1-basiert) bei Text-Regeln")
+    recorded_at: datetime = Field(default_factory=datetime.utcnow)
+
+
 class Document(BaseModel):
     """Hauptdokument mit UUID und Metadaten"""
     id: UUID = Field(default_factory=uuid4)
     original_filename: str = Field(..., description="Ursprünglicher Dateiname")
     saved_as: List[SavedAs] = Field(default_factory=list, description="Speicherhistorie")
+    content_hash: Optional[str] = Field(None, description="SHA-256 des PDF-Inhalts (hex)")
+    duplicate_of: Optional[UUID] = Field(None, description="ID des Originals bei inhaltsgleichem Dokument")
     
     # Metadaten (anfangs leer)
     document_type: Optional[str] = None
@@ -28,6 +48,12 @@ class Document(BaseModel):
     document_number: Optional[str] = Field(None, description="Rechnungs-/Dokumentnummer")
     document_date: Optional[date] = Field(None, description="Dokumentdatum")
     
+    # Herkunft der Metadaten-Felder (Feldname -> Quelle)
+    field_sources: Dict[str, FieldSource] = Field(default_factory=dict)
+    
+    # Wird bei jeder Änderung erhöht (ETag, If-Match gegen verlorene Updates)
+    version: int = Field(0, description="Änderungszähler")
+    
     @staticmethod
     def build_filename(
         document_type: Optional[str],
@@ -84,6 +110,7 @@ class Document(BaseModel):
     def add_saved_filename(self, filename: str) -> None:
         """Fügt einen Dateinamen zur Speicherhistorie hinzu"""
         self.saved_as.append(SavedAs(filename=filename))
+        self.bump_version()
         logger.info(f"Document {self.id}: Gespeichert als '{filename}'")
     
     @property
@@ -93,6 +120,23 @@ class Document(BaseModel):
             return self.saved_as[-1].filename
         return self.original_filename
     
+    def bump_version(self) -> int:
+        """Erhöht die Version nach einer Änderung"""
+        self.version += 1
+        return self.version
+    
+    def updated_sources(self, fields: Iterable[str], source: FieldSource) -> Dict[str, FieldSource]:
+        """Kopie von field_sources, in der die angegebenen Felder auf source gesetzt sind"""
+        sources = dict(self.field_sources)
+        for field in fields:
+            sources[field] = source
+        return sources
+    
+    @property
+    def is_complete(self) -> bool:
+        """Gibt True zurück, wenn die Pflicht-Metadaten (Typ und Korrespondent) gesetzt sind"""
+        return bool(self.document_type and self.correspondent)
+    
     @property
     def is_saved(self) -> bool:
         """Gibt True zurück, wenn das Dokument bereits gespeichert wurde"""
@@ -1,44 +1,452 @@
-from typing import Dict, List, Optional
+from collections import Counter
+from datetime import date
+from typing import Any, Callable, ContextManager, Dict, Iterable, List, NamedTuple, Optional, Tuple
 from uuid import UUID
+import contextlib
+import heapq
 import logging
+import math
+import threading
 from app.models.document import Document
+from app.models.document_filter import DocumentFilter
+from app.models.document_store import create_document_store
+from app.models.search_index import SearchIndex
+from app.models.sorted_index import SortedIndex
 
 logger = logging.getLogger(__name__)
 
+# Sortierschlüssel für Navigation: Original-Dateiname, ID als stabiler Tie-Breaker
+NavigationKey = Tuple[str, str]
+
+# Navigations-Filter: Name -> Prädikat für Mitgliedschaft im Index
+NAVIGATION_FILTERS: Dict[str, Callable[[Document], bool]] = {
+    "all": lambda doc: True,
+    "unprocessed": lambda doc: not doc.is_complete,
+    "unsaved": lambda doc: not doc.is_saved,
+}
+
+
+class NavigationWindow(NamedTuple):
+    """Ergebnis einer Navigationsabfrage"""
+    previous: List[Document]  # nächster Vorgänger zuerst
+    next: List[Document]
+    position: int  # 1-basiert
+    total: int
+
+
+class SearchPage(NamedTuple):
+    """Ergebnisseite einer Suche"""
+    documents: List[Document]
+    total: int  # Anzahl aller Treffer
+    total_exact: bool  # False: total ist nur eine Untergrenze
+    next_key: Optional[NavigationKey]
+
+
+class VersionConflict(ValueError):
+    """Ein Update erwartete eine andere als die aktuelle Version des Documents"""
+    
+    def __init__(self, document: Document, expected: int):
+        super().__init__(f"Document {document.id} hat Version {document.version}, erwartet {expected}")
+        self.document = document
+        self.expected = expected
+
 
 class DocumentCollection:
-    """Verwaltung einer Menge von Documents mit ID-basiertem Zugriff"""
+    """
+    Verwaltung einer Menge von Documents mit ID-basiertem Zugriff.
+    store='compact' legt die Documents spaltenweise ab und erzeugt sie erst beim
+    Zugriff (siehe CompactDocumentStore); Indizes und Filter lesen dann leichte
+    Sichten statt ganzer Modelle.
+    """
+    
+    def __init__(self, store: str = "objects", version_lock: Optional[ContextManager] = None):
+        self._store = create_document_store(store)
+        self._lock = threading.RLock()
+        # Umschließt Versionsprüfung und -erhöhung in update(); mit mehreren Worker-Prozessen
+        # prozessübergreifend, damit keine zwei Prozesse dieselbe Version vergeben
+        self._version_lock = version_lock or contextlib.nullcontext()
+        # Sortierte Navigations-Indizes je Filter, inkrementell gepflegt
+        self._nav_indexes: Dict[str, SortedIndex[NavigationKey]] = {
+            name: SortedIndex() for name in NAVIGATION_FILTERS
+        }
+        self._nav_keys: Dict[NavigationKey, UUID] = {}
+        # Nach add_many werden die Indizes erst beim ersten Zugriff (neu) aufgebaut
+        self._indexes_stale = False
+        # Content-Hash -> Document-IDs (Original zuerst) für die Deduplizierung
+        self._hash_index: Dict[str, List[UUID]] = {}
+        # Invertierter Index für die Suche, nach add_many erst bei der ersten Suche aufgebaut
+        self._search_index = SearchIndex()
+        self._search_stale = False
+        # Werden nach add/update/apply/refresh/remove noch unter dem Lock aufgerufen:
+        # (created|updated|removed, Document, geänderte Felder, vorherige Werte dieser Felder).
+        # Nicht bei add_many (Laden beim Start). Listener müssen schnell sein und dürfen nicht blockieren.
+        self.change_listeners: List[Callable[[str, Document, Tuple[str, ...], Dict[str, Any]], None]] = []
+    
+    @staticmethod
+    def _nav_key(document: Document) -> NavigationKey:
+        return (document.original_filename, str(document.id))
+    
+    def _ensure_indexes(self) -> None:
+        """Baut veraltete Navigations-Indizes in einem Durchlauf neu auf (Lock muss gehalten werden)"""
+        if not self._indexes_stale:
+            return
+        # Schlüssel-Tupel werden von allen Indizes gemeinsam referenziert
+        keyed = [(self._nav_key(row), row) for row in self._store.rows()]
+        self._nav_keys = {key: row.id for key, row in keyed}
+        for name, predicate in NAVIGATION_FILTERS.items():
+            self._nav_indexes[name].rebuild(key for key, row in keyed if predicate(row))
+        self._indexes_stale = False
+        logger.debug(f"Navigations-Indizes für {len(self._store)} Documents aufgebaut")
+    
+    def _ensure_search_index(self) -> None:
+        """Baut einen veralteten Such-Index neu auf (Lock muss gehalten werden)"""
+        if not self._search_stale:
+            return
+        self._search_index.rebuild(self._store.rows())
+        self._search_stale = False
+        logger.debug(f"Such-Index für {len(self._store)} Documents aufgebaut")
+    
+    def build_indexes(self) -> None:
+        """Baut veraltete Navigations- und Such-Indizes sofort auf (z.B. nach dem Laden des Archivs)"""
+        with self._lock:
+            self._ensure_indexes()
+            self._ensure_search_index()
+    
+    def _index_hash(self, document: Document) -> None:
+        if not document.content_hash:
+            return
+        document_ids = self._hash_index.setdefault(document.content_hash, [])
+        if document.id not in document_ids:
+            if document.duplicate_of is None:
+                document_ids.insert(0, document.id)
+            else:
+                document_ids.append(document.id)
     
-    def __init__(self):
-        self._documents: Dict[UUID, Document] = {}
+    def _unindex_hash(self, document: Document) -> None:
+        document_ids = self._hash_index.get(document.content_hash or "")
+        if document_ids and document.id in document_ids:
+            document_ids.remove(document.id)
+            if not document_ids:
+                del self._hash_index[document.content_hash]
+    
+    def _index_document(self, document: Document) -> None:
+        self._index_hash(document)
+        if not self._search_stale:
+            self._search_index.index(document)
+        if self._indexes_stale:
+            return
+        key = self._nav_key(document)
+        self._nav_keys[key] = document.id
+        for name, predicate in NAVIGATION_FILTERS.items():
+            if predicate(document):
+                self._nav_indexes[name].insert(key)
+            else:
+                self._nav_indexes[name].discard(key)
+    
+    def _notify(
+        self,
+        change: str,
+        document: Document,
+        fields: Tuple[str, ...] = (),
+        previous: Optional[Dict[str, Any]] = None
+    ) -> None:
+        """Benachrichtigt die Listener (Lock muss gehalten werden, damit die Reihenfolge der Änderungen gilt)"""
+        for listener in self.change_listeners:
+            try:
+                listener(change, document, fields, previous or {})
+            except Exception as e:
+                logger.error(f"Change-Listener für Document {document.id} fehlgeschlagen: {e}")
+    
+    def _unindex_document(self, document: Document) -> None:
+        self._unindex_hash(document)
+        if not self._search_stale:
+            self._search_index.remove(document.id)
+        if self._indexes_stale:
+            return
+        key = self._nav_key(document)
+        self._nav_keys.pop(key, None)
+        for index in self._nav_indexes.values():
+            index.discard(key)
     
     def add(self, document: Document) -> None:
         """Fügt ein Document zur Collection hinzu. Wirft ValueError bei doppelter ID."""
-        if document.id in self._documents:
-            raise ValueError(f"Document mit ID {document.id} existiert bereits in der Collection")
-        self._documents[document.id] = document
+        with self._lock:
+            if document.id in self._store:
+                raise ValueError(f"Document mit ID {document.id} existiert bereits in der Collection")
+            self._store.put(document)
+            self._index_document(document)
+            self._notify("created", document)
         logger.debug(f"Document {document.id} zur Collection hinzugefügt")
     
+    def add_many(self, documents: Iterable[Document]) -> List[Document]:
+        """
+        Fügt viele Documents auf einmal hinzu (z.B. beim Start).
+        Navigations- und Such-Index werden erst beim nächsten Zugriff aufgebaut.
+        Gibt die wegen doppelter ID übersprungenen Documents zurück.
+        """
+        skipped: List[Document] = []
+        with self._lock:
+            for document in documents:
+                if document.id in self._store:
+                    skipped.append(document)
+                    continue
+                # Beim Laden werden die Documents danach verworfen - keine Sicht vormerken
+                self._store.put(document, view=False)
+                self._index_hash(document)
+            self._indexes_stale = True
+            self._search_stale = True
+        return skipped
+    
     def get(self, document_id: UUID) -> Optional[Document]:
         """Holt ein Document per ID"""
-        return self._documents.get(document_id)
+        with self._lock:
+            return self._store.get(document_id)
+    
+    def update(self, document: Document, changes: Dict[str, Any], expected_version: Optional[int] = None) -> Document:
+        """
+        Wendet ein partielles Update auf ein Document an, erhöht die Version und pflegt die Indizes.
+        Mit expected_version nur, wenn das Document noch diese Version hat (sonst VersionConflict).
+        """
+        with self._version_lock, self._lock:
+            if expected_version is not None and document.version != expected_version:
+                raise VersionConflict(document, expected_version)
+            known = document.id in self._store
+            if known:
+                # Schlüssel des bisherigen Stands entfernen (z.B. geänderter original_filename)
+                self._unindex_document(document)
+            previous = {field: getattr(document, field) for field in changes}
+            for field, value in changes.items():
+                setattr(document, field, value)
+            document.bump_version()
+            if known:
+                self._store.put(document)
+                self._index_document(document)
+            self._notify("updated", document, tuple(changes), previous)
+        return document
+    
+    def apply(self, document: Document, changes: Dict[str, Any]) -> Document:
+        """
+        Übernimmt Änderungen, die anderswo vorgenommen und gespeichert wurden
+        (z.B. von einem anderen Worker-Prozess). Wie update(), aber ohne die
+        Version zu erhöhen - changes enthält den fertigen Stand inkl. version.
+        """
+        with self._lock:
+            known = document.id in self._store
+            if known:
+                self._unindex_document(document)
+            previous = {field: getattr(document, field) for field in changes}
+            for field, value in changes.items():
+                setattr(document, field, value)
+            if known:
+                self._store.put(document)
+                self._index_document(document)
+            self._notify("updated", document, tuple(changes), previous)
+        return document
+    
+    def refresh(self, document: Document) -> None:
+        """
+        Aktualisiert die Indizes nach einer Änderung am Document
+        (z.B. nach Speicherung, die saved_as verändert)
+        """
+        with self._lock:
+            if document.id not in self._store:
+                return
+            self._store.put(document)
+            self._index_document(document)
+            self._notify("updated", document)
     
     def remove(self, document_id: UUID) -> bool:
         """Entfernt ein Document aus der Collection"""
-        if document_id in self._documents:
-            del self._documents[document_id]
-            logger.debug(f"Document {document_id} aus Collection entfernt")
-            return True
-        return False
+        with self._lock:
+            document = self._store.pop(document_id)
+            if document is None:
+                return False
+            self._unindex_document(document)
+            self._notify("removed", document)
+        logger.debug(f"Document {document_id} aus Collection entfernt")
+        return True
+    
+    def find_by_hash(self, content_hash: str) -> Optional[Document]:
+        """Liefert das (Original-)Document mit diesem Content-Hash, falls vorhanden"""
+        with self._lock:
+            document_ids = self._hash_index.get(content_hash)
+            return self._store.get(document_ids[0]) if document_ids else None
     
     def all(self) -> List[Document]:
-        """Gibt alle Documents als Liste zurück"""
-        return list(self._documents.values())
+        """Gibt alle Documents als Liste zurück (im kompakten Modus werden dafür alle erzeugt)"""
+        with self._lock:
+            return self._store.documents()
+    
+    def rows(self) -> List[Any]:
+        """
+        Lesende Sichten auf alle Documents für Durchläufe über die einfachen
+        Felder (ohne saved_as und field_sources), z.B. Statistiken. Im kompakten
+        Modus werden dafür keine Documents erzeugt; eine Sicht gilt nur bis zur
+        nächsten Änderung - für Änderungen das Document per get() holen.
+        """
+        with self._lock:
+            return self._store.rows()
+    
+    def count_values(self, fields: Iterable[str], started: Optional[Callable[[], None]] = None) -> Dict[str, Counter]:
+        """
+        Häufigkeit der Werte je Feld über alle Documents, unter dem Lock gezählt.
+        started wird vorher unter demselben Lock aufgerufen: Change-Listener sehen
+        danach genau die Änderungen, die nicht mehr mitgezählt sind.
+        """
+        counters: Dict[str, Counter] = {field: Counter() for field in fields}
+        with self._lock:
+            if started is not None:
+                started()
+            for row in self._store.rows():
+                for field, counter in counters.items():
+                    value = getattr(row, field)
+                    if value:
+                        counter[value] += 1
+        return counters
+    
+    def count(self, filter: str = "all") -> int:
+        """Anzahl der Documents, die einem Navigations-Filter entsprechen"""
+        with self._lock:
+            self._ensure_indexes()
+            return len(self._nav_indexes.get(filter, self._nav_indexes["all"]))
+    
+    def navigate(self, document_id: UUID, filter: str = "all", window: int = 1) -> Optional[NavigationWindow]:
+        """
+        Liefert bis zu `window` Vorgänger und Nachfolger eines Documents
+        in der nach original_filename sortierten Filter-Reihenfolge.
+        Ist das Document selbst nicht im Filter, wird es an seiner
+        Sortierposition eingeordnet (zählt dann zur Gesamtzahl).
+        """
+        with self._lock:
+            document = self._store.row(document_id)
+            if document is None:
+                return None
+            
+            self._ensure_indexes()
+            index = self._nav_indexes.get(filter, self._nav_indexes["all"])
+            pos, contained = index.position(self._nav_key(document))
+            after = pos + 1 if contained else pos
+            
+            previous_keys = index.slice(pos - window, pos)
+            next_keys = index.slice(after, after + window)
+            
+            return NavigationWindow(
+                previous=[self._store.get(self._nav_keys[key]) for key in reversed(previous_keys)],
+                next=[self._store.get(self._nav_keys[key]) for key in next_keys],
+                position=pos + 1,
+                total=len(index) if contained else len(index) + 1
+            )
+    
+    def page(
+        self,
+        document_filter: Optional[DocumentFilter] = None,
+        after: Optional[NavigationKey] = None,
+        limit: int = 100
+    ) -> Tuple[List[Document], Optional[NavigationKey]]:
+        """
+        Cursor-Pagination in stabiler Reihenfolge (original_filename, id).
+        Gibt bis zu `limit` passende Documents nach dem Schlüssel `after` zurück
+        sowie den Schlüssel für die nächste Seite (None wenn keine weitere existiert).
+        """
+        document_filter = document_filter or DocumentFilter()
+        
+        with self._lock:
+            self._ensure_indexes()
+            index = self._nav_indexes[document_filter.index_name]
+            start = 0
+            if after is not None:
+                pos, contained = index.position(after)
+                start = pos + 1 if contained else pos
+            
+            documents: List[Document] = []
+            has_more = False
+            matches = self._store.matcher(document_filter)
+            for key in index.iter_from(start):
+                document_id = self._nav_keys[key]
+                if not matches(document_id):
+                    continue
+                if len(documents) == limit:
+                    has_more = True
+                    break
+                documents.append(self._store.get(document_id))
+        
+        next_key = self._nav_key(documents[-1]) if has_more else None
+        return documents, next_key
+    
+    def count_matching(self, document_filter: Optional[DocumentFilter] = None) -> int:
+        """
+        Anzahl der Documents, die einem Filter entsprechen (wie page()).
+        Deckt der Navigations-Index den Filter vollständig ab, ohne Durchlauf.
+        """
+        document_filter = document_filter or DocumentFilter()
+        
+        with self._lock:
+            self._ensure_indexes()
+            index_name = document_filter.index_name
+            index = self._nav_indexes[index_name]
+            criteria = document_filter.model_dump(exclude_none=True)
+            if criteria == ({} if index_name == "all" else {index_name: True}):
+                return len(index)
+            matches = self._store.matcher(document_filter)
+            return sum(1 for key in index.iter_from(0) if matches(self._nav_keys[key]))
+    
+    def search(
+        self,
+        query: str = "",
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None,
+        prefix: bool = True,
+        after: Optional[NavigationKey] = None,
+        limit: int = 100
+    ) -> SearchPage:
+        """
+        Sucht über den invertierten Index und liefert die Treffer cursor-paginiert
+        in der Reihenfolge der Dokumentliste (original_filename, id).
+        Wenige Treffer werden sortiert, bei vielen Treffern wird die sortierte
+        Navigation durchlaufen, bis die Seite voll ist.
+        """
+        with self._lock:
+            self._ensure_search_index()
+            self._ensure_indexes()
+            index = self._nav_indexes["all"]
+            # Bis etwa sqrt(limit * n) Treffer ist Sortieren günstiger als die Navigation zu durchlaufen
+            sort_limit = math.isqrt(limit * max(len(index), 1))
+            matches = self._search_index.search(query, date_from, date_to, prefix, materialize_limit=sort_limit)
+            
+            keys: List[NavigationKey] = []
+            if matches.slots is None or len(matches) > sort_limit:
+                start = 0
+                if after is not None:
+                    pos, contained = index.position(after)
+                    start = pos + 1 if contained else pos
+                for key in index.iter_from(start):
+                    if self._nav_keys[key] in matches:
+                        keys.append(key)
+                        if len(keys) > limit:
+                            break
+            else:
+                # UUID.int sortiert wie die Hex-Darstellung im Navigationsschlüssel, ist aber ohne str() verfügbar
+                after_rank = (after[0], UUID(after[1]).int) if after is not None else None
+                rows = map(self._store.row, matches.document_ids())
+                ranked = heapq.nsmallest(limit + 1, (
+                    (row.original_filename, row.id.int, row)
+                    for row in rows
+                    if after_rank is None or (row.original_filename, row.id.int) > after_rank
+                ))
+                keys = [self._nav_key(row) for _, _, row in ranked]
+            
+            documents = [self._store.get(self._nav_keys[key]) for key in keys[:limit]]
+        
+        next_key = keys[limit - 1] if len(keys) > limit else None
+        total = len(matches)
+        if not matches.exact:
+            total = max(total, len(documents) + (1 if next_key else 0))
+        return SearchPage(documents=documents, total=total, total_exact=matches.exact, next_key=next_key)
     
     def __len__(self) -> int:
         """Anzahl der Documents in der Collection"""
-        return len(self._documents)
+        return len(self._store)
     
     def __contains__(self, document_id: UUID) -> bool:
         """Prüft ob Document-ID in Collection vorhanden"""
-        return document_id in self._documents
\ No newline at end of file
+        return document_id in self._store
\ No newline at end of file
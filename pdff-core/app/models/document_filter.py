@@ -0,0 +1,47 @@
+from pydantic import BaseModel, Field
+from datetime import date
+from typing import Optional
+from app.models.document import Document
+
+
+class DocumentFilter(BaseModel):
+    """Filterkriterien für Listen- und Bulk-Operationen"""
+    unprocessed: Optional[bool] = Field(None, description="Nur Dokumente ohne (True) / mit (False) vollständigen Metadaten")
+    unsaved: Optional[bool] = Field(None, description="Nur nie (True) / bereits (False) gespeicherte Dokumente")
+    document_type: Optional[str] = None
+    correspondent: Optional[str] = None
+    date_from: Optional[date] = Field(None, description="Dokumentdatum ab (inklusive)")
+    date_to: Optional[date] = Field(None, description="Dokumentdatum bis (inklusive)")
+    
+    @property
+    def index_name(self) -> str:
+        """Navigations-Index der Collection, der die Kandidatenmenge am stärksten einschränkt"""
+        if self.unprocessed:
+            return "unprocessed"
+        if self.unsaved:
+            return "unsaved"
+        return "all"
+    
+    @property
+    def is_empty(self) -> bool:
+        """True wenn keine Filterkriterien gesetzt sind"""
+        return not self.model_dump(exclude_none=True)
+    
+    def matches(self, document: Document) -> bool:
+        """Prüft ob ein Document alle gesetzten Kriterien erfüllt"""
+        if self.unprocessed is not None and self.unprocessed == document.is_complete:
+            return False
+        if self.unsaved is not None and self.unsaved == document.is_saved:
+            return False
+        if self.document_type is not None and document.document_type != self.document_type:
+            return False
+        if self.correspondent is not None and document.correspondent != self.correspondent:
+            return False
+        if self.date_from is not None or self.date_to is not None:
+            if document.document_date is None:
+                return False
+            if self.date_from is not None and document.document_date < self.date_from:
+                return False
+            if self.date_to is not None and document.document_date > self.date_to:
+                return False
+        return True
\ No newline at end of file
@@ -0,0 +1,489 @@
+"""
+Ablage der Documents einer DocumentCollection.
+
+ObjectDocumentStore hält die Pydantic-Modelle selbst (Standard). CompactDocumentStore
+legt die Felder spaltenweise ab: Dokumenttyp, Korrespondent und Thema als Codes
+in eine Tabelle internierter Strings, Datum, Version, Flags und Content-Hash in
+Arrays, Speicherhistorie und Feld-Herkunft gepackt in einem bytes-Objekt.
+Documents entstehen erst beim Zugriff und bleiben so lange dieselbe Instanz,
+wie jemand sie hält - Änderungen gelangen über put() (update/refresh der
+Collection) zurück in die Spalten.
+"""
+from array import array
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+from uuid import UUID
+import weakref
+from app.models.document import Document
+from app.models.document_filter import DocumentFilter
+
+_COMPLETE = 1
+_SAVED = 2
+_HASHED = 4
+
+_HASH_SIZE = 32
+_EPOCH = datetime(1970, 1, 1)
+
+
+class StringTable:
+    """Internierte Strings: jeder Wert wird einmal gespeichert, Spalten halten nur den Code (0 = None)"""
+    
+    def __init__(self):
+        self._values: List[Optional[str]] = [None]
+        self._codes: Dict[str, int] = {}
+    
+    def code(self, value: Optional[str]) -> int:
+        if value is None:
+            return 0
+        code = self._codes.get(value)
+        if code is None:
+            code = len(self._values)
+            self._values.append(value)
+            self._codes[value] = code
+        return code
+    
+    def find(self, value: str) -> Optional[int]:
+        """Code eines bereits internierten Werts (ohne ihn aufzunehmen)"""
+        return self._codes.get(value)
+    
+    def __getitem__(self, code: int) -> Optional[str]:
+        return self._values[code]
+    
+    def __len__(self) -> int:
+        return len(self._values) - 1
+
+
+def _zigzag(value: int) -> int:
+    return value * 2 if value >= 0 else -value * 2 - 1
+
+
+def _unzigzag(value: int) -> int:
+    return value // 2 if not value & 1 else -(value + 1) // 2
+
+
+def _encode_varints(values: List[int]) -> bytearray:
+    """Nicht-negative Zahlen als Varints (7 Bit je Byte, kleine Werte in einem Byte)"""
+    out = bytearray()
+    for value in values:
+        while value > 0x7F:
+            out.append(value & 0x7F | 0x80)
+            value >>= 7
+        out.append(value)
+    return out
+
+
+def _decode_varints(data: bytes, count: int, pos: int) -> Tuple[List[int], int]:
+    values: List[int] = []
+    for _ in range(count):
+        value = shift = 0
+        while True:
+            byte = data[pos]
+            pos += 1
+            value |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                break
+            shift += 7
+        values.append(value)
+    return values, pos
+
+
+def _pack_history(document: Document, strings: "StringTable") -> Optional[bytes]:
+    """
+    Packt saved_as und field_sources: Anzahl der Zahlen, die Zahlen als Varints,
+    danach die gespeicherten Dateinamen (UTF-8, durch NUL getrennt). Zeitpunkte
+    sind Differenzen zum vorherigen in Mikrosekunden (meist 0 - die Felder einer
+    Extraktion teilen sich den Zeitpunkt), Zeitzonen ein fester Offset (0 = naiv).
+    """
+    if not document.saved_as and not document.field_sources:
+        return None
+    values: List[int] = []
+    previous = 0
+    
+    def add_time(value: datetime) -> None:
+        nonlocal previous
+        offset = value.utcoffset()
+        if offset is not None:
+            value = value.replace(tzinfo=None)
+        delta = value - _EPOCH
+        micros = (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds
+        values.append(_zigzag(micros - previous))
+        values.append(0 if offset is None else _zigzag(offset // timedelta(seconds=1)) + 1)
+        previous = micros
+    
+    values.append(len(document.saved_as))
+    for entry in document.saved_as:
+        add_time(entry.timestamp)
+    values.append(len(document.field_sources))
+    for field, source in document.field_sources.items():
+        values.append(strings.code(field))
+        values.append(strings.code(source.source))
+        values.append(strings.code(source.detail))
+        values.append(0 if source.page is None else _zigzag(source.page) + 1)
+        add_time(source.recorded_at)
+    
+    out = _encode_varints([len(values)])
+    out += _encode_varints(values)
+    out += "\0".join(entry.filename for entry in document.saved_as).encode("utf-8")
+    return bytes(out)
+
+
+def _unpack_history(data: Optional[bytes], strings: "StringTable") -> Tuple[List[Dict[str, Any]], Dict[str, Dict[str, Any]]]:
+    """Gegenstück zu _pack_history, liefert die Felder als Dicts (für model_validate)"""
+    if data is None:
+        return [], {}
+    (count,), pos = _decode_varints(data, 1, 0)
+    values, pos = _decode_varints(data, count, pos)
+    stream = iter(values)
+    previous = 0
+    last: Optional[datetime] = None
+    last_offset = 0
+    
+    def next_time() -> datetime:
+        nonlocal previous, last, last_offset
+        delta, offset = next(stream), next(stream)
+        # Gleicher Zeitpunkt wie zuvor (Regelfall): datetime ist unveränderlich und wird geteilt
+        if delta == 0 and offset == last_offset and last is not None:
+            return last
+        previous += _unzigzag(delta)
+        value = _EPOCH + timedelta(microseconds=previous)
+        if offset:
+            value = value.replace(tzinfo=timezone(timedelta(seconds=_unzigzag(offset - 1))))
+        last, last_offset = value, offset
+        return value
+    
+    saved_count = next(stream)
+    timestamps = [next_time() for _ in range(saved_count)]
+    filenames = data[pos:].decode("utf-8").split("\0") if saved_count else []
+    saved_as = [{"filename": filename, "timestamp": timestamp} for filename, timestamp in zip(filenames, timestamps)]
+    
+    field_sources: Dict[str, Dict[str, Any]] = {}
+    for _ in range(next(stream)):
+        field, source, detail, page = strings[next(stream)], strings[next(stream)], strings[next(stream)], next(stream)
+        field_sources[field] = {
+            "source": source,
+            "detail": detail,
+            "page": _unzigzag(page - 1) if page else None,
+            "recorded_at": next_time(),
+        }
+    return saved_as, field_sources
+
+
+
+class ObjectDocumentStore:
+    """Hält die Documents selbst (Standard): Zugriff ohne Umwandlung"""
+    
+    def __init__(self):
+        self._documents: Dict[UUID, Document] = {}
+    
+    def put(self, document: Document, view: bool = True) -> None:
+        self._documents[document.id] = document
+    
+    def get(self, document_id: UUID) -> Optional[Document]:
+        return self._documents.get(document_id)
+    
+    # Das Document selbst dient als Sicht für Indizes und Filter
+    row = get
+    
+    def rows(self) -> List[Document]:
+        return list(self._documents.values())
+    
+    def matcher(self, document_filter: DocumentFilter) -> Callable[[UUID], bool]:
+        documents = self._documents
+        return lambda document_id: document_filter.matches(documents[document_id])
+    
+    def documents(self) -> List[Document]:
+        return list(self._documents.values())
+    
+    def pop(self, document_id: UUID) -> Optional[Document]:
+        return self._documents.pop(document_id, None)
+    
+    def __len__(self) -> int:
+        return len(self._documents)
+    
+    def __contains__(self, document_id: UUID) -> bool:
+        return document_id in self._documents
+
+
+class DocumentRow:
+    """
+    Leichte Sicht auf die einfachen Felder eines Documents im CompactDocumentStore
+    (Navigation, Filter, Such-Index) - ohne Speicherhistorie und Feld-Herkunft.
+    Nur bis zur nächsten Änderung der Collection gültig.
+    """
+    __slots__ = ("_store", "_slot")
+    
+    def __init__(self, store: "CompactDocumentStore", slot: int):
+        self._store = store
+        self._slot = slot
+    
+    @property
+    def id(self) -> UUID:
+        return self._store._ids[self._slot]
+    
+    @property
+    def original_filename(self) -> str:
+        return self._store._filenames[self._slot]
+    
+    @property
+    def content_hash(self) -> Optional[str]:
+        return self._store._content_hash(self._slot)
+    
+    @property
+    def duplicate_of(self) -> Optional[UUID]:
+        return self._store._duplicates.get(self._slot)
+    
+    @property
+    def document_type(self) -> Optional[str]:
+        return self._store._strings[self._store._types[self._slot]]
+    
+    @property
+    def correspondent(self) -> Optional[str]:
+        return self._store._strings[self._store._correspondents[self._slot]]
+    
+    @property
+    def topic(self) -> Optional[str]:
+        return self._store._strings[self._store._topics[self._slot]]
+    
+    @property
+    def customer_id(self) -> Optional[str]:
+        return self._store._customer_ids[self._slot]
+    
+    @property
+    def document_number(self) -> Optional[str]:
+        return self._store._document_numbers[self._slot]
+    
+    @property
+    def document_date(self) -> Optional[date]:
+        ordinal = self._store._dates[self._slot]
+        return date.fromordinal(ordinal) if ordinal else None
+    
+    @property
+    def version(self) -> int:
+        return self._store._versions[self._slot]
+    
+    @property
+    def is_complete(self) -> bool:
+        return bool(self._store._flags[self._slot] & _COMPLETE)
+    
+    @property
+    def is_saved(self) -> bool:
+        return bool(self._store._flags[self._slot] & _SAVED)
+
+
+class CompactDocumentStore:
+    """
+    Spaltenweise Ablage (Slot je Document, freie Slots werden wiederverwendet).
+    Etwa ein Achtel des Speichers der Pydantic-Modelle (rund 0,5 statt 3,7 KB je
+    Document, davon UUID und Dateiname gemeinsam mit den Navigations-Indizes);
+    dafür kostet das Erzeugen eines Documents (get) bzw. das Zurückschreiben
+    (put) einige zehn Mikrosekunden.
+    """
+    
+    def __init__(self):
+        self._slots: Dict[UUID, int] = {}
+        self._free: List[int] = []
+        self._strings = StringTable()
+        self._ids: List[Optional[UUID]] = []
+        self._filenames: List[Optional[str]] = []
+        self._types = array("I")
+        self._correspondents = array("I")
+        self._topics = array("I")
+        self._customer_ids: List[Optional[str]] = []
+        self._document_numbers: List[Optional[str]] = []
+        self._dates = array("i")  # date.toordinal(), 0 = kein Datum
+        self._versions = array("q")
+        self._flags = bytearray()
+        self._hashes = bytearray()  # SHA-256 binär, _HASH_SIZE Bytes je Slot
+        # Selten gesetzte Werte nur für die betroffenen Slots
+        self._duplicates: Dict[int, UUID] = {}
+        self._raw_hashes: Dict[int, str] = {}  # Content-Hashes, die kein SHA-256 in Kleinbuchstaben-Hex sind
+        self._history: List[Optional[bytes]] = []
+        # Erzeugte Documents, solange sie noch referenziert werden
+        self._views: "weakref.WeakValueDictionary[UUID, Document]" = weakref.WeakValueDictionary()
+    
+    def _allocate(self, document_id: UUID) -> int:
+        if self._free:
+            slot = self._free.pop()
+        else:
+            slot = len(self._ids)
+            self._ids.append(None)
+            self._filenames.append(None)
+            self._types.append(0)
+            self._correspondents.append(0)
+            self._topics.append(0)
+            self._customer_ids.append(None)
+            self._document_numbers.append(None)
+            self._dates.append(0)
+            self._versions.append(0)
+            self._flags.append(0)
+            self._hashes += bytes(_HASH_SIZE)
+            self._history.append(None)
+        self._slots[document_id] = slot
+        self._ids[slot] = document_id
+        return slot
+    
+    def _content_hash(self, slot: int) -> Optional[str]:
+        if self._flags[slot] & _HASHED:
+            return self._hashes[slot * _HASH_SIZE:(slot + 1) * _HASH_SIZE].hex()
+        return self._raw_hashes.get(slot)
+    
+    def _set_content_hash(self, slot: int, value: Optional[str]) -> bool:
+        """Speichert den Hash binär, wenn er verlustfrei zurückgewandelt werden kann"""
+        self._raw_hashes.pop(slot, None)
+        if value is None:
+            return False
+        if len(value) == 2 * _HASH_SIZE:
+            try:
+                packed = bytes.fromhex(value)
+            except ValueError:
+                packed = None
+            if packed is not None and packed.hex() == value:
+                self._hashes[slot * _HASH_SIZE:(slot + 1) * _HASH_SIZE] = packed
+                return True
+        self._raw_hashes[slot] = value
+        return False
+    
+    def put(self, document: Document, view: bool = True) -> None:
+        """
+        Nimmt ein Document auf bzw. schreibt ein geändertes zurück. Mit view=True
+        liefert get() dieselbe Instanz, solange sie noch referenziert wird.
+        """
+        slot = self._slots.get(document.id)
+        if slot is None:
+            slot = self._allocate(document.id)
+        strings = self._strings
+        self._filenames[slot] = document.original_filename
+        self._types[slot] = strings.code(document.document_type)
+        self._correspondents[slot] = strings.code(document.correspondent)
+        self._topics[slot] = strings.code(document.topic)
+        self._customer_ids[slot] = document.customer_id
+        self._document_numbers[slot] = document.document_number
+        self._dates[slot] = document.document_date.toordinal() if document.document_date else 0
+        self._versions[slot] = document.version
+        if document.duplicate_of is None:
+            self._duplicates.pop(slot, None)
+        else:
+            self._duplicates[slot] = document.duplicate_of
+        flags = 0
+        if document.is_complete:
+            flags |= _COMPLETE
+        if document.is_saved:
+            flags |= _SAVED
+        if self._set_content_hash(slot, document.content_hash):
+            flags |= _HASHED
+        self._flags[slot] = flags
+        self._history[slot] = _pack_history(document, self._strings)
+        if view:
+            self._views[document.id] = document
+    
+    def _materialize(self, slot: int) -> Document:
+        strings = self._strings
+        saved_as, field_sources = _unpack_history(self._history[slot], strings)
+        ordinal = self._dates[slot]
+        # Validierung in pydantic-core ist schneller als model_construct für die verschachtelten Modelle
+        return Document.model_validate({
+            "id": self._ids[slot],
+            "original_filename": self._filenames[slot],
+            "saved_as": saved_as,
+            "content_hash": self._content_hash(slot),
+            "duplicate_of": self._duplicates.get(slot),
+            "document_type": strings[self._types[slot]],
+            "correspondent": strings[self._correspondents[slot]],
+            "topic": strings[self._topics[slot]],
+            "customer_id": self._customer_ids[slot],
+            "document_number": self._document_numbers[slot],
+            "document_date": date.fromordinal(ordinal) if ordinal else None,
+            "field_sources": field_sources,
+            "version": self._versions[slot],
+        })
+    
+    def get(self, document_id: UUID) -> Optional[Document]:
+        document = self._views.get(document_id)
+        if document is not None:
+            return document
+        slot = self._slots.get(document_id)
+        if slot is None:
+            return None
+        document = self._materialize(slot)
+        self._views[document_id] = document
+        return document
+    
+    def row(self, document_id: UUID) -> Optional[Union[Document, DocumentRow]]:
+        # Ein bereits erzeugtes Document kann noch nicht zurückgeschriebene Änderungen enthalten
+        document = self._views.get(document_id)
+        if document is not None:
+            return document
+        slot = self._slots.get(document_id)
+        return DocumentRow(self, slot) if slot is not None else None
+    
+    def rows(self) -> List[DocumentRow]:
+        return [DocumentRow(self, slot) for slot in self._slots.values()]
+    
+    def matcher(self, document_filter: DocumentFilter) -> Callable[[UUID], bool]:
+        """Prädikat über die ID, das die Filterkriterien direkt auf Codes, Datums- und Flag-Spalten prüft"""
+        checks: List[Callable[[int], bool]] = []
+        flags = self._flags
+        if document_filter.unprocessed is not None:
+            complete = 0 if document_filter.unprocessed else _COMPLETE
+            checks.append(lambda slot: flags[slot] & _COMPLETE == complete)
+        if document_filter.unsaved is not None:
+            saved = 0 if document_filter.unsaved else _SAVED
+            checks.append(lambda slot: flags[slot] & _SAVED == saved)
+        for value, column in ((document_filter.document_type, self._types), (document_filter.correspondent, self._correspondents)):
+            if value is None:
+                continue
+            code = self._strings.find(value)
+            if code is None:
+                # Wert kommt in keinem Document vor
+                return lambda document_id: False
+            checks.append(lambda slot, column=column, code=code: column[slot] == code)
+        if document_filter.date_from is not None or document_filter.date_to is not None:
+            dates = self._dates
+            # Ordinalzahlen beginnen bei 1, Documents ohne Datum (0) fallen so heraus
+            lower = document_filter.date_from.toordinal() if document_filter.date_from else 1
+            upper = document_filter.date_to.toordinal() if document_filter.date_to else date.max.toordinal()
+            checks.append(lambda slot: lower <= dates[slot] <= upper)
+        
+        slots = self._slots
+        
+        def matches(document_id: UUID) -> bool:
+            slot = slots[document_id]
+            for check in checks:
+                if not check(slot):
+                    return False
+            return True
+        return matches
+    
+    def documents(self) -> List[Document]:
+        return [self.get(document_id) for document_id in list(self._slots)]
+    
+    def pop(self, document_id: UUID) -> Optional[Document]:
+        document = self.get(document_id)
+        if document is None:
+            return None
+        slot = self._slots.pop(document_id)
+        self._views.pop(document_id, None)
+        self._ids[slot] = None
+        self._filenames[slot] = None
+        self._customer_ids[slot] = None
+        self._document_numbers[slot] = None
+        self._history[slot] = None
+        self._duplicates.pop(slot, None)
+        self._raw_hashes.pop(slot, None)
+        self._free.append(slot)
+        return document
+    
+    def __len__(self) -> int:
+        return len(self._slots)
+    
+    def __contains__(self, document_id: UUID) -> bool:
+        return document_id in self._slots
+
+
+def create_document_store(kind: str = "objects") -> Union[ObjectDocumentStore, CompactDocumentStore]:
+    """Erzeugt die konfigurierte Ablage ('objects' oder 'compact')"""
+    if kind == "objects":
+        return ObjectDocumentStore()
+    if kind == "compact":
+        return CompactDocumentStore()
+    raise ValueError(f"Unbekannte Document-Ablage: {kind}")
\ No newline at end of file
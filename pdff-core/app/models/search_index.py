@@ -0,0 +1,381 @@
+from datetime import date, timedelta
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
+from itertools import compress, repeat
+from uuid import UUID
+import re
+from app.models.document import Document
+from app.models.sorted_index import SortedIndex
+
+# Durchsuchte Felder eines Documents
+SEARCH_FIELDS = (
+    "correspondent",
+    "topic",
+    "document_type",
+    "document_number",
+    "customer_id",
+    "original_filename",
+)
+
+# Ein einzelnes Zeichen als Präfix würde große Teile des Vokabulars vereinigen
+MIN_PREFIX_LENGTH = 2
+
+# Präfixe mit mehr Begriffen werden nicht vereinigt, sondern pro Document geprüft
+MAX_PREFIX_TERMS = 10_000
+
+_TOKEN = re.compile(r"[^\W_]+")
+_EMPTY: Set[int] = frozenset()
+
+
+def _join_terms(terms: Tuple[str, ...]) -> str:
+    return "\0" + "\0".join(terms) if terms else ""
+
+
+def _split_terms(joined: str) -> List[str]:
+    return joined.split("\0")[1:]
+
+
+def tokenize(text: str) -> List[str]:
+    """Zerlegt Text in kleingeschriebene Tokens aus Buchstaben und Ziffern"""
+    return _TOKEN.findall(text.casefold())
+
+
+def document_terms(document: Document) -> Tuple[str, ...]:
+    """Alle Suchbegriffe eines Documents über die SEARCH_FIELDS (ohne Duplikate)"""
+    values: List[str] = []
+    for field in SEARCH_FIELDS:
+        value = getattr(document, field)
+        if not value:
+            continue
+        if field == "original_filename" and value.lower().endswith(".pdf"):
+            value = value[:-4]
+        values.append(value)
+    return tuple(dict.fromkeys(tokenize(" ".join(values))))
+
+
+class SearchMatches:
+    """
+    Treffer einer Suche. slots ist None, wenn die Treffer nur über eine Bedingung
+    bestimmt sind (alle Documents, großer Datumsbereich oder sehr allgemeiner
+    Präfix) - dann wird die Mitgliedschaft pro Document geprüft statt eine Menge
+    aufzubauen. exact=False: total ist nur eine Untergrenze.
+    """
+    
+    def __init__(
+        self,
+        index: "SearchIndex",
+        slots: Optional[Set[int]],
+        total: int,
+        exact: bool = True,
+        needle: Optional[str] = None,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None
+    ):
+        self._index = index
+        self.slots = slots
+        self.total = total
+        self.exact = exact
+        self._needle = needle
+        self._date_from = date_from
+        self._date_to = date_to
+    
+    def __len__(self) -> int:
+        return self.total
+    
+    def __contains__(self, document_id: UUID) -> bool:
+        slot = self._index._slots.get(document_id)
+        if slot is None:
+            return False
+        if self.slots is not None:
+            return slot in self.slots
+        if self._needle is not None and self._needle not in self._index._terms[slot]:
+            return False
+        return self._index._in_range(slot, self._date_from, self._date_to)
+    
+    def document_ids(self) -> Iterator[UUID]:
+        """IDs der Treffer (nur wenn slots bestimmt sind)"""
+        ids = self._index._ids
+        for slot in self.slots or ():
+            yield ids[slot]
+
+
+class SearchIndex:
+    """
+    Invertierter Index über die Metadaten (Token -> Slots).
+    Documents werden intern über fortlaufende Slots (int) adressiert, damit
+    Mengenoperationen nicht für jede UUID hashen müssen; Begriffe mit nur
+    einem Document speichern den Slot direkt statt einer Menge. Das sortierte
+    Vokabular erlaubt Präfixsuche per Binärsuche, ein nach Dokumentdatum
+    sortierter Index liefert Datumsbereiche ohne Scan. Änderungen werden als
+    Differenz der Suchbegriffe eingepflegt.
+    """
+    
+    def __init__(self):
+        self._slots: Dict[UUID, int] = {}
+        self._ids: List[Optional[UUID]] = []
+        # Suchbegriffe je Slot als "\0begriff1\0begriff2" (Präfixprüfung per Teilstring-Suche)
+        self._terms: List[str] = []
+        self._dates: List[Optional[date]] = []
+        self._free: List[int] = []
+        self._postings: Dict[str, Union[int, Set[int]]] = {}
+        self._vocabulary: SortedIndex[str] = SortedIndex()
+        self._date_index: SortedIndex[Tuple[date, int]] = SortedIndex()
+        # (Jahr, Monat) -> Slots, damit Datumsbereiche aus ganzen Monaten per Mengenoperation entstehen
+        self._months: Dict[Tuple[int, int], Set[int]] = {}
+    
+    def rebuild(self, documents: Iterable[Document]) -> None:
+        """Baut den Index komplett neu auf"""
+        self._slots = {}
+        self._ids = []
+        self._terms = []
+        self._dates = []
+        self._free = []
+        self._postings = {}
+        self._months = {}
+        postings = self._postings
+        for slot, document in enumerate(documents):
+            terms = document_terms(document)
+            self._slots[document.id] = slot
+            self._ids.append(document.id)
+            self._terms.append(_join_terms(terms))
+            self._dates.append(document.document_date)
+            if document.document_date is not None:
+                self._months.setdefault((document.document_date.year, document.document_date.month), set()).add(slot)
+            for term in terms:
+                entry = postings.get(term)
+                if entry is None:
+                    postings[term] = slot
+                elif type(entry) is int:
+                    postings[term] = {entry, slot}
+                else:
+                    entry.add(slot)
+        self._vocabulary.rebuild(postings)
+        self._date_index.rebuild(
+            (value, slot) for slot, value in enumerate(self._dates) if value is not None
+        )
+    
+    def _add_posting(self, term: str, slot: int) -> None:
+        entry = self._postings.get(term)
+        if entry is None:
+            self._postings[term] = slot
+            self._vocabulary.insert(term)
+        elif type(entry) is int:
+            self._postings[term] = {entry, slot}
+        else:
+            entry.add(slot)
+    
+    def _remove_posting(self, term: str, slot: int) -> None:
+        entry = self._postings.get(term)
+        if entry is None:
+            return
+        if type(entry) is int:
+            if entry == slot:
+                del self._postings[term]
+                self._vocabulary.discard(term)
+            return
+        entry.discard(slot)
+        if len(entry) == 1:
+            self._postings[term] = next(iter(entry))
+    
+    def _term_postings(self, term: str) -> Set[int]:
+        entry = self._postings.get(term)
+        if entry is None:
+            return _EMPTY
+        return {entry} if type(entry) is int else entry
+    
+    def index(self, document: Document) -> None:
+        """Nimmt ein Document auf bzw. gleicht geänderte Felder ab"""
+        slot = self._slots.get(document.id)
+        if slot is None:
+            if self._free:
+                slot = self._free.pop()
+            else:
+                slot = len(self._ids)
+                self._ids.append(document.id)
+                self._terms.append("")
+                self._dates.append(None)
+            self._slots[document.id] = slot
+        self._ids[slot] = document.id
+        
+        terms = _join_terms(document_terms(document))
+        previous = self._terms[slot]
+        if terms != previous:
+            old, new = set(_split_terms(previous)), set(_split_terms(terms))
+            for term in old - new:
+                self._remove_posting(term, slot)
+            for term in new - old:
+                self._add_posting(term, slot)
+            self._terms[slot] = terms
+        
+        previous_date = self._dates[slot]
+        if previous_date != document.document_date:
+            if previous_date is not None:
+                self._unindex_date(previous_date, slot)
+            if document.document_date is not None:
+                self._date_index.insert((document.document_date, slot))
+                self._months.setdefault((document.document_date.year, document.document_date.month), set()).add(slot)
+            self._dates[slot] = document.document_date
+    
+    def remove(self, document_id: UUID) -> None:
+        """Entfernt ein Document aus dem Index"""
+        slot = self._slots.pop(document_id, None)
+        if slot is None:
+            return
+        for term in _split_terms(self._terms[slot]):
+            self._remove_posting(term, slot)
+        if self._dates[slot] is not None:
+            self._unindex_date(self._dates[slot], slot)
+        self._ids[slot] = None
+        self._terms[slot] = ""
+        self._dates[slot] = None
+        self._free.append(slot)
+    
+    def _unindex_date(self, value: date, slot: int) -> None:
+        self._date_index.discard((value, slot))
+        month = self._months.get((value.year, value.month))
+        if month is not None:
+            month.discard(slot)
+            if not month:
+                del self._months[(value.year, value.month)]
+    
+    def _date_parts(self, date_from: Optional[date], date_to: Optional[date], start: int, stop: int) -> List[Set[int]]:
+        """
+        Zerlegt einen Datumsbereich in Mengen: ganze Monate aus dem Monats-Index,
+        angeschnittene Monate aus dem sortierten Datums-Index.
+        """
+        if start >= stop:
+            return []
+        lower = self._date_index.at(start)[0] if date_from is None else max(date_from, self._date_index.at(start)[0])
+        upper = self._date_index.at(stop - 1)[0] if date_to is None else min(date_to, self._date_index.at(stop - 1)[0])
+        parts: List[Set[int]] = []
+        edge: Set[int] = set()
+        year, month = lower.year, lower.month
+        while (year, month) <= (upper.year, upper.month):
+            first = date(year, month, 1)
+            following = date(year + month // 12, month % 12 + 1, 1)
+            slots = self._months.get((year, month))
+            if slots:
+                if (date_from is None or date_from <= first) and (date_to is None or date_to >= following - timedelta(days=1)):
+                    parts.append(slots)
+                else:
+                    part_start, _ = self._date_index.position((max(first, lower), -1))
+                    part_stop, _ = self._date_index.position((min(following - timedelta(days=1), upper), len(self._ids)))
+                    edge.update(slot for _, slot in self._date_index.slice(part_start, part_stop))
+            year, month = (following.year, following.month)
+        if edge:
+            parts.append(edge)
+        return parts
+    
+    def _in_range(self, slot: int, date_from: Optional[date], date_to: Optional[date]) -> bool:
+        value = self._dates[slot]
+        if value is None:
+            return date_from is None and date_to is None
+        return (date_from is None or value >= date_from) and (date_to is None or value <= date_to)
+    
+    def _prefix_postings(self, prefix: str, candidates: Optional[Set[int]] = None) -> Optional[Set[int]]:
+        """
+        Slots mit einem Begriff dieses Präfixes (mit candidates: nur deren Schnittmenge).
+        Liefert None, wenn das Vereinigen teurer wäre als die Kandidaten einzeln zu prüfen
+        bzw. - ohne Kandidaten - wenn der Präfix mehr als MAX_PREFIX_TERMS Begriffe umfasst.
+        """
+        start, _ = self._vocabulary.position(prefix)
+        stop, _ = self._vocabulary.position(prefix + "\U0010ffff")
+        # Jeder Begriff hat mindestens ein Document: schon die Anzahl begrenzt die Kosten nach unten
+        budget = MAX_PREFIX_TERMS if candidates is None else 4 * len(candidates)
+        if stop - start > budget:
+            return None
+        entries = list(map(self._postings.__getitem__, self._vocabulary.slice(start, stop)))
+        if len(entries) == 1 and candidates is None:
+            return self._term_postings(self._vocabulary.at(start))
+        singles = [entry for entry in entries if type(entry) is int]
+        sets = [entry for entry in entries if type(entry) is not int]
+        
+        if candidates is None:
+            matched = set(singles)
+            matched.update(*sets)
+            return matched
+        
+        # Schnittmengen je Begriff kosten höchstens min(|Begriff|, |Kandidaten|)
+        if len(singles) + sum(min(len(entry), len(candidates)) for entry in sets) > budget:
+            return None
+        matched = candidates.intersection(singles)
+        for entry in sets:
+            matched |= entry & candidates
+        return matched
+    
+    def search(
+        self,
+        query: str = "",
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None,
+        prefix: bool = True,
+        materialize_limit: Optional[int] = None
+    ) -> SearchMatches:
+        """
+        Documents, die jedes Token der Anfrage enthalten (UND-Verknüpfung) und im
+        Datumsbereich liegen. Mit prefix=True wird das letzte Token als Präfix
+        gesucht (Suche während der Eingabe). Reine Datumsbereiche mit mehr als
+        materialize_limit Treffern werden nicht als Menge aufgebaut.
+        """
+        tokens = list(dict.fromkeys(tokenize(query)))
+        prefix_token: Optional[str] = None
+        # Ein einzelnes Zeichen nur als Präfix, wenn andere Tokens die Kandidaten schon einschränken
+        if prefix and tokens and (len(tokens[-1]) >= MIN_PREFIX_LENGTH or len(tokens) > 1):
+            prefix_token = tokens.pop()
+        
+        has_dates = date_from is not None or date_to is not None
+        if has_dates:
+            start, _ = self._date_index.position((date_from or date.min, -1))
+            stop, _ = self._date_index.position((date_to or date.max, len(self._ids)))
+        
+        # Exakte Tokens: kleinste Posting-Liste zuerst schneiden
+        candidates: Optional[Set[int]] = None
+        postings_by_size = sorted(map(self._term_postings, tokens), key=len)
+        # Ein kleiner Datumsbereich schränkt am stärksten ein und wird dann zuerst aufgebaut
+        if has_dates:
+            date_limit = len(postings_by_size[0]) if postings_by_size else materialize_limit
+            if date_limit is None or stop - start <= date_limit:
+                candidates = set().union(*self._date_parts(date_from, date_to, start, stop))
+                has_dates = False
+        for postings in postings_by_size:
+            candidates = postings if candidates is None else candidates & postings
+            if not candidates:
+                return SearchMatches(self, set(), 0)
+        
+        if prefix_token is not None:
+            needle = "\0" + prefix_token
+            matched = self._prefix_postings(prefix_token, candidates)
+            if matched is None and candidates is None:
+                # Sehr allgemeiner Präfix ohne weitere Tokens: pro Document prüfen, Anzahl nur als Untergrenze
+                return SearchMatches(self, None, 0, False, needle, date_from, date_to)
+            if matched is None:
+                # Wenige Kandidaten direkt prüfen statt viele Posting-Listen zu vereinigen
+                # (Teilstring-Suche in den Begriffen je Slot, vollständig in C per map/compress)
+                slots = list(candidates)
+                found = map(str.__contains__, map(self._terms.__getitem__, slots), repeat(needle))
+                candidates = set(compress(slots, found))
+            else:
+                candidates = matched
+        
+        if has_dates:
+            if candidates is None:
+                if materialize_limit is not None and stop - start > materialize_limit:
+                    return SearchMatches(self, None, stop - start, date_from=date_from, date_to=date_to)
+                candidates = set().union(*self._date_parts(date_from, date_to, start, stop))
+            elif 4 * len(candidates) <= stop - start:
+                dates, lower, upper = self._dates, date_from or date.min, date_to or date.max
+                candidates = {
+                    slot for slot in candidates
+                    if (value := dates[slot]) is not None and lower <= value <= upper
+                }
+            else:
+                in_range: Set[int] = set()
+                for part in self._date_parts(date_from, date_to, start, stop):
+                    in_range |= candidates & part
+                candidates = in_range
+        
+        if candidates is None:
+            return SearchMatches(self, None, len(self._slots))
+        return SearchMatches(self, candidates, len(candidates))
+    
+    def __len__(self) -> int:
+        return len(self._slots)
\ No newline at end of file
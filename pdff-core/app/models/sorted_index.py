@@ -0,0 +1,65 @@
+from bisect import bisect_left
+from typing import Generic, Hashable, Iterable, Iterator, List, Optional, Tuple, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+
+
+class SortedIndex(Generic[K]):
+    """
+    Sortierte Schlüsselliste für Navigation und Positionsabfragen.
+    Suche und Position per Binärsuche in O(log n), Nachbarn per Index in O(1).
+    Einfügen/Entfernen verschiebt nur Zeiger (memmove) und bleibt auch
+    bei sehr großen Listen im Mikrosekundenbereich.
+    """
+    
+    def __init__(self):
+        self._keys: List[K] = []
+    
+    def rebuild(self, keys: Iterable[K]) -> None:
+        """Ersetzt den Inhalt komplett (einmal sortieren statt n Einzel-Inserts)"""
+        self._keys = sorted(set(keys))
+    
+    def insert(self, key: K) -> None:
+        """Fügt einen Schlüssel ein (Duplikate werden ignoriert)"""
+        pos = bisect_left(self._keys, key)
+        if pos < len(self._keys) and self._keys[pos] == key:
+            return
+        self._keys.insert(pos, key)
+    
+    def discard(self, key: K) -> bool:
+        """Entfernt einen Schlüssel, gibt True zurück wenn er vorhanden war"""
+        pos = bisect_left(self._keys, key)
+        if pos < len(self._keys) and self._keys[pos] == key:
+            del self._keys[pos]
+            return True
+        return False
+    
+    def position(self, key: K) -> Tuple[int, bool]:
+        """
+        Gibt (Position, enthalten) zurück. Ist der Schlüssel nicht enthalten,
+        ist die Position die Einfügestelle.
+        """
+        pos = bisect_left(self._keys, key)
+        return pos, pos < len(self._keys) and self._keys[pos] == key
+    
+    def at(self, pos: int) -> Optional[K]:
+        """Schlüssel an Position oder None außerhalb des Bereichs"""
+        if 0 <= pos < len(self._keys):
+            return self._keys[pos]
+        return None
+    
+    def iter_from(self, start: int) -> Iterator[K]:
+        """Iteriert ab Position start (Liste darf währenddessen nicht verändert werden)"""
+        keys = self._keys
+        for pos in range(max(start, 0), len(keys)):
+            yield keys[pos]
+    
+    def slice(self, start: int, stop: int) -> List[K]:
+        """Schlüssel im halboffenen Bereich [start, stop)"""
+        return self._keys[max(start, 0):max(stop, 0)]
+    
+    def __len__(self) -> int:
+        return len(self._keys)
+    
+    def __contains__(self, key: K) -> bool:
+        return self.position(key)[1]
\ No newline at end of file
@@ -17,13 +17,18 @@ export class ApiClient {
       });
 
       if (!response.ok) {
-        const error = await response.json().catch(() => ({}));
-        throw new Error(error.detail || `HTTP ${response.status}`);
+        const body = await response.json().catch(() => ({}));
+        const error = new Error(body.detail || `HTTP ${response.status}`);
+        error.status = response.status;
+        throw error;
       }
 
       return response;
     } catch (error) {
-      console.error('API Error:', error);
+      // Abgebrochene Anfragen (z.B. veraltete Vorschläge) sind kein Fehler
+      if (error.name !== 'AbortError') {
+        console.error('API Error:', error);
+      }
       throw error;
     }
   }
@@ -34,17 +39,24 @@ export class ApiClient {
     return response.json();
   }
 
-  async updateMetadata(documentId, metadata) {
+  // Optimistic concurrency: with a version, the server rejects stale writes with 412
+  _ifMatch(version) {
+    return version === undefined || version === null ? {} : { 'If-Match': `"v${version}"` };
+  }
+
+  async updateMetadata(documentId, metadata, version) {
     const response = await this._fetch(`/documents/${documentId}`, {
       method: 'PATCH',
+      headers: this._ifMatch(version),
       body: JSON.stringify(metadata)
     });
     return response.json();
   }
 
-  async saveDocument(documentId) {
+  async saveDocument(documentId, version) {
     const response = await this._fetch(`/documents/${documentId}/save`, {
-      method: 'POST'
+      method: 'POST',
+      headers: this._ifMatch(version)
     });
     return response.json();
   }
@@ -63,8 +75,30 @@ export class ApiClient {
     return response.json();
   }
 
+  // Typeahead suggestions (most frequent values first)
+  async getSuggestions(field, prefix, { limit = 8, signal } = {}) {
+    const params = new URLSearchParams({ q: prefix, limit });
+    const response = await this._fetch(`/suggestions/${field}?${params}`, { signal });
+    const data = await response.json();
+    return data.items;
+  }
+
+  // Change feed (Server-Sent Events); EventSource reconnects and resumes on its own
+  subscribeEvents(handlers) {
+    const source = new EventSource(`${this.baseUrl}/events`);
+    for (const [type, handler] of Object.entries(handlers)) {
+      source.addEventListener(type, event => handler(JSON.parse(event.data)));
+    }
+    return source;
+  }
+
   // PDF URL helper
   getPdfUrl(documentId) {
     return `${this.baseUrl}/documents/${documentId}/pdf`;
   }
+
+  // Page preview image (cached server-side and in the browser)
+  getThumbnailUrl(documentId, { page = 1, size = 'small' } = {}) {
+    return `${this.baseUrl}/documents/${documentId}/thumbnail?page=${page}&size=${size}`;
+  }
 }
\ No newline at end of file
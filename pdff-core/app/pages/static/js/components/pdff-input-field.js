@@ -11,6 +11,13 @@ class PdffInputField extends BaseComponent {
     super();
     this._originalValue = '';
     this._debounceTimer = null;
+    
+    // Typeahead: (prefix, signal) => Promise<[{value, count}]>, set by the controller
+    this.suggestionProvider = null;
+    this._suggestions = [];
+    this._activeSuggestion = -1;
+    this._suggestTimer = null;
+    this._suggestAbort = null;
   }
 
   // Getters/Setters
@@ -30,6 +37,10 @@ class PdffInputField extends BaseComponent {
     return this.getAttribute('type') || 'text';
   }
 
+  get fieldName() {
+    return this.getAttribute('name') || this.label.toLowerCase().replace(/\s+/g, '_');
+  }
+
   get required() {
     return this.hasAttribute('required');
   }
@@ -49,9 +60,26 @@ class PdffInputField extends BaseComponent {
   }
 
   attributeChangedCallback(name, oldValue, newValue) {
-    if (oldValue !== newValue) {
-      this.render();
+    if (oldValue === newValue) {
+      return;
+    }
+    
+    // Value/state changes while typing are applied in place so focus and suggestions survive
+    const input = this.shadowRoot.querySelector('input');
+    if (input && name === 'value') {
+      if (input.value !== (newValue || '')) {
+        input.value = newValue || '';
+      }
+      return;
+    }
+    if (input && name === 'state') {
+      const group = this.shadowRoot.querySelector('.form-group');
+      group.classList.remove(`state-${oldValue || 'empty'}`);
+      group.classList.add(`state-${this.state}`);
+      return;
     }
+    
+    this.render();
   }
 
   // Setup events
@@ -61,9 +89,26 @@ class PdffInputField extends BaseComponent {
       this.addListener(input, 'input', (e) => this.handleInput(e));
       this.addListener(input, 'focus', () => this.handleFocus());
       this.addListener(input, 'blur', () => this.handleBlur());
+      this.addListener(input, 'keydown', (e) => this.handleKeydown(e));
+    }
+    
+    const list = this.shadowRoot.querySelector('.suggestions');
+    if (list) {
+      // mousedown instead of click: fires before the input loses focus
+      this.addListener(list, 'mousedown', (e) => {
+        const item = e.target.closest('li');
+        if (item) {
+          e.preventDefault();
+          this.selectSuggestion(Number(item.dataset.index));
+        }
+      });
     }
   }
 
+  get suggests() {
+    return this.hasAttribute('suggest') && typeof this.suggestionProvider === 'function';
+  }
+
   handleInput(event) {
     const newValue = event.target.value;
     this.setAttribute('value', newValue);
@@ -77,26 +122,152 @@ class PdffInputField extends BaseComponent {
       this.state = 'empty';
     }
 
+    this.scheduleSuggestions(newValue);
+
     // Debounced emit
     clearTimeout(this._debounceTimer);
     this._debounceTimer = setTimeout(() => {
       this.emit('value-changed', { 
         value: newValue,
-        field: this.getAttribute('name') || this.label.toLowerCase().replace(/\s+/g, '_')
+        field: this.fieldName
       });
     }, 300);
   }
 
   handleFocus() {
     this.shadowRoot.querySelector('.form-group').classList.add('focused');
+    this.scheduleSuggestions(this.value);
   }
 
   handleBlur() {
     this.shadowRoot.querySelector('.form-group').classList.remove('focused');
+    this.closeSuggestions();
+  }
+
+  handleKeydown(event) {
+    if (!this._suggestions.length) {
+      return;
+    }
+    
+    switch (event.key) {
+      case 'ArrowDown':
+        event.preventDefault();
+        this.highlightSuggestion((this._activeSuggestion + 1) % this._suggestions.length);
+        break;
+      case 'ArrowUp':
+        event.preventDefault();
+        this.highlightSuggestion(
+          (this._activeSuggestion - 1 + this._suggestions.length) % this._suggestions.length
+        );
+        break;
+      case 'Enter':
+        if (this._activeSuggestion >= 0) {
+          event.preventDefault();
+          this.selectSuggestion(this._activeSuggestion);
+        }
+        break;
+      case 'Escape':
+        event.preventDefault();
+        this.closeSuggestions();
+        break;
+    }
+  }
+
+  // Typeahead
+  scheduleSuggestions(prefix) {
+    if (!this.suggests) {
+      return;
+    }
+    
+    // Short debounce: fast enough to keep up with typing, drops intermediate keystrokes
+    clearTimeout(this._suggestTimer);
+    this._suggestTimer = setTimeout(() => this.fetchSuggestions(prefix), 80);
+  }
+
+  async fetchSuggestions(prefix) {
+    // Only the latest request counts
+    this._suggestAbort?.abort();
+    const controller = new AbortController();
+    this._suggestAbort = controller;
+    
+    try {
+      const items = await this.suggestionProvider(prefix, controller.signal);
+      if (controller.signal.aborted || this.shadowRoot.activeElement?.tagName !== 'INPUT') {
+        return;
+      }
+      // Hide the list when the only suggestion is exactly what was typed
+      const current = prefix.trim();
+      this._suggestions = items.length === 1 && items[0].value === current ? [] : items;
+    } catch (error) {
+      if (error.name === 'AbortError') {
+        return;
+      }
+      this._suggestions = [];
+    }
+    this._activeSuggestion = -1;
+    this.renderSuggestions();
+  }
+
+  highlightSuggestion(index) {
+    this._activeSuggestion = index;
+    this.shadowRoot.querySelectorAll('.suggestions li').forEach((item, i) => {
+      item.classList.toggle('active', i === index);
+      item.setAttribute('aria-selected', i === index ? 'true' : 'false');
+    });
+  }
+
+  selectSuggestion(index) {
+    const suggestion = this._suggestions[index];
+    if (!suggestion) {
+      return;
+    }
+    
+    const input = this.shadowRoot.querySelector('input');
+    input.value = suggestion.value;
+    this.closeSuggestions();
+    this.handleInput({ target: input });
+    
+    // Accepting a suggestion is a deliberate choice: emit right away
+    clearTimeout(this._debounceTimer);
+    this.emit('value-changed', {
+      value: suggestion.value,
+      field: this.fieldName
+    });
+    clearTimeout(this._suggestTimer);
+  }
+
+  closeSuggestions() {
+    clearTimeout(this._suggestTimer);
+    this._suggestAbort?.abort();
+    this._suggestions = [];
+    this._activeSuggestion = -1;
+    this.renderSuggestions();
+  }
+
+  renderSuggestions() {
+    const list = this.shadowRoot.querySelector('.suggestions');
+    if (!list) {
+      return;
+    }
+    
+    list.replaceChildren(...this._suggestions.map((suggestion, index) => {
+      const item = document.createElement('li');
+      item.setAttribute('role', 'option');
+      item.dataset.index = index;
+      item.textContent = suggestion.value;
+      
+      const count = document.createElement('span');
+      count.className = 'count';
+      count.textContent = suggestion.count;
+      item.append(count);
+      return item;
+    }));
+    list.hidden = this._suggestions.length === 0;
   }
 
   // Reset to original value
   reset() {
+    this.closeSuggestions();
     this.value = '';
     this.state = 'empty';
     this._originalValue = '';
@@ -123,7 +294,9 @@ class PdffInputField extends BaseComponent {
           value="${this.value}"
           placeholder="${this.getAttribute('placeholder') || ''}"
           ${this.required ? 'required' : ''}
+          ${this.hasAttribute('suggest') ? 'autocomplete="off" role="combobox"' : ''}
         />
+        ${this.hasAttribute('suggest') ? '<ul class="suggestions" role="listbox" hidden></ul>' : ''}
       </div>
     `;
 
@@ -179,6 +352,47 @@ class PdffInputField extends BaseComponent {
         border-color: rgba(239, 68, 68, 0.5);
       }
 
+      /* Typeahead suggestions */
+      .suggestions {
+        position: absolute;
+        left: 0;
+        right: 0;
+        z-index: 10;
+        margin: var(--space-xs, 0.25rem) 0 0;
+        padding: var(--space-xs, 0.25rem) 0;
+        list-style: none;
+        max-height: 16rem;
+        overflow-y: auto;
+        background: var(--bg-dropdown, rgba(30, 41, 59, 0.98));
+        border: 1px solid var(--border-light, rgba(255, 255, 255, 0.2));
+        border-radius: var(--radius-md, 8px);
+        box-shadow: 0 8px 24px rgba(0, 0, 0, 0.3);
+      }
+
+      .suggestions[hidden] {
+        display: none;
+      }
+
+      .suggestions li {
+        display: flex;
+        justify-content: space-between;
+        gap: var(--space-md, 0.75rem);
+        padding: var(--space-sm, 0.5rem) var(--space-md, 0.75rem);
+        color: var(--text-primary, white);
+        font-size: 0.95rem;
+        cursor: pointer;
+      }
+
+      .suggestions li:hover,
+      .suggestions li.active {
+        background: var(--bg-glass-hover, rgba(255, 255, 255, 0.15));
+      }
+
+      .suggestions .count {
+        color: var(--text-secondary, rgba(255, 255, 255, 0.6));
+        font-size: 0.8rem;
+      }
+
       /* Date input specific */
       input[type="date"]::-webkit-calendar-picker-indicator {
         filter: invert(1);
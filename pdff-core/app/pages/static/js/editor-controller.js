@@ -9,6 +9,9 @@ export class EditorController {
     this.currentDocument = null;
     this.navigationData = null;
     this.previewTimer = null;
+    this.navigationTimer = null;
+    this.events = null;
+    this.saving = false;
     
     // Cache DOM elements (will be set in init)
     this.elements = {};
@@ -28,12 +31,50 @@ export class EditorController {
         this.loadNavigation()
       ]);
       
+      // Live updates from other tabs and the inbox
+      this.subscribeToChanges();
+      
       console.log('Editor initialized for document:', this.documentId);
     } catch (error) {
       this.showError('Initialisierung fehlgeschlagen: ' + error.message);
     }
   }
 
+  subscribeToChanges() {
+    if (typeof EventSource === 'undefined') return;
+    
+    const onChange = change => {
+      if (change.document_id === this.documentId) {
+        this.handleExternalChange(change);
+      }
+      this.scheduleNavigationReload();
+    };
+    this.events = this.api.subscribeEvents({
+      created: onChange,
+      updated: onChange,
+      removed: onChange,
+      // Missed too many events: state may be stale
+      reset: () => this.scheduleNavigationReload()
+    });
+  }
+
+  handleExternalChange(change) {
+    // Own writes arrive while saving; after saving the local version is current
+    if (this.saving || !this.currentDocument || change.version <= this.currentDocument.version) return;
+    
+    if (change.type === 'removed') {
+      this.showError('Das Dokument wurde an anderer Stelle entfernt.');
+    } else {
+      this.showError('Das Dokument wurde an anderer Stelle geändert. Bitte neu laden, bevor Sie speichern.');
+    }
+  }
+
+  scheduleNavigationReload() {
+    // Inbox batches produce many events: reload once
+    clearTimeout(this.navigationTimer);
+    this.navigationTimer = setTimeout(() => this.loadNavigation(), 500);
+  }
+
   cacheElements() {
     // Input fields
     this.elements.correspondent = document.querySelector('pdff-input-field[name="correspondent"]');
@@ -54,6 +95,8 @@ export class EditorController {
     this.elements.btnNext = document.getElementById('btnNext');
     this.elements.previousInfo = document.getElementById('previousInfo');
     this.elements.nextInfo = document.getElementById('nextInfo');
+    this.elements.previousThumbnail = document.getElementById('previousThumbnail');
+    this.elements.nextThumbnail = document.getElementById('nextThumbnail');
     
     // Actions
     this.elements.saveBtn = document.getElementById('saveBtn');
@@ -66,6 +109,12 @@ export class EditorController {
     const inputFields = document.querySelectorAll('pdff-input-field');
     inputFields.forEach(field => {
       field.addEventListener('value-changed', (e) => this.handleInputChange(e));
+      
+      // Typeahead for fields with recurring values
+      if (field.hasAttribute('suggest')) {
+        const name = field.getAttribute('name');
+        field.suggestionProvider = (prefix, signal) => this.api.getSuggestions(name, prefix, { signal });
+      }
     });
     
     // Save button
@@ -75,6 +124,11 @@ export class EditorController {
     this.elements.btnPrevious?.addEventListener('click', () => this.navigateToPrevious());
     this.elements.btnNext?.addEventListener('click', () => this.navigateToNext());
     
+    // Hide thumbnails that cannot be rendered (e.g. renderer not installed)
+    [this.elements.previousThumbnail, this.elements.nextThumbnail].forEach(img => {
+      img?.addEventListener('error', () => { img.hidden = true; });
+    });
+    
     // Browser navigation (back/forward)
     window.addEventListener('popstate', (event) => {
       if (event.state?.documentId) {
@@ -140,6 +194,7 @@ export class EditorController {
       this.elements.btnPrevious.disabled = true;
       this.elements.previousInfo.textContent = '---';
     }
+    this.updateThumbnail(this.elements.previousThumbnail, this.navigationData.previous);
     
     // Next button
     if (this.navigationData.next) {
@@ -149,12 +204,24 @@ export class EditorController {
       this.elements.btnNext.disabled = true;
       this.elements.nextInfo.textContent = '---';
     }
+    this.updateThumbnail(this.elements.nextThumbnail, this.navigationData.next);
     
     // Position indicator
     this.elements.navPosition.textContent = 
       `(${this.navigationData.current_position} von ${this.navigationData.total_unprocessed})`;
   }
 
+  updateThumbnail(img, neighbour) {
+    if (!img) return;
+    if (neighbour) {
+      img.src = this.api.getThumbnailUrl(neighbour.id);
+      img.hidden = false;
+    } else {
+      img.removeAttribute('src');
+      img.hidden = true;
+    }
+  }
+
   handleInputChange(event) {
     // Debounce preview update
     clearTimeout(this.previewTimer);
@@ -209,6 +276,8 @@ export class EditorController {
     const originalText = saveBtn.textContent;
     
     try {
+      this.saving = true;
+      
       // Set loading state
       saveBtn.textContent = '⏳ Speichere...';
       saveBtn.disabled = true;
@@ -216,14 +285,15 @@ export class EditorController {
       
       // Collect and update metadata
       const metadata = this.collectMetadata();
-      await this.api.updateMetadata(this.documentId, metadata);
+      const updated = await this.api.updateMetadata(this.documentId, metadata, this.currentDocument?.version);
       
-      // Save document
-      const saveResult = await this.api.saveDocument(this.documentId);
+      // Save document (only the version just written)
+      const saveResult = await this.api.saveDocument(this.documentId, updated.version);
       
       // Update UI with success
       this.currentDocument.current_filename = saveResult.generated_filename;
       this.currentDocument.is_saved = true;
+      this.currentDocument.version = saveResult.version;
       
       this.elements.currentFilename.textContent = saveResult.generated_filename;
       this.elements.pageTitle.textContent = `${saveResult.generated_filename} - PDFF Core`;
@@ -245,10 +315,16 @@ export class EditorController {
       }, 2000);
       
     } catch (error) {
-      this.showError('Speichern fehlgeschlagen: ' + error.message);
+      if (error.status === 412) {
+        this.showError('Das Dokument wurde zwischenzeitlich geändert. Bitte neu laden und Änderungen erneut eingeben.');
+      } else {
+        this.showError('Speichern fehlgeschlagen: ' + error.message);
+      }
       saveBtn.textContent = originalText;
       saveBtn.disabled = false;
       this.elements.statusIndicator.status = 'changed';
+    } finally {
+      this.saving = false;
     }
   }
 
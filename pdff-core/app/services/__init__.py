@@ -1,5 +1,75 @@
-from app.services.local_storage_service import LocalStorageService
+from app.services.local_storage_service import LocalStorageService, IngestResult
+from app.services.output_name_index import OutputNameIndex
+from app.services.async_storage_service import AsyncStorageService
+from app.services.archive_loader import ArchiveLoader, LoadProgress
+from app.services.inbox_watcher import InboxWatcher, IngestStats
+from app.services.extraction_engine import ExtractionEngine, ExtractionStats
+from app.services.extraction_cache import ExtractionCache
+from app.services.extraction_jobs import ExtractionJob, ExtractionJobStore
+from app.services.extraction_providers import (
+    ExtractionProvider,
+    ExtractionResult,
+    ExtractionError,
+    FakeExtractionProvider,
+    AnthropicExtractionProvider,
+    create_extraction_provider,
+)
+from app.services.text_rules import RuleMatch, extract_with_rules
+from app.services.suggestion_service import Suggestion, SuggestionService, SuggestionTrie
+from app.services.thumbnail_service import ThumbnailService, THUMBNAIL_SIZES
+from app.services.event_bus import DocumentEvent, EventBus
+from app.services.worker_coordination import ChangeFeed, WorkerCoordinator, WorkerStatus
+from app.services.archive_layout import ArchiveLayout, ShardedLayout, create_archive_layout
+from app.services.metadata_store import (
+    MetadataStore,
+    JsonFileMetadataStore,
+    JournalMetadataStore,
+    WriteBehindMetadataStore,
+    check_metadata_backend,
+    create_metadata_store,
+    migrate_metadata,
+)
 
 __all__ = [
     "LocalStorageService",
+    "IngestResult",
+    "OutputNameIndex",
+    "AsyncStorageService",
+    "ArchiveLoader",
+    "LoadProgress",
+    "InboxWatcher",
+    "IngestStats",
+    "ExtractionEngine",
+    "ExtractionStats",
+    "ExtractionCache",
+    "ExtractionJob",
+    "ExtractionJobStore",
+    "ExtractionProvider",
+    "ExtractionResult",
+    "ExtractionError",
+    "FakeExtractionProvider",
+    "AnthropicExtractionProvider",
+    "create_extraction_provider",
+    "RuleMatch",
+    "extract_with_rules",
+    "Suggestion",
+    "SuggestionService",
+    "SuggestionTrie",
+    "ThumbnailService",
+    "THUMBNAIL_SIZES",
+    "DocumentEvent",
+    "EventBus",
+    "ChangeFeed",
+    "WorkerCoordinator",
+    "WorkerStatus",
+    "ArchiveLayout",
+    "ShardedLayout",
+    "create_archive_layout",
+    "MetadataStore",
+    "JsonFileMetadataStore",
+    "JournalMetadataStore",
+    "WriteBehindMetadataStore",
+    "check_metadata_backend",
+    "create_metadata_store",
+    "migrate_metadata",
 ]
\ No newline at end of file
@@ -0,0 +1,198 @@
+"""
+Verzeichnis-Layout des Archives für die Dateien eines Documents ({id}.pdf, {id}.json).
+
+flat:       archive/{id}.pdf - klassisch, ein einziges großes Verzeichnis
+sharded:    archive/ab/cd/{id}.pdf - Präfix-Verzeichnisse aus der UUID (hex),
+            'sharded:N' mit N Ebenen zu je zwei Zeichen (Standard 2, also 65536 Blätter)
+
+Beim Lesen wird nach dem konfigurierten Layout auch der flache Pfad geprüft,
+damit ein Archive während der Migration (python -m app.tools.layout) in beiden
+Layouts gleichzeitig liegen darf.
+"""
+from pathlib import Path
+from typing import Callable, Iterator, Optional, Set
+from uuid import UUID
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+# Dateien eines Documents, die dem Layout folgen
+ARCHIVE_SUFFIXES = (".pdf", ".json")
+
+# Hex-Zeichen je Verzeichnisebene
+SHARD_WIDTH = 2
+
+
+def parse_document_id(path: Path) -> Optional[UUID]:
+    """UUID aus einem Dateinamen {id}.pdf / {id}.json, None bei fremden Dateien"""
+    try:
+        return UUID(path.stem)
+    except ValueError:
+        return None
+
+
+class ArchiveLayout:
+    """Flaches Layout: alle Dateien direkt im Archive-Verzeichnis"""
+    
+    name = "flat"
+    levels = 0
+    
+    def __init__(self):
+        # Bereits angelegte Shard-Verzeichnisse (spart den mkdir-Aufruf pro Schreibvorgang)
+        self._created: Set[Path] = set()
+    
+    def relative(self, document_id: UUID, suffix: str) -> Path:
+        """Pfad relativ zum Archive-Verzeichnis"""
+        return Path(f"{document_id}{suffix}")
+    
+    def path(self, directory: Path, document_id: UUID, suffix: str) -> Path:
+        """Pfad für neue Dateien im konfigurierten Layout"""
+        return directory / self.relative(document_id, suffix)
+    
+    def resolve(self, directory: Path, document_id: UUID, suffix: str) -> Path:
+        """
+        Pfad einer bestehenden Datei: konfiguriertes Layout, sonst noch nicht
+        migrierter flacher Pfad. Existiert keiner, wird der Layout-Pfad geliefert.
+        """
+        path = self.path(directory, document_id, suffix)
+        if self.levels == 0 or path.exists():
+            return path
+        legacy = directory / f"{document_id}{suffix}"
+        if legacy.exists():
+            return legacy
+        # Zwischen den beiden Prüfungen migriert
+        return path
+    
+    def candidates(self, directory: Path, document_id: UUID, suffix: str) -> Iterator[Path]:
+        """Alle Pfade, unter denen die Datei liegen kann (z.B. zum Löschen)"""
+        yield self.path(directory, document_id, suffix)
+        if self.levels:
+            yield directory / f"{document_id}{suffix}"
+    
+    def ensure_parent(self, path: Path) -> None:
+        """Legt das Shard-Verzeichnis einer neuen Datei an"""
+        parent = path.parent
+        if self.levels == 0 or parent in self._created:
+            return
+        parent.mkdir(parents=True, exist_ok=True)
+        self._created.add(parent)
+    
+    def iter_files(self, directory: Path, pattern: str) -> Iterator[Path]:
+        """
+        Alle Dateien zu pattern (z.B. '*.json') im Layout, danach noch nicht
+        migrierte flache Dateien - außer es gibt sie bereits im Layout
+        (Migration zwischen link und unlink unterbrochen, oder die flache Datei ist veraltet).
+        """
+        if self.levels == 0:
+            yield from directory.glob(pattern)
+            return
+        shards = "/".join(["?" * SHARD_WIDTH] * self.levels)
+        yield from directory.glob(f"{shards}/{pattern}")
+        for legacy in directory.glob(pattern):
+            document_id = parse_document_id(legacy)
+            if document_id is None or not self.path(directory, document_id, legacy.suffix).exists():
+                yield legacy
+    
+    def __str__(self) -> str:
+        return self.name
+
+
+class ShardedLayout(ArchiveLayout):
+    """Präfix-Verzeichnisse aus den ersten levels * 2 Hex-Zeichen der UUID"""
+    
+    def __init__(self, levels: int = 2):
+        super().__init__()
+        if not 1 <= levels <= 3:
+            raise ValueError(f"Ungültige Anzahl Shard-Ebenen: {levels} (1-3)")
+        self.levels = levels
+        self.name = "sharded" if levels == 2 else f"sharded:{levels}"
+    
+    def relative(self, document_id: UUID, suffix: str) -> Path:
+        key = document_id.hex
+        parts = [key[i * SHARD_WIDTH:(i + 1) * SHARD_WIDTH] for i in range(self.levels)]
+        return Path(*parts, f"{document_id}{suffix}")
+
+
+def create_archive_layout(spec: str) -> ArchiveLayout:
+    """Erzeugt das Layout zu 'flat', 'sharded' oder 'sharded:N'"""
+    kind, _, levels = spec.partition(":")
+    if kind == "flat" and not levels:
+        return ArchiveLayout()
+    if kind == "sharded":
+        if not levels:
+            return ShardedLayout()
+        if levels.isdigit():
+            return ShardedLayout(int(levels))
+    raise ValueError(f"Unbekanntes Archive-Layout: {spec}")
+
+
+def _migrate_file(layout: ArchiveLayout, directory: Path, source: Path) -> bool:
+    """
+    Verschiebt eine flache Datei an ihren Platz im Layout, gibt True zurück wenn verschoben.
+    link + unlink statt rename: eine vom laufenden Service inzwischen im Layout
+    geschriebene neuere Fassung wird nie überschrieben (EEXIST), und ein Abbruch
+    dazwischen hinterlässt zwei Namen für denselben Inhalt, die der nächste Lauf auflöst.
+    """
+    document_id = parse_document_id(source)
+    if document_id is None:
+        return False
+    target = layout.path(directory, document_id, source.suffix)
+    if target == source:
+        return False
+    layout.ensure_parent(target)
+    try:
+        os.link(source, target)
+    except FileExistsError:
+        # Im Layout existiert bereits eine (gleiche oder neuere) Fassung
+        pass
+    except FileNotFoundError:
+        # Vom Service inzwischen gelöscht
+        return False
+    except OSError:
+        # Dateisystem ohne Hardlinks: rename, sofern das Ziel (noch) nicht existiert
+        if not target.exists():
+            os.replace(source, target)
+            return True
+    source.unlink(missing_ok=True)
+    return True
+
+
+def iter_flat_files(directory: Path) -> Iterator[Path]:
+    """Noch flach liegende Dateien {id}.pdf / {id}.json (scandir, ohne die Liste aufzubauen)"""
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.name.endswith(ARCHIVE_SUFFIXES) and entry.is_file(follow_symlinks=False):
+                path = Path(entry.path)
+                if parse_document_id(path) is not None:
+                    yield path
+
+
+def migrate_archive(
+    directory: Path,
+    layout: ArchiveLayout,
+    batch_size: int = 1000,
+    pause: float = 0.0,
+    progress: Optional[Callable[[int], None]] = None
+) -> int:
+    """
+    Verschiebt alle flachen Dateien des Archives ins Layout, gibt die Anzahl zurück.
+    Läuft neben dem Service (der beide Layouts liest) und kann jederzeit abgebrochen
+    und erneut gestartet werden - jeder Lauf macht mit den verbliebenen flachen Dateien weiter.
+    pause Sekunden nach jedem Batch begrenzen die I/O-Last im laufenden Betrieb.
+    """
+    if layout.levels == 0:
+        raise ValueError("Migration nur vom flachen in ein Shard-Layout möglich")
+    moved = 0
+    for path in iter_flat_files(directory):
+        if _migrate_file(layout, directory, path):
+            moved += 1
+            if moved % batch_size == 0:
+                if progress:
+                    progress(moved)
+                if pause:
+                    time.sleep(pause)
+    
+    logger.info(f"{moved} Dateien nach {directory} ({layout}) verschoben")
+    return moved
\ No newline at end of file
@@ -0,0 +1,103 @@
+from pydantic import BaseModel
+from datetime import datetime
+from typing import Optional
+import asyncio
+import logging
+import threading
+import time
+from app.models import DocumentCollection
+from app.services.local_storage_service import LocalStorageService
+
+logger = logging.getLogger(__name__)
+
+
+class LoadProgress(BaseModel):
+    """Fortschritt des Archiv-Ladens beim Start"""
+    state: str = "pending"  # pending | ingesting | loading | ready | cancelled | failed
+    ingested: int = 0
+    loaded: int = 0
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    duration_seconds: Optional[float] = None
+    error: Optional[str] = None
+
+
+class ArchiveLoader:
+    """
+    Führt Ingestion und Laden des Archivs aus - blockierend oder im Hintergrund.
+    Im Hintergrund-Modus nimmt die App sofort Verbindungen an, /ready meldet
+    den Fortschritt bis das Archiv vollständig geladen ist.
+    """
+    
+    def __init__(self, storage: LocalStorageService, collection: DocumentCollection):
+        self.storage = storage
+        self.collection = collection
+        self.progress = LoadProgress()
+        self._stop = threading.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._backfill_task: Optional[asyncio.Task] = None
+    
+    @property
+    def is_ready(self) -> bool:
+        return self.progress.state == "ready"
+    
+    def run(self, ingest: bool = True) -> None:
+        """
+        Ingestion und Laden synchron ausführen (aktualisiert progress).
+        Mit ingest=False wird data_in nicht gelesen (weitere Worker-Prozesse, das übernimmt der Leader).
+        """
+        started = time.monotonic()
+        self.progress = LoadProgress(state="ingesting", started_at=datetime.utcnow())
+        
+        try:
+            # Erst neue PDFs einlesen
+            if ingest:
+                self.storage.ingest_documents(self.collection, progress=self._on_ingested)
+                logger.info(f"{self.progress.ingested} neue Dokumente ingested")
+            
+            # Dann existierende laden
+            self.progress.state = "loading"
+            self.storage.load_documents(self.collection, progress=self._on_loaded, stop=self._stop)
+            logger.info(f"Insgesamt {len(self.collection)} Dokumente geladen")
+            
+            # Indizes jetzt aufbauen statt bei der ersten Anfrage (hält sonst den Collection-Lock)
+            if not self._stop.is_set():
+                self.collection.build_indexes()
+            
+            self.progress.state = "cancelled" if self._stop.is_set() else "ready"
+        except Exception as e:
+            logger.exception("Laden des Archivs fehlgeschlagen")
+            self.progress.state = "failed"
+            self.progress.error = str(e)
+        finally:
+            self.progress.finished_at = datetime.utcnow()
+            self.progress.duration_seconds = round(time.monotonic() - started, 3)
+    
+    def _on_ingested(self, count: int) -> None:
+        self.progress.ingested = count
+    
+    def _on_loaded(self, count: int) -> None:
+        self.progress.loaded = count
+    
+    def start_background(self, ingest: bool = True) -> asyncio.Task:
+        """Startet run() in einem Worker-Thread, ohne den Event-Loop zu blockieren"""
+        self._task = asyncio.create_task(asyncio.to_thread(self.run, ingest))
+        return self._task
+    
+    def start_hash_backfill(self, wait_for: Optional[asyncio.Task] = None) -> asyncio.Task:
+        """Berechnet fehlende Content-Hashes im Hintergrund, sobald das Archiv geladen ist"""
+        async def backfill() -> None:
+            if wait_for is not None:
+                await wait_for
+            await asyncio.to_thread(self.storage.backfill_content_hashes, self.collection, self._stop)
+        
+        self._backfill_task = asyncio.create_task(backfill())
+        return self._backfill_task
+    
+    async def stop(self) -> None:
+        """Bricht ein laufendes Hintergrund-Laden nach dem aktuellen Batch ab und wartet darauf"""
+        self._stop.set()
+        for task in (self._task, self._backfill_task):
+            if task is not None and not task.done():
+                logger.info("Warte auf Abbruch des Archiv-Ladens...")
+                await asyncio.gather(task, return_exceptions=True)
\ No newline at end of file
@@ -0,0 +1,168 @@
+from concurrent.futures import ThreadPoolExecutor
+from os import stat_result
+from pathlib import Path
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Set, Tuple, TypeVar, Union
+from uuid import UUID
+import asyncio
+import functools
+import logging
+from app.models import Document, DocumentCollection, SavedAs
+from app.services.local_storage_service import STORAGE_SECONDS, IngestResult, LocalStorageService
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class OutputPlan(NamedTuple):
+    """Eine per claim_save() belegte Speicherung: Zielname und zu ersetzende Datei, auf dem Event-Loop festgelegt"""
+    document: Document
+    filename: str
+    previous_filename: Optional[str]
+    
+    @property
+    def id(self) -> UUID:
+        return self.document.id
+
+
+class AsyncStorageService:
+    """
+    Async-Fassade über LocalStorageService für die API.
+    Blockierende Datei-Operationen laufen in eigenen, fest dimensionierten
+    Executoren statt im allgemeinen Threadpool von Starlette:
+    - io_executor: PDF-Kopien, Uploads, Datei-Stat (kann auf NFS langsam sein)
+    - metadata_executor: Metadaten-Writes, damit ein PATCH nicht hinter Kopien wartet
+    Reine In-Memory-Zugriffe brauchen keinen der beiden Executoren.
+    """
+    
+    def __init__(self, storage: LocalStorageService, io_workers: int = 16, metadata_workers: int = 4):
+        self.storage = storage
+        self.io_workers = max(1, io_workers)
+        self.io_executor = ThreadPoolExecutor(max_workers=self.io_workers, thread_name_prefix="storage-io")
+        self.metadata_executor = ThreadPoolExecutor(
+            max_workers=max(1, metadata_workers), thread_name_prefix="storage-metadata"
+        )
+        # Documents, deren Speicherung gerade läuft (nur auf dem Event-Loop verändert)
+        self._saving: Set[UUID] = set()
+    
+    async def run_io(self, func: Callable[..., T], *args: Any) -> T:
+        """Führt eine blockierende Datei-Operation im I/O-Executor aus"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.io_executor, functools.partial(func, *args))
+    
+    async def _run_metadata(self, func: Callable[..., T], *args: Any) -> T:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.metadata_executor, functools.partial(func, *args))
+    
+    def create_upload_path(self) -> Path:
+        return self.storage.create_upload_path()
+    
+    async def ingest_upload(
+        self,
+        collection: DocumentCollection,
+        upload_path: Path,
+        original_filename: str,
+        content_hash: str
+    ) -> IngestResult:
+        return await self.run_io(
+            self.storage.ingest_upload, collection, upload_path, original_filename, content_hash
+        )
+    
+    async def pdf_path_and_stat(self, document: Document) -> Tuple[Path, stat_result]:
+        """Pfad und stat() der archivierten PDF in einem Executor-Aufruf"""
+        def resolve() -> Tuple[Path, stat_result]:
+            pdf_path = self.storage.get_pdf_path(document)
+            return pdf_path, pdf_path.stat()
+        
+        return await self.run_io(resolve)
+    
+    async def update_metadata(self, document: Document) -> None:
+        await self._run_metadata(self.storage.update_metadata, document)
+    
+    def claim_save(
+        self,
+        collection: DocumentCollection,
+        document: Document,
+        expected_version: Optional[int] = None
+    ) -> Optional[OutputPlan]:
+        """
+        Belegt ein Document für die Speicherung; synchron vor dem ersten await aufrufen
+        (direkt nach der If-Match-Prüfung). Reserviert per collection.update eine neue
+        Version, ein zweiter Save oder PATCH mit demselben If-Match scheitert danach mit 412.
+        None, wenn für das Document bereits eine Speicherung läuft; VersionConflict,
+        wenn es nicht mehr expected_version hat.
+        """
+        if document.id in self._saving:
+            return None
+        collection.update(document, {}, expected_version)
+        self._saving.add(document.id)
+        # Erst nach dem Update: es übernimmt zuvor die Änderungen anderer Worker-Prozesse
+        return OutputPlan(
+            document=document,
+            filename=document.generate_filename(),
+            previous_filename=document.current_filename if document.is_saved else None
+        )
+    
+    async def save_to_output(self, collection: DocumentCollection, plan: OutputPlan) -> Path:
+        """
+        Führt eine per claim_save() belegte Speicherung aus: nur die Datei-Operationen
+        laufen im I/O-Executor, saved_as wird danach auf dem Event-Loop eingetragen
+        """
+        try:
+            with STORAGE_SECONDS.labels("save_output").time():
+                target_path = await self.run_io(
+                    self.storage.write_output, plan.id, plan.filename, plan.previous_filename
+                )
+                # Aktuellen Stand nehmen: ein PATCH während des Kopierens darf nicht verloren gehen
+                document = collection.get(plan.id) or plan.document
+                collection.apply(document, {"saved_as": [*document.saved_as, SavedAs(filename=target_path.name)]})
+                await self.update_metadata(document)
+            return target_path
+        finally:
+            self._saving.discard(plan.id)
+    
+    async def update_metadata_many(
+        self,
+        documents: List[Document],
+        max_workers: int = 8
+    ) -> Dict[UUID, Union[None, Exception]]:
+        """Wie LocalStorageService.update_metadata_many, aber im Metadaten-Executor"""
+        return await self._run_many(self._run_metadata, self.storage.update_metadata, documents, max_workers)
+    
+    async def save_many_to_output(
+        self,
+        collection: DocumentCollection,
+        plans: List[OutputPlan],
+        max_workers: int = 8
+    ) -> Dict[UUID, Union[Path, Exception]]:
+        """Wie save_to_output() für mehrere per claim_save() belegte Documents, mit begrenzter Parallelität"""
+        async def run(operation: Callable[..., T], plan: OutputPlan) -> T:
+            return await operation(collection, plan)
+        
+        return await self._run_many(run, self.save_to_output, plans, max_workers)
+    
+    @staticmethod
+    async def _run_many(
+        runner: Callable[..., Any],
+        operation: Callable[[Document], Any],
+        documents: List[Document],
+        max_workers: int
+    ) -> Dict[UUID, Any]:
+        """Begrenzt die Parallelität pro Request, damit ein Bulk-Save den Executor nicht allein belegt"""
+        semaphore = asyncio.Semaphore(max(1, max_workers))
+        
+        async def run_one(document: Document) -> Any:
+            async with semaphore:
+                try:
+                    return await runner(operation, document)
+                except Exception as e:
+                    logger.error(f"Bulk-Operation für Document {document.id} fehlgeschlagen: {e}")
+                    return e
+        
+        outcomes = await asyncio.gather(*(run_one(document) for document in documents))
+        return {document.id: outcome for document, outcome in zip(documents, outcomes)}
+    
+    def shutdown(self) -> None:
+        """Wartet auf laufende Operationen und beendet die Executoren"""
+        self.io_executor.shutdown(wait=True)
+        self.metadata_executor.shutdown(wait=True)
\ No newline at end of file
@@ -0,0 +1,159 @@
+from collections import deque
+from datetime import datetime
+from pydantic import BaseModel, Field
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple
+from uuid import UUID
+import asyncio
+import logging
+import secrets
+import threading
+from app.models import Document
+
+logger = logging.getLogger(__name__)
+
+
+class DocumentEvent(BaseModel):
+    """Änderung an einem Document (created, updated oder removed)"""
+    seq: int
+    type: str
+    document_id: UUID
+    version: int
+    fields: List[str] = Field(default_factory=list, description="Geänderte Felder (bei updated)")
+    timestamp: datetime = Field(default_factory=datetime.utcnow)
+
+
+class Subscription:
+    """Event-Queue eines Clients; None in der Queue beendet den Stream"""
+    
+    def __init__(self, last_seq: int):
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.last_seq = last_seq
+        self.closed = False
+
+
+class EventBus:
+    """
+    In-Process-Bus für Änderungen an der DocumentCollection.
+    Events erhalten eine fortlaufende Nummer und landen in einem begrenzten
+    Replay-Puffer, aus dem Clients nach einem Reconnect (Last-Event-ID) fortsetzen.
+    Event-IDs enthalten eine Epoche pro Prozess, damit IDs eines früheren
+    Prozesses nicht mit neuen Nummern verwechselt werden.
+    Backpressure: Hat ein Client mehr als client_queue_size Events nicht
+    abgeholt, wird sein Stream beendet statt unbegrenzt Speicher zu belegen -
+    er setzt per Last-Event-ID aus dem Replay-Puffer fort.
+    """
+    
+    def __init__(self, replay_size: int = 1000, client_queue_size: int = 256):
+        self.replay_size = max(1, replay_size)
+        self.client_queue_size = max(1, client_queue_size)
+        self.epoch = secrets.token_hex(4)
+        self._seq = 0
+        self._buffer: Deque[DocumentEvent] = deque(maxlen=self.replay_size)
+        self._subscribers: Set[Subscription] = set()
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.published_total = 0
+        self.dropped_clients_total = 0
+    
+    def attach(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Event-Loop, in dem die Streams laufen (beim Start setzen)"""
+        self._loop = loop
+    
+    def event_id(self, event: DocumentEvent) -> str:
+        return f"{self.epoch}-{event.seq}"
+    
+    def parse_event_id(self, event_id: Optional[str]) -> Optional[int]:
+        """Nummer aus einer Last-Event-ID dieses Prozesses, sonst None"""
+        if not event_id:
+            return None
+        epoch, _, seq = event_id.strip().partition("-")
+        if epoch != self.epoch or not seq.isdigit():
+            return None
+        return int(seq)
+    
+    def publish_change(
+        self,
+        change: str,
+        document: Document,
+        fields: Tuple[str, ...] = (),
+        previous: Optional[Dict[str, Any]] = None
+    ) -> None:
+        """Change-Listener der DocumentCollection (threadsicher, auch aus Worker-Threads)"""
+        with self._lock:
+            self._seq += 1
+            event = DocumentEvent(
+                seq=self._seq,
+                type=change,
+                document_id=document.id,
+                version=document.version,
+                fields=sorted(fields)
+            )
+            self._buffer.append(event)
+            self.published_total += 1
+            loop = self._loop if self._subscribers else None
+        if loop is not None and not loop.is_closed():
+            # Zustellung immer im Loop, damit die Reihenfolge der Nummern erhalten bleibt
+            loop.call_soon_threadsafe(self._deliver, event)
+    
+    def _deliver(self, event: DocumentEvent) -> None:
+        for subscription in list(self._subscribers):
+            # Bereits per Replay zugestellte Events überspringen
+            if subscription.closed or event.seq <= subscription.last_seq:
+                continue
+            if subscription.queue.qsize() >= self.client_queue_size:
+                self._drop(subscription)
+                continue
+            subscription.last_seq = event.seq
+            subscription.queue.put_nowait(event)
+    
+    def _drop(self, subscription: Subscription) -> None:
+        subscription.closed = True
+        self.unsubscribe(subscription)
+        # Nicht abgeholte Events verwerfen, der Client holt sie per Replay nach
+        while not subscription.queue.empty():
+            subscription.queue.get_nowait()
+        subscription.queue.put_nowait(None)
+        self.dropped_clients_total += 1
+        logger.warning(f"Event-Stream eines langsamen Clients beendet ({self.client_queue_size} Events ausstehend)")
+    
+    def subscribe(self, last_event_id: Optional[str] = None) -> Tuple[Subscription, List[DocumentEvent], bool]:
+        """
+        Meldet einen Client an (im Event-Loop aufrufen).
+        Liefert die Subscription, die seit last_event_id verpassten Events und
+        ob die Lücke größer als der Replay-Puffer ist (Client muss dann neu laden).
+        """
+        with self._lock:
+            seq = self.parse_event_id(last_event_id)
+            current = self._seq
+            if seq is None or seq > current:
+                # Neuer Client oder ID eines anderen Prozesses: ab jetzt
+                missed: List[DocumentEvent] = []
+                gap = last_event_id is not None
+            else:
+                missed = [event for event in self._buffer if event.seq > seq]
+                oldest = self._buffer[0].seq if self._buffer else current + 1
+                gap = seq + 1 < oldest and seq < current
+            subscription = Subscription(last_seq=current)
+            self._subscribers.add(subscription)
+        return subscription, missed, gap
+    
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            self._subscribers.discard(subscription)
+    
+    def close(self) -> None:
+        """Beendet alle Streams (beim Herunterfahren, im Event-Loop aufrufen)"""
+        with self._lock:
+            subscriptions = list(self._subscribers)
+            self._subscribers.clear()
+        for subscription in subscriptions:
+            subscription.closed = True
+            subscription.queue.put_nowait(None)
+    
+    @property
+    def subscribers(self) -> int:
+        return len(self._subscribers)
+    
+    @property
+    def last_seq(self) -> int:
+        return self._seq
\ No newline at end of file
@@ -0,0 +1,116 @@
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+import json
+import logging
+import os
+import threading
+from app.services.extraction_providers import ExtractionProvider, ExtractionResult, normalize_fields
+
+logger = logging.getLogger(__name__)
+
+
+def cache_key(content_hash: str, provider: ExtractionProvider, variant: str = "") -> str:
+    """Cache-Key: PDF-Inhalt + Provider/Modell + Prompt-Version (+ Variante, z.B. Text-Regeln)"""
+    key = f"{content_hash}:{provider.name}:{provider.model}:{provider.prompt_version}"
+    return f"{key}:{variant}" if variant else key
+
+
+class ExtractionCache:
+    """
+    Persistenter LRU-Cache für Extraktionsergebnisse.
+    Im Speicher als OrderedDict (älteste Nutzung zuerst), auf der Platte als
+    append-only Journal (put/del). Beim Laden und wenn das Journal deutlich
+    größer als der Cache ist, wird es in LRU-Reihenfolge neu geschrieben -
+    so bleibt die Nutzungsreihenfolge auch über Neustarts grob erhalten.
+    """
+    
+    FILENAME = "extraction.cache.jsonl"
+    
+    def __init__(self, directory: Path, max_entries: int = 100_000):
+        self.path = directory / self.FILENAME
+        self.max_entries = max(1, max_entries)
+        self._entries: "OrderedDict[str, dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._file = None
+        self._records = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def load(self) -> int:
+        """Liest das Journal und kompaktiert es, gibt die Anzahl der Einträge zurück"""
+        with self._lock:
+            self._entries.clear()
+            if self.path.exists():
+                with self.path.open("r", encoding="utf-8") as journal:
+                    for line in journal:
+                        if not line.strip():
+                            continue
+                        try:
+                            record = json.loads(line)
+                        except ValueError:
+                            continue
+                        if record.get("op") == "put":
+                            self._entries[record["key"]] = record["result"]
+                            self._entries.move_to_end(record["key"])
+                        elif record.get("op") == "del":
+                            self._entries.pop(record["key"], None)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._rewrite()
+            return len(self._entries)
+    
+    def _rewrite(self) -> None:
+        tmp_path = self.path.with_suffix(".tmp")
+        with tmp_path.open("w", encoding="utf-8") as journal:
+            for key, result in self._entries.items():
+                journal.write(json.dumps({"op": "put", "key": key, "result": result}, ensure_ascii=False) + "\n")
+        os.replace(tmp_path, self.path)
+        if self._file is not None:
+            self._file.close()
+        self._file = self.path.open("a", encoding="utf-8")
+        self._records = len(self._entries)
+    
+    def _append(self, record: dict) -> None:
+        if self._file is None:
+            self._file = self.path.open("a", encoding="utf-8")
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._file.flush()
+        self._records += 1
+    
+    def get(self, key: str, count_miss: bool = True) -> Optional[ExtractionResult]:
+        """Liefert ein gecachtes Ergebnis; count_miss=False für wiederholte Nachschläge desselben Jobs"""
+        with self._lock:
+            result = self._entries.get(key)
+            if result is None:
+                if count_miss:
+                    self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        cached = ExtractionResult.model_validate(result)
+        cached.fields = normalize_fields(cached.fields)
+        return cached
+    
+    def put(self, key: str, result: ExtractionResult) -> None:
+        data = result.model_dump(mode="json")
+        with self._lock:
+            self._entries[key] = data
+            self._entries.move_to_end(key)
+            self._append({"op": "put", "key": key, "result": data})
+            while len(self._entries) > self.max_entries:
+                evicted, _ = self._entries.popitem(last=False)
+                self._append({"op": "del", "key": evicted})
+                self.evictions += 1
+            if self._records > 2 * self.max_entries:
+                self._rewrite()
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
\ No newline at end of file
@@ -0,0 +1,517 @@
+from collections import deque
+from datetime import datetime, timedelta
+from pydantic import BaseModel
+from typing import Awaitable, Deque, Dict, List, Optional, Set
+from uuid import UUID
+import asyncio
+import logging
+import random
+import threading
+import time
+from app.models import Document, DocumentCollection, FieldSource, METADATA_FIELDS
+from app.services.async_storage_service import AsyncStorageService
+from app.services.extraction_cache import ExtractionCache, cache_key
+from app.services.extraction_jobs import ExtractionJob, ExtractionJobStore
+from app.services.extraction_providers import ExtractionError, ExtractionProvider, ExtractionResult
+from app.services.text_rules import TEXT_RULES_VERSION, extract_with_rules
+from app.utils.pdf_text import extract_text
+from app.utils.metrics import REGISTRY
+from app.utils.rate_limiter import RateLimiter
+
+logger = logging.getLogger(__name__)
+
+# Ein Versuch pro Beobachtung; state: succeeded, failed oder queued (wird wiederholt)
+EXTRACTION_SECONDS = REGISTRY.histogram(
+    "pdff_extraction_attempt_seconds",
+    "Dauer eines Extraktionsversuchs (Text-Layer, Rate Limit und Provider)",
+    ("state",),
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+)
+
+
+class ExtractionStats(BaseModel):
+    """Kennzahlen der Metadaten-Extraktion"""
+    provider: str
+    model: str
+    running: bool
+    concurrency: int
+    queued: int
+    in_flight: int
+    waiting_for_retry: int
+    succeeded_total: int
+    failed_total: int
+    retries_total: int
+    tokens_total: int
+    throughput_per_minute: int
+    text_layer: bool = False
+    text_fields_total: int = 0
+    llm_fields_total: int = 0
+    llm_skipped_total: int = 0
+    cache_entries: int = 0
+    cache_hits: int = 0
+    cache_misses: int = 0
+    cache_evictions: int = 0
+
+
+class ExtractionEngine:
+    """
+    Arbeitet Extraktions-Jobs mit fester Parallelität ab.
+    Neu ingestierte Documents ohne vollständige Metadaten werden automatisch
+    eingereiht. Aufrufe an den Provider laufen durch ein Requests-/Tokens-pro-Minute
+    Rate-Limit; vorübergehende Fehler werden mit exponentiellem Backoff und Jitter
+    wiederholt. Ergebnisse füllen nur leere Metadaten-Felder (Eingaben im UI
+    haben Vorrang). Jobs werden persistiert und nach einem Neustart fortgesetzt.
+    Mit Cache werden Ergebnisse für bereits extrahierte PDF-Inhalte (gleicher
+    Content-Hash, Provider, Modell und Prompt-Version) ohne Provider-Aufruf und
+    ohne Warten in der Queue übernommen.
+    Mit text_layer werden zuerst die ersten Seiten des Text-Layers lokal gelesen
+    und Datum/Nummern per Regeln erkannt; der Provider bekommt nur die übrigen
+    Felder und - wenn der Text-Layer genug Text enthält - nur diesen Text statt
+    der PDF.
+    Mit mehreren Worker-Prozessen arbeitet nur der Leader Jobs ab (start()); die
+    übrigen laufen mit follow(): sie spiegeln die Jobs aus dem gemeinsamen
+    Job-Journal und hängen neue Jobs dort an, der Leader übernimmt sie (shared).
+    """
+    
+    def __init__(
+        self,
+        storage: AsyncStorageService,
+        collection: DocumentCollection,
+        provider: ExtractionProvider,
+        job_store: ExtractionJobStore,
+        concurrency: int = 4,
+        rate_limiter: Optional[RateLimiter] = None,
+        max_attempts: int = 5,
+        backoff_base: float = 1.0,
+        backoff_max: float = 60.0,
+        cache: Optional[ExtractionCache] = None,
+        text_layer: bool = True,
+        text_max_pages: int = 3,
+        text_max_bytes: int = 50 * 1024 * 1024,
+        text_min_chars: int = 50,
+        shared: bool = False,
+        follow_interval: float = 0.5
+    ):
+        self.storage = storage
+        self.collection = collection
+        self.provider = provider
+        self.job_store = job_store
+        self.concurrency = max(1, concurrency)
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self.max_attempts = max(1, max_attempts)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.cache = cache
+        self.text_layer = text_layer
+        self.text_max_pages = max(1, text_max_pages)
+        self.text_max_bytes = text_max_bytes
+        self.text_min_chars = text_min_chars
+        self.shared = shared
+        self.follow_interval = follow_interval
+        # Nur spiegeln, ein anderer Worker-Prozess arbeitet die Jobs ab
+        self.follower = False
+        self._follow_task: Optional[asyncio.Task] = None
+        # Ergebnisse mit Text-Stufe unterscheiden sich von reinen Provider-Ergebnissen
+        self._cache_variant = f"rules{TEXT_RULES_VERSION}-p{self.text_max_pages}" if text_layer else ""
+        
+        self.jobs: Dict[UUID, ExtractionJob] = {}
+        # Document-ID -> aktiver Job (höchstens einer pro Document)
+        self._active: Dict[UUID, UUID] = {}
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self._timers: Dict[UUID, asyncio.TimerHandle] = {}
+        self._tasks: List[asyncio.Task] = []
+        self._background: Set[asyncio.Task] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # Vor dem Start (z.B. während der initialen Ingestion) gemeldete Documents
+        self._early: List[UUID] = []
+        self._early_lock = threading.Lock()
+        self._completed: Deque[float] = deque()
+        self._in_flight = 0
+        self._succeeded_total = 0
+        self._failed_total = 0
+        self._retries_total = 0
+        self._tokens_total = 0
+        self._text_fields_total = 0
+        self._llm_fields_total = 0
+        self._llm_skipped_total = 0
+    
+    async def start(self, wait_for: Optional[Awaitable] = None) -> None:
+        """Lädt persistierte Jobs, reiht offene wieder ein und startet die Worker"""
+        if wait_for is not None:
+            await wait_for
+        
+        if self.follower:
+            # Übernahme als Leader: gespiegelte Jobs verwerfen, maßgeblich ist das Journal
+            self._follow_task.cancel()
+            await asyncio.gather(self._follow_task, return_exceptions=True)
+            self._follow_task = None
+            self.follower = False
+            self.jobs = {}
+            self._active = {}
+        
+        if self.cache is not None:
+            entries = await asyncio.to_thread(self.cache.load)
+            logger.info(f"Extraktions-Cache geladen ({entries} Einträge)")
+        
+        # Bereits vor dem Start (per API) angelegte Jobs behalten
+        created_early = dict(self.jobs)
+        self.jobs = await asyncio.to_thread(self.job_store.load)
+        for job in sorted(self.jobs.values(), key=lambda job: job.created_at):
+            if job.is_active and job.document_id not in self._active:
+                # Beim Beenden laufende Jobs erneut ausführen
+                job.state = "queued"
+                self._active[job.document_id] = job.id
+                self._schedule(job)
+        for job in created_early.values():
+            self.jobs[job.id] = job
+            self._save(job)
+        
+        with self._early_lock:
+            self._loop = asyncio.get_running_loop()
+            early, self._early = self._early, []
+        for document_id in early:
+            self.enqueue(document_id)
+        
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+        if self.shared:
+            self._tasks.append(asyncio.create_task(self._adopt_loop()))
+        logger.info(
+            f"Extraktion gestartet ({self.provider.name}), Parallelität {self.concurrency}, "
+            f"{self.queue.qsize()} offene Jobs"
+        )
+    
+    def follow(self, wait_for: Optional[Awaitable] = None) -> asyncio.Task:
+        """
+        Startet den Follower-Modus: Jobs werden nur aus dem gemeinsamen Journal
+        gespiegelt, neue Jobs dort angehängt und vom Leader abgearbeitet
+        """
+        self.follower = True
+        self._follow_task = asyncio.create_task(self._follow(wait_for))
+        return self._follow_task
+    
+    async def _follow(self, wait_for: Optional[Awaitable]) -> None:
+        if wait_for is not None:
+            await wait_for
+        with self._early_lock:
+            self._loop = asyncio.get_running_loop()
+            early, self._early = self._early, []
+        # Erster Aufruf liest das ganze Journal
+        self._mirror(await asyncio.to_thread(self.job_store.read_new))
+        for document_id in early:
+            self.enqueue(document_id)
+        logger.info(f"Extraktion im Follower-Modus ({len(self.jobs)} Jobs), Jobs arbeitet der Leader ab")
+        while True:
+            await asyncio.sleep(self.follow_interval)
+            self._mirror(self.job_store.read_new())
+    
+    def _mirror(self, jobs: List[ExtractionJob]) -> None:
+        for job in jobs:
+            self.jobs[job.id] = job
+            if job.is_active:
+                self._active[job.document_id] = job.id
+            elif self._active.get(job.document_id) == job.id:
+                del self._active[job.document_id]
+    
+    async def _adopt_loop(self) -> None:
+        """Leader: übernimmt Jobs, die andere Worker-Prozesse ins Journal geschrieben haben"""
+        while True:
+            await asyncio.sleep(self.follow_interval)
+            for job in self.job_store.read_new():
+                # Eigene Stände (und bereits übernommene Jobs) kennt der Leader schon
+                if job.id in self.jobs or not job.is_active:
+                    continue
+                active_id = self._active.get(job.document_id)
+                self.jobs[job.id] = job
+                if active_id is not None:
+                    # Gleichzeitig in zwei Prozessen eingereiht: nur einer läuft
+                    job.state = "failed"
+                    job.error = f"Duplicate of active job {active_id}"
+                    self._save(job)
+                    continue
+                job.state = "queued"
+                self._active[job.document_id] = job.id
+                self._submit(job)
+    
+    async def stop(self) -> None:
+        """Stoppt die Worker; unterbrochene Jobs bleiben 'running' und laufen nach dem Neustart erneut"""
+        if self._follow_task is not None:
+            self._follow_task.cancel()
+            await asyncio.gather(self._follow_task, return_exceptions=True)
+            self._follow_task = None
+        for timer in self._timers.values():
+            timer.cancel()
+        self._timers.clear()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self.job_store.close()
+        if self.cache is not None:
+            self.cache.close()
+        logger.info("Extraktion gestoppt")
+    
+    def notify_ingested(self, document: Document) -> None:
+        """Ingest-Listener (threadsicher): reiht neue Documents ohne vollständige Metadaten ein"""
+        if document.is_complete:
+            return
+        with self._early_lock:
+            if self._loop is None:
+                self._early.append(document.id)
+                return
+            loop = self._loop
+        loop.call_soon_threadsafe(self.enqueue, document.id)
+    
+    def enqueue(self, document_id: UUID) -> ExtractionJob:
+        """Legt einen Job an (oder liefert den bereits aktiven Job des Documents)"""
+        active_id = self._active.get(document_id)
+        if active_id is not None:
+            return self.jobs[active_id]
+        
+        job = ExtractionJob(document_id=document_id, provider=self.provider.name)
+        self.jobs[job.id] = job
+        self._active[document_id] = job.id
+        if self.follower:
+            # Nur ins gemeinsame Journal - der Leader übernimmt den Job
+            self.job_store.save(job)
+            return job
+        self._save(job)
+        self._submit(job)
+        return job
+    
+    def _submit(self, job: ExtractionJob) -> None:
+        # Cache-Treffer sofort übernehmen statt hinter anderen Jobs zu warten
+        document = self.collection.get(job.document_id)
+        cached = self._lookup_cache(document) if document is not None else None
+        if cached is not None:
+            task = asyncio.get_running_loop().create_task(self._complete_from_cache(job, document, cached))
+            self._background.add(task)
+            task.add_done_callback(self._background.discard)
+        else:
+            self._schedule(job)
+    
+    def _lookup_cache(self, document: Document, count_miss: bool = True) -> Optional[ExtractionResult]:
+        if self.cache is None or not document.content_hash:
+            return None
+        return self.cache.get(self._cache_key(document), count_miss=count_miss)
+    
+    def _cache_key(self, document: Document) -> str:
+        return cache_key(document.content_hash, self.provider, self._cache_variant)
+    
+    async def _complete_from_cache(self, job: ExtractionJob, document: Document, result: ExtractionResult) -> None:
+        job.state = "running"
+        try:
+            job.applied_fields = await self._apply(document, result)
+        except Exception as e:
+            # Schreibfehler: regulär über die Queue erneut versuchen
+            logger.error(f"Übernahme aus dem Cache für Document {document.id} fehlgeschlagen: {e}")
+            job.state = "queued"
+            self._schedule(job)
+            return
+        self._succeed(job, document, cache_hit=True)
+    
+    def get_job(self, job_id: UUID) -> Optional[ExtractionJob]:
+        return self.jobs.get(job_id)
+    
+    def list_jobs(self, state: Optional[str] = None, limit: int = 100) -> List[ExtractionJob]:
+        """Neueste Jobs zuerst, optional nach Zustand gefiltert"""
+        jobs = [job for job in self.jobs.values() if state is None or job.state == state]
+        jobs.sort(key=lambda job: job.updated_at, reverse=True)
+        return jobs[:limit]
+    
+    def _schedule(self, job: ExtractionJob) -> None:
+        delay = 0.0
+        if job.next_attempt_at is not None:
+            delay = (job.next_attempt_at - datetime.utcnow()).total_seconds()
+        if delay > 0:
+            self._timers[job.id] = asyncio.get_running_loop().call_later(delay, self._release_timer, job.id)
+        else:
+            self.queue.put_nowait(job.id)
+    
+    def _release_timer(self, job_id: UUID) -> None:
+        self._timers.pop(job_id, None)
+        self.queue.put_nowait(job_id)
+    
+    def _save(self, job: ExtractionJob) -> None:
+        self.job_store.save(job)
+        if self.job_store.records > max(1000, 4 * len(self.jobs)):
+            self.job_store.compact(self.jobs.values())
+    
+    async def _worker(self) -> None:
+        while True:
+            job_id = await self.queue.get()
+            job = self.jobs.get(job_id)
+            if job is None or job.state != "queued":
+                continue
+            self._in_flight += 1
+            started = time.perf_counter()
+            try:
+                await self._process(job)
+            finally:
+                self._in_flight -= 1
+                EXTRACTION_SECONDS.labels(job.state).observe(time.perf_counter() - started)
+                if not job.is_active:
+                    self._active.pop(job.document_id, None)
+    
+    async def _process(self, job: ExtractionJob) -> None:
+        document = self.collection.get(job.document_id)
+        if document is None:
+            self._fail(job, "Document not found")
+            return
+        
+        job.state = "running"
+        job.attempts += 1
+        job.next_attempt_at = None
+        self._save(job)
+        
+        try:
+            # Erneut nachschlagen: inzwischen könnte ein inhaltsgleiches Document extrahiert worden sein
+            result = self._lookup_cache(document, count_miss=False)
+            cache_hit = result is not None
+            if result is None:
+                result = await self._extract(document)
+            
+            job.applied_fields = await self._apply(document, result)
+        except FileNotFoundError:
+            self._fail(job, "PDF file not found in archive")
+            return
+        except ExtractionError as e:
+            if e.retry_after:
+                self.rate_limiter.penalize(e.retry_after)
+            if e.retryable:
+                self._retry(job, str(e), e.retry_after)
+            else:
+                self._fail(job, str(e))
+            return
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.exception(f"Extraktion für Document {document.id} fehlgeschlagen")
+            self._retry(job, str(e))
+            return
+        
+        self._succeed(job, document, cache_hit)
+    
+    async def _extract(self, document: Document) -> ExtractionResult:
+        """Text-Regeln zuerst, danach der Provider für die noch offenen Felder"""
+        pdf_path, stat_result = await self.storage.pdf_path_and_stat(document)
+        result = ExtractionResult()
+        page_text: Optional[List[str]] = None
+        
+        if self.text_layer and stat_result.st_size <= self.text_max_bytes:
+            try:
+                pages = await self.storage.run_io(extract_text, pdf_path, self.text_max_pages)
+            except Exception as e:
+                logger.debug(f"Text-Layer von Document {document.id} nicht lesbar: {e}")
+                pages = []
+            for name, match in extract_with_rules(pages).items():
+                result.fields[name] = match.value
+                result.sources[name] = FieldSource(source="text", detail=match.rule, page=match.page)
+            self._text_fields_total += len(result.fields)
+            if sum(len(text.strip()) for text in pages) >= self.text_min_chars:
+                page_text = pages
+        
+        # Nur Felder anfragen, die weder per Regel erkannt noch bereits gefüllt sind
+        unresolved = [name for name in METADATA_FIELDS if name not in result.fields]
+        requested = [name for name in unresolved if getattr(document, name, None) in (None, "")]
+        if requested:
+            estimate = self.provider.estimate_tokens(stat_result.st_size, page_text)
+            await self.rate_limiter.acquire(estimate)
+            answer = await self.provider.extract(document, pdf_path, requested, page_text)
+            self.rate_limiter.settle(estimate, answer.total_tokens)
+            self._tokens_total += answer.total_tokens
+            self._llm_fields_total += len(answer.fields)
+            result.fields.update(answer.fields)
+            result.sources.update(answer.sources)
+            result.input_tokens = answer.input_tokens
+            result.output_tokens = answer.output_tokens
+        else:
+            self._llm_skipped_total += 1
+        
+        # Nur vollständige Ergebnisse cachen - Teilergebnisse hängen von den Feldern dieses Documents ab
+        if self.cache is not None and document.content_hash and len(requested) == len(unresolved):
+            self.cache.put(self._cache_key(document), result)
+        return result
+    
+    def _succeed(self, job: ExtractionJob, document: Document, cache_hit: bool = False) -> None:
+        job.state = "succeeded"
+        job.error = None
+        job.cache_hit = cache_hit
+        self._save(job)
+        self._active.pop(job.document_id, None)
+        self._succeeded_total += 1
+        self._completed.append(time.monotonic())
+        source = " (Cache)" if cache_hit else ""
+        logger.info(f"Metadaten für Document {document.id} extrahiert{source}: {', '.join(job.applied_fields) or '-'}")
+    
+    async def _apply(self, document: Document, result: ExtractionResult) -> List[str]:
+        """Übernimmt extrahierte Werte nur in leere Felder (mit Herkunft) und speichert die Metadaten"""
+        changes: Dict = {
+            name: value for name, value in result.fields.items()
+            if getattr(document, name, None) in (None, "")
+        }
+        applied = sorted(changes)
+        if changes:
+            sources = {name: result.sources[name] for name in applied if name in result.sources}
+            if sources:
+                changes["field_sources"] = {**document.field_sources, **sources}
+            self.collection.update(document, changes)
+            await self.storage.update_metadata(document)
+        return applied
+    
+    def _retry(self, job: ExtractionJob, error: str, retry_after: Optional[float] = None) -> None:
+        if job.attempts >= self.max_attempts:
+            self._fail(job, f"Giving up after {job.attempts} attempts: {error}")
+            return
+        # Exponentieller Backoff mit vollem Jitter, Retry-After des Providers als Untergrenze
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** (job.attempts - 1)))
+        delay = max(delay, retry_after or 0.0)
+        job.state = "queued"
+        job.error = error
+        job.next_attempt_at = datetime.utcnow() + timedelta(seconds=delay)
+        self._save(job)
+        self._retries_total += 1
+        logger.warning(f"Extraktion für Document {job.document_id} wird in {delay:.1f}s wiederholt: {error}")
+        self._schedule(job)
+    
+    def _fail(self, job: ExtractionJob, error: str) -> None:
+        job.state = "failed"
+        job.error = error
+        job.next_attempt_at = None
+        self._save(job)
+        self._failed_total += 1
+        logger.error(f"Extraktion für Document {job.document_id} fehlgeschlagen: {error}")
+    
+    def stats(self) -> ExtractionStats:
+        """Aktuelle Kennzahlen (Durchsatz über die letzten 60 Sekunden)"""
+        horizon = time.monotonic() - 60
+        while self._completed and self._completed[0] < horizon:
+            self._completed.popleft()
+        
+        queued, in_flight = self.queue.qsize(), self._in_flight
+        if self.follower:
+            # Zähler führt der Leader; Queue-Stand aus den gespiegelten Jobs
+            queued = sum(1 for job in self.jobs.values() if job.state == "queued")
+            in_flight = sum(1 for job in self.jobs.values() if job.state == "running")
+        
+        return ExtractionStats(
+            provider=self.provider.name,
+            model=self.provider.model,
+            running=bool(self._tasks),
+            concurrency=self.concurrency,
+            queued=queued,
+            in_flight=in_flight,
+            waiting_for_retry=len(self._timers),
+            succeeded_total=self._succeeded_total,
+            failed_total=self._failed_total,
+            retries_total=self._retries_total,
+            tokens_total=self._tokens_total,
+            throughput_per_minute=len(self._completed),
+            text_layer=self.text_layer,
+            text_fields_total=self._text_fields_total,
+            llm_fields_total=self._llm_fields_total,
+            llm_skipped_total=self._llm_skipped_total,
+            cache_entries=len(self.cache) if self.cache is not None else 0,
+            cache_hits=self.cache.hits if self.cache is not None else 0,
+            cache_misses=self.cache.misses if self.cache is not None else 0,
+            cache_evictions=self.cache.evictions if self.cache is not None else 0
+        )
\ No newline at end of file
@@ -0,0 +1,126 @@
+from datetime import datetime, timedelta
+from pathlib import Path
+from pydantic import BaseModel, Field
+from typing import Dict, Iterable, List, Optional
+from uuid import UUID, uuid4
+import json
+import logging
+import os
+from app.utils.shared_files import FileTail, SharedAppendFile
+
+logger = logging.getLogger(__name__)
+
+# Zustände, in denen ein Job noch abgearbeitet wird
+ACTIVE_JOB_STATES = ("queued", "running")
+
+
+class ExtractionJob(BaseModel):
+    """Extraktions-Job für ein Document"""
+    id: UUID = Field(default_factory=uuid4)
+    document_id: UUID
+    state: str = "queued"  # queued | running | succeeded | failed
+    attempts: int = 0
+    provider: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+    next_attempt_at: Optional[datetime] = None
+    error: Optional[str] = None
+    applied_fields: List[str] = Field(default_factory=list)
+    cache_hit: bool = False
+    
+    @property
+    def is_active(self) -> bool:
+        return self.state in ACTIVE_JOB_STATES
+
+
+class ExtractionJobStore:
+    """
+    Persistente Jobs als append-only Journal (eine JSON-Zeile pro Zustandsänderung).
+    Beim Laden gewinnt der letzte Stand je Job; danach wird das Journal kompaktiert
+    und abgeschlossene Jobs älter als retention werden verworfen.
+    Mehrere Prozesse dürfen gleichzeitig anhängen (flock); read_new() liefert
+    die seither von allen Prozessen geschriebenen Stände.
+    """
+    
+    FILENAME = "extraction.jobs.jsonl"
+    
+    def __init__(self, directory: Path, retention: timedelta = timedelta(days=7)):
+        self.path = directory / self.FILENAME
+        self.retention = retention
+        self._file = SharedAppendFile(self.path)
+        self._tail: Optional[FileTail] = None
+        self._records = 0
+    
+    def load(self) -> Dict[UUID, ExtractionJob]:
+        """Liest alle Jobs und schreibt ein kompaktiertes Journal"""
+        jobs: Dict[UUID, ExtractionJob] = {}
+        if self.path.exists():
+            with self.path.open("r", encoding="utf-8") as journal:
+                for line_number, line in enumerate(journal, start=1):
+                    if not line.strip():
+                        continue
+                    try:
+                        job = ExtractionJob.model_validate_json(line)
+                    except Exception:
+                        logger.warning(f"Überspringe defekten Job-Record in Zeile {line_number}")
+                        continue
+                    jobs[job.id] = job
+        
+        horizon = datetime.utcnow() - self.retention
+        jobs = {
+            job_id: job for job_id, job in jobs.items()
+            if job.is_active or job.updated_at >= horizon
+        }
+        self._rewrite(jobs.values())
+        return jobs
+    
+    def _rewrite(self, jobs: Iterable[ExtractionJob]) -> None:
+        with self._file.lock:
+            tmp_path = self.path.with_suffix(".tmp")
+            count = 0
+            with tmp_path.open("w", encoding="utf-8") as journal:
+                for job in jobs:
+                    journal.write(job.model_dump_json() + "\n")
+                    count += 1
+                journal.flush()
+                os.fsync(journal.fileno())
+            os.replace(tmp_path, self.path)
+            self._records = count
+    
+    def save(self, job: ExtractionJob) -> None:
+        """Hängt den aktuellen Stand eines Jobs an"""
+        job.updated_at = datetime.utcnow()
+        line = job.model_dump_json() + "\n"
+        with self._file.lock:
+            self._file.append_locked(line.encode("utf-8"))
+            self._records += 1
+    
+    def read_new(self) -> List[ExtractionJob]:
+        """
+        Seit dem letzten Aufruf angehängte Stände (auch anderer Prozesse) in
+        Schreibreihenfolge; der erste Aufruf liefert das ganze Journal.
+        Nach dem Kompaktieren wird die alte Datei zu Ende gelesen und die neue von vorn.
+        """
+        if self._tail is None:
+            self._tail = FileTail(self.path, from_end=False)
+        jobs: List[ExtractionJob] = []
+        for line in self._tail.read_lines():
+            try:
+                jobs.append(ExtractionJob.model_validate_json(line))
+            except Exception:
+                logger.warning("Überspringe defekten Job-Record")
+        return jobs
+    
+    @property
+    def records(self) -> int:
+        return self._records
+    
+    def compact(self, jobs: Iterable[ExtractionJob]) -> None:
+        """Ersetzt das Journal durch den aktuellen Stand aller Jobs"""
+        self._rewrite(jobs)
+    
+    def close(self) -> None:
+        if self._tail is not None:
+            self._tail.close()
+            self._tail = None
+        self._file.close()
\ No newline at end of file
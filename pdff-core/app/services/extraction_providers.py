@@ -0,0 +1,274 @@
+from abc import ABC, abstractmethod
+from datetime import date
+from pathlib import Path
+from pydantic import BaseModel, Field
+from typing import Any, Dict, List, Optional, Sequence
+import asyncio
+import base64
+import hashlib
+import json
+import logging
+import random
+import re
+import urllib.error
+import urllib.request
+from app.models import Document, FieldSource, METADATA_FIELDS
+
+logger = logging.getLogger(__name__)
+
+# Bei Änderungen am Prompt hochzählen (Teil des Cache-Keys von Extraktionsergebnissen)
+PROMPT_VERSION = "1"
+
+FIELD_DESCRIPTIONS = {
+    "document_type": 'Dokumenttyp, kurz und einheitlich (z.B. "Rechnung", "Vertrag", "Kontoauszug", "Mahnung")',
+    "correspondent": "Absender bzw. Organisation, ohne Rechtsform-Zusätze wenn möglich",
+    "topic": "Thema/Betreff in wenigen Worten",
+    "customer_id": "Kunden-, Vertrags- oder Mitgliedsnummer",
+    "document_number": "Rechnungs- oder Dokumentnummer",
+    "document_date": "Dokumentdatum im Format YYYY-MM-DD",
+}
+
+
+def build_prompt(fields: Sequence[str] = METADATA_FIELDS) -> str:
+    """Extraktions-Prompt für die angefragten Felder"""
+    lines = [
+        "Analysiere das angehängte Dokument und extrahiere die folgenden Metadaten.",
+        "Antworte ausschließlich mit einem JSON-Objekt mit genau diesen Schlüsseln (null, wenn nicht erkennbar):",
+    ]
+    lines += [f'- "{field}": {FIELD_DESCRIPTIONS[field]}' for field in fields]
+    return "\n".join(lines)
+
+
+EXTRACTION_PROMPT = build_prompt()
+
+
+class ExtractionError(Exception):
+    """Fehler eines Extraktions-Providers; retryable=True für vorübergehende Fehler"""
+    
+    def __init__(self, message: str, retryable: bool = False, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retryable = retryable
+        self.retry_after = retry_after
+
+
+class ExtractionResult(BaseModel):
+    """Ergebnis einer Extraktion: erkannte Metadaten-Felder, deren Herkunft und Token-Verbrauch"""
+    fields: Dict[str, Any] = Field(default_factory=dict)
+    sources: Dict[str, FieldSource] = Field(default_factory=dict)
+    input_tokens: int = 0
+    output_tokens: int = 0
+    
+    @property
+    def total_tokens(self) -> int:
+        return self.input_tokens + self.output_tokens
+
+
+def normalize_fields(raw: Dict[str, Any]) -> Dict[str, Any]:
+    """Übernimmt nur bekannte Metadaten-Felder mit Inhalt, Datum als date"""
+    fields: Dict[str, Any] = {}
+    for name in METADATA_FIELDS:
+        value = raw.get(name)
+        if value is None:
+            continue
+        if name == "document_date":
+            try:
+                value = date.fromisoformat(str(value)[:10])
+            except ValueError:
+                continue
+        else:
+            value = str(value).strip()
+            if not value or value.lower() in ("null", "none", "unknown"):
+                continue
+        fields[name] = value
+    return fields
+
+
+class ExtractionProvider(ABC):
+    """Schnittstelle für Metadaten-Extraktion (LLM oder lokal)"""
+    
+    name: str = "provider"
+    model: str = ""
+    prompt_version: str = PROMPT_VERSION
+    
+    @abstractmethod
+    async def extract(
+        self,
+        document: Document,
+        pdf_path: Path,
+        fields: Sequence[str] = METADATA_FIELDS,
+        page_text: Optional[List[str]] = None
+    ) -> ExtractionResult:
+        """
+        Extrahiert die angefragten Felder; wirft ExtractionError bei Fehlern.
+        Mit page_text (Text-Layer der ersten Seiten) wird statt der PDF nur dieser Text übergeben.
+        """
+    
+    def estimate_tokens(self, pdf_size: int, page_text: Optional[List[str]] = None) -> int:
+        """Grobe Token-Schätzung vor dem Aufruf (für das Rate-Limit)"""
+        if page_text is not None:
+            return 500 + sum(len(text) for text in page_text) // 3
+        return max(1000, pdf_size // 20)
+    
+    @property
+    def source_detail(self) -> str:
+        return f"{self.name}/{self.model}" if self.model else self.name
+    
+    def _result(self, raw: Dict[str, Any], fields: Sequence[str], input_tokens: int, output_tokens: int) -> ExtractionResult:
+        """Normalisiert die Antwort auf die angefragten Felder und vermerkt die Herkunft"""
+        values = {name: value for name, value in normalize_fields(raw).items() if name in fields}
+        return ExtractionResult(
+            fields=values,
+            sources={name: FieldSource(source="llm", detail=self.source_detail) for name in values},
+            input_tokens=input_tokens,
+            output_tokens=output_tokens
+        )
+
+
+class FakeExtractionProvider(ExtractionProvider):
+    """
+    Lokaler Provider ohne Netzwerk, um Durchsatz und Fehlerbehandlung offline zu testen.
+    Leitet deterministische Metadaten aus dem Dateinamen ab, simuliert Latenz und
+    (mit failure_rate) vorübergehende Fehler.
+    """
+    
+    name = "fake"
+    model = "fake"
+    
+    def __init__(self, latency: float = 0.2, failure_rate: float = 0.0, tokens: int = 1500):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.tokens = tokens
+    
+    async def extract(
+        self,
+        document: Document,
+        pdf_path: Path,
+        fields: Sequence[str] = METADATA_FIELDS,
+        page_text: Optional[List[str]] = None
+    ) -> ExtractionResult:
+        await asyncio.sleep(self.latency)
+        if self.failure_rate and random.random() < self.failure_rate:
+            raise ExtractionError("Simulierter vorübergehender Fehler", retryable=True)
+        
+        stem = Path(document.original_filename).stem
+        digest = hashlib.sha256(stem.encode("utf-8")).hexdigest()
+        words = [word for word in re.split(r"[\W_]+", stem) if word]
+        raw = {
+            "document_type": "Rechnung" if int(digest[0], 16) % 2 else "Schreiben",
+            "correspondent": words[0].capitalize() if words else "Unbekannt",
+            "topic": " ".join(words[1:3]) or None,
+            "document_number": digest[:8].upper(),
+            "document_date": date(2020 + int(digest[1], 16) % 6, 1 + int(digest[2], 16) % 12, 1).isoformat(),
+        }
+        input_tokens = self.estimate_tokens(0, page_text) if page_text is not None else self.tokens
+        return self._result(raw, fields, input_tokens, 20 * len(fields))
+
+
+class AnthropicExtractionProvider(ExtractionProvider):
+    """
+    Claude Messages API (PDF als base64-Dokument oder nur der Text-Layer als Text).
+    Nutzt nur die Standardbibliothek; der HTTP-Aufruf läuft in einem Thread.
+    """
+    
+    name = "anthropic"
+    API_URL = "https://api.anthropic.com/v1/messages"
+    API_VERSION = "2023-06-01"
+    
+    def __init__(self, api_key: str, model: str, max_tokens: int = 1024, timeout: float = 120.0):
+        if not api_key:
+            raise ValueError("API-Key für Anthropic fehlt (PDFF_ANTHROPIC_API_KEY)")
+        self.api_key = api_key
+        self.model = model
+        self.max_tokens = max_tokens
+        self.timeout = timeout
+    
+    def estimate_tokens(self, pdf_size: int, page_text: Optional[List[str]] = None) -> int:
+        if page_text is not None:
+            return super().estimate_tokens(pdf_size, page_text)
+        # PDFs werden als Text + Seitenbilder verarbeitet, großzügig schätzen
+        return max(2000, pdf_size // 10)
+    
+    async def extract(
+        self,
+        document: Document,
+        pdf_path: Path,
+        fields: Sequence[str] = METADATA_FIELDS,
+        page_text: Optional[List[str]] = None
+    ) -> ExtractionResult:
+        return await asyncio.to_thread(self._extract_sync, pdf_path, fields, page_text)
+    
+    def _extract_sync(self, pdf_path: Path, fields: Sequence[str], page_text: Optional[List[str]]) -> ExtractionResult:
+        if page_text is not None:
+            # Nur der Text-Layer der ersten Seiten statt der kompletten PDF
+            pages = "\n\n".join(f"--- Seite {number} ---\n{text}" for number, text in enumerate(page_text, start=1))
+            document_block = {"type": "text", "text": f"<dokument>\n{pages}\n</dokument>"}
+        else:
+            document_block = {
+                "type": "document",
+                "source": {
+                    "type": "base64",
+                    "media_type": "application/pdf",
+                    "data": base64.b64encode(pdf_path.read_bytes()).decode("ascii"),
+                },
+            }
+        body = {
+            "model": self.model,
+            "max_tokens": self.max_tokens,
+            "messages": [{
+                "role": "user",
+                "content": [document_block, {"type": "text", "text": build_prompt(fields)}],
+            }],
+        }
+        request = urllib.request.Request(
+            self.API_URL,
+            data=json.dumps(body).encode("utf-8"),
+            headers={
+                "x-api-key": self.api_key,
+                "anthropic-version": self.API_VERSION,
+                "content-type": "application/json",
+            },
+            method="POST"
+        )
+        
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                payload = json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            retry_after = e.headers.get("retry-after") if e.headers else None
+            detail = e.read().decode("utf-8", errors="replace")[:500]
+            raise ExtractionError(
+                f"HTTP {e.code}: {detail}",
+                retryable=e.code in (408, 409, 429) or e.code >= 500,
+                retry_after=float(retry_after) if retry_after and retry_after.isdigit() else None
+            )
+        except (urllib.error.URLError, TimeoutError, ConnectionError) as e:
+            raise ExtractionError(f"Verbindungsfehler: {e}", retryable=True)
+        
+        text = "".join(block.get("text", "") for block in payload.get("content", []) if block.get("type") == "text")
+        match = re.search(r"\{.*\}", text, re.DOTALL)
+        if not match:
+            raise ExtractionError("Antwort enthält kein JSON-Objekt")
+        try:
+            raw = json.loads(match.group(0))
+        except ValueError as e:
+            raise ExtractionError(f"Antwort ist kein gültiges JSON: {e}")
+        
+        usage = payload.get("usage", {})
+        return self._result(raw, fields, usage.get("input_tokens", 0), usage.get("output_tokens", 0))
+
+
+def create_extraction_provider(
+    name: str,
+    model: str = "",
+    api_key: str = "",
+    fake_latency: float = 0.2,
+    fake_failure_rate: float = 0.0
+) -> Optional[ExtractionProvider]:
+    """Erzeugt den konfigurierten Provider ('none', 'fake' oder 'anthropic')"""
+    if name == "none":
+        return None
+    if name == "fake":
+        return FakeExtractionProvider(latency=fake_latency, failure_rate=fake_failure_rate)
+    if name == "anthropic":
+        return AnthropicExtractionProvider(api_key=api_key, model=model)
+    raise ValueError(f"Unbekannter Extraktions-Provider: {name}")
\ No newline at end of file
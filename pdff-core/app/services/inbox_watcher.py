@@ -0,0 +1,276 @@
+from pydantic import BaseModel
+from collections import deque
+from pathlib import Path
+from typing import Awaitable, Deque, Dict, List, Optional, Set, Tuple
+import asyncio
+import ctypes
+import ctypes.util
+import logging
+import os
+import struct
+import sys
+import time
+from app.models import DocumentCollection
+from app.services.local_storage_service import LocalStorageService
+
+logger = logging.getLogger(__name__)
+
+# inotify-Konstanten (linux/inotify.h)
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+class _Inotify:
+    """Minimaler inotify-Wrapper über ctypes (nur Linux, ohne Zusatzabhängigkeit)"""
+    
+    def __init__(self, directory: Path):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 fehlgeschlagen")
+        mask = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_MODIFY
+        if libc.inotify_add_watch(self.fd, os.fsencode(directory), mask) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, f"inotify_add_watch für {directory} fehlgeschlagen")
+    
+    def read_events(self) -> Tuple[List[str], bool]:
+        """Liest anstehende Events: (Dateinamen, Queue-Überlauf)"""
+        names: List[str] = []
+        overflow = False
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return names, overflow
+        
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            _wd, mask, _cookie, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b"\0")
+            offset += length
+            if mask & IN_Q_OVERFLOW:
+                overflow = True
+            elif name:
+                names.append(os.fsdecode(name))
+        return names, overflow
+    
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+class IngestStats(BaseModel):
+    """Kennzahlen von Inbox-Watcher und Ingest-Queue"""
+    mode: str
+    running: bool
+    queue_depth: int
+    queue_capacity: int
+    queue_full: bool
+    in_flight: int
+    debouncing: int
+    ingested_total: int
+    failed_total: int
+    throughput_per_minute: int
+
+
+class InboxWatcher:
+    """
+    Überwacht das Eingangsverzeichnis kontinuierlich (inotify, sonst Polling)
+    und ingestiert neue PDFs über eine begrenzte Queue mit fester Parallelität.
+    Dateien werden erst eingereiht, wenn Größe und mtime für debounce_seconds
+    stabil sind (Scanner/Kopien, die noch schreiben). Ist die Queue voll,
+    blockiert das Einreihen (Backpressure) statt Dateien zu verlieren.
+    """
+    
+    def __init__(
+        self,
+        storage: LocalStorageService,
+        collection: DocumentCollection,
+        mode: str = "auto",
+        poll_interval: float = 2.0,
+        debounce_seconds: float = 2.0,
+        queue_size: int = 100,
+        concurrency: int = 2
+    ):
+        self.storage = storage
+        self.collection = collection
+        self.requested_mode = mode
+        self.mode = "stopped"
+        self.poll_interval = poll_interval
+        self.debounce_seconds = debounce_seconds
+        self.concurrency = max(1, concurrency)
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, queue_size))
+        
+        # Pfad -> (Größe, mtime_ns, Zeitpunkt der letzten Änderung)
+        self._candidates: Dict[Path, Tuple[int, int, float]] = {}
+        # Eingereihte oder in Arbeit befindliche Pfade
+        self._queued: Set[Path] = set()
+        # Fehlgeschlagene Dateien mit (Größe, mtime_ns) - erst nach Änderung erneut versuchen
+        self._failed: Dict[Path, Tuple[int, int]] = {}
+        self._completed: Deque[float] = deque()
+        self._in_flight = 0
+        self._ingested_total = 0
+        self._failed_total = 0
+        self._inotify: Optional[_Inotify] = None
+        self._tasks: List[asyncio.Task] = []
+    
+    async def start(self, wait_for: Optional[Awaitable] = None) -> None:
+        """Startet Watcher und Ingest-Worker (optional erst nach Abschluss von wait_for)"""
+        if wait_for is not None:
+            await wait_for
+        
+        self.storage.data_in.mkdir(parents=True, exist_ok=True)
+        self.mode = self._select_mode()
+        loop = asyncio.get_running_loop()
+        
+        if self._inotify is not None:
+            loop.add_reader(self._inotify.fd, self._on_inotify_readable)
+        
+        self._scan()
+        self._tasks = [asyncio.create_task(self._debounce_loop())]
+        self._tasks += [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+        logger.info(
+            f"Inbox-Watcher gestartet ({self.mode}) für {self.storage.data_in}, "
+            f"Queue {self.queue.maxsize}, Parallelität {self.concurrency}"
+        )
+    
+    def _select_mode(self) -> str:
+        if self.requested_mode in ("auto", "inotify") and sys.platform.startswith("linux"):
+            try:
+                self._inotify = _Inotify(self.storage.data_in)
+                return "inotify"
+            except (OSError, AttributeError) as e:
+                if self.requested_mode == "inotify":
+                    raise
+                logger.warning(f"inotify nicht verfügbar ({e}), verwende Polling")
+        return "poll"
+    
+    async def stop(self) -> None:
+        """Stoppt Watcher und Worker; laufende Ingests werden abgeschlossen"""
+        if self._inotify is not None:
+            asyncio.get_running_loop().remove_reader(self._inotify.fd)
+            self._inotify.close()
+            self._inotify = None
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self.mode = "stopped"
+        logger.info("Inbox-Watcher gestoppt")
+    
+    def _on_inotify_readable(self) -> None:
+        names, overflow = self._inotify.read_events()
+        if overflow:
+            logger.warning("inotify-Queue übergelaufen, scanne Eingangsverzeichnis neu")
+            self._scan()
+            return
+        for name in names:
+            self._observe(self.storage.data_in / name)
+    
+    def _scan(self) -> None:
+        """Erfasst alle PDFs im Eingangsverzeichnis als Kandidaten, vergisst Fehlschläge gelöschter Dateien"""
+        seen: Set[Path] = set()
+        for pdf_path in self.storage.data_in.glob("*.pdf"):
+            seen.add(pdf_path)
+            self._observe(pdf_path)
+        for path in [path for path in self._failed if path not in seen]:
+            del self._failed[path]
+    
+    def _prune_failed(self) -> None:
+        """Vergisst Fehlschläge von Dateien, die nicht mehr existieren (inotify meldet kein Löschen)"""
+        for path in [path for path in self._failed if not path.exists()]:
+            del self._failed[path]
+    
+    def _observe(self, path: Path) -> None:
+        """Registriert eine (geänderte) Datei für das Debouncing"""
+        if path.suffix != ".pdf" or path in self._queued:
+            return
+        try:
+            stat_result = path.stat()
+        except FileNotFoundError:
+            self._candidates.pop(path, None)
+            self._failed.pop(path, None)
+            return
+        
+        signature = (stat_result.st_size, stat_result.st_mtime_ns)
+        if self._failed.get(path) == signature:
+            return
+        previous = self._candidates.get(path)
+        if previous is None or previous[:2] != signature:
+            self._candidates[path] = (*signature, time.monotonic())
+    
+    async def _debounce_loop(self) -> None:
+        """Reiht stabile Kandidaten ein; im Polling-Modus wird zusätzlich periodisch gescannt"""
+        interval = min(self.poll_interval, max(self.debounce_seconds / 2, 0.1))
+        last_scan = time.monotonic()
+        
+        while True:
+            await asyncio.sleep(interval)
+            now = time.monotonic()
+            
+            if now - last_scan >= self.poll_interval:
+                if self.mode == "poll":
+                    self._scan()
+                else:
+                    self._prune_failed()
+                last_scan = now
+            
+            for path in list(self._candidates):
+                # Erneut prüfen: hat sich die Datei seit der letzten Beobachtung verändert?
+                self._observe(path)
+                candidate = self._candidates.get(path)
+                if candidate is None or now - candidate[2] < self.debounce_seconds:
+                    continue
+                del self._candidates[path]
+                self._queued.add(path)
+                # Blockiert bei voller Queue (Backpressure)
+                await self.queue.put(path)
+    
+    async def _worker(self) -> None:
+        while True:
+            path = await self.queue.get()
+            self._in_flight += 1
+            try:
+                await asyncio.to_thread(self.storage.ingest_file, self.collection, path)
+                self._ingested_total += 1
+                self._completed.append(time.monotonic())
+                self._failed.pop(path, None)
+            except FileNotFoundError:
+                logger.debug(f"{path.name} verschwunden, bevor es ingestiert wurde")
+            except Exception as e:
+                self._failed_total += 1
+                try:
+                    stat_result = path.stat()
+                    self._failed[path] = (stat_result.st_size, stat_result.st_mtime_ns)
+                except OSError:
+                    pass
+                logger.error(f"Ingest von {path.name} fehlgeschlagen: {e}")
+            finally:
+                self._in_flight -= 1
+                self._queued.discard(path)
+                self.queue.task_done()
+    
+    def stats(self) -> IngestStats:
+        """Aktuelle Kennzahlen (Durchsatz über die letzten 60 Sekunden)"""
+        horizon = time.monotonic() - 60
+        while self._completed and self._completed[0] < horizon:
+            self._completed.popleft()
+        
+        return IngestStats(
+            mode=self.mode,
+            running=bool(self._tasks),
+            queue_depth=self.queue.qsize(),
+            queue_capacity=self.queue.maxsize,
+            queue_full=self.queue.full(),
+            in_flight=self._in_flight,
+            debouncing=len(self._candidates),
+            ingested_total=self._ingested_total,
+            failed_total=self._failed_total,
+            throughput_per_minute=len(self._completed)
+        )
\ No newline at end of file
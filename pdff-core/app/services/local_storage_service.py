@@ -1,14 +1,64 @@
 from pathlib import Path
 import shutil
-from typing import List
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, ContextManager, Dict, List, NamedTuple, Optional, Union
+from uuid import UUID, uuid4
 import logging
 import base64
-from app.models import Document
+import hashlib
+import os
+import threading
+import time
+from app.models import Document, METADATA_FIELDS
 from app.models import DocumentCollection
+from app.services.archive_layout import ArchiveLayout
+from app.services.metadata_store import MetadataStore, JsonFileMetadataStore
+from app.services.output_name_index import OutputNameIndex
+from app.utils.file_ops import MATERIALIZATION_MODES, materialize_file
+from app.utils.iterables import batched
+from app.utils.metrics import REGISTRY
 
 logger = logging.getLogger(__name__)
 
 
+DUPLICATE_POLICIES = ("skip", "link", "keep")
+
+# Teilschritte einzeln messen (z.B. save_output = materialize + update_metadata)
+STORAGE_SECONDS = REGISTRY.histogram(
+    "pdff_storage_operation_seconds",
+    "Dauer von Operationen des LocalStorageService",
+    ("operation",)
+)
+STORAGE_BYTES = REGISTRY.counter(
+    "pdff_storage_bytes_total",
+    "Vom LocalStorageService gelesene bzw. kopierte Bytes (Hardlinks und Reflinks zählen nicht)",
+    ("operation",)
+)
+OUTPUT_MATERIALIZATIONS = REGISTRY.counter(
+    "pdff_output_materializations_total",
+    "Nach data_out gespeicherte PDFs je Materialisierungsstrategie",
+    ("method",)
+)
+INGESTED_DOCUMENTS = REGISTRY.counter(
+    "pdff_ingested_documents_total",
+    "Ingestierte PDFs (Inbox und Upload); skipped: Duplikat verworfen",
+    ("result",)
+)
+
+
+class IngestResult(NamedTuple):
+    """Ergebnis einer Ingestion"""
+    document: Document
+    created: bool  # False wenn ein Duplikat übersprungen wurde
+    duplicate_of: Optional[UUID] = None
+
+
+def sha256_file(path: Path) -> str:
+    """SHA-256 einer Datei, sequentiell in Blöcken gelesen"""
+    with open(path, "rb") as file:
+        return hashlib.file_digest(file, "sha256").hexdigest()
+
+
 class LocalStorageService:
     """Service für lokale Dateisystem-basierte Dokumenten-Verarbeitung"""
     
@@ -16,69 +66,279 @@ class LocalStorageService:
         self,
         data_in: Path = Path("/data/in"), 
         data_archive: Path = Path("/data/archive"),
-        data_out: Path = Path("/data/out")
+        data_out: Path = Path("/data/out"),
+        metadata_store: Optional[MetadataStore] = None,
+        duplicate_policy: str = "keep",
+        output_materialization: str = "auto",
+        ingest_lock: Optional[ContextManager] = None,
+        archive_layout: Optional[ArchiveLayout] = None
     ):
+        if duplicate_policy not in DUPLICATE_POLICIES:
+            raise ValueError(f"Unbekannte Duplikat-Policy: {duplicate_policy}")
+        if output_materialization not in MATERIALIZATION_MODES:
+            raise ValueError(f"Unbekannter Materialisierungsmodus: {output_materialization}")
         self.data_in = data_in
         self.data_archive = data_archive
         self.data_out = data_out
         self.data_archive.mkdir(parents=True, exist_ok=True)
         self.data_out.mkdir(parents=True, exist_ok=True)
+        # Ablage der Archiv-Dateien (flach oder in Präfix-Verzeichnissen), alle Pfade über archive_path()
+        self.archive_layout = archive_layout or ArchiveLayout()
+        # Metadaten-Backend, Standard: ein {id}.json pro Document im Archive
+        self.metadata_store = metadata_store or JsonFileMetadataStore(self.data_archive, layout=self.archive_layout)
+        self.duplicate_policy = duplicate_policy
+        self.output_materialization = output_materialization
+        self.output_names = OutputNameIndex(self.data_out)
+        self._output_lock = threading.Lock()
+        # Serialisiert Duplikat-Prüfung und Registrierung; mit mehreren Worker-Prozessen prozessübergreifend
+        self._ingest_lock = ingest_lock or threading.Lock()
+        # Werden nach jeder erfolgreichen Ingestion mit dem neuen Document aufgerufen (aus Worker-Threads)
+        self.ingest_listeners: List[Callable[[Document], None]] = []
     
-    def ingest_documents(self, collection: DocumentCollection) -> DocumentCollection:
+    def ingest_documents(
+        self,
+        collection: DocumentCollection,
+        progress: Optional[Callable[[int], None]] = None
+    ) -> DocumentCollection:
         """
         Liest alle PDFs aus /data/in, erstellt Document-Objekte,
         verschiebt PDFs nach /data/archive, speichert Metadaten
-        und befüllt die übergebene Collection
+        und befüllt die übergebene Collection.
+        progress wird nach jedem Dokument mit der Anzahl bisher ingesteter Dokumente aufgerufen.
         """
         pdf_files = list(self.data_in.glob("*.pdf"))
         
-        for pdf_path in pdf_files:
-            doc = Document(original_filename=pdf_path.name)
+        for count, pdf_path in enumerate(pdf_files, start=1):
+            self.ingest_file(collection, pdf_path)
+            if progress:
+                progress(count)
+        
+        if pdf_files:
+            logger.info(f"{len(pdf_files)} Dokumente aus {self.data_in} ingested")
+        return collection
+    
+    def ingest_file(self, collection: DocumentCollection, pdf_path: Path) -> IngestResult:
+        """
+        Ingestiert eine einzelne PDF aus dem Eingangsverzeichnis:
+        verschiebt sie nach /data/archive, berechnet den Content-Hash,
+        speichert Metadaten und fügt sie der Collection hinzu
+        """
+        # Erst ins Archive-Verzeichnis stagen (ggf. Kopie über Dateisystemgrenzen),
+        # dann hashen und unter Lock registrieren
+        staged_path = self.create_upload_path()
+        with STORAGE_SECONDS.labels("ingest_move").time():
+            try:
+                shutil.move(str(pdf_path), str(staged_path))
+            except BaseException:
+                # Abgebrochene Kopie über Dateisystemgrenzen: Original liegt noch im Eingang
+                if pdf_path.exists():
+                    staged_path.unlink(missing_ok=True)
+                raise
+        
+        try:
+            with STORAGE_SECONDS.labels("ingest_hash").time():
+                content_hash = sha256_file(staged_path)
+            STORAGE_BYTES.labels("ingest_hash").inc(staged_path.stat().st_size)
+            return self._register_staged(collection, staged_path, pdf_path.name, content_hash)
+        except BaseException:
+            # Die gestagte Datei ist die einzige Kopie - zurück in den Eingang statt löschen
+            self._restore_staged(staged_path, pdf_path)
+            raise
+    
+    def _restore_staged(self, staged_path: Path, pdf_path: Path) -> None:
+        """
+        Legt eine nach einem Fehler noch gestagte PDF wieder ins Eingangsverzeichnis
+        (Name belegt: mit Suffix daneben). Größe und mtime bleiben erhalten,
+        der InboxWatcher versucht sie daher erst nach einer Änderung erneut.
+        """
+        if not staged_path.exists():
+            return
+        target = pdf_path
+        if target.exists():
+            target = pdf_path.with_name(f"{pdf_path.stem}-{uuid4().hex[:8]}{pdf_path.suffix}")
+        try:
+            shutil.move(str(staged_path), str(target))
+            logger.warning(f"{pdf_path.name} nach fehlgeschlagener Ingestion zurück nach {target} gelegt")
+        except OSError as e:
+            logger.error(f"{pdf_path.name} konnte nicht zurückgelegt werden, liegt weiter unter {staged_path}: {e}")
+    
+    def archive_path(self, document_id: UUID, suffix: str = ".pdf", existing: bool = True) -> Path:
+        """
+        Pfad einer Datei des Documents im Archive gemäß archive_layout.
+        existing=True sucht eine bestehende Datei (auch noch nicht migrierte flache Pfade),
+        existing=False liefert das Ziel für eine neue Datei und legt ihr Verzeichnis an.
+        """
+        if existing:
+            return self.archive_layout.resolve(self.data_archive, document_id, suffix)
+        path = self.archive_layout.path(self.data_archive, document_id, suffix)
+        self.archive_layout.ensure_parent(path)
+        return path
+    
+    def create_upload_path(self) -> Path:
+        """
+        Temporärer Pfad für einen laufenden Upload. Liegt im Archive-Verzeichnis,
+        damit die Übernahme per atomarem rename (gleiches Dateisystem) erfolgen kann.
+        """
+        return self.data_archive / f".upload-{uuid4().hex}.part"
+    
+    def ingest_upload(
+        self,
+        collection: DocumentCollection,
+        upload_path: Path,
+        original_filename: str,
+        content_hash: str
+    ) -> IngestResult:
+        """
+        Übernimmt eine vollständig hochgeladene PDF atomar ins Archive,
+        speichert Metadaten und fügt sie der Collection hinzu
+        """
+        result = self._register_staged(collection, upload_path, original_filename, content_hash)
+        logger.info(f"Document {result.document.id} ({original_filename}) hochgeladen")
+        return result
+    
+    def _register_staged(
+        self,
+        collection: DocumentCollection,
+        staged_path: Path,
+        original_filename: str,
+        content_hash: str
+    ) -> IngestResult:
+        """
+        Registriert eine ins Archive gestagte PDF unter Berücksichtigung der Duplikat-Policy:
+        - skip: Duplikat verwerfen, bestehendes Document zurückgeben
+        - link: neues Document mit duplicate_of und übernommenen Metadaten
+        - keep: neues, eigenständiges Document
+        Inhaltsgleiche PDFs teilen sich per Hardlink einen Blob im Archive.
+        """
+        with self._ingest_lock, STORAGE_SECONDS.labels("ingest_register").time():
+            existing = collection.find_by_hash(content_hash)
+            
+            if existing and self.duplicate_policy == "skip":
+                staged_path.unlink(missing_ok=True)
+                INGESTED_DOCUMENTS.labels("skipped").inc()
+                logger.info(f"Duplikat von Document {existing.id} übersprungen: {original_filename}")
+                return IngestResult(document=existing, created=False, duplicate_of=existing.id)
+            
+            doc = Document(original_filename=original_filename, content_hash=content_hash)
+            archive_pdf = self.archive_path(doc.id, existing=False)
             
-            # PDF nach /data/archive verschieben
-            archive_pdf = self.data_archive / f"{doc.id}.pdf"
-            shutil.move(str(pdf_path), str(archive_pdf))
+            linked = existing is not None and self._link_blob(existing, archive_pdf)
+            if not linked:
+                os.replace(staged_path, archive_pdf)
             
-            # Document-Objekt als JSON speichern
-            metadata_file = self.data_archive / f"{doc.id}.json"
-            metadata_file.write_text(doc.model_dump_json(indent=2))
+            if existing and self.duplicate_policy == "link":
+                doc.duplicate_of = existing.id
+                for field in METADATA_FIELDS:
+                    setattr(doc, field, getattr(existing, field))
             
-            # Zur Collection hinzufügen
+            # Neue Documents sofort dauerhaft schreiben, sonst verwaiste PDFs nach einem Absturz
+            try:
+                self.metadata_store.put_durable(doc)
+            except BaseException:
+                # Blob zurücknehmen: eine PDF ohne Metadaten würde nie geladen
+                if linked:
+                    archive_pdf.unlink(missing_ok=True)
+                else:
+                    os.replace(archive_pdf, staged_path)
+                raise
+            if linked:
+                staged_path.unlink(missing_ok=True)
             collection.add(doc)
-            logger.info(f"Document {doc.id} ({doc.original_filename}) ingested")
+        INGESTED_DOCUMENTS.labels("created").inc()
         
-        return collection
+        if existing:
+            logger.info(f"Document {doc.id} ({original_filename}) ist inhaltsgleich mit {existing.id}")
+        logger.debug(f"Document {doc.id} ({doc.original_filename}) ingested")
+        
+        for listener in self.ingest_listeners:
+            try:
+                listener(doc)
+            except Exception as e:
+                logger.error(f"Ingest-Listener für Document {doc.id} fehlgeschlagen: {e}")
+        return IngestResult(document=doc, created=True, duplicate_of=existing.id if existing else None)
     
-    def load_documents(self, collection: DocumentCollection) -> DocumentCollection:
+    def _link_blob(self, existing: Document, target_path: Path) -> bool:
+        """Legt target_path als Hardlink auf die PDF eines bestehenden Documents an"""
+        try:
+            os.link(self.archive_path(existing.id), target_path)
+            return True
+        except OSError as e:
+            logger.debug(f"Hardlink auf {existing.id}.pdf nicht möglich: {e}")
+            return False
+    
+    def backfill_content_hashes(
+        self,
+        collection: DocumentCollection,
+        stop: Optional[threading.Event] = None
+    ) -> int:
         """
-        Liest alle serialisierten Document-Objekte aus /data/archive
-        und befüllt die übergebene Collection
+        Berechnet fehlende Content-Hashes für Bestandsdokumente (vor Einführung
+        der Deduplizierung archiviert) und speichert sie in den Metadaten
         """
-        json_files = list(self.data_archive.glob("*.json"))
-        
-        for json_path in json_files:
-            try:
-                json_data = json_path.read_text()
-                doc = Document.model_validate_json(json_data)
-                collection.add(doc)
-                logger.info(f"Document {doc.id} geladen")
-            except ValueError as e:
-                # Doppelte UUID - überspringen
-                logger.warning(f"Überspringe {json_path.name}: {e}")
+        count = 0
+        for row in collection.rows():
+            if stop is not None and stop.is_set():
+                break
+            if row.content_hash:
                 continue
-            except Exception as e:
-                # Fehlerhafte Dateien überspringen
-                logger.error(f"Fehler beim Laden von {json_path.name}: {e}")
+            doc = collection.get(row.id)
+            if doc is None or doc.content_hash:
+                continue
+            try:
+                content_hash = sha256_file(self.archive_path(doc.id))
+            except FileNotFoundError:
                 continue
+            collection.update(doc, {"content_hash": content_hash})
+            self.metadata_store.put(doc)
+            count += 1
+        
+        if count:
+            logger.info(f"Content-Hash für {count} Bestandsdokumente nachgetragen")
+        return count
+    
+    def load_documents(
+        self,
+        collection: DocumentCollection,
+        progress: Optional[Callable[[int], None]] = None,
+        stop: Optional[threading.Event] = None,
+        batch_size: int = 1000
+    ) -> DocumentCollection:
+        """
+        Liest alle serialisierten Document-Objekte aus dem Metadaten-Backend
+        und befüllt die übergebene Collection batchweise (Navigations-Indizes
+        werden dabei erst beim ersten Zugriff aufgebaut).
+        progress wird nach jedem Batch mit der Anzahl bisher gelesener Documents aufgerufen,
+        ein gesetztes stop-Event bricht das Laden nach dem aktuellen Batch ab.
+        """
+        loaded = 0
+        started = time.perf_counter()
         
+        for batch in batched(self.metadata_store.load_all(), batch_size):
+            # Doppelte UUIDs überspringen
+            for doc in collection.add_many(batch):
+                logger.warning(f"Überspringe Document {doc.id}: bereits in der Collection")
+            
+            loaded += len(batch)
+            if progress:
+                progress(loaded)
+            if stop is not None and stop.is_set():
+                logger.warning(f"Laden nach {loaded} Documents abgebrochen")
+                break
+        
+        STORAGE_SECONDS.labels("load_documents").observe(time.perf_counter() - started)
+        logger.info(f"{loaded} Documents aus dem Metadaten-Backend gelesen")
         return collection
     
+    def close(self) -> None:
+        """Schließt das Metadaten-Backend und schreibt ausstehende Änderungen (beim Shutdown aufrufen)"""
+        self.metadata_store.close()
+    
     def update_metadata(self, document: Document) -> None:
         """
         Speichert aktualisierte Metadaten eines Documents im Archive
         """
-        metadata_file = self.data_archive / f"{document.id}.json"
-        metadata_file.write_text(document.model_dump_json(indent=2))
+        with STORAGE_SECONDS.labels("update_metadata").time():
+            self.metadata_store.put(document)
         logger.info(f"Metadaten aktualisiert für Document {document.id}")
     
     def save_to_output(self, document: Document) -> Path:
@@ -86,58 +346,147 @@ class LocalStorageService:
         Speichert PDF mit generiertem Dateinamen nach /data/out.
         Falls bereits gespeichert, wird alte Datei gelöscht.
         Bei Namenskonflikten wird durchnummeriert: datei(1).pdf, datei(2).pdf, etc.
+        Die Datei wird je nach output_materialization als Hardlink, Reflink oder Kopie angelegt.
+        """
+        with STORAGE_SECONDS.labels("save_output").time():
+            target_path = self.write_output(
+                document.id,
+                document.generate_filename(),
+                document.current_filename if document.is_saved else None
+            )
+            # In saved_as History eintragen
+            document.add_saved_filename(target_path.name)
+            self.update_metadata(document)
+        return target_path
+    
+    def write_output(self, document_id: UUID, target_filename: str, previous_filename: Optional[str] = None) -> Path:
+        """
+        Nur der Datei-Teil von save_to_output: löscht previous_filename in /data/out
+        und legt die Archiv-PDF unter target_filename (bei Konflikt durchnummeriert) an.
+        saved_as und Metadaten bleiben unverändert - die API trägt sie auf dem Event-Loop nach.
         """
         # Alte Datei löschen, falls vorhanden
-        if document.is_saved:
-            old_filename = document.current_filename
-            old_path = self.data_out / old_filename
-            if old_path.exists():
-                old_path.unlink()
-                logger.info(f"Alte Datei gelöscht: {old_filename}")
+        if previous_filename:
+            try:
+                (self.data_out / previous_filename).unlink()
+                logger.info(f"Alte Datei gelöscht: {previous_filename}")
+            except FileNotFoundError:
+                pass
+            self.output_names.release(previous_filename)
         
         # Quell-PDF im Archive
-        source_pdf = self.data_archive / f"{document.id}.pdf"
+        source_pdf = self.archive_path(document_id)
         
-        if not source_pdf.exists():
+        try:
+            size = source_pdf.stat().st_size
+        except FileNotFoundError:
             raise FileNotFoundError(f"PDF nicht gefunden: {source_pdf}")
         
-        # Ziel-Dateiname generieren
-        target_filename = document.generate_filename()
-        target_path = self.data_out / target_filename
-        
-        # Bei Konflikt durchnummerieren
-        if target_path.exists():
-            stem = target_path.stem  # Dateiname ohne Extension
-            suffix = target_path.suffix  # .pdf
-            counter = 1
-            
-            while target_path.exists():
-                target_path = self.data_out / f"{stem}({counter}){suffix}"
-                counter += 1
-            
-            logger.warning(f"Dateiname-Konflikt: Umbenannt zu {target_path.name}")
+        # Ziel-Dateiname im Namensindex reservieren
+        with self._output_lock:
+            reserved = self.output_names.reserve(target_filename)
+            # Extern (oder von einem anderen Worker-Prozess) angelegte Dateien kennt der Index nicht -
+            # Namen exklusiv per leerem Platzhalter belegen, materialize_file ersetzt ihn atomar
+            while not self._claim_output(reserved):
+                reserved = self.output_names.reserve(target_filename)
+        target_path = self.data_out / reserved
         
-        # PDF kopieren
-        shutil.copy2(str(source_pdf), str(target_path))
+        if reserved != target_filename:
+            logger.warning(f"Dateiname-Konflikt: Umbenannt zu {reserved}")
         
-        # In saved_as History eintragen
-        document.add_saved_filename(target_path.name)
-        self.update_metadata(document)
+        # PDF materialisieren (Reservierung bei Fehler wieder freigeben)
+        try:
+            with STORAGE_SECONDS.labels("materialize").time():
+                method = materialize_file(source_pdf, target_path, self.output_materialization)
+        except Exception:
+            target_path.unlink(missing_ok=True)
+            self.output_names.release(reserved)
+            raise
+        OUTPUT_MATERIALIZATIONS.labels(method).inc()
+        if method in ("copy", "copy_file_range"):
+            STORAGE_BYTES.labels("materialize").inc(size)
         
-        logger.info(f"Document {document.id} gespeichert nach {target_path}")
+        logger.info(f"Document {document_id} gespeichert nach {target_path} ({method})")
         return target_path
     
+    def _claim_output(self, filename: str) -> bool:
+        try:
+            os.close(os.open(self.data_out / filename, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644))
+            return True
+        except FileExistsError:
+            return False
+    
+    def update_metadata_many(
+        self,
+        documents: List[Document],
+        max_workers: int = 8
+    ) -> Dict[UUID, Optional[Exception]]:
+        """
+        Speichert Metadaten mehrerer Documents mit begrenzter Parallelität.
+        Gibt je Document-ID None (Erfolg) oder die aufgetretene Exception zurück.
+        """
+        return self._run_many(self.update_metadata, documents, max_workers)
+    
+    def save_many_to_output(
+        self,
+        documents: List[Document],
+        max_workers: int = 8
+    ) -> Dict[UUID, Union[Path, Exception]]:
+        """
+        Speichert mehrere Documents nach /data/out mit begrenzter Parallelität.
+        Gibt je Document-ID den Zielpfad oder die aufgetretene Exception zurück.
+        """
+        return self._run_many(self.save_to_output, documents, max_workers)
+    
+    def _run_many(
+        self,
+        operation: Callable[[Document], Any],
+        documents: List[Document],
+        max_workers: int
+    ) -> Dict[UUID, Any]:
+        """Führt eine Operation je Document im Thread-Pool aus, Fehler werden pro Element gesammelt"""
+        results: Dict[UUID, Any] = {}
+        if not documents:
+            return results
+        
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(documents)))) as executor:
+            futures = {executor.submit(operation, doc): doc.id for doc in documents}
+            for future in as_completed(futures):
+                document_id = futures[future]
+                try:
+                    results[document_id] = future.result()
+                except Exception as e:
+                    logger.error(f"Bulk-Operation fehlgeschlagen für Document {document_id}: {e}")
+                    results[document_id] = e
+        
+        return results
+    
+    def get_pdf_path(self, document: Document) -> Path:
+        """
+        Gibt den Pfad der archivierten PDF zurück.
+        Für Web-Auslieferung als Datei-Stream (Range, sendfile) gedacht.
+        """
+        pdf_path = self.archive_path(document.id)
+        
+        if not pdf_path.is_file():
+            raise FileNotFoundError(f"PDF nicht gefunden: {pdf_path}")
+        
+        return pdf_path
+    
     def load_pdf_as_base64(self, document: Document) -> str:
         """
         Lädt PDF aus Archive als Base64-String.
-        Geeignet für Anthropic Claude API und Web-Download.
+        Nur für den LLM-Aufruf (Anthropic Claude API) gedacht -
+        für die Web-Auslieferung get_pdf_path() verwenden.
         """
-        pdf_path = self.data_archive / f"{document.id}.pdf"
+        pdf_path = self.archive_path(document.id)
         
         if not pdf_path.exists():
             raise FileNotFoundError(f"PDF nicht gefunden: {pdf_path}")
         
-        pdf_bytes = pdf_path.read_bytes()
+        with STORAGE_SECONDS.labels("read_pdf").time():
+            pdf_bytes = pdf_path.read_bytes()
+        STORAGE_BYTES.labels("read_pdf").inc(len(pdf_bytes))
         base64_string = base64.b64encode(pdf_bytes).decode('utf-8')
         
         logger.debug(f"PDF {document.id} als Base64 geladen ({len(pdf_bytes)} bytes)")
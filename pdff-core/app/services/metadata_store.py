@@ -0,0 +1,524 @@
+from abc import ABC, abstractmethod
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Set
+from uuid import UUID
+import json
+import logging
+import os
+import threading
+import time
+from app.models import Document
+from app.services.archive_layout import SHARD_WIDTH, ArchiveLayout, parse_document_id
+from app.utils.iterables import batched
+from app.utils.metrics import REGISTRY
+from app.utils.shared_files import FileLock
+
+logger = logging.getLogger(__name__)
+
+# Eigentliches Schreiben der Metadaten (put() des Write-Behind-Stores reiht nur ein)
+METADATA_WRITE_SECONDS = REGISTRY.histogram(
+    "pdff_metadata_write_seconds",
+    "Dauer der Schreibvorgänge ins Metadaten-Backend (flush: Batch inkl. fsync)",
+    ("operation",)
+)
+
+
+class MetadataStore(ABC):
+    """Persistenz-Backend für Document-Metadaten"""
+    
+    @abstractmethod
+    def load_all(self) -> Iterator[Document]:
+        """Liefert alle gespeicherten Documents (fehlerhafte Einträge werden übersprungen)"""
+    
+    @abstractmethod
+    def put(self, document: Document) -> None:
+        """Speichert den aktuellen Stand eines Documents"""
+    
+    def put_many(self, documents: Iterable[Document]) -> None:
+        """Speichert mehrere Documents"""
+        for document in documents:
+            self.put(document)
+    
+    def put_durable(self, document: Document) -> None:
+        """Speichert sofort und dauerhaft (z.B. neu ingestierte Documents)"""
+        self.put(document)
+        self.sync()
+    
+    @abstractmethod
+    def delete(self, document_id: UUID) -> None:
+        """Entfernt die Metadaten eines Documents"""
+    
+    def sync(self) -> None:
+        """Schreibt bisherige Änderungen dauerhaft auf die Platte (fsync, falls aktiviert)"""
+    
+    def close(self) -> None:
+        """Gibt Ressourcen frei"""
+
+
+class JsonFileMetadataStore(MetadataStore):
+    """
+    Klassisches Layout: ein {id}.json pro Document im Archive, mit einem
+    ShardedLayout in Präfix-Verzeichnissen (flache Dateien werden weiter gelesen).
+    Dateien werden über temp-Datei + rename atomar ersetzt, ein Absturz
+    hinterlässt also nie abgeschnittenes JSON. Mit fsync=True werden die
+    Dateiinhalte vor dem rename und das Verzeichnis in sync() synchronisiert.
+    """
+    
+    def __init__(
+        self,
+        directory: Path,
+        max_workers: int = 1,
+        batch_size: int = 256,
+        fsync: bool = False,
+        layout: Optional[ArchiveLayout] = None
+    ):
+        self.directory = directory
+        self.max_workers = max_workers
+        self.batch_size = batch_size
+        self.fsync = fsync
+        self.layout = layout or ArchiveLayout()
+        # Seit dem letzten sync() beschriebene Verzeichnisse
+        self._dirty_dirs: Set[Path] = set()
+    
+    def _path(self, document_id: UUID) -> Path:
+        return self.layout.path(self.directory, document_id, ".json")
+    
+    @staticmethod
+    def _load_batch(json_paths: List[Path]) -> List[Document]:
+        documents = []
+        for json_path in json_paths:
+            try:
+                documents.append(Document.model_validate_json(json_path.read_bytes()))
+            except Exception as e:
+                # Fehlerhafte Dateien überspringen
+                logger.error(f"Fehler beim Laden von {json_path.name}: {e}")
+        return documents
+    
+    def load_all(self) -> Iterator[Document]:
+        """
+        Liest alle {id}.json. Mit max_workers > 1 werden Lesen und Parsen
+        batchweise in einem Thread-Pool ausgeführt (hilft vor allem bei
+        hoher Latenz pro Datei, z.B. NFS).
+        """
+        batches = batched(self.layout.iter_files(self.directory, "*.json"), self.batch_size)
+        
+        if self.max_workers <= 1:
+            for batch in batches:
+                yield from self._load_batch(batch)
+            return
+        
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            # Begrenzte Anzahl Batches gleichzeitig in Arbeit halten
+            pending = deque()
+            for batch in batches:
+                pending.append(executor.submit(self._load_batch, batch))
+                if len(pending) >= self.max_workers * 2:
+                    yield from pending.popleft().result()
+            while pending:
+                yield from pending.popleft().result()
+    
+    def put(self, document: Document) -> None:
+        path = self._path(document.id)
+        self.layout.ensure_parent(path)
+        tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            with tmp_path.open("w", encoding="utf-8") as file:
+                file.write(document.model_dump_json(indent=2))
+                if self.fsync:
+                    file.flush()
+                    os.fsync(file.fileno())
+            os.replace(tmp_path, path)
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
+        if self.fsync:
+            self._dirty_dirs.add(path.parent)
+    
+    def delete(self, document_id: UUID) -> None:
+        # Auch eine noch nicht migrierte flache Fassung, sonst taucht das Document wieder auf
+        for path in self.layout.candidates(self.directory, document_id, ".json"):
+            path.unlink(missing_ok=True)
+    
+    def sync(self) -> None:
+        """Verzeichnisse synchronisieren, damit die renames einen Absturz überstehen"""
+        if not self.fsync:
+            return
+        dirty, self._dirty_dirs = self._dirty_dirs, set()
+        for directory in dirty or (self.directory,):
+            fd = os.open(directory, os.O_RDONLY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+
+
+class JournalMetadataStore(MetadataStore):
+    """
+    Append-only Journal mit periodisch kompaktiertem Snapshot.
+    Start liest nur zwei Dateien sequentiell: Snapshot (JSON Lines, ein Document
+    pro Zeile) und Journal (put/del-Records seit dem letzten Snapshot).
+    Anhängen und Kompaktieren laufen unter einem flock, damit mehrere
+    Worker-Prozesse dasselbe Journal beschreiben können.
+    """
+    
+    SNAPSHOT_NAME = "metadata.snapshot.jsonl"
+    JOURNAL_NAME = "metadata.journal.jsonl"
+    
+    def __init__(self, directory: Path, compact_threshold: int = 50_000, fsync: bool = False):
+        self.directory = directory
+        self.snapshot_path = directory / self.SNAPSHOT_NAME
+        self.journal_path = directory / self.JOURNAL_NAME
+        self.compact_threshold = compact_threshold
+        self.fsync = fsync
+        self._lock = threading.Lock()
+        self._file_lock = FileLock(directory / ".metadata.journal.lock")
+        self._journal = None
+        self._journal_records = 0
+    
+    def _read_journal(self) -> Dict[str, Optional[str]]:
+        """Liest das Journal: id -> letzter JSON-Stand (None = gelöscht)"""
+        changes: Dict[str, Optional[str]] = {}
+        records = 0
+        
+        if self.journal_path.exists():
+            with self.journal_path.open("r", encoding="utf-8") as journal:
+                for line_number, line in enumerate(journal, start=1):
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # Abgeschnittener letzter Record nach Absturz
+                        logger.warning(f"Überspringe defekten Journal-Record in Zeile {line_number}")
+                        continue
+                    records += 1
+                    if record["op"] == "put":
+                        changes[record["id"]] = json.dumps(record["doc"], ensure_ascii=False)
+                    elif record["op"] == "del":
+                        changes[record["id"]] = None
+        
+        self._journal_records = records
+        return changes
+    
+    def load_all(self) -> Iterator[Document]:
+        with self._lock, self._file_lock:
+            changes = self._read_journal()
+        
+        # Snapshot sequentiell streamen, durch Journal überholte Einträge auslassen
+        if self.snapshot_path.exists():
+            with self.snapshot_path.open("r", encoding="utf-8") as snapshot:
+                for line in snapshot:
+                    if not line.strip():
+                        continue
+                    try:
+                        document = Document.model_validate_json(line)
+                    except Exception as e:
+                        logger.error(f"Fehler beim Laden eines Snapshot-Eintrags: {e}")
+                        continue
+                    if str(document.id) not in changes:
+                        yield document
+        
+        for document_id, data in changes.items():
+            if data is None:
+                continue
+            try:
+                yield Document.model_validate_json(data)
+            except Exception as e:
+                logger.error(f"Fehler beim Laden von Document {document_id}: {e}")
+        
+        if self._journal_records >= self.compact_threshold:
+            self.compact()
+    
+    def _append(self, records: Iterable[dict]) -> None:
+        lines = "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records)
+        with self._lock, self._file_lock:
+            if self._journal is None:
+                self._journal = self.journal_path.open("a+", encoding="utf-8")
+            self._terminate_torn_record()
+            self._journal.write(lines)
+            self._journal.flush()
+            self._journal_records += lines.count("\n")
+            needs_compaction = self._journal_records >= self.compact_threshold
+        
+        if needs_compaction:
+            self.compact()
+    
+    def _terminate_torn_record(self) -> None:
+        """
+        Schließt einen nach einem Absturz (auch eines anderen Prozesses) abgeschnittenen
+        letzten Record mit einem Zeilenende ab - sonst würde der nächste Record an ihn
+        angehängt und beim Lesen mit ihm verworfen. Der Lock wird bereits gehalten.
+        """
+        fd = self._journal.fileno()
+        size = os.fstat(fd).st_size
+        if size and os.pread(fd, 1, size - 1) != b"\n":
+            self._journal.write("\n")
+    
+    def put(self, document: Document) -> None:
+        self.put_many([document])
+    
+    def put_many(self, documents: Iterable[Document]) -> None:
+        self._append(
+            {"op": "put", "id": str(document.id), "doc": document.model_dump(mode="json")}
+            for document in documents
+        )
+    
+    def delete(self, document_id: UUID) -> None:
+        self._append([{"op": "del", "id": str(document_id)}])
+    
+    def sync(self) -> None:
+        """Ein fsync für alle seit dem letzten Aufruf angehängten Records (Group Commit)"""
+        if not self.fsync:
+            return
+        with self._lock:
+            if self._journal is not None:
+                os.fsync(self._journal.fileno())
+    
+    def compact(self) -> None:
+        """
+        Schreibt einen neuen Snapshot aus Snapshot + Journal und leert das Journal.
+        Snapshot wird per temp-Datei + rename atomar ersetzt; ein Absturz vor dem
+        Leeren des Journals ist unkritisch, da Journal-Records idempotent sind.
+        """
+        with self._lock, self._file_lock:
+            changes = self._read_journal()
+            state: Dict[str, str] = {}
+            if self.snapshot_path.exists():
+                with self.snapshot_path.open("r", encoding="utf-8") as snapshot:
+                    for line in snapshot:
+                        line = line.strip()
+                        if line:
+                            state[json.loads(line)["id"]] = line
+            for document_id, data in changes.items():
+                if data is None:
+                    state.pop(document_id, None)
+                else:
+                    state[document_id] = data
+            
+            tmp_path = self.snapshot_path.with_suffix(".tmp")
+            with tmp_path.open("w", encoding="utf-8") as snapshot:
+                for data in state.values():
+                    snapshot.write(data + "\n")
+                snapshot.flush()
+                os.fsync(snapshot.fileno())
+            os.replace(tmp_path, self.snapshot_path)
+            
+            # Unter dem flock kürzen statt mit "w" neu öffnen: ohne O_APPEND schriebe dieser
+            # Prozess ab seinem eigenen Offset und überschriebe Records anderer Prozesse
+            if self._journal is None:
+                self._journal = self.journal_path.open("a+", encoding="utf-8")
+            self._journal.truncate(0)
+            self._journal_records = 0
+        
+        logger.info(f"Metadaten-Snapshot kompaktiert ({len(state)} Documents)")
+    
+    def close(self) -> None:
+        with self._lock:
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+        self._file_lock.close()
+
+
+class WriteBehindMetadataStore(MetadataStore):
+    """
+    Verzögertes Schreiben vor einem anderen MetadataStore.
+    put() markiert das Document nur als dirty; wiederholte Änderungen am selben
+    Document (z.B. Autosave pro Tastendruck) werden zu einem Schreibvorgang
+    zusammengefasst. Ein Hintergrund-Thread schreibt alle flush_interval Sekunden
+    oder sobald max_pending Documents anstehen und synchronisiert danach einmal
+    für den ganzen Batch (Group Commit). close() schreibt alles Ausstehende.
+    """
+    
+    def __init__(self, inner: MetadataStore, flush_interval: float = 1.0, max_pending: int = 500):
+        self.inner = inner
+        self.flush_interval = flush_interval
+        self.max_pending = max(1, max_pending)
+        self._pending: Dict[UUID, Document] = {}
+        self._condition = threading.Condition()
+        # Serialisiert Flushes und Deletes, damit ein Flush gelöschte Documents nicht wiederherstellt
+        self._flush_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+        self.puts_total = 0
+        self.writes_total = 0
+        self.flushes_total = 0
+    
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+    
+    def _ensure_thread(self) -> None:
+        if self._thread is None and not self._closed:
+            self._thread = threading.Thread(target=self._run, name="metadata-write-behind", daemon=True)
+            self._thread.start()
+    
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                self._condition.wait_for(
+                    lambda: self._closed or len(self._pending) >= self.max_pending,
+                    timeout=self.flush_interval
+                )
+                closed = self._closed
+            if closed:
+                return
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Verzögertes Schreiben der Metadaten fehlgeschlagen: {e}")
+                time.sleep(self.flush_interval)
+    
+    def load_all(self) -> Iterator[Document]:
+        self.flush()
+        return self.inner.load_all()
+    
+    def put(self, document: Document) -> None:
+        self.put_many([document])
+    
+    def put_many(self, documents: Iterable[Document]) -> None:
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("MetadataStore ist geschlossen")
+            for document in documents:
+                self._pending[document.id] = document
+                self.puts_total += 1
+            if len(self._pending) >= self.max_pending:
+                self._condition.notify()
+            self._ensure_thread()
+    
+    def put_durable(self, document: Document) -> None:
+        with self._flush_lock:
+            with self._condition:
+                self._pending.pop(document.id, None)
+            with METADATA_WRITE_SECONDS.labels("put_durable").time():
+                self.inner.put_durable(document)
+            self.writes_total += 1
+    
+    def delete(self, document_id: UUID) -> None:
+        with self._flush_lock:
+            with self._condition:
+                self._pending.pop(document_id, None)
+            self.inner.delete(document_id)
+    
+    def flush(self) -> int:
+        """Schreibt alle ausstehenden Documents und synchronisiert einmal, gibt die Anzahl zurück"""
+        with self._flush_lock:
+            with self._condition:
+                batch = list(self._pending.values())
+                self._pending.clear()
+            if not batch:
+                return 0
+            try:
+                with METADATA_WRITE_SECONDS.labels("flush").time():
+                    self.inner.put_many(batch)
+                    self.inner.sync()
+            except Exception:
+                # Nicht verlieren: beim nächsten Flush erneut versuchen (neuere Stände haben Vorrang)
+                with self._condition:
+                    for document in batch:
+                        self._pending.setdefault(document.id, document)
+                raise
+            self.writes_total += len(batch)
+            self.flushes_total += 1
+        logger.debug(f"{len(batch)} Metadaten-Änderungen geschrieben")
+        return len(batch)
+    
+    def sync(self) -> None:
+        self.flush()
+    
+    def close(self) -> None:
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        try:
+            count = self.flush()
+            if count:
+                logger.info(f"{count} ausstehende Metadaten-Änderungen beim Beenden geschrieben")
+        finally:
+            self.inner.close()
+
+
+def create_metadata_store(
+    backend: str,
+    directory: Path,
+    compact_threshold: int = 50_000,
+    load_workers: int = 1,
+    fsync: bool = False,
+    write_behind: bool = False,
+    flush_interval: float = 1.0,
+    flush_max_pending: int = 500,
+    layout: Optional[ArchiveLayout] = None
+) -> MetadataStore:
+    """Erzeugt das konfigurierte Metadaten-Backend ('json' oder 'journal'), optional mit verzögertem Schreiben"""
+    if backend == "json":
+        store: MetadataStore = JsonFileMetadataStore(directory, max_workers=load_workers, fsync=fsync, layout=layout)
+    elif backend == "journal":
+        store = JournalMetadataStore(directory, compact_threshold=compact_threshold, fsync=fsync)
+    else:
+        raise ValueError(f"Unbekanntes Metadaten-Backend: {backend}")
+    
+    if write_behind:
+        return WriteBehindMetadataStore(store, flush_interval=flush_interval, max_pending=flush_max_pending)
+    return store
+
+
+def _has_json_metadata(directory: Path, layout: ArchiveLayout) -> bool:
+    """
+    Gibt es mindestens eine {id}.json? Bricht beim ersten Treffer ab; die
+    Shard-Verzeichnisse werden nur durchsucht, wenn flach keine liegt.
+    """
+    try:
+        with os.scandir(directory) as entries:
+            if any(entry.name.endswith(".json") and parse_document_id(Path(entry.name)) is not None for entry in entries):
+                return True
+    except FileNotFoundError:
+        return False
+    if layout.levels == 0:
+        return False
+    shards = "/".join(["?" * SHARD_WIDTH] * layout.levels)
+    return any(parse_document_id(path) is not None for path in directory.glob(f"{shards}/*.json"))
+
+
+def check_metadata_backend(backend: str, directory: Path, layout: Optional[ArchiveLayout] = None) -> None:
+    """
+    Verweigert den Start mit einem Backend, das die vorhandenen Metadaten nicht sieht.
+    Sonst wäre das Archive scheinbar leer, und neue Documents landeten nur im
+    falschen Backend (nach dem Zurückstellen verwaist).
+    Läuft beim Import in jedem Worker: das Archive wird nur durchsucht, wenn
+    das Ergebnis den Start verhindern kann, und nur bis zur ersten {id}.json.
+    """
+    has_journal = (directory / JournalMetadataStore.SNAPSHOT_NAME).exists() or (directory / JournalMetadataStore.JOURNAL_NAME).exists()
+    if backend not in ("journal", "json") or (backend == "journal") == has_journal:
+        return
+    has_json = _has_json_metadata(directory, layout or ArchiveLayout())
+    
+    if backend == "journal" and has_json and not has_journal:
+        raise RuntimeError(
+            f"{directory} enthält Metadaten als {{id}}.json, aber kein Journal - "
+            f"erst mit 'python -m app.tools.metadata migrate --from json --to journal' übernehmen"
+        )
+    if backend == "json" and has_journal and not has_json:
+        raise RuntimeError(
+            f"{directory} enthält Metadaten im Journal, aber keine {{id}}.json - "
+            f"erst mit 'python -m app.tools.metadata migrate --from journal --to json' exportieren "
+            f"oder PDFF_METADATA_BACKEND=journal setzen"
+        )
+
+
+def migrate_metadata(source: MetadataStore, target: MetadataStore, batch_size: int = 1000) -> int:
+    """Kopiert alle Documents von source nach target, gibt die Anzahl zurück"""
+    count = 0
+    for batch in batched(source.load_all(), batch_size):
+        target.put_many(batch)
+        count += len(batch)
+    
+    if isinstance(target, JournalMetadataStore):
+        target.compact()
+    return count
\ No newline at end of file
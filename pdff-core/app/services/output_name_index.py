@@ -0,0 +1,82 @@
+from pathlib import Path
+from typing import Dict, Optional, Set
+import os
+import re
+import threading
+
+# name(3).pdf -> ("name", "3", ".pdf")
+_NUMBERED_PATTERN = re.compile(r"^(.*)\((\d+)\)(\.[^.]*)?$")
+
+
+class OutputNameIndex:
+    """
+    In-Memory-Index der Dateinamen im Ausgabeverzeichnis.
+    Vergibt bei Konflikten den nächsten freien Suffix (name(1).pdf, name(2).pdf, ...)
+    in amortisiert konstanter Zeit, ohne exists()-Schleife über das Dateisystem.
+    Das Verzeichnis wird beim ersten Zugriff einmalig eingelesen.
+    Extern gelöschte Dateien fallen auf, sobald ihr Name wieder vergeben werden
+    soll (Basisname oder beim Weiterzählen übersprungene Nummer): der Name wird
+    dann aus dem Index entfernt und neu vergeben. Gelöschte Nummern unterhalb
+    des Zählers werden erst nach erneutem Einlesen (Neustart) wieder vergeben.
+    """
+    
+    def __init__(self, directory: Path):
+        self.directory = directory
+        self._names: Optional[Set[str]] = None
+        # Basisname -> nächster zu probierender Zähler
+        self._next_counter: Dict[str, int] = {}
+        self._lock = threading.Lock()
+    
+    def _ensure_loaded(self) -> Set[str]:
+        if self._names is None:
+            with os.scandir(self.directory) as entries:
+                self._names = {entry.name for entry in entries if not entry.name.startswith(".")}
+        return self._names
+    
+    def reserve(self, filename: str) -> str:
+        """Reserviert filename oder die nächste freie nummerierte Variante und gibt den Namen zurück"""
+        with self._lock:
+            names = self._ensure_loaded()
+            if filename not in names or self._deleted(filename):
+                names.add(filename)
+                return filename
+            
+            stem, suffix = os.path.splitext(filename)
+            counter = self._next_counter.get(filename, 1)
+            candidate = f"{stem}({counter}){suffix}"
+            while candidate in names and not self._deleted(candidate):
+                counter += 1
+                candidate = f"{stem}({counter}){suffix}"
+            names.add(candidate)
+            self._next_counter[filename] = counter + 1
+            return candidate
+    
+    def _deleted(self, filename: str) -> bool:
+        """Belegter Name ohne Datei (extern gelöscht): wird aus dem Index entfernt"""
+        if os.path.lexists(self.directory / filename):
+            return False
+        self._names.discard(filename)
+        return True
+    
+    def mark_used(self, filename: str) -> None:
+        """Markiert einen (extern angelegten) Namen als belegt"""
+        with self._lock:
+            self._ensure_loaded().add(filename)
+    
+    def release(self, filename: str) -> None:
+        """Gibt einen Namen wieder frei (z.B. nach Löschen der alten Ausgabe)"""
+        with self._lock:
+            if self._names is None:
+                return
+            self._names.discard(filename)
+            # Freigewordene Nummer wieder vergeben (wie bisher: kleinster freier Suffix)
+            match = _NUMBERED_PATTERN.match(filename)
+            if match:
+                base = f"{match.group(1)}{match.group(3) or ''}"
+                counter = int(match.group(2))
+                if counter < self._next_counter.get(base, 1):
+                    self._next_counter[base] = counter
+    
+    def __contains__(self, filename: str) -> bool:
+        with self._lock:
+            return filename in self._ensure_loaded()
\ No newline at end of file
@@ -0,0 +1,312 @@
+from pydantic import BaseModel
+from typing import Any, Awaitable, Dict, Iterable, List, Optional, Tuple
+import asyncio
+import heapq
+import logging
+import re
+import threading
+from app.models import Document, DocumentCollection
+
+logger = logging.getLogger(__name__)
+
+# Felder mit Vorschlägen (wiederkehrende Werte)
+SUGGESTION_FIELDS = ("correspondent", "document_type", "topic", "customer_id")
+
+# Längere Werte werden nur über ihren Anfang gefunden
+MAX_KEY_LENGTH = 100
+
+_UMLAUTS = (("ä", "ae"), ("ö", "oe"), ("ü", "ue"), ("ß", "ss"))
+_SEPARATORS = re.compile(r"[\s_\-]+")
+
+# Eintrag einer Vorschlagsliste: (-Häufigkeit, bevorzugte Schreibweise) - sortiert direkt nach Rang
+Entry = Tuple[int, str]
+
+
+def normalize_key(value: str) -> str:
+    """
+    Vergleichsschlüssel: Kleinschreibung, Umlaute ausgeschrieben, Trenner vereinheitlicht.
+    So landen "Stadtwerke_München" und "Stadtwerke Muenchen" auf demselben Schlüssel.
+    """
+    key = value.casefold()
+    # str.replace ist hier deutlich schneller als str.translate
+    for umlaut, replacement in _UMLAUTS:
+        if umlaut in key:
+            key = key.replace(umlaut, replacement)
+    return _SEPARATORS.sub(" ", key).strip()[:MAX_KEY_LENGTH]
+
+
+class Suggestion(BaseModel):
+    """Vorschlag für ein Metadaten-Feld"""
+    value: str
+    count: int
+
+
+class _Node:
+    """Knoten des Radix-Baums; label ist die Kante vom Elternknoten"""
+    __slots__ = ("label", "children", "variants", "entry", "top")
+    
+    def __init__(self, label: str = ""):
+        self.label = label
+        self.children: Optional[Dict[str, "_Node"]] = None
+        # Schreibweisen mit diesem Schlüssel -> Häufigkeit
+        self.variants: Optional[Dict[str, int]] = None
+        self.entry: Optional[Entry] = None
+        # Beste Einträge im Teilbaum, None = beim nächsten Zugriff neu berechnen
+        self.top: Optional[List[Entry]] = None
+
+
+def _entry(variants: Dict[str, int]) -> Entry:
+    """Häufigste Schreibweise repräsentiert den Schlüssel, Häufigkeit aller Schreibweisen zusammen"""
+    if len(variants) == 1:
+        for value, count in variants.items():
+            return (-count, value)
+    return (-sum(variants.values()), min(variants, key=lambda v: (-variants[v], v)))
+
+
+class SuggestionTrie:
+    """
+    Präfixbaum (Radix-Baum) über normalisierte Werte mit Häufigkeiten.
+    Jeder Knoten hält die besten `size` Einträge seines Teilbaums, eine Anfrage
+    kostet daher nur den Abstieg entlang des Präfixes. Änderungen invalidieren
+    die Listen auf dem Pfad, neu berechnet wird erst beim nächsten Zugriff.
+    """
+    
+    def __init__(self, size: int = 20):
+        self.root = _Node()
+        self.size = size
+        self.keys = 0
+    
+    def _path(self, key: str, create: bool) -> Optional[List[_Node]]:
+        """Knoten von der Wurzel bis zum Schlüssel (teilt bei create Kanten auf)"""
+        node = self.root
+        path = [node]
+        i = 0
+        while i < len(key):
+            children = node.children
+            child = children.get(key[i]) if children else None
+            if child is None:
+                if not create:
+                    return None
+                leaf = _Node(key[i:])
+                if children is None:
+                    node.children = children = {}
+                children[key[i]] = leaf
+                path.append(leaf)
+                return path
+            
+            label = child.label
+            if key.startswith(label, i):
+                common = len(label)
+            else:
+                common = 1
+                limit = min(len(label), len(key) - i)
+                while common < limit and label[common] == key[i + common]:
+                    common += 1
+            if common < len(label):
+                if not create:
+                    return None
+                # Kante aufteilen: gemeinsamer Anfang wird eigener Knoten
+                middle = _Node(label[:common])
+                child.label = label[common:]
+                middle.children = {child.label[0]: child}
+                children[key[i]] = middle
+                child = middle
+            path.append(child)
+            node = child
+            i += common
+        return path
+    
+    def add(self, value: str, delta: int = 1) -> None:
+        """Ändert die Häufigkeit einer Schreibweise um delta (entfernt sie bei 0)"""
+        key = normalize_key(value)
+        if not key or not delta:
+            return
+        path = self._path(key, create=delta > 0)
+        if path is None:
+            return
+        node = path[-1]
+        variants = node.variants or {}
+        count = variants.get(value, 0) + delta
+        if count > 0:
+            variants[value] = count
+        else:
+            variants.pop(value, None)
+        
+        if variants and node.variants is None:
+            self.keys += 1
+        elif not variants and node.variants is not None:
+            self.keys -= 1
+        node.variants = variants or None
+        node.entry = _entry(variants) if variants else None
+        for path_node in path:
+            path_node.top = None
+    
+    @classmethod
+    def build(cls, counts: Dict[str, int], size: int = 20) -> "SuggestionTrie":
+        """
+        Baut den Baum in einem Durchlauf über die sortierten Schlüssel auf
+        (deutlich schneller als einzelnes add): der gemeinsame Anfang mit dem
+        vorherigen Schlüssel bestimmt, wo der neue Zweig abgeht.
+        """
+        keyed: Dict[str, Dict[str, int]] = {}
+        for value, count in counts.items():
+            key = normalize_key(value)
+            if key and count > 0:
+                keyed.setdefault(key, {})[value] = count
+        
+        trie = cls(size)
+        trie.keys = len(keyed)
+        # Offener Pfad zum vorherigen Schlüssel: (Knoten, Länge des Schlüssels bis Knotenende)
+        stack: List[Tuple[_Node, int]] = [(trie.root, 0)]
+        previous = ""
+        for key in sorted(keyed):
+            common = 0
+            limit = min(len(previous), len(key))
+            while common < limit and previous[common] == key[common]:
+                common += 1
+            
+            popped: Optional[_Node] = None
+            while stack[-1][1] > common:
+                popped = stack.pop()[0]
+            parent, depth = stack[-1]
+            if depth < common:
+                # Kante zum zuletzt verlassenen Knoten am gemeinsamen Anfang aufteilen
+                middle = _Node(key[depth:common])
+                popped.label = popped.label[common - depth:]
+                middle.children = {popped.label[0]: popped}
+                parent.children[key[depth]] = middle
+                stack.append((middle, common))
+                parent = middle
+            
+            leaf = _Node(key[common:])
+            leaf.variants = keyed[key]
+            leaf.entry = _entry(leaf.variants)
+            if parent.children is None:
+                parent.children = {}
+            parent.children[key[common]] = leaf
+            stack.append((leaf, len(key)))
+            previous = key
+        
+        trie.warm()
+        return trie
+    
+    def _top(self, node: _Node) -> List[Entry]:
+        if node.top is None:
+            candidates: List[Entry] = [node.entry] if node.entry else []
+            if node.children:
+                for child in node.children.values():
+                    candidates.extend(self._top(child))
+            if len(candidates) > self.size:
+                node.top = heapq.nsmallest(self.size, candidates)
+            else:
+                candidates.sort()
+                node.top = candidates
+        return node.top
+    
+    def _find(self, prefix: str) -> Optional[_Node]:
+        """Knoten, dessen Teilbaum genau die Schlüssel mit diesem Präfix enthält"""
+        node = self.root
+        i = 0
+        while i < len(prefix):
+            child = node.children.get(prefix[i]) if node.children else None
+            if child is None or not child.label.startswith(prefix[i:i + len(child.label)]):
+                return None
+            node = child
+            i += len(child.label)
+        return node
+    
+    def suggest(self, prefix: str, limit: int = 10) -> List[Suggestion]:
+        """Häufigste Werte, deren Schlüssel mit dem (normalisierten) Präfix beginnt"""
+        node = self._find(normalize_key(prefix))
+        if node is None:
+            return []
+        return [Suggestion(value=value, count=-count) for count, value in self._top(node)[:limit]]
+    
+    def warm(self) -> None:
+        """Berechnet alle Vorschlagslisten vorab (nach dem Aufbau)"""
+        self._top(self.root)
+
+
+class SuggestionService:
+    """
+    Vorschläge je Metadaten-Feld, gewichtet nach Anzahl der Documents mit dem Wert.
+    Wird nach dem Laden einmal aus der Collection aufgebaut und danach als
+    Change-Listener der Collection (observe_change) inkrementell fortgeschrieben -
+    egal ob PATCH, Extraktion, Duplikat-Übernahme, anderer Worker oder Entfernen.
+    """
+    
+    def __init__(self, fields: Iterable[str] = SUGGESTION_FIELDS, size: int = 20):
+        self.fields = tuple(fields)
+        self.size = size
+        self._tries: Dict[str, SuggestionTrie] = {field: SuggestionTrie(size) for field in self.fields}
+        self._lock = threading.Lock()
+        # Während rebuild(): Änderungen nach dem Zählen, werden auf die neuen Bäume nachgespielt
+        self._backlog: Optional[List[Tuple[str, str, int]]] = None
+        self.ready = False
+    
+    def attach(self, collection: DocumentCollection) -> None:
+        """Schreibt ab jetzt alle Änderungen der Collection fort"""
+        collection.change_listeners.append(self.observe_change)
+    
+    async def start(self, collection: DocumentCollection, wait_for: Optional[Awaitable] = None) -> None:
+        """Baut die Vorschläge nach dem Laden des Archivs in einem Worker-Thread auf"""
+        if wait_for is not None:
+            await wait_for
+        await asyncio.to_thread(self.rebuild, collection)
+    
+    def _start_backlog(self) -> None:
+        with self._lock:
+            self._backlog = []
+    
+    def rebuild(self, collection: DocumentCollection) -> None:
+        """
+        Zählt die Werte aller Documents und ersetzt die Bäume. Änderungen, die
+        während des (langsamen) Aufbaus eintreffen, gehen dabei nicht verloren.
+        """
+        counters = collection.count_values(self.fields, started=self._start_backlog)
+        tries = {field: SuggestionTrie.build(counter, self.size) for field, counter in counters.items()}
+        
+        with self._lock:
+            for field, value, delta in self._backlog or ():
+                tries[field].add(value, delta)
+            self._backlog = None
+            self._tries = tries
+            self.ready = True
+        logger.info(f"Vorschläge aufgebaut: {', '.join(f'{field} {trie.keys}' for field, trie in tries.items())}")
+    
+    def observe_change(self, change: str, document: Document, fields: Tuple[str, ...], previous: Dict[str, Any]) -> None:
+        """Change-Listener der DocumentCollection: schreibt die Häufigkeiten fort"""
+        deltas: List[Tuple[str, str, int]] = []
+        for field in self.fields:
+            if change == "created":
+                old, new = None, getattr(document, field)
+            elif change == "removed":
+                old, new = getattr(document, field), None
+            elif field in fields:
+                old, new = previous.get(field), getattr(document, field)
+            else:
+                continue
+            if old == new:
+                continue
+            if old:
+                deltas.append((field, old, -1))
+            if new:
+                deltas.append((field, new, 1))
+        if not deltas:
+            return
+        
+        with self._lock:
+            if self._backlog is not None:
+                self._backlog.extend(deltas)
+            for field, value, delta in deltas:
+                self._tries[field].add(value, delta)
+    
+    def suggest(self, field: str, prefix: str, limit: int = 10) -> List[Suggestion]:
+        """Vorschläge für ein Feld; wirft KeyError für Felder ohne Vorschläge"""
+        trie = self._tries[field]
+        with self._lock:
+            return trie.suggest(prefix, min(limit, self.size))
+    
+    def stats(self) -> Dict[str, int]:
+        """Anzahl unterschiedlicher Werte je Feld"""
+        return {field: trie.keys for field, trie in self._tries.items()}
\ No newline at end of file
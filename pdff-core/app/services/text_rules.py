@@ -0,0 +1,109 @@
+from datetime import date
+from typing import Dict, List, NamedTuple, Optional, Set
+import re
+
+# Bei Änderungen an den Regeln hochzählen (Teil des Cache-Keys von Extraktionsergebnissen)
+TEXT_RULES_VERSION = "1"
+
+# Felder, die per Regel aus dem Text-Layer gelesen werden
+TEXT_RULE_FIELDS = ("document_date", "document_number", "customer_id")
+
+_MONTHS = {
+    "januar": 1, "jan": 1, "februar": 2, "feb": 2, "märz": 3, "maerz": 3, "mär": 3, "mrz": 3,
+    "april": 4, "apr": 4, "mai": 5, "juni": 6, "jun": 6, "juli": 7, "jul": 7, "august": 8, "aug": 8,
+    "september": 9, "sep": 9, "sept": 9, "oktober": 10, "okt": 10, "november": 11, "nov": 11,
+    "dezember": 12, "dez": 12,
+}
+
+_DATE_PATTERN = re.compile(
+    r"\b(?:"
+    r"(?P<d>\d{1,2})\.\s?(?P<m>\d{1,2})\.\s?(?P<y>\d{4}|\d{2})"
+    r"|(?P<iy>\d{4})-(?P<im>\d{2})-(?P<id>\d{2})"
+    r"|(?P<td>\d{1,2})\.?\s+(?P<tm>" + "|".join(sorted(_MONTHS, key=len, reverse=True)) + r")\.?\s+(?P<ty>\d{4})"
+    r")\b",
+    re.IGNORECASE
+)
+
+_DATE_LABEL = re.compile(
+    r"(?:Rechnungsdatum|Belegdatum|Dokumentdatum|Ausstellungsdatum|Ausgestellt\s+am|Invoice\s+date|Datum|Date)"
+    r"\s*[:.]?[ \t]*\n?[ \t]*",
+    re.IGNORECASE
+)
+
+# Wert: beginnt mit Buchstabe/Ziffer, enthält mindestens eine Ziffer
+_IDENTIFIER = r"(?P<value>(?=[A-Z0-9\-/.]*\d)[A-Z0-9][A-Z0-9\-/.]{2,39})"
+
+_NUMBER_LABELS = {
+    "document_number": (
+        r"Rechnungs[- ]?(?:nummer|nr\.?)|Rechnung\s+Nr\.?|Beleg[- ]?(?:nummer|nr\.?)|Dokumentnummer"
+        r"|Gutschrift(?:s)?[- ]?(?:nummer|nr\.?)|Invoice\s*(?:No\.?|Number|#)"
+    ),
+    "customer_id": (
+        r"Kunden[- ]?(?:nummer|nr\.?)|Kd\.?[- ]?Nr\.?|Vertrags[- ]?(?:nummer|konto|nr\.?)"
+        r"|Mitglieds[- ]?(?:nummer|nr\.?)|Versicherungs[- ]?(?:nummer|schein[- ]?nr\.?)|Customer\s*(?:ID|No\.?|Number)"
+    ),
+}
+
+_NUMBER_PATTERNS = {
+    field: re.compile(r"\b(?:" + labels + r")\s*[:.#]?[ \t]*\n?[ \t]*" + _IDENTIFIER, re.IGNORECASE)
+    for field, labels in _NUMBER_LABELS.items()
+}
+
+
+class RuleMatch(NamedTuple):
+    """Per Regel gefundener Wert mit Herkunft"""
+    value: object
+    rule: str
+    page: int  # 1-basiert
+
+
+def parse_date(match: re.Match) -> Optional[date]:
+    """Wandelt einen Treffer von _DATE_PATTERN in ein plausibles Datum"""
+    try:
+        if match.group("d"):
+            year = int(match.group("y"))
+            year += 2000 if year < 100 else 0
+            result = date(year, int(match.group("m")), int(match.group("d")))
+        elif match.group("iy"):
+            result = date(int(match.group("iy")), int(match.group("im")), int(match.group("id")))
+        else:
+            result = date(int(match.group("ty")), _MONTHS[match.group("tm").lower()], int(match.group("td")))
+    except ValueError:
+        return None
+    if not 1990 <= result.year <= date.today().year + 1:
+        return None
+    return result
+
+
+def _find_date(pages: List[str]) -> Optional[RuleMatch]:
+    # 1. Datum direkt hinter einem Label
+    for page_number, text in enumerate(pages, start=1):
+        for label in _DATE_LABEL.finditer(text):
+            match = _DATE_PATTERN.match(text, label.end())
+            if match and (value := parse_date(match)):
+                return RuleMatch(value, "date_label", page_number)
+    
+    # 2. Genau ein eindeutiges Datum auf der ersten Seite
+    if pages:
+        dates: Set[date] = {value for match in _DATE_PATTERN.finditer(pages[0]) if (value := parse_date(match))}
+        if len(dates) == 1:
+            return RuleMatch(dates.pop(), "single_date", 1)
+    return None
+
+
+def extract_with_rules(pages: List[str]) -> Dict[str, RuleMatch]:
+    """Liest Dokumentdatum, Dokumentnummer und Kundennummer per Regeln aus dem Seitentext"""
+    results: Dict[str, RuleMatch] = {}
+    
+    date_match = _find_date(pages)
+    if date_match:
+        results["document_date"] = date_match
+    
+    for field, pattern in _NUMBER_PATTERNS.items():
+        for page_number, text in enumerate(pages, start=1):
+            match = pattern.search(text)
+            if match:
+                results[field] = RuleMatch(match.group("value").rstrip(".-/"), f"{field}_label", page_number)
+                break
+    
+    return results
\ No newline at end of file
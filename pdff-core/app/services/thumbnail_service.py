@@ -0,0 +1,132 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+import asyncio
+import logging
+import os
+import threading
+from app.models import Document
+from app.services.async_storage_service import AsyncStorageService
+from app.utils.pdf_render import RENDER_VERSION, RenderUnavailable, render_page, renderer_available
+
+logger = logging.getLogger(__name__)
+
+# Erlaubte Breiten in Pixeln (feste Stufen, damit der Cache nicht beliebig wächst)
+THUMBNAIL_SIZES = {"small": 240, "medium": 600, "large": 1200}
+
+
+class ThumbnailService:
+    """
+    Vorschaubilder einzelner PDF-Seiten in einem inhaltsadressierten Cache.
+    Dateiname aus Content-Hash, Seite, Breite und Renderer-Version - inhaltsgleiche
+    Documents teilen sich die Bilder, geänderte Renderer erzeugen neue.
+    Die erste Seite wird nach der Ingestion im Hintergrund gerendert, alles andere
+    (und fehlende Bilder) beim ersten Abruf. Gleichzeitige Anfragen nach demselben
+    Bild rendern nur einmal.
+    """
+    
+    def __init__(
+        self,
+        storage: AsyncStorageService,
+        directory: Path,
+        enabled: bool = True,
+        workers: int = 2,
+        pregenerate_size: Optional[str] = "small"
+    ):
+        if pregenerate_size and pregenerate_size not in THUMBNAIL_SIZES:
+            raise ValueError(f"Unbekannte Vorschaubild-Größe: {pregenerate_size}")
+        self.storage = storage
+        self.directory = directory
+        self.enabled = enabled and renderer_available()
+        self.pregenerate_width = THUMBNAIL_SIZES[pregenerate_size] if pregenerate_size else None
+        # Abrufe warten nicht hinter vorberechneten Bildern aus einem großen Inbox-Batch
+        self._request_executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="thumbnails")
+        self._background_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="thumbnails-bg")
+        self._pending: Dict[str, Future] = {}
+        # Reentrant: Future.cancel() ruft _forget synchron unter dem Lock auf
+        self._lock = threading.RLock()
+        self.rendered_total = 0
+        self.failed_total = 0
+        if enabled and not self.enabled:
+            logger.warning("Vorschaubilder deaktiviert: pypdfium2 ist nicht installiert (pdff-core[thumbnails])")
+    
+    @staticmethod
+    def cache_key(document: Document, page: int, width: int) -> str:
+        """Inhaltsadressierter Schlüssel; ohne Content-Hash (Altbestand vor Backfill) die Document-ID"""
+        content = document.content_hash or f"id-{document.id}"
+        return f"{content}-p{page}-w{width}-r{RENDER_VERSION}"
+    
+    def path_for(self, key: str) -> Path:
+        # Zwei Ebenen vermeiden riesige Einzelverzeichnisse
+        return self.directory / key[:2] / f"{key}.png"
+    
+    def notify_ingested(self, document: Document) -> None:
+        """Ingest-Listener (threadsicher): rendert die erste Seite im Hintergrund vor"""
+        if not self.enabled or self.pregenerate_width is None:
+            return
+        future = self._submit(document, 1, self.pregenerate_width, self._background_executor)
+        future.add_done_callback(lambda done: self._log_failure(document, done))
+    
+    def _log_failure(self, document: Document, future: Future) -> None:
+        if not future.cancelled() and future.exception() is not None:
+            logger.warning(f"Vorschaubild für Document {document.id} fehlgeschlagen: {future.exception()}")
+    
+    def _submit(self, document: Document, page: int, width: int, executor: ThreadPoolExecutor) -> Future:
+        key = self.cache_key(document, page, width)
+        with self._lock:
+            future = self._pending.get(key)
+            # Ein Abruf überholt ein noch wartendes Hintergrund-Rendering desselben Bilds
+            if future is not None and not (executor is self._request_executor and future.cancel()):
+                return future
+            future = executor.submit(self._render, document, page, width, self.path_for(key))
+            self._pending[key] = future
+        # Außerhalb des Locks: bei bereits fertigem Future läuft der Callback sofort
+        future.add_done_callback(lambda done: self._forget(key, done))
+        return future
+    
+    def _forget(self, key: str, future: Future) -> None:
+        with self._lock:
+            if self._pending.get(key) is future:
+                del self._pending[key]
+    
+    def _render(self, document: Document, page: int, width: int, path: Path) -> Path:
+        if path.is_file():
+            return path
+        try:
+            png = render_page(self.storage.storage.get_pdf_path(document), page, width)
+        except Exception:
+            with self._lock:
+                self.failed_total += 1
+            raise
+        
+        # Atomar ersetzen, damit parallele Leser nie ein halbes Bild sehen
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp_path.write_bytes(png)
+        os.replace(tmp_path, path)
+        # Mehrere Render-Threads, += ist nicht atomar
+        with self._lock:
+            self.rendered_total += 1
+        logger.debug(f"Vorschaubild {path.name} für Document {document.id} gerendert ({len(png)} Bytes)")
+        return path
+    
+    async def get(self, document: Document, page: int = 1, width: int = THUMBNAIL_SIZES["small"]) -> Tuple[Path, os.stat_result]:
+        """
+        Pfad und Stat des Vorschaubilds, fehlende Bilder werden gerendert.
+        Wirft RenderError (bzw. RenderUnavailable/PageNotFound) und FileNotFoundError.
+        """
+        if not self.enabled:
+            raise RenderUnavailable("Vorschaubilder sind deaktiviert")
+        path = self.path_for(self.cache_key(document, page, width))
+        try:
+            return path, await self.storage.run_io(os.stat, path)
+        except FileNotFoundError:
+            pass
+        
+        path = await asyncio.wrap_future(self._submit(document, page, width, self._request_executor))
+        return path, await self.storage.run_io(os.stat, path)
+    
+    def close(self) -> None:
+        """Bricht ausstehende Hintergrund-Renderings ab und wartet auf laufende"""
+        self._background_executor.shutdown(wait=True, cancel_futures=True)
+        self._request_executor.shutdown(wait=True, cancel_futures=True)
\ No newline at end of file
@@ -0,0 +1,528 @@
+"""
+Mehrere Worker-Prozesse auf einem Archiv (uvicorn --workers N).
+
+Jeder Prozess hält seine eigene DocumentCollection im Speicher, maßgeblich ist
+das gemeinsame Metadaten-Backend. Änderungen an der Collection veröffentlicht
+jeder Prozess als Record in einem gemeinsamen Change-Feed (append-only
+JSON Lines unter flock, gesammelt von einem eigenen Thread geschrieben); die
+anderen Prozesse lesen ihn fortlaufend und
+übernehmen die Stände in ihre Collection, Indizes, Vorschläge und Event-Streams.
+Ingest aus data_in, Inbox-Watcher, Hash-Backfill und Extraktion laufen nur im
+Leader - dem Prozess, der den Leader-Lock (flock) hält. Endet er, übernimmt ein
+anderer Prozess den Lock und startet diese Dienste.
+"""
+from pathlib import Path
+from pydantic import BaseModel
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from uuid import UUID
+import asyncio
+import json
+import logging
+import os
+import secrets
+import threading
+import time
+from app.models import Document, DocumentCollection
+from app.services.local_storage_service import LocalStorageService
+from app.utils.shared_files import FileLock, FileTail, SharedAppendFile
+
+logger = logging.getLogger(__name__)
+
+# Eigene Schreibvorgänge, deren verzögertes Schreiben (Write-Behind) noch aussteht, gelten so lange als offen
+_OWN_WRITE_WINDOW = 60.0
+
+# Abstand der Checkpoints (Sekunden); ein Checkpoint bestätigt den Feed-Stand des vorherigen
+_CHECKPOINT_INTERVAL = 10.0
+
+
+class WorkerStatus(BaseModel):
+    """Rolle dieses Worker-Prozesses"""
+    worker_id: str
+    leader: bool
+    leader_id: str
+    published_total: int
+    applied_total: int
+
+
+class ChangeFeed:
+    """
+    Gemeinsamer Change-Feed aller Worker-Prozesse: ein Record pro Änderung
+    ({"w": Worker, "op": "put", "doc": {...}} bzw. {"w": ..., "op": "del", "id": ...}).
+    Überschreitet die Datei max_bytes, wird sie nach changes.jsonl.1 rotiert;
+    Leser lesen die alte Datei noch zu Ende (siehe FileTail).
+    
+    Checkpoints (changes.checkpoints.json): jeder Worker trägt ein, bis zu welchem
+    Offset seine eigenen Records im Metadaten-Backend stehen. Ein neu startender
+    Worker liest erst ab dem kleinsten Eintrag statt die ganze Datei erneut
+    anzuwenden; stehen alle Records im Backend, wird schon ab compact_bytes rotiert.
+    Beendete Worker tragen sich aus, abgestürzte bleiben bis zur nächsten Rotation stehen.
+    """
+    
+    FILENAME = "changes.jsonl"
+    CHECKPOINTS = "changes.checkpoints.json"
+    
+    def __init__(self, directory: Path, max_bytes: int = 16 * 1024 * 1024, compact_bytes: int = 1024 * 1024):
+        directory.mkdir(parents=True, exist_ok=True)
+        self.path = directory / self.FILENAME
+        self.rotated_path = directory / f"{self.FILENAME}.1"
+        self.checkpoints_path = directory / self.CHECKPOINTS
+        self.max_bytes = max_bytes
+        self.compact_bytes = compact_bytes
+        self._file = SharedAppendFile(self.path)
+        self._tail: Optional[FileTail] = None
+        self._pending: List[bytes] = []
+    
+    def open(self, worker_id: str) -> None:
+        """
+        Vor dem Laden des Archivs aufrufen: read() liefert danach alle Records,
+        deren Schreiben ins Metadaten-Backend beim Laden noch ausstehen kann -
+        ab dem kleinsten Checkpoint, nach einer Rotation auch den Rest der alten Datei
+        """
+        with self._file.lock:
+            inode, size = self._file.position_locked()
+            rotated_inode = self._rotated_inode()
+            checkpoints = self._read_checkpoints(inode, rotated_inode)
+            if checkpoints is None:
+                checkpoints, start = {}, 0
+            else:
+                current = [entry["offset"] for entry in checkpoints.values() if entry["inode"] == inode]
+                rotated = [entry["offset"] for entry in checkpoints.values() if entry["inode"] != inode]
+                start = 0 if rotated else min(current, default=size)
+                if rotated:
+                    self._pending = self._read_rotated(min(rotated))
+            checkpoints[worker_id] = {"inode": inode, "offset": size}
+            self._write_checkpoints(checkpoints)
+            self._tail = FileTail(self.path, start=start)
+        if size:
+            logger.info(f"Change-Feed: {len(self._pending)} Records aus {self.rotated_path.name}, {self.FILENAME} ab Offset {start} von {size} Bytes")
+    
+    def _rotated_inode(self) -> Optional[int]:
+        try:
+            return os.stat(self.rotated_path).st_ino
+        except FileNotFoundError:
+            return None
+    
+    def _read_rotated(self, offset: int) -> List[bytes]:
+        """Vollständige Zeilen der rotierten Datei ab offset (der Lock wird gehalten, sie ändert sich nicht mehr)"""
+        with open(self.rotated_path, "rb") as rotated:
+            rotated.seek(offset)
+            *complete, _ = rotated.read().split(b"\n")
+        return [line for line in complete if line]
+    
+    def _read_checkpoints(self, inode: int, rotated_inode: Optional[int]) -> Optional[Dict[str, Dict[str, int]]]:
+        """
+        Einträge zur aktuellen und zur rotierten Datei; ältere gehören zu
+        abgestürzten Workern, deren Records nicht mehr im Feed stehen.
+        None, wenn die Datei defekt ist.
+        """
+        try:
+            checkpoints = json.loads(self.checkpoints_path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return {}
+        except ValueError:
+            logger.warning(f"{self.checkpoints_path} defekt, Change-Feed wird vollständig gelesen")
+            return None
+        return {
+            worker_id: entry for worker_id, entry in checkpoints.items()
+            if entry["inode"] in (inode, rotated_inode)
+        }
+    
+    def _write_checkpoints(self, checkpoints: Dict[str, Dict[str, int]]) -> None:
+        tmp_path = self.checkpoints_path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(checkpoints), encoding="utf-8")
+        os.replace(tmp_path, self.checkpoints_path)
+    
+    def position(self) -> Tuple[int, int]:
+        """(Inode, Größe) der aktuellen Datei"""
+        with self._file.lock:
+            return self._file.position_locked()
+    
+    def checkpoint(self, worker_id: str, inode: int, offset: int) -> None:
+        """
+        Alle eigenen Records vor offset stehen im Metadaten-Backend. Gilt das für
+        alle eingetragenen Worker und die ganze Datei, wird sie rotiert.
+        """
+        with self._file.lock:
+            current_inode, size = self._file.position_locked()
+            checkpoints = self._read_checkpoints(current_inode, self._rotated_inode()) or {}
+            checkpoints[worker_id] = {"inode": inode, "offset": offset}
+            self._write_checkpoints(checkpoints)
+            if size >= self.compact_bytes and all(
+                entry["inode"] == current_inode and entry["offset"] >= size for entry in checkpoints.values()
+            ):
+                self._rotate(size)
+    
+    def release(self, worker_id: str) -> None:
+        """Beim Beenden: alle eigenen Records stehen im Metadaten-Backend"""
+        with self._file.lock:
+            inode, _ = self._file.position_locked()
+            checkpoints = self._read_checkpoints(inode, self._rotated_inode()) or {}
+            checkpoints.pop(worker_id, None)
+            self._write_checkpoints(checkpoints)
+    
+    def publish_many(self, records: List[Dict]) -> None:
+        """Hängt alle Records mit einem Schreibvorgang unter einem Lock an"""
+        data = b"".join(json.dumps(record, ensure_ascii=False).encode("utf-8") + b"\n" for record in records)
+        with self._file.lock:
+            size = self._file.append_locked(data)
+            if size >= self.max_bytes:
+                self._rotate(size)
+    
+    def _rotate(self, size: int) -> None:
+        os.replace(self.path, self.rotated_path)
+        logger.info(f"Change-Feed rotiert ({size} Bytes)")
+    
+    def read(self) -> List[Dict]:
+        """Seit dem letzten Aufruf veröffentlichte Records (aller Prozesse) in Feed-Reihenfolge"""
+        if self._tail is None:
+            return []
+        lines, self._pending = self._pending + self._tail.read_lines(), []
+        records = []
+        for line in lines:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                logger.warning("Überspringe defekten Change-Feed-Record")
+        return records
+    
+    def close(self) -> None:
+        if self._tail is not None:
+            self._tail.close()
+            self._tail = None
+        self._file.close()
+
+
+class _SharedLock:
+    """
+    Lock über alle Worker-Prozesse. Beim Holen werden die Änderungen der anderen
+    Prozesse übernommen, beim Freigeben die eigenen veröffentlicht - wer den Lock
+    danach hält, sieht so alles, was unter ihm geändert wurde. Als Ingest-Lock
+    kennt find_by_hash damit auch gerade in anderen Prozessen ingestierte
+    Documents, als Versions-Lock prüft und erhöht update() die Version gegen
+    den Stand aller Prozesse.
+    """
+    
+    def __init__(self, coordinator: "WorkerCoordinator", path: Path):
+        self._coordinator = coordinator
+        self._lock = FileLock(path)
+    
+    def __enter__(self) -> None:
+        self._lock.acquire()
+        try:
+            self._coordinator.catch_up()
+        except BaseException:
+            self._lock.release()
+            raise
+    
+    def __exit__(self, *exc_info) -> None:
+        try:
+            self._coordinator.flush()
+        finally:
+            self._lock.release()
+    
+    def close(self) -> None:
+        self._lock.close()
+
+
+class WorkerCoordinator:
+    """
+    Stimmt die Worker-Prozesse eines Archivs ab: Leader-Wahl per flock und
+    Abgleich der Collections über den Change-Feed.
+    Reihenfolge beim Start: open() vor dem Laden, try_lead(), nach dem Laden
+    start() (Abgleich im Hintergrund-Thread alle poll_interval Sekunden).
+    Eigene Änderungen sammelt der Change-Listener nur ein; ein Publisher-Thread
+    fasst sie zusammen (ein Record je Document) und hängt sie gemeinsam an.
+    Versionen: update() der Collection prüft und erhöht die Version unter
+    version_lock, also gegen den Stand aller Prozesse - zwei Prozesse können
+    nicht beide dieselbe Version akzeptieren (If-Match) oder vergeben.
+    Konflikte bei Änderungen ohne neue Version (apply, z.B. saved_as nach dem
+    Speichern): gewinnt in allen Prozessen der spätere Record im Feed; ein
+    Prozess, dessen eigener Stand dabei verliert, schreibt den gewinnenden
+    Stand erneut ins Backend.
+    """
+    
+    def __init__(self, directory: Path, poll_interval: float = 0.1, leader_retry_interval: float = 2.0):
+        self.directory = directory
+        self.poll_interval = poll_interval
+        self.leader_retry_interval = leader_retry_interval
+        self.worker_id = f"{os.getpid()}-{secrets.token_hex(3)}"
+        self.feed = ChangeFeed(directory)
+        self.ingest_lock = _SharedLock(self, directory / "ingest.lock")
+        self.version_lock = _SharedLock(self, directory / "version.lock")
+        self._leader_lock = FileLock(directory / "leader.lock")
+        self.is_leader = False
+        self.collection: Optional[DocumentCollection] = None
+        self.storage: Optional[LocalStorageService] = None
+        # Eigene veröffentlichte, aber noch nicht zurückgelesene Records je Document
+        self._unread_own: Dict[UUID, int] = {}
+        self._own_writes: Dict[UUID, float] = {}
+        self._pruned_at = time.monotonic()
+        self._own_lock = threading.Lock()
+        self._apply_lock = threading.Lock()
+        self._applying = threading.local()
+        self._synced = False
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        # Noch nicht veröffentlichte eigene Änderungen in Reihenfolge
+        self._outbox: List[Tuple[str, Document]] = []
+        self._outbox_condition = threading.Condition()
+        # Hält, wer eine Charge aus der Outbox entnommen hat, bis sie im Feed steht
+        self._publish_lock = threading.Lock()
+        self._publisher: Optional[threading.Thread] = None
+        # Feed-Stand des letzten Checkpoints, bestätigt beim nächsten
+        self._checkpoint_position: Optional[Tuple[int, int]] = None
+        self._checkpoint_at = time.monotonic()
+        self.published_total = 0
+        self.applied_total = 0
+    
+    def attach(self, collection: DocumentCollection, storage: LocalStorageService) -> None:
+        """Veröffentlicht ab jetzt alle Änderungen der Collection"""
+        self.collection = collection
+        self.storage = storage
+        collection.change_listeners.append(self.publish_change)
+    
+    def open(self) -> None:
+        """Vor dem Laden des Archivs aufrufen (siehe ChangeFeed.open)"""
+        self.feed.open(self.worker_id)
+        self._publisher = threading.Thread(target=self._publish_loop, name="worker-publish", daemon=True)
+        self._publisher.start()
+    
+    def try_lead(self) -> bool:
+        """Versucht, Leader zu werden (nicht blockierend)"""
+        if not self.is_leader and self._leader_lock.acquire(blocking=False):
+            self._leader_lock.write_owner(self.worker_id)
+            self.is_leader = True
+            logger.info(f"Worker {self.worker_id} ist Leader (Ingest, Inbox-Watcher, Extraktion)")
+        return self.is_leader
+    
+    async def wait_for_leadership(
+        self,
+        on_elected: Callable[[], None],
+        wait_for: Optional[Awaitable] = None
+    ) -> None:
+        """Wartet, bis der bisherige Leader endet, und ruft dann on_elected auf"""
+        if wait_for is not None:
+            await wait_for
+        while not self.try_lead():
+            await asyncio.sleep(self.leader_retry_interval)
+        on_elected()
+    
+    async def start(self, wait_for: Optional[Awaitable] = None) -> None:
+        """Startet den Abgleich, sobald das Archiv geladen ist"""
+        if wait_for is not None:
+            await wait_for
+        await asyncio.to_thread(self.catch_up, True)
+        self._thread = threading.Thread(target=self._run, name="worker-sync", daemon=True)
+        self._thread.start()
+        logger.info(f"Worker {self.worker_id}: Abgleich über {self.feed.path} gestartet")
+    
+    def _run(self) -> None:
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.catch_up()
+            except Exception:
+                logger.exception("Abgleich mit anderen Worker-Prozessen fehlgeschlagen")
+            if time.monotonic() - self._checkpoint_at >= _CHECKPOINT_INTERVAL:
+                try:
+                    self.checkpoint()
+                except Exception:
+                    logger.exception("Change-Feed-Checkpoint fehlgeschlagen")
+    
+    def checkpoint(self) -> None:
+        """
+        Bestätigt den beim vorherigen Aufruf gemerkten Feed-Stand: die Metadaten
+        eigener Records davor werden direkt nach dem Veröffentlichen geschrieben und
+        sind spätestens mit diesem sync() im Backend
+        """
+        self._checkpoint_at = time.monotonic()
+        confirmed, self._checkpoint_position = self._checkpoint_position, self.feed.position()
+        if confirmed is None:
+            return
+        self.storage.metadata_store.sync()
+        self.feed.checkpoint(self.worker_id, *confirmed)
+    
+    def publish_change(
+        self,
+        change: str,
+        document: Document,
+        fields: Tuple[str, ...] = (),
+        previous: Optional[Dict[str, Any]] = None
+    ) -> None:
+        """
+        Change-Listener der Collection (läuft unter deren Lock): merkt die Änderung
+        für den Publisher-Thread vor. Bis ihr Record im Feed steht, gilt sie als
+        ungelesen - Records anderer Prozesse für das Document werden so lange übergangen.
+        """
+        if getattr(self._applying, "active", False):
+            return
+        with self._own_lock:
+            self._unread_own[document.id] = self._unread_own.get(document.id, 0) + 1
+            self._own_writes[document.id] = time.monotonic()
+        with self._outbox_condition:
+            self._outbox.append((change, document))
+            self._outbox_condition.notify()
+    
+    def _publish_loop(self) -> None:
+        while True:
+            with self._outbox_condition:
+                self._outbox_condition.wait_for(lambda: self._outbox or self._stop.is_set())
+            with self._publish_lock:
+                with self._outbox_condition:
+                    batch, self._outbox = self._outbox, []
+                if batch:
+                    self._publish(batch)
+            if not batch and self._stop.is_set():
+                return
+    
+    def flush(self) -> None:
+        """Veröffentlicht alle bisher eingesammelten eigenen Änderungen sofort (im aufrufenden Thread)"""
+        with self._publish_lock:
+            with self._outbox_condition:
+                batch, self._outbox = self._outbox, []
+            if batch:
+                self._publish(batch)
+    
+    def _publish(self, batch: List[Tuple[str, Document]]) -> None:
+        """
+        Ein Record je Document mit dessen aktuellem Stand, in der Reihenfolge der
+        jeweils letzten Änderung. Wird ein Document währenddessen weiter geändert,
+        folgt dafür ohnehin ein eigener Record.
+        """
+        latest: Dict[UUID, Tuple[str, Document]] = {}
+        for change, document in batch:
+            if latest.pop(document.id, None) is not None:
+                # Zusammengefasst: ein Record weniger zurückzulesen
+                self._read_own(document.id)
+            latest[document.id] = (change, document)
+        records = [
+            {"w": self.worker_id, "op": "del", "id": str(document.id)} if change == "removed"
+            else {"w": self.worker_id, "op": "put", "doc": document.model_dump(mode="json")}
+            for change, document in latest.values()
+        ]
+        try:
+            self.feed.publish_many(records)
+            self.published_total += len(records)
+        except Exception as e:
+            for document_id in latest:
+                self._read_own(document_id)
+            logger.error(f"{len(records)} Änderungen nicht im Change-Feed veröffentlicht: {e}")
+    
+    def _read_own(self, document_id: UUID) -> None:
+        with self._own_lock:
+            remaining = self._unread_own.get(document_id, 0) - 1
+            if remaining > 0:
+                self._unread_own[document_id] = remaining
+            else:
+                self._unread_own.pop(document_id, None)
+    
+    def catch_up(self, initial: bool = False) -> int:
+        """Übernimmt alle seither veröffentlichten Änderungen anderer Prozesse, gibt deren Anzahl zurück"""
+        if not (self._synced or initial):
+            # Vor dem Laden würde add_many die übernommenen Stände überschreiben
+            return 0
+        applied = 0
+        with self._apply_lock:
+            self._synced = True
+            for record in self.feed.read():
+                try:
+                    applied += self._apply(record)
+                except Exception as e:
+                    logger.error(f"Change-Feed-Record nicht übernommen: {e}")
+            self._prune_own_writes()
+        if applied and initial:
+            logger.info(f"{applied} Änderungen anderer Worker-Prozesse nach dem Laden übernommen")
+        return applied
+    
+    def _apply(self, record: Dict) -> int:
+        document_id = UUID(record["doc"]["id"] if record["op"] == "put" else record["id"])
+        if record.get("w") == self.worker_id:
+            self._read_own(document_id)
+            return 0
+        with self._own_lock:
+            if self._unread_own.get(document_id):
+                # Ein eigener, späterer Record für dieses Document folgt noch im Feed
+                return 0
+            rewrite = time.monotonic() - self._own_writes.get(document_id, -_OWN_WRITE_WINDOW) < _OWN_WRITE_WINDOW
+        
+        self._applying.active = True
+        try:
+            if record["op"] == "del":
+                return int(self.collection.remove(document_id))
+            return self._apply_document(Document.model_validate(record["doc"]), rewrite)
+        finally:
+            self._applying.active = False
+    
+    def _apply_document(self, incoming: Document, rewrite: bool) -> int:
+        existing = self.collection.get(incoming.id)
+        if existing is None:
+            try:
+                self.collection.add(incoming)
+            except ValueError:
+                return 0
+            self.applied_total += 1
+            return 1
+        
+        changes = {
+            name: getattr(incoming, name) for name in Document.model_fields
+            if getattr(incoming, name) != getattr(existing, name)
+        }
+        if not changes:
+            return 0
+        previous_output = existing.current_filename if existing.is_saved else None
+        self.collection.apply(existing, changes)
+        
+        # Namensindex von data_out: der andere Prozess hat die alte Ausgabe gelöscht
+        if previous_output is not None and previous_output != existing.current_filename:
+            self.storage.output_names.release(previous_output)
+        if existing.is_saved:
+            self.storage.output_names.mark_used(existing.current_filename)
+        if rewrite:
+            # Eigener (verlorener) Stand könnte noch verzögert geschrieben werden - gewinnender Stand zuletzt
+            self.storage.metadata_store.put(existing)
+        self.applied_total += 1
+        return 1
+    
+    def _prune_own_writes(self) -> None:
+        now = time.monotonic()
+        if now - self._pruned_at < _OWN_WRITE_WINDOW:
+            return
+        self._pruned_at = now
+        horizon = now - _OWN_WRITE_WINDOW
+        with self._own_lock:
+            self._own_writes = {key: value for key, value in self._own_writes.items() if value >= horizon}
+    
+    def status(self) -> WorkerStatus:
+        return WorkerStatus(
+            worker_id=self.worker_id,
+            leader=self.is_leader,
+            leader_id=self.worker_id if self.is_leader else self._leader_lock.read_owner(),
+            published_total=self.published_total,
+            applied_total=self.applied_total
+        )
+    
+    def close(self) -> None:
+        """
+        Beendet den Abgleich, veröffentlicht ausstehende Änderungen und gibt den
+        Leader-Lock frei. Erst nach dem Schließen des Metadaten-Backends aufrufen:
+        danach stehen alle eigenen Records dort und der Checkpoint wird ausgetragen.
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._publisher is not None:
+            with self._outbox_condition:
+                self._outbox_condition.notify()
+            self._publisher.join()
+            self._publisher = None
+            try:
+                self.feed.release(self.worker_id)
+            except OSError as e:
+                logger.warning(f"Change-Feed-Checkpoint nicht ausgetragen: {e}")
+        self.feed.close()
+        self.ingest_lock.close()
+        self.version_lock.close()
+        if self.is_leader:
+            self._leader_lock.release()
+            self.is_leader = False
+        self._leader_lock.close()
\ No newline at end of file
@@ -0,0 +1 @@
+"""Kommandozeilen-Werkzeuge (python -m app.tools.<name>)"""
\ No newline at end of file
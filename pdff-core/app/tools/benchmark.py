@@ -0,0 +1,426 @@
+"""
+Benchmarks für Kaltstart, Navigation, Dokumentliste, Dateinamen-Preview,
+Bulk-PATCH, Speichern und Speicherbedarf auf einem synthetischen Archiv.
+
+Die Anwendung läuft im selben Prozess (ASGI über den TestClient, ohne
+Netzwerk) - gemessen wird also inklusive Routing und Serialisierung, aber mit
+konstantem Overhead des Clients. Ergebnisse sind flache Kennzahlen als JSON;
+compare (bzw. run --baseline) schlägt fehl, wenn eine Kennzahl die Baseline
+um mehr als --margin verschlechtert.
+
+Das Archiv wird verändert (PATCH, Speichern) - ohne --workdir wird deshalb
+für jeden Lauf ein frisches Korpus in einem temporären Verzeichnis erzeugt.
+Gemessen wird in einem eigenen Interpreter, damit Importzeit, Kaltstart und
+Speicherbedarf nicht von der Korpus-Erzeugung beeinflusst werden.
+
+Beispiele:
+    python -m app.tools.benchmark run --count 100k --output baseline.json
+    python -m app.tools.benchmark run --count 100k --baseline baseline.json --margin 0.25
+    python -m app.tools.benchmark compare baseline.json result.json
+"""
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+import argparse
+import json
+import logging
+import math
+import os
+import platform
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+logger = logging.getLogger(__name__)
+
+RESULT_SCHEMA = 1
+
+# Projektverzeichnis (für python -m im Mess-Prozess)
+_PROJECT_DIR = Path(__file__).resolve().parents[2]
+
+# Kennzahlen mit diesen Endungen: größer ist besser, alle anderen (Zeiten, Speicher): kleiner ist besser
+HIGHER_IS_BETTER = ("_per_second",)
+
+
+def percentile(samples: List[float], fraction: float) -> float:
+    """Nearest-Rank-Perzentil"""
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+def summarize(name: str, samples: List[float]) -> Dict[str, float]:
+    """Latenzen (Sekunden) als p50/p95/max in Millisekunden und Durchsatz"""
+    total = sum(samples)
+    return {
+        f"{name}_p50_ms": round(percentile(samples, 0.5) * 1000, 3),
+        f"{name}_p95_ms": round(percentile(samples, 0.95) * 1000, 3),
+        f"{name}_max_ms": round(max(samples) * 1000, 3),
+        f"{name}_per_second": round(len(samples) / total, 1) if total else 0.0,
+    }
+
+
+def rss_mb() -> Optional[float]:
+    """Aktueller Resident Set Size (nur Linux), sonst None"""
+    try:
+        with open("/proc/self/statm") as statm:
+            pages = int(statm.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+    return round(pages * os.sysconf("SC_PAGE_SIZE") / 2 ** 20, 1)
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss: Linux in KiB, macOS in Bytes
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (2 ** 20 if sys.platform == "darwin" else 2 ** 10), 1)
+
+
+def timed(samples: List[float], call: Callable[[], object]) -> object:
+    started = time.perf_counter()
+    result = call()
+    samples.append(time.perf_counter() - started)
+    return result
+
+
+def configure_environment(workdir: Path, backend: str) -> None:
+    """Einstellungen für den Lauf; muss vor dem ersten Import von app.config passieren"""
+    os.environ["PDFF_DATA_IN"] = str(workdir / "in")
+    os.environ["PDFF_DATA_ARCHIVE"] = str(workdir / "archive")
+    os.environ["PDFF_DATA_OUT"] = str(workdir / "out")
+    os.environ["PDFF_METADATA_BACKEND"] = backend
+    os.environ["PDFF_STARTUP_MODE"] = "blocking"
+    # Hintergrunddienste, die die Messung verfälschen würden (explizit gesetzte Werte gelten)
+    for name, value in (
+        ("INBOX_WATCH", "false"),
+        ("EXTRACTION_PROVIDER", "none"),
+        ("CONTENT_HASH_BACKFILL", "false"),
+        ("THUMBNAILS", "false"),
+        ("LOG_LEVEL", "WARNING"),
+    ):
+        os.environ.setdefault(f"PDFF_{name}", value)
+
+
+def run_benchmarks(workdir: Path, backend: str, requests: int, pages: int, bulk_size: int, bulk_rounds: int, saves: int, seed: int) -> Dict[str, float]:
+    """Startet die Anwendung auf workdir und misst alle Szenarien"""
+    configure_environment(workdir, backend)
+    metrics: Dict[str, float] = {}
+    rng = random.Random(seed)
+    
+    started = time.perf_counter()
+    from fastapi.testclient import TestClient
+    from app.main import app
+    from app.dependencies import collection, storage, suggestions
+    metrics["import_seconds"] = round(time.perf_counter() - started, 3)
+    
+    client = TestClient(app)
+    started = time.perf_counter()
+    client.__enter__()
+    try:
+        # Blocking-Start: Lifespan kehrt erst nach dem Laden des Archivs zurück
+        metrics["cold_start_seconds"] = round(time.perf_counter() - started, 3)
+        metrics["rss_after_start_mb"] = rss_mb()
+        
+        # Vorschläge werden im Hintergrund aufgebaut und würden die Messungen stören
+        deadline = time.monotonic() + 1800
+        while not suggestions.ready:
+            if time.monotonic() > deadline:
+                raise RuntimeError("Eingabevorschläge nach 30 Minuten nicht aufgebaut")
+            time.sleep(0.05)
+        metrics["suggestions_ready_seconds"] = round(time.perf_counter() - started, 3)
+        
+        documents = collection.all()
+        if not documents:
+            raise RuntimeError(f"Keine Documents im Archive {workdir / 'archive'}")
+        unprocessed = [doc.id for doc in documents if not doc.is_complete] or [doc.id for doc in documents]
+        complete = [doc.id for doc in documents if doc.is_complete]
+        sample = [doc.id for doc in rng.sample(documents, min(requests, len(documents)))]
+        del documents
+        
+        metrics.update(_bench_navigation(client, rng, unprocessed, requests))
+        metrics.update(_bench_listing(client, pages))
+        metrics.update(_bench_preview(client, sample))
+        metrics.update(_bench_bulk_patch(client, rng, sample, complete, bulk_size, bulk_rounds))
+        metrics.update(_bench_save(client, rng, complete, saves, bulk_size))
+        
+        # Ausstehende Metadaten schreiben zählt zum Speichern dazu
+        started = time.perf_counter()
+        storage.metadata_store.sync()
+        metrics["metadata_flush_seconds"] = round(time.perf_counter() - started, 3)
+        metrics["rss_end_mb"] = rss_mb()
+    finally:
+        client.__exit__(None, None, None)
+    
+    metrics["rss_peak_mb"] = peak_rss_mb()
+    return {name: value for name, value in metrics.items() if value is not None}
+
+
+def _check(response, name: str) -> None:
+    if response.status_code >= 400:
+        raise RuntimeError(f"{name}: HTTP {response.status_code} {response.text[:200]}")
+
+
+def _bench_navigation(client, rng: random.Random, ids: List, requests: int) -> Dict[str, float]:
+    samples: List[float] = []
+    for _ in range(requests):
+        document_id = rng.choice(ids)
+        response = timed(samples, lambda: client.get(f"/api/v1/documents/{document_id}/navigation", params={"filter": "unprocessed"}))
+        _check(response, "navigation")
+    return summarize("navigation", samples)
+
+
+def _bench_listing(client, pages: int) -> Dict[str, float]:
+    first: List[float] = []
+    walk: List[float] = []
+    filtered: List[float] = []
+    for _ in range(max(1, pages // 2)):
+        _check(timed(first, lambda: client.get("/api/v1/documents", params={"limit": 100})), "list")
+        _check(timed(filtered, lambda: client.get("/api/v1/documents", params={"limit": 100, "unprocessed": "true"})), "list filtered")
+    
+    # Cursor-Paginierung über mehrere Seiten (tiefe Seiten dürfen nicht langsamer werden)
+    cursor = None
+    for _ in range(pages):
+        params = {"limit": 100, "fields": "original_filename,correspondent,document_type"}
+        if cursor:
+            params["cursor"] = cursor
+        response = timed(walk, lambda: client.get("/api/v1/documents", params=params))
+        _check(response, "list walk")
+        cursor = response.json()["next_cursor"]
+        if cursor is None:
+            break
+    
+    return {**summarize("list_first_page", first), **summarize("list_filtered", filtered), **summarize("list_walk_page", walk)}
+
+
+def _bench_preview(client, ids: List) -> Dict[str, float]:
+    samples: List[float] = []
+    for document_id in ids:
+        response = timed(samples, lambda: client.post(f"/api/v1/documents/{document_id}/preview-filename", json={"topic": "Benchmark"}))
+        _check(response, "preview")
+    return summarize("preview_filename", samples)
+
+
+def _bench_bulk_patch(client, rng: random.Random, sample: List, complete: List, size: int, rounds: int) -> Dict[str, float]:
+    samples: List[float] = []
+    pool = complete or sample
+    for number in range(rounds):
+        ids = [str(document_id) for document_id in rng.sample(pool, min(size, len(pool)))]
+        body = {"ids": ids, "update": {"topic": f"Benchmark {number}"}}
+        _check(timed(samples, lambda: client.patch("/api/v1/documents/bulk", json=body)), "bulk patch")
+    documents = min(size, len(pool)) * rounds
+    return {
+        "bulk_patch_p50_ms": round(percentile(samples, 0.5) * 1000, 3),
+        "bulk_patch_max_ms": round(max(samples) * 1000, 3),
+        "bulk_patch_documents_per_second": round(documents / sum(samples), 1),
+    }
+
+
+def _bench_save(client, rng: random.Random, complete: List, saves: int, bulk_size: int) -> Dict[str, float]:
+    if not complete or saves <= 0:
+        return {}
+    shuffled = rng.sample(complete, len(complete))
+    single, bulk = shuffled[:saves], shuffled[saves:saves + bulk_size]
+    
+    samples: List[float] = []
+    for document_id in single:
+        _check(timed(samples, lambda: client.post(f"/api/v1/documents/{document_id}/save")), "save")
+    metrics = summarize("save", samples)
+    
+    if bulk:
+        started = time.perf_counter()
+        response = client.post("/api/v1/documents/bulk/save", json={"ids": [str(document_id) for document_id in bulk]})
+        _check(response, "bulk save")
+        metrics["bulk_save_documents_per_second"] = round(len(bulk) / (time.perf_counter() - started), 1)
+    return metrics
+
+
+def compare(baseline: Dict, current: Dict, margin: float, noise_ms: float) -> Tuple[List[str], List[str]]:
+    """
+    Vergleicht die Kennzahlen, gibt (Regressionen, Berichtszeilen) zurück.
+    Latenzen, die sich um weniger als noise_ms ändern, gelten nicht als Regression.
+    """
+    regressions: List[str] = []
+    lines: List[str] = []
+    base_metrics, current_metrics = baseline["metrics"], current["metrics"]
+    for name in sorted(base_metrics):
+        if name not in current_metrics:
+            lines.append(f"  {name:<40} {base_metrics[name]:>12} {'-':>12}   fehlt")
+            continue
+        base, value = base_metrics[name], current_metrics[name]
+        higher_is_better = name.endswith(HIGHER_IS_BETTER)
+        if higher_is_better:
+            regressed = value < base * (1 - margin)
+        else:
+            regressed = value > base * (1 + margin)
+            if name.endswith("_ms") and value - base < noise_ms:
+                regressed = False
+        change = f"{(value - base) / base * 100:+.1f}%" if base else "-"
+        marker = "REGRESSION" if regressed else ""
+        lines.append(f"  {name:<40} {base:>12} {value:>12} {change:>8} {marker}")
+        if regressed:
+            regressions.append(name)
+    return regressions, lines
+
+
+def _report_comparison(baseline_path: Path, current: Dict, margin: float, noise_ms: float) -> int:
+    baseline = json.loads(baseline_path.read_text())
+    if baseline.get("schema") != RESULT_SCHEMA:
+        logger.error(f"Baseline {baseline_path} hat ein anderes Format (schema {baseline.get('schema')})")
+        return 2
+    for key in ("count", "backend", "collection_store"):
+        if baseline["meta"].get(key) != current["meta"].get(key):
+            logger.warning(f"Baseline und Lauf unterscheiden sich in {key}: {baseline['meta'].get(key)} != {current['meta'].get(key)}")
+    
+    regressions, lines = compare(baseline, current, margin, noise_ms)
+    print(f"Vergleich mit {baseline_path} (Toleranz {margin:.0%}, Rauschen < {noise_ms} ms ignoriert):")
+    print("\n".join(lines))
+    if regressions:
+        print(f"{len(regressions)} Regression(en): {', '.join(regressions)}")
+        return 1
+    print("Keine Regressionen")
+    return 0
+
+
+def measure_in_subprocess(workdir: Path, backend: str, args: argparse.Namespace) -> Dict[str, float]:
+    """Führt run_benchmarks in einem frischen Interpreter aus und liest die Kennzahlen aus einer Datei"""
+    metrics_path = workdir / "benchmark-metrics.json"
+    metrics_path.unlink(missing_ok=True)
+    command = [
+        sys.executable, "-m", "app.tools.benchmark", "measure", str(workdir), str(metrics_path),
+        "--backend", backend,
+        "--seed", str(args.seed),
+        "--requests", str(args.requests),
+        "--pages", str(args.pages),
+        "--bulk-size", str(args.bulk_size),
+        "--bulk-rounds", str(args.bulk_rounds),
+        "--saves", str(args.saves),
+    ]
+    # Ausgaben der Anwendung nach stderr, stdout gehört dem Ergebnis
+    process = subprocess.run(command, cwd=_PROJECT_DIR, stdout=sys.stderr)
+    if process.returncode != 0:
+        raise RuntimeError(f"Mess-Prozess mit Exit-Code {process.returncode} beendet")
+    try:
+        return json.loads(metrics_path.read_text())
+    finally:
+        metrics_path.unlink(missing_ok=True)
+
+
+def _add_scenario_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--requests", type=int, default=200, help="Anfragen je Latenz-Szenario")
+    parser.add_argument("--pages", type=int, default=20, help="Seiten für die Cursor-Paginierung")
+    parser.add_argument("--bulk-size", type=int, default=500, help="Documents je Bulk-PATCH bzw. Bulk-Save")
+    parser.add_argument("--bulk-rounds", type=int, default=5)
+    parser.add_argument("--saves", type=int, default=100, help="Einzelne Save-Requests (0: Speichern nicht messen)")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.tools.benchmark")
+    commands = parser.add_subparsers(dest="command", required=True)
+    
+    run = commands.add_parser("run", help="Benchmarks ausführen")
+    run.add_argument("--workdir", type=Path, default=None,
+                     help="Vorhandenes Korpus (python -m app.tools.corpus) oder Ziel für ein neues; wird verändert")
+    run.add_argument("--count", default="10k", help="Größe eines neu erzeugten Korpus, z.B. 1k, 100k, 1M")
+    run.add_argument("--backend", choices=["json", "journal"], default="json")
+    run.add_argument("--pdfs", choices=["unique", "link", "none"], default="unique")
+    run.add_argument("--layout", default="flat", help="Archive-Layout eines neu erzeugten Korpus: flat, sharded oder sharded:N")
+    _add_scenario_arguments(run)
+    run.add_argument("--output", type=Path, default=None, help="Ergebnis-JSON (Standard: stdout)")
+    run.add_argument("--baseline", type=Path, default=None, help="Mit dieser Baseline vergleichen (Exit-Code 1 bei Regression)")
+    run.add_argument("--margin", type=float, default=0.2, help="Erlaubte Verschlechterung, relativ (0.2 = 20%%)")
+    run.add_argument("--noise-ms", type=float, default=0.5, help="Kleinere Latenz-Änderungen ignorieren")
+    run.add_argument("--keep", action="store_true", help="Temporäres Korpus nicht löschen")
+    
+    comparison = commands.add_parser("compare", help="Zwei Ergebnis-Dateien vergleichen")
+    comparison.add_argument("baseline", type=Path)
+    comparison.add_argument("result", type=Path)
+    comparison.add_argument("--margin", type=float, default=0.2)
+    comparison.add_argument("--noise-ms", type=float, default=0.5)
+    
+    # Intern: Messung im eigenen Prozess, Kennzahlen als JSON-Datei
+    measure = commands.add_parser("measure")
+    measure.add_argument("workdir", type=Path)
+    measure.add_argument("metrics_file", type=Path)
+    measure.add_argument("--backend", choices=["json", "journal"], default="json")
+    _add_scenario_arguments(measure)
+    
+    args = parser.parse_args(argv)
+    # Nur die eigenen Meldungen auf INFO, die Anwendung bleibt auf WARNING
+    logging.basicConfig(level=logging.WARNING, format="%(levelname)s - %(message)s", stream=sys.stderr)
+    logging.getLogger("app.tools").setLevel(logging.INFO)
+    
+    if args.command == "compare":
+        return _report_comparison(args.baseline, json.loads(args.result.read_text()), args.margin, args.noise_ms)
+    
+    if args.command == "measure":
+        metrics = run_benchmarks(
+            args.workdir,
+            args.backend,
+            requests=args.requests,
+            pages=args.pages,
+            bulk_size=args.bulk_size,
+            bulk_rounds=args.bulk_rounds,
+            saves=args.saves,
+            seed=args.seed
+        )
+        args.metrics_file.write_text(json.dumps(metrics))
+        return 0
+    
+    from app.tools.corpus import generate_corpus, load_manifest, parse_count
+    try:
+        count = parse_count(args.count)
+    except argparse.ArgumentTypeError as e:
+        parser.error(str(e))
+    
+    temporary = args.workdir is None
+    workdir = args.workdir or Path(tempfile.mkdtemp(prefix="pdff-bench-"))
+    try:
+        manifest = load_manifest(workdir)
+        if manifest is None:
+            logger.info(f"Erzeuge Korpus mit {count} Documents in {workdir}")
+            manifest = generate_corpus(workdir, count, seed=args.seed, backend=args.backend, pdfs=args.pdfs, layout=args.layout)
+        if manifest.pdfs == "none" and args.saves > 0:
+            # Ohne PDFs im Archiv schlägt jedes Speichern mit 404 fehl
+            logger.warning("Korpus ohne PDFs: Speichern wird nicht gemessen")
+            args.saves = 0
+        logger.info(f"Messe auf {manifest.count} Documents ({manifest.backend}, {manifest.layout})")
+        # Der Mess-Prozess erbt das Layout des Korpus
+        os.environ["PDFF_ARCHIVE_LAYOUT"] = manifest.layout
+        metrics = measure_in_subprocess(workdir, manifest.backend, args)
+    finally:
+        if temporary and not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+    
+    result = {
+        "schema": RESULT_SCHEMA,
+        "meta": {
+            "count": manifest.count,
+            "backend": manifest.backend,
+            "pdfs": manifest.pdfs,
+            "layout": manifest.layout,
+            "seed": manifest.seed,
+            "collection_store": os.environ.get("PDFF_COLLECTION_STORE", "objects"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        },
+        "metrics": metrics,
+    }
+    output = json.dumps(result, indent=2)
+    if args.output:
+        args.output.write_text(output + "\n")
+        logger.info(f"Ergebnis nach {args.output} geschrieben")
+    else:
+        print(output)
+    
+    if args.baseline:
+        return _report_comparison(args.baseline, result, args.margin, args.noise_ms)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
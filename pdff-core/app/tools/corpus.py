@@ -0,0 +1,360 @@
+"""
+Synthetisches Archiv für Benchmarks: Metadaten mit realistischen Verteilungen
+und winzige Platzhalter-PDFs, geschrieben über das echte Metadaten-Backend.
+
+Gleicher Seed, gleiche Anzahl und gleiche Parameter ergeben dasselbe Archiv
+(IDs, Metadaten, Dateinamen), Baselines bleiben so vergleichbar.
+
+Beispiele:
+    python -m app.tools.corpus /tmp/bench-100k --count 100k
+    python -m app.tools.corpus /tmp/bench-1m --count 1M --backend journal --pdfs link
+"""
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from pydantic import BaseModel, Field
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from uuid import UUID
+import argparse
+import hashlib
+import itertools
+import json
+import logging
+import os
+import random
+import sys
+import time
+from app.models import Document, FieldSource, SavedAs
+from app.services.archive_layout import ArchiveLayout, create_archive_layout
+from app.services.metadata_store import create_metadata_store
+from app.utils.iterables import batched
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = "corpus.json"
+PDF_MODES = ("unique", "link", "none")
+
+# Feste Zeitbasis statt utcnow(), damit Korpora reproduzierbar sind
+_BASE_TIME = datetime(2025, 1, 1, 8, 0, 0)
+
+# Dokumenttyp -> relative Häufigkeit, Themen und Präfix der Dokumentnummer
+_DOCUMENT_TYPES: Dict[str, Tuple[int, Tuple[str, ...], str]] = {
+    "Rechnung": (40, ("Strom", "Gas", "Internet", "Mobilfunk", "Wartung", "Büromaterial", "Hosting"), "RE"),
+    "Kontoauszug": (15, ("Girokonto", "Tagesgeld", "Kreditkarte"), "KA"),
+    "Quittung": (7, ("Tankstelle", "Restaurant", "Baumarkt"), "Q"),
+    "Lohnabrechnung": (6, ("Gehalt", "Sonderzahlung"), "LA"),
+    "Lieferschein": (6, ("Wareneingang", "Rücksendung"), "LS"),
+    "Vertrag": (6, ("Mietvertrag", "Arbeitsvertrag", "Versicherung", "Leasing"), "V"),
+    "Angebot": (5, ("Renovierung", "Software", "Fahrzeug"), "AN"),
+    "Gutschrift": (4, ("Erstattung", "Bonus"), "GS"),
+    "Bescheid": (4, ("Einkommensteuer", "Grundsteuer", "Rente"), "B"),
+    "Mahnung": (3, ("Zahlungserinnerung", "Letzte Mahnung"), "M"),
+    "Versicherungsschein": (3, ("Hausrat", "Kfz", "Haftpflicht"), "VS"),
+    "Kündigung": (1, ("Mobilfunk", "Fitnessstudio", "Zeitschrift"), "K"),
+}
+
+_INSTITUTIONS = (
+    "Stadtwerke München", "Sparkasse", "Volksbank", "Deutsche Telekom", "Vodafone", "Finanzamt",
+    "AOK", "Techniker Krankenkasse", "Allianz", "HUK-Coburg", "Amazon", "Deutsche Bahn",
+    "E.ON", "Vattenfall", "1&1", "ING", "Commerzbank", "Deutsche Rentenversicherung",
+)
+_SURNAMES = (
+    "Müller", "Schmidt", "Schneider", "Fischer", "Weber", "Meyer", "Wagner", "Becker", "Schulz",
+    "Hoffmann", "Schäfer", "Koch", "Bauer", "Richter", "Klein", "Wolf", "Schröder", "Neumann",
+    "Schwarz", "Zimmermann", "Braun", "Krüger", "Hofmann", "Hartmann", "Lange", "Schmitt",
+)
+_TRADES = ("Elektro", "Sanitär", "Dach", "Garten", "Steuerberatung", "Autohaus", "Druckerei", "Reinigung", "IT-Service")
+_LEGAL_FORMS = ("GmbH", "GmbH & Co. KG", "AG", "e.K.", "KG", "")
+# Felder, die die Text-Regeln liefern können (Regelname als detail)
+_TEXT_RULE_FIELDS = {"document_date": "date_label", "document_number": "document_number_label", "customer_id": "customer_id_label"}
+
+
+class CorpusManifest(BaseModel):
+    """Parameter eines erzeugten Korpus (liegt als corpus.json neben dem Archive)"""
+    count: int
+    seed: int
+    backend: str
+    pdfs: str
+    processed: float
+    saved: float
+    correspondents: int
+    layout: str = "flat"
+    duration_seconds: float = 0.0
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+def parse_count(value: str) -> int:
+    """Anzahl mit optionalem Suffix: 1000, 10k, 1M"""
+    value = value.strip().lower().replace("_", "")
+    factor = {"k": 1_000, "m": 1_000_000}.get(value[-1:], 1)
+    number = value[:-1] if factor > 1 else value
+    try:
+        count = int(float(number) * factor)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Ungültige Anzahl: {value}")
+    if count < 1:
+        raise argparse.ArgumentTypeError("Anzahl muss mindestens 1 sein")
+    return count
+
+
+def placeholder_pdf(text: str) -> bytes:
+    """Minimale einseitige PDF (A4) mit einer Textzeile, wenige hundert Bytes"""
+    escaped = text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)").encode("latin-1", "replace")
+    content = b"BT /F1 12 Tf 72 770 Td (" + escaped + b") Tj ET"
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Resources << /Font << /F1 5 0 R >> >> /Contents 4 0 R >>",
+        b"<< /Length %d >>\nstream\n%s\nendstream" % (len(content), content),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    pdf = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(pdf))
+        pdf += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(pdf)
+    pdf += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    pdf += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    pdf += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(pdf)
+
+
+class CorpusGenerator:
+    """
+    Erzeugt deterministische Documents. Verteilungen angelehnt an reale Archive:
+    wenige Korrespondenten stellen die meisten Dokumente (Zipf), Rechnungen und
+    Kontoauszüge dominieren, Daten häufen sich in den letzten Jahren, Original-
+    Dateinamen stammen überwiegend von Scannern und Smartphones.
+    """
+    
+    def __init__(self, seed: int = 1, processed: float = 0.7, saved: float = 0.5, correspondents: Optional[int] = None, count: int = 1000):
+        self.rng = random.Random(seed)
+        self.processed = processed
+        self.saved = saved
+        size = correspondents or max(50, min(20_000, count // 50))
+        self.correspondents = self._correspondent_pool(size)
+        # Zipf-artig: der k-häufigste Korrespondent kommt ~1/k^1.1 so oft vor wie der häufigste
+        self._correspondent_weights = list(itertools.accumulate(1 / rank ** 1.1 for rank in range(1, size + 1)))
+        self._types = list(_DOCUMENT_TYPES)
+        self._type_weights = list(itertools.accumulate(weight for weight, _, _ in _DOCUMENT_TYPES.values()))
+        self._customer_ids: Dict[str, str] = {}
+        self._numbers = itertools.count(10_000)
+        self._scans = itertools.count(1)
+    
+    def _correspondent_pool(self, size: int) -> List[str]:
+        names = list(_INSTITUTIONS)
+        seen = set(names)
+        while len(names) < size:
+            kind = self.rng.random()
+            surname = self.rng.choice(_SURNAMES)
+            if kind < 0.5:
+                name = f"{self.rng.choice(_TRADES)} {surname} {self.rng.choice(_LEGAL_FORMS)}".strip()
+            elif kind < 0.8:
+                name = f"{surname} & {self.rng.choice(_SURNAMES)} {self.rng.choice(_LEGAL_FORMS)}".strip()
+            else:
+                name = f"Dr. {surname} {self.rng.choice(('Praxis', 'Kanzlei', 'Zahnarzt', 'Tierarzt'))}"
+            # Eindeutig machen, ohne die Verteilung der Bestandteile zu verändern
+            if name in seen:
+                name = f"{name} {len(names)}"
+            seen.add(name)
+            names.append(name)
+        return names[:size]
+    
+    def _uuid(self) -> UUID:
+        return UUID(int=self.rng.getrandbits(128), version=4)
+    
+    def _date(self) -> date:
+        # Dreiecksverteilung: ältere Dokumente seltener (10 Jahre Archiv)
+        days = int(self.rng.triangular(0, 3650, 3650))
+        return date(2015, 1, 1) + timedelta(days=days)
+    
+    def _original_filename(self, document_date: date, correspondent: str, document_type: str) -> str:
+        kind = self.rng.random()
+        number = next(self._scans)
+        if kind < 0.45:
+            return f"Scan_{document_date:%Y-%m-%d}_{number:05d}.pdf"
+        if kind < 0.65:
+            return f"IMG_{number:04d}.pdf"
+        if kind < 0.85:
+            return f"{correspondent.split()[0]}_{document_type}_{document_date:%Y%m}.pdf"
+        if kind < 0.95:
+            return f"document({number % 50}).pdf"
+        return f"{self.rng.getrandbits(32):08x}.pdf"
+    
+    def _source(self, field: str, recorded_at: datetime) -> FieldSource:
+        if field in _TEXT_RULE_FIELDS and self.rng.random() < 0.5:
+            return FieldSource(source="text", detail=_TEXT_RULE_FIELDS[field], page=1, recorded_at=recorded_at)
+        if self.rng.random() < 0.8:
+            return FieldSource(source="llm", detail="anthropic/claude", recorded_at=recorded_at)
+        return FieldSource(source="manual", recorded_at=recorded_at)
+    
+    def document(self) -> Document:
+        correspondent = self.rng.choices(self.correspondents, cum_weights=self._correspondent_weights)[0]
+        document_type = self.rng.choices(self._types, cum_weights=self._type_weights)[0]
+        _, topics, prefix = _DOCUMENT_TYPES[document_type]
+        document_date = self._date()
+        recorded_at = _BASE_TIME + timedelta(seconds=self.rng.randrange(0, 86_400 * 365))
+        doc = Document(
+            id=self._uuid(),
+            original_filename=self._original_filename(document_date, correspondent, document_type)
+        )
+        
+        state = self.rng.random()
+        if state < self.processed:
+            doc.document_type = document_type
+            doc.correspondent = correspondent
+            doc.document_date = document_date
+            doc.topic = self.rng.choice(topics) if self.rng.random() < 0.6 else None
+            if self.rng.random() < 0.6:
+                doc.customer_id = self._customer_ids.setdefault(correspondent, f"KD-{self.rng.randrange(10 ** 7):07d}")
+            if self.rng.random() < 0.7:
+                doc.document_number = f"{prefix}-{document_date.year}-{next(self._numbers)}"
+        elif state < self.processed + (1 - self.processed) / 2:
+            # Teilweise extrahiert: Datum und evtl. Thema, Pflichtfelder fehlen
+            doc.document_date = document_date
+            doc.topic = self.rng.choice(topics) if self.rng.random() < 0.5 else None
+        
+        filled = [name for name in ("document_type", "correspondent", "topic", "customer_id", "document_number", "document_date") if getattr(doc, name) is not None]
+        doc.field_sources = {name: self._source(name, recorded_at) for name in filled}
+        doc.version = self.rng.randint(1, 3) if filled else 0
+        
+        if doc.is_complete and self.rng.random() < self.saved:
+            doc.saved_as = [SavedAs(filename=doc.generated_filename, timestamp=recorded_at + timedelta(minutes=5))]
+            doc.version += 1
+        return doc
+    
+    def documents(self, count: int) -> Iterator[Document]:
+        for _ in range(count):
+            yield self.document()
+
+
+def _write_pdfs(archive: Path, layout: ArchiveLayout, documents: List[Document], mode: str, shared: Optional[Path]) -> Optional[Path]:
+    """Schreibt die Platzhalter-PDFs eines Batches, gibt den geteilten Blob zurück (Modus link)"""
+    for doc in documents:
+        target = layout.path(archive, doc.id, ".pdf")
+        layout.ensure_parent(target)
+        if mode == "unique":
+            pdf = placeholder_pdf(f"{doc.original_filename} {doc.id}")
+            target.write_bytes(pdf)
+            doc.content_hash = hashlib.sha256(pdf).hexdigest()
+            continue
+        if shared is None:
+            target.write_bytes(placeholder_pdf("PDFF Benchmark"))
+            shared = target
+        else:
+            try:
+                os.link(shared, target)
+            except OSError:
+                target.write_bytes(shared.read_bytes())
+        # Geteilter Inhalt: eindeutiger synthetischer Hash, sonst wären alle Documents Duplikate
+        doc.content_hash = hashlib.sha256(doc.id.bytes).hexdigest()
+    return shared
+
+
+def generate_corpus(
+    directory: Path,
+    count: int,
+    seed: int = 1,
+    backend: str = "json",
+    pdfs: str = "unique",
+    layout: str = "flat",
+    processed: float = 0.7,
+    saved: float = 0.5,
+    correspondents: Optional[int] = None,
+    batch_size: int = 1000,
+    progress: Optional[Callable[[int], None]] = None
+) -> CorpusManifest:
+    """
+    Legt directory/{in,archive,out} an und schreibt count Documents samt PDFs.
+    Ein bestehendes Archive wird nicht überschrieben.
+    """
+    if pdfs not in PDF_MODES:
+        raise ValueError(f"Unbekannter PDF-Modus: {pdfs}")
+    archive = directory / "archive"
+    if archive.exists() and any(archive.iterdir()):
+        raise FileExistsError(f"Archive ist nicht leer: {archive}")
+    for name in ("in", "archive", "out"):
+        (directory / name).mkdir(parents=True, exist_ok=True)
+    
+    started = time.monotonic()
+    generator = CorpusGenerator(seed=seed, processed=processed, saved=saved, correspondents=correspondents, count=count)
+    archive_layout = create_archive_layout(layout)
+    store = create_metadata_store(backend, archive, layout=archive_layout)
+    shared: Optional[Path] = None
+    written = 0
+    try:
+        for batch in batched(generator.documents(count), batch_size):
+            if pdfs != "none":
+                shared = _write_pdfs(archive, archive_layout, batch, pdfs, shared)
+            store.put_many(batch)
+            written += len(batch)
+            if progress:
+                progress(written)
+    finally:
+        store.close()
+    
+    manifest = CorpusManifest(
+        count=count,
+        seed=seed,
+        backend=backend,
+        pdfs=pdfs,
+        processed=processed,
+        saved=saved,
+        correspondents=len(generator.correspondents),
+        layout=archive_layout.name,
+        duration_seconds=round(time.monotonic() - started, 3)
+    )
+    (directory / MANIFEST_NAME).write_text(manifest.model_dump_json(indent=2))
+    logger.info(f"{count} Documents in {manifest.duration_seconds}s nach {archive} geschrieben ({backend}, {archive_layout}, PDFs: {pdfs})")
+    return manifest
+
+
+def load_manifest(directory: Path) -> Optional[CorpusManifest]:
+    path = directory / MANIFEST_NAME
+    if not path.is_file():
+        return None
+    return CorpusManifest.model_validate(json.loads(path.read_text()))
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.tools.corpus", description="Synthetisches Archiv für Benchmarks erzeugen")
+    parser.add_argument("directory", type=Path, help="Zielverzeichnis (in/, archive/ und out/ werden angelegt)")
+    parser.add_argument("--count", type=parse_count, default=parse_count("10k"), help="Anzahl Documents, z.B. 1k, 100k, 1M")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--backend", choices=["json", "journal"], default="json", help="Metadaten-Backend")
+    parser.add_argument("--pdfs", choices=PDF_MODES, default="unique",
+                        help="unique: eine PDF je Document; link: ein geteilter Blob per Hardlink (große Korpora); none: keine PDFs")
+    parser.add_argument("--layout", default="flat", help="Archive-Layout: flat, sharded oder sharded:N")
+    parser.add_argument("--processed", type=float, default=0.7, help="Anteil mit vollständigen Metadaten")
+    parser.add_argument("--saved", type=float, default=0.5, help="Anteil der vollständigen, die bereits gespeichert wurden")
+    parser.add_argument("--correspondents", type=int, default=None, help="Anzahl verschiedener Korrespondenten (Standard: count/50)")
+    
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s - %(message)s", stream=sys.stdout)
+    
+    step = max(1, args.count // 20)
+    
+    def report(written: int) -> None:
+        if written % step < 1000 or written == args.count:
+            logger.info(f"{written}/{args.count} Documents geschrieben")
+    
+    try:
+        generate_corpus(
+            args.directory,
+            args.count,
+            seed=args.seed,
+            backend=args.backend,
+            pdfs=args.pdfs,
+            layout=args.layout,
+            processed=args.processed,
+            saved=args.saved,
+            correspondents=args.correspondents,
+            progress=report
+        )
+    except FileExistsError as e:
+        parser.error(str(e))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
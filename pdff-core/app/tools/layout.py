@@ -0,0 +1,63 @@
+"""
+Umzug eines flachen Archives ({id}.pdf, {id}.json) in Präfix-Verzeichnisse.
+
+Ablauf im laufenden Betrieb: PDFF_ARCHIVE_LAYOUT=sharded setzen und den Service
+neu starten (neue Dateien landen im neuen Layout, bestehende werden in beiden
+Layouts gefunden), dann migrieren. Ein abgebrochener Lauf wird einfach neu gestartet.
+
+Beispiele:
+    python -m app.tools.layout status
+    python -m app.tools.layout migrate --layout sharded
+    python -m app.tools.layout migrate --layout sharded --pause 0.5   # I/O-Last begrenzen
+"""
+from pathlib import Path
+import argparse
+import logging
+import sys
+from app.config import settings
+from app.services.archive_layout import create_archive_layout, iter_flat_files, migrate_archive
+
+logger = logging.getLogger(__name__)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.tools.layout")
+    parser.add_argument("--archive", type=Path, default=settings.data_archive, help="Archive-Verzeichnis")
+    commands = parser.add_subparsers(dest="command", required=True)
+    
+    migrate = commands.add_parser("migrate", help="Flache Dateien in das Shard-Layout verschieben (fortsetzbar)")
+    migrate.add_argument("--layout", default=settings.archive_layout, help="Ziel-Layout: sharded oder sharded:N")
+    migrate.add_argument("--batch-size", type=int, default=1000, help="Fortschritt (und Pause) alle N Dateien")
+    migrate.add_argument("--pause", type=float, default=0.0, help="Sekunden Pause nach jedem Batch")
+    
+    commands.add_parser("status", help="Anzahl noch flach liegender Dateien")
+    
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s - %(message)s", stream=sys.stdout)
+    
+    if args.command == "migrate":
+        try:
+            layout = create_archive_layout(args.layout)
+        except ValueError as e:
+            parser.error(str(e))
+        if layout.levels == 0:
+            parser.error("--layout muss ein Shard-Layout sein (sharded oder sharded:N)")
+        if settings.archive_layout != layout.name:
+            # Ein Service mit anderem Layout fände die verschobenen Dateien nicht mehr
+            logger.warning(f"PDFF_ARCHIVE_LAYOUT ist '{settings.archive_layout}', nicht '{layout}' - Service vor dem Weiterarbeiten umstellen")
+        migrate_archive(
+            args.archive,
+            layout,
+            batch_size=max(1, args.batch_size),
+            pause=args.pause,
+            progress=lambda moved: logger.info(f"{moved} Dateien verschoben")
+        )
+    elif args.command == "status":
+        remaining = sum(1 for _ in iter_flat_files(args.archive))
+        logger.info(f"{remaining} Dateien liegen noch flach in {args.archive} (Layout: {settings.archive_layout})")
+    
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
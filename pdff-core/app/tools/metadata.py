@@ -0,0 +1,57 @@
+"""
+Migration der Metadaten zwischen den Backends.
+
+Beispiele:
+    python -m app.tools.metadata migrate --from json --to journal
+    python -m app.tools.metadata migrate --from journal --to json   # Export ins JSON-Layout
+    python -m app.tools.metadata compact
+"""
+from pathlib import Path
+import argparse
+import logging
+import sys
+from app.config import settings
+from app.services.archive_layout import create_archive_layout
+from app.services.metadata_store import JournalMetadataStore, create_metadata_store, migrate_metadata
+
+logger = logging.getLogger(__name__)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.tools.metadata")
+    parser.add_argument("--archive", type=Path, default=settings.data_archive, help="Archive-Verzeichnis")
+    commands = parser.add_subparsers(dest="command", required=True)
+    
+    migrate = commands.add_parser("migrate", help="Alle Metadaten von einem Backend in ein anderes kopieren")
+    migrate.add_argument("--from", dest="source", choices=["json", "journal"], required=True)
+    migrate.add_argument("--to", dest="target", choices=["json", "journal"], required=True)
+    
+    commands.add_parser("compact", help="Journal in einen neuen Snapshot kompaktieren")
+    
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s - %(message)s", stream=sys.stdout)
+    
+    if args.command == "migrate":
+        if args.source == args.target:
+            parser.error("--from und --to müssen sich unterscheiden")
+        layout = create_archive_layout(settings.archive_layout)
+        source = create_metadata_store(args.source, args.archive, layout=layout)
+        target = create_metadata_store(args.target, args.archive, layout=layout)
+        try:
+            count = migrate_metadata(source, target)
+        finally:
+            source.close()
+            target.close()
+        logger.info(f"{count} Documents von '{args.source}' nach '{args.target}' migriert")
+    elif args.command == "compact":
+        store = JournalMetadataStore(args.archive)
+        try:
+            store.compact()
+        finally:
+            store.close()
+    
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
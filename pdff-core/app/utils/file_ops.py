@@ -0,0 +1,93 @@
+from pathlib import Path
+from typing import Callable, Dict, Tuple
+import errno
+import fcntl
+import logging
+import os
+import shutil
+import uuid
+
+logger = logging.getLogger(__name__)
+
+# ioctl FICLONE (linux/fs.h): Copy-on-Write-Klon auf btrfs/XFS/bcachefs
+FICLONE = 0x40049409
+
+# Fehler, bei denen die nächste Strategie versucht wird (statt abzubrechen)
+_UNSUPPORTED_ERRNOS = {
+    errno.EXDEV, errno.EPERM, errno.EOPNOTSUPP, errno.ENOTSUP,
+    errno.EINVAL, errno.ENOSYS, errno.EMLINK, errno.ENOTTY, errno.EBADF,
+}
+
+
+def _hardlink(source: Path, target: Path) -> None:
+    os.link(source, target)
+
+
+def _reflink(source: Path, target: Path) -> None:
+    with open(source, "rb") as src, open(target, "wb") as dst:
+        fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+    shutil.copystat(source, target)
+
+
+def _copy_file_range(source: Path, target: Path) -> None:
+    """Kopie im Kernel ohne Userspace-Puffer (nutzt auf manchen Dateisystemen selbst Reflinks)"""
+    if not hasattr(os, "copy_file_range"):
+        raise OSError(errno.ENOSYS, "copy_file_range nicht verfügbar")
+    with open(source, "rb") as src, open(target, "wb") as dst:
+        remaining = os.fstat(src.fileno()).st_size
+        while remaining > 0:
+            copied = os.copy_file_range(src.fileno(), dst.fileno(), remaining)
+            if copied == 0:
+                break
+            remaining -= copied
+    shutil.copystat(source, target)
+
+
+def _copy(source: Path, target: Path) -> None:
+    shutil.copy2(source, target)
+
+
+_STRATEGIES: Dict[str, Callable[[Path, Path], None]] = {
+    "hardlink": _hardlink,
+    "reflink": _reflink,
+    "copy_file_range": _copy_file_range,
+    "copy": _copy,
+}
+
+# Reihenfolge der Versuche je Modus
+MATERIALIZATION_MODES: Dict[str, Tuple[str, ...]] = {
+    "auto": ("hardlink", "reflink", "copy_file_range", "copy"),
+    "hardlink": ("hardlink", "copy"),
+    "reflink": ("reflink", "copy_file_range", "copy"),
+    "copy": ("copy",),
+}
+
+
+def materialize_file(source: Path, target: Path, mode: str = "auto") -> str:
+    """
+    Legt target als Inhaltskopie von source an - so billig wie möglich:
+    Hardlink (kein Datentransfer), Reflink (CoW-Klon), copy_file_range (Kernel-Kopie),
+    zuletzt eine normale Kopie. Geschrieben wird in eine temporäre Datei, die
+    atomar nach target umbenannt wird. Gibt die verwendete Strategie zurück.
+    
+    Achtung: Bei 'hardlink' teilen sich Quelle und Ziel den Inode - In-Place-Änderungen
+    am Ziel würden auch die Quelle verändern.
+    """
+    strategies = MATERIALIZATION_MODES.get(mode)
+    if strategies is None:
+        raise ValueError(f"Unbekannter Materialisierungsmodus: {mode}")
+    
+    tmp_path = target.with_name(f".{target.name}.{uuid.uuid4().hex}.tmp")
+    for name in strategies:
+        try:
+            _STRATEGIES[name](source, tmp_path)
+        except OSError as e:
+            tmp_path.unlink(missing_ok=True)
+            if name == "copy" or e.errno not in _UNSUPPORTED_ERRNOS:
+                raise
+            logger.debug(f"Materialisierung per {name} nicht möglich ({e}), nächste Strategie")
+            continue
+        os.replace(tmp_path, target)
+        return name
+    
+    raise OSError(errno.EIO, f"Keine Materialisierungsstrategie erfolgreich für {target}")
\ No newline at end of file
@@ -0,0 +1,61 @@
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Optional
+import os
+
+
+def file_etag(key: str, stat_result: os.stat_result) -> str:
+    """
+    Starker ETag für eine Datei auf Basis von Schlüssel, Größe und mtime (ns).
+    Ändert sich der Dateiinhalt, ändert sich mindestens einer der Werte.
+    """
+    return f'"{key}-{stat_result.st_size:x}-{stat_result.st_mtime_ns:x}"'
+
+
+def http_date(timestamp: float) -> str:
+    """Formatiert einen Unix-Timestamp als HTTP-Datum (RFC 7231)"""
+    return formatdate(timestamp, usegmt=True)
+
+
+def etag_matches(header_value: Optional[str], etag: str, weak: bool = True) -> bool:
+    """
+    Prüft ob ein If-None-Match/If-Match Header den ETag enthält.
+    Bei weak=True wird der schwache Vergleich verwendet (If-None-Match),
+    sonst der starke Vergleich (If-Match).
+    """
+    if not header_value:
+        return False
+    
+    for candidate in header_value.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            if not weak:
+                continue
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+def not_modified(
+    etag: str,
+    last_modified: float,
+    if_none_match: Optional[str],
+    if_modified_since: Optional[str]
+) -> bool:
+    """
+    Entscheidet ob ein bedingter GET mit 304 beantwortet werden kann.
+    If-None-Match hat Vorrang vor If-Modified-Since (RFC 7232, 6).
+    """
+    if if_none_match is not None:
+        return etag_matches(if_none_match, etag)
+    
+    if if_modified_since:
+        try:
+            since = parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+        return int(last_modified) <= since
+    
+    return False
\ No newline at end of file
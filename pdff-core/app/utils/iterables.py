@@ -0,0 +1,11 @@
+from itertools import islice
+from typing import Iterable, Iterator, List, TypeVar
+
+T = TypeVar("T")
+
+
+def batched(items: Iterable[T], size: int) -> Iterator[List[T]]:
+    """Teilt ein Iterable in Listen der Größe size (letzte Liste ggf. kürzer)"""
+    iterator = iter(items)
+    while batch := list(islice(iterator, size)):
+        yield batch
\ No newline at end of file
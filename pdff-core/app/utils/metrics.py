@@ -0,0 +1,319 @@
+"""
+Kennzahlen im Prometheus-Textformat (ohne externe Abhängigkeiten).
+
+Counter und Histogramme zählen pro Thread in eigene Shards: Aufzeichnen im
+Hot Path kommt ohne Lock aus, erst der Abruf von /metrics summiert die Shards.
+Werte, die ohnehin schon irgendwo gezählt werden (Collection-Größe, Stats von
+Ingest und Extraktion), liefern Callbacks erst beim Abruf.
+"""
+from bisect import bisect_left
+from starlette.routing import Mount
+from threading import get_ident
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
+import threading
+import time
+
+# Standard-Buckets für Latenzen in Sekunden (1 ms bis 30 s)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+CallbackValue = Union[float, Dict[Tuple[str, ...], float]]
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Sharded:
+    """Pro Thread eine Liste von Zählern; nur der eigene Thread schreibt hinein"""
+    __slots__ = ("_size", "_shards", "_lock")
+    
+    def __init__(self, size: int):
+        self._size = size
+        self._shards: Dict[int, List[float]] = {}
+        self._lock = threading.Lock()
+    
+    def _new_shard(self) -> List[float]:
+        # Selten (einmal pro Thread): Lock nur für das Anlegen.
+        # Wiederverwendete Thread-IDs übernehmen den Shard eines beendeten Threads.
+        with self._lock:
+            return self._shards.setdefault(get_ident(), [0] * self._size)
+    
+    def _sum(self) -> List[float]:
+        totals = [0] * self._size
+        for shard in list(self._shards.values()):
+            for index, value in enumerate(shard):
+                totals[index] += value
+        return totals
+
+
+class CounterChild(_Sharded):
+    __slots__ = ()
+    
+    def __init__(self):
+        super().__init__(1)
+    
+    def inc(self, amount: float = 1) -> None:
+        shard = self._shards.get(get_ident()) or self._new_shard()
+        shard[0] += amount
+    
+    @property
+    def value(self) -> float:
+        return self._sum()[0]
+
+
+class HistogramChild(_Sharded):
+    """Shard-Layout: Anzahl je Bucket (letzter: +Inf), danach die Summe"""
+    __slots__ = ("_bounds",)
+    
+    def __init__(self, bounds: Tuple[float, ...]):
+        super().__init__(len(bounds) + 2)
+        self._bounds = bounds
+    
+    def observe(self, value: float) -> None:
+        shard = self._shards.get(get_ident()) or self._new_shard()
+        # le ist inklusiv: erster Bucket mit Grenze >= value
+        shard[bisect_left(self._bounds, value)] += 1
+        shard[-1] += value
+    
+    def time(self) -> "_Timer":
+        """Context Manager, misst die Dauer des Blocks (auch bei Exceptions)"""
+        return _Timer(self)
+    
+    def snapshot(self) -> Tuple[List[float], float, float]:
+        """Kumulierte Bucket-Zähler, Summe und Anzahl"""
+        totals = self._sum()
+        cumulative, running = [], 0
+        for count in totals[:-1]:
+            running += count
+            cumulative.append(running)
+        return cumulative, totals[-1], running
+
+
+class _Timer:
+    __slots__ = ("_histogram", "_started")
+    
+    def __init__(self, histogram: HistogramChild):
+        self._histogram = histogram
+    
+    def __enter__(self) -> None:
+        self._started = time.perf_counter()
+    
+    def __exit__(self, *exc_info) -> None:
+        self._histogram.observe(time.perf_counter() - self._started)
+
+
+class _Metric:
+    type = ""
+    
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], _Sharded] = {}
+        self._lock = threading.Lock()
+    
+    def _new_child(self) -> _Sharded:
+        raise NotImplementedError
+    
+    def labels(self, *values: str):
+        """Kind-Metrik für eine Label-Kombination (für häufige Aufrufe vorab binden)"""
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} erwartet Labels {self.labelnames}, erhalten: {values}")
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+    
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+    
+    def render(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    type = "counter"
+    
+    def _new_child(self) -> CounterChild:
+        return CounterChild()
+    
+    def inc(self, amount: float = 1) -> None:
+        """Nur für Counter ohne Labels"""
+        self.labels().inc(amount)
+    
+    def render(self) -> List[str]:
+        lines = self.header()
+        for values, child in sorted(self._children.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(child.value)}")
+        return lines
+
+
+class Histogram(_Metric):
+    type = "histogram"
+    
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+    
+    def _new_child(self) -> HistogramChild:
+        return HistogramChild(self.buckets)
+    
+    def observe(self, value: float) -> None:
+        """Nur für Histogramme ohne Labels"""
+        self.labels().observe(value)
+    
+    def render(self) -> List[str]:
+        lines = self.header()
+        bounds = self.buckets + (float("inf"),)
+        for values, child in sorted(self._children.items()):
+            cumulative, total, count = child.snapshot()
+            for bound, running in zip(bounds, cumulative):
+                labels = _format_labels(self.labelnames, values, f'le="{_format_value(bound)}"')
+                lines.append(f"{self.name}_bucket{labels} {_format_value(running)}")
+            labels = _format_labels(self.labelnames, values)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {_format_value(count)}")
+        return lines
+
+
+class CallbackMetric(_Metric):
+    """
+    Wert wird erst beim Abruf ermittelt: eine Zahl oder ein Dict
+    Label-Werte -> Zahl. None lässt die Metrik aus (z.B. Dienst deaktiviert).
+    """
+    
+    def __init__(self, name: str, help: str, type: str, callback: Callable[[], Optional[CallbackValue]], labelnames: Sequence[str] = ()):
+        super().__init__(name, help, labelnames)
+        self.type = type
+        self.callback = callback
+    
+    def render(self) -> List[str]:
+        value = self.callback()
+        if value is None:
+            return []
+        samples = value if isinstance(value, dict) else {(): value}
+        lines = self.header()
+        for values, sample in sorted(samples.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(sample)}")
+        return lines
+
+
+class MetricsRegistry:
+    """Sammelt Metriken und erzeugt die Ausgabe für /metrics"""
+    
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+    
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                # Erneutes Registrieren (z.B. Modul neu geladen) liefert die bestehende Metrik
+                if type(existing) is not type(metric) or existing.labelnames != metric.labelnames:
+                    raise ValueError(f"Metrik {metric.name} ist bereits anders registriert")
+                if isinstance(metric, CallbackMetric):
+                    existing.callback = metric.callback
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+    
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help, labelnames))
+    
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help, labelnames, buckets))
+    
+    def gauge_callback(self, name: str, help: str, callback: Callable[[], Optional[CallbackValue]], labelnames: Sequence[str] = ()) -> CallbackMetric:
+        return self._register(CallbackMetric(name, help, "gauge", callback, labelnames))
+    
+    def counter_callback(self, name: str, help: str, callback: Callable[[], Optional[CallbackValue]], labelnames: Sequence[str] = ()) -> CallbackMetric:
+        """Für Zähler, die ein Dienst bereits selbst führt"""
+        return self._register(CallbackMetric(name, help, "counter", callback, labelnames))
+    
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# Standard-Registry der Anwendung
+REGISTRY = MetricsRegistry()
+
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    "pdff_http_request_duration_seconds",
+    "Dauer von HTTP-Requests je Route (bis zum letzten Byte der Antwort)",
+    ("method", "route", "status")
+)
+
+
+def route_template(scope) -> str:
+    """
+    Routen-Template eines bearbeiteten Requests, z.B. /api/v1/documents/{document_id}.
+    Je nach FastAPI-Version kennt die Route nur ihren Pfad relativ zum
+    eingebundenen Router - das Präfix wird dann aus dem Request-Pfad ergänzt.
+    """
+    route = scope.get("route")
+    template = getattr(route, "path", None)
+    if template is None:
+        return "unmatched"
+    if isinstance(route, Mount):
+        return template
+    depth = template.count("/")
+    path = scope["path"]
+    if path.count("/") > depth:
+        return path.rsplit("/", depth)[0] + template
+    return template
+
+
+class MetricsMiddleware:
+    """
+    ASGI-Middleware für die Latenz je Route. Label ist das Routen-Template
+    (z.B. /api/v1/documents/{document_id}), nicht der konkrete Pfad, damit die
+    Anzahl der Zeitreihen begrenzt bleibt. Lang laufende Streams (SSE) werden
+    über exclude ausgenommen.
+    """
+    
+    def __init__(self, app, exclude: Sequence[str] = ()):
+        self.app = app
+        self.exclude = frozenset(exclude)
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        started = time.perf_counter()
+        status = 500
+        
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+        
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            template = route_template(scope)
+            if template not in self.exclude:
+                HTTP_REQUEST_SECONDS.labels(scope["method"], template, str(status)).observe(time.perf_counter() - started)
\ No newline at end of file
@@ -0,0 +1,138 @@
+from typing import AsyncIterator, Dict, Optional
+from urllib.parse import unquote
+import re
+
+# key=value oder key="quoted value" in Header-Parametern
+_PARAM_PATTERN = re.compile(r';\s*([\w*-]+)\s*=\s*("(?:[^"\\]|\\.)*"|[^;]*)')
+
+
+class MultipartError(ValueError):
+    """Fehlerhafter multipart/form-data Request"""
+
+
+def parse_header_params(value: str) -> Dict[str, str]:
+    """
+    Parst Parameter eines Headers wie Content-Disposition oder Content-Type.
+    Unterstützt quoted-strings und filename* nach RFC 5987.
+    """
+    params: Dict[str, str] = {}
+    for key, raw in _PARAM_PATTERN.findall(";" + value.split(";", 1)[1] if ";" in value else ""):
+        key = key.lower()
+        raw = raw.strip()
+        if raw.startswith('"') and raw.endswith('"'):
+            raw = re.sub(r'\\(.)', r'\1', raw[1:-1])
+        if key.endswith("*"):
+            # charset'lang'percent-encoded
+            charset, _, encoded = raw.partition("'")
+            _, _, encoded = encoded.partition("'")
+            params[key[:-1]] = unquote(encoded, encoding=charset or "utf-8")
+        else:
+            params.setdefault(key, raw)
+    return params
+
+
+class MultipartPart:
+    """Ein Teil eines multipart-Bodys; der Inhalt wird per chunks() gestreamt"""
+    
+    def __init__(self, headers: Dict[str, str], parser: "StreamingMultipartParser"):
+        self.headers = headers
+        self._parser = parser
+        self._done = False
+        disposition = parse_header_params(headers.get("content-disposition", ""))
+        self.name: Optional[str] = disposition.get("name")
+        self.filename: Optional[str] = disposition.get("filename")
+        self.content_type: Optional[str] = headers.get("content-type")
+    
+    async def chunks(self) -> AsyncIterator[bytes]:
+        """Liefert den Inhalt des Teils in Chunks, ohne ihn komplett zu puffern"""
+        async for chunk in self._parser._read_body(self):
+            yield chunk
+
+
+class StreamingMultipartParser:
+    """
+    Streaming-Parser für multipart/form-data.
+    Hält nur den aktuellen Chunk plus ein Boundary-großes Ende im Speicher,
+    Dateiinhalte werden direkt an den Aufrufer weitergereicht.
+    """
+    
+    def __init__(self, stream: AsyncIterator[bytes], content_type: str, max_header_size: int = 16 * 1024):
+        boundary = parse_header_params(content_type).get("boundary")
+        if not boundary:
+            raise MultipartError("Missing multipart boundary")
+        self._stream = stream.__aiter__()
+        self._delimiter = b"--" + boundary.encode("latin-1")
+        self._body_delimiter = b"\r\n" + self._delimiter
+        self._max_header_size = max_header_size
+        self._buffer = bytearray()
+        self._eof = False
+    
+    async def _fill(self) -> bool:
+        """Liest den nächsten Chunk in den Puffer; False am Stream-Ende"""
+        if self._eof:
+            return False
+        try:
+            chunk = await self._stream.__anext__()
+        except StopAsyncIteration:
+            self._eof = True
+            return False
+        self._buffer.extend(chunk)
+        return True
+    
+    async def _read_body(self, part: MultipartPart) -> AsyncIterator[bytes]:
+        keep = len(self._body_delimiter) - 1
+        while not part._done:
+            index = self._buffer.find(self._body_delimiter)
+            if index >= 0:
+                data = bytes(self._buffer[:index])
+                del self._buffer[:index + len(self._body_delimiter)]
+                # Vor dem yield markieren - bricht der Aufrufer ab, ist der Teil trotzdem abgeschlossen
+                part._done = True
+                if data:
+                    yield data
+                return
+            if len(self._buffer) > keep:
+                data = bytes(self._buffer[:-keep])
+                del self._buffer[:-keep]
+                yield data
+            if not await self._fill():
+                raise MultipartError("Unexpected end of multipart body")
+    
+    async def parts(self) -> AsyncIterator[MultipartPart]:
+        """Iteriert über alle Teile; nicht gelesene Inhalte werden übersprungen"""
+        # Präambel bis zum ersten Delimiter überspringen
+        while (index := self._buffer.find(self._delimiter)) < 0:
+            if len(self._buffer) > len(self._delimiter):
+                del self._buffer[:-len(self._delimiter)]
+            if not await self._fill():
+                raise MultipartError("Multipart boundary not found")
+        del self._buffer[:index + len(self._delimiter)]
+        
+        while True:
+            while len(self._buffer) < 2:
+                if not await self._fill():
+                    raise MultipartError("Unexpected end of multipart body")
+            if self._buffer[:2] == b"--":
+                return
+            if self._buffer[:2] != b"\r\n":
+                raise MultipartError("Malformed multipart delimiter")
+            del self._buffer[:2]
+            
+            while (end := self._buffer.find(b"\r\n\r\n")) < 0:
+                if len(self._buffer) > self._max_header_size:
+                    raise MultipartError("Multipart headers too large")
+                if not await self._fill():
+                    raise MultipartError("Unexpected end of multipart headers")
+            
+            headers: Dict[str, str] = {}
+            for line in bytes(self._buffer[:end]).decode("utf-8", errors="replace").split("\r\n"):
+                name, _, value = line.partition(":")
+                headers[name.strip().lower()] = value.strip()
+            del self._buffer[:end + 4]
+            
+            part = MultipartPart(headers, self)
+            yield part
+            
+            # Nicht (vollständig) gelesenen Inhalt verwerfen
+            async for _ in part.chunks():
+                pass
\ No newline at end of file
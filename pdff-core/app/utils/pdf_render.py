@@ -0,0 +1,103 @@
+"""
+Rendern einzelner PDF-Seiten als PNG für Vorschaubilder.
+
+Nutzt pypdfium2 (optional: `pip install pdff-core[thumbnails]`); ohne die
+Bibliothek meldet render_page RenderUnavailable und Vorschaubilder sind
+deaktiviert. Die PNG-Kodierung kommt ohne Pillow aus (zlib der Standardbibliothek).
+"""
+from pathlib import Path
+from typing import Union
+import struct
+import threading
+import zlib
+
+try:
+    import pypdfium2 as pdfium
+except ImportError:  # optionale Abhängigkeit
+    pdfium = None
+
+# Bei Änderungen an Rendering oder Kodierung hochzählen (Teil der Cache-Keys von Vorschaubildern)
+RENDER_VERSION = "1"
+
+# PDFium ist nicht threadsicher, Aufrufe werden serialisiert
+_PDFIUM_LOCK = threading.Lock()
+
+
+class RenderError(Exception):
+    """PDF bzw. Seite kann nicht gerendert werden"""
+
+
+class RenderUnavailable(RenderError):
+    """Kein Renderer installiert"""
+
+
+class PageNotFound(RenderError):
+    """Seitennummer außerhalb des Dokuments"""
+
+
+def renderer_available() -> bool:
+    return pdfium is not None
+
+
+def encode_png(pixels: bytes, width: int, height: int, stride: int, channels: int = 3) -> bytes:
+    """Kodiert 8-Bit-Graustufen- oder RGB-Zeilen als PNG (Filtertyp 0 je Zeile)"""
+    color_type = {1: 0, 3: 2}[channels]
+    row_bytes = width * channels
+    raw = b"".join(b"\x00" + pixels[row * stride:row * stride + row_bytes] for row in range(height))
+    
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+    
+    return b"".join((
+        b"\x89PNG\r\n\x1a\n",
+        chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, color_type, 0, 0, 0)),
+        chunk(b"IDAT", zlib.compress(raw, 6)),
+        chunk(b"IEND", b""),
+    ))
+
+
+def render_page(source: Union[Path, bytes], page: int = 1, width: int = 240) -> bytes:
+    """
+    Rendert eine Seite (1-basiert) auf die angegebene Breite und liefert PNG-Bytes.
+    Wirft RenderUnavailable ohne pypdfium2, PageNotFound bzw. RenderError bei Fehlern.
+    """
+    if pdfium is None:
+        raise RenderUnavailable("pypdfium2 ist nicht installiert")
+    
+    with _PDFIUM_LOCK:
+        try:
+            document = pdfium.PdfDocument(str(source) if isinstance(source, Path) else source)
+        except pdfium.PdfiumError as e:
+            raise RenderError(f"PDF kann nicht geöffnet werden: {e}")
+        try:
+            if not 1 <= page <= len(document):
+                raise PageNotFound(f"Seite {page} existiert nicht (Dokument hat {len(document)} Seiten)")
+            pdf_page = document[page - 1]
+            page_width, _ = pdf_page.get_size()
+            bitmap = pdf_page.render(scale=width / max(page_width, 1.0), rev_byteorder=True)
+            pixels = bytes(bitmap.buffer)
+            size = (bitmap.width, bitmap.height, bitmap.stride, bitmap.n_channels)
+        except pdfium.PdfiumError as e:
+            raise RenderError(f"Seite {page} kann nicht gerendert werden: {e}")
+        finally:
+            document.close()
+    
+    width, height, stride, channels = size
+    if channels == 4:
+        # BGRx/RGBA: Füllbyte bzw. Alpha verwerfen (weißer Hintergrund ist bereits gerendert)
+        pixels = _drop_fourth_channel(pixels, width, height, stride)
+        stride, channels = width * 3, 3
+    # Kodierung außerhalb des Locks, zlib gibt den GIL frei
+    return encode_png(pixels, width, height, stride, channels)
+
+
+def _drop_fourth_channel(pixels: bytes, width: int, height: int, stride: int) -> bytes:
+    rows = []
+    for row in range(height):
+        line = pixels[row * stride:row * stride + width * 4]
+        rgb = bytearray(width * 3)
+        rgb[0::3] = line[0::4]
+        rgb[1::3] = line[1::4]
+        rgb[2::3] = line[2::4]
+        rows.append(bytes(rgb))
+    return b"".join(rows)
\ No newline at end of file
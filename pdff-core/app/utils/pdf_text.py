@@ -0,0 +1,428 @@
+"""
+Minimaler Text-Layer-Leser für PDFs ohne Zusatzabhängigkeit.
+
+Deckt den typischen Fall born-digital erzeugter Rechnungen ab: Seitenbaum,
+Objekt-Streams, FlateDecode und Textoperatoren (Tj, TJ, ', ") mit
+ToUnicode-CMaps bzw. Latin-1/cp1252 als Rückfall. Verschlüsselte PDFs,
+andere Filter und exotische Encodings liefern leeren Text - der Aufrufer
+fällt dann auf die Extraktion per LLM zurück.
+"""
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+import re
+import zlib
+
+_OBJECT_PATTERN = re.compile(rb"(\d+)\s+(\d+)\s+obj\b")
+_REF_PATTERN = re.compile(rb"(\d+)\s+\d+\s+R\b")
+_WHITESPACE = b" \t\r\n\f\x00"
+_DELIMITERS = b"()<>[]{}/%"
+
+
+class PdfObject:
+    """Roh-Objekt: Dictionary-/Wert-Text und ggf. dekodierter Stream-Inhalt"""
+    
+    def __init__(self, head: bytes, stream: Optional[bytes] = None):
+        self.head = head
+        self.stream = stream
+    
+    def get(self, key: bytes) -> Optional[bytes]:
+        """Roher Wert eines Dictionary-Eintrags (nur oberste Ebene, ausreichend für Page/Font)"""
+        match = re.search(rb"/" + key + rb"(?![A-Za-z0-9])\s*", self.head)
+        if not match:
+            return None
+        return _read_value(self.head, match.end())
+    
+    def ref(self, key: bytes) -> Optional[int]:
+        value = self.get(key)
+        if value is None:
+            return None
+        match = _REF_PATTERN.match(value)
+        return int(match.group(1)) if match else None
+
+
+def _read_value(data: bytes, pos: int) -> bytes:
+    """Liest einen Wert ab pos: Referenz, Dictionary, Array, Name oder Zahl"""
+    match = _REF_PATTERN.match(data, pos)
+    if match:
+        return match.group(0)
+    if data.startswith(b"<<", pos) or data.startswith(b"[", pos):
+        opening, closing = (b"<<", b">>") if data.startswith(b"<<", pos) else (b"[", b"]")
+        depth = 0
+        i = pos
+        while i < len(data):
+            if data.startswith(opening, i):
+                depth += 1
+                i += len(opening)
+            elif data.startswith(closing, i):
+                depth -= 1
+                i += len(closing)
+                if depth == 0:
+                    return data[pos:i]
+            else:
+                i += 1
+        return data[pos:]
+    end = pos + 1
+    while end < len(data) and data[end] not in _WHITESPACE and data[end] not in _DELIMITERS:
+        end += 1
+    return data[pos:end]
+
+
+def _decode_stream(head: bytes, raw: bytes) -> Optional[bytes]:
+    filters = re.findall(rb"/(\w+Decode)\b", (PdfObject(head).get(b"Filter") or b""))
+    if not filters:
+        return raw
+    if filters != [b"FlateDecode"]:
+        return None
+    try:
+        return zlib.decompressobj().decompress(raw)
+    except zlib.error:
+        return None
+
+
+class PdfDocument:
+    """Index aller Objekte einer PDF (direkt und aus Objekt-Streams)"""
+    
+    def __init__(self, data: bytes):
+        self.objects: Dict[int, PdfObject] = {}
+        self._parse(data)
+        self.encrypted = b"/Encrypt" in data[-4096:] or any(
+            b"/Encrypt" in obj.head for obj in self.objects.values() if b"/Type/XRef" in obj.head.replace(b" ", b"")
+        )
+    
+    def _parse(self, data: bytes) -> None:
+        object_streams: List[PdfObject] = []
+        for match in _OBJECT_PATTERN.finditer(data):
+            number = int(match.group(1))
+            start = match.end()
+            end = data.find(b"endobj", start)
+            if end < 0:
+                continue
+            body = data[start:end]
+            stream_start = body.find(b"stream")
+            stream = None
+            if stream_start >= 0:
+                head = body[:stream_start]
+                offset = stream_start + len(b"stream")
+                if body[offset:offset + 2] == b"\r\n":
+                    offset += 2
+                elif body[offset:offset + 1] in (b"\n", b"\r"):
+                    offset += 1
+                stream_end = body.rfind(b"endstream")
+                raw = body[offset:stream_end if stream_end >= 0 else len(body)]
+                length = PdfObject(head).get(b"Length")
+                if length and length.isdigit() and int(length) <= len(raw):
+                    raw = raw[:int(length)]
+                stream = _decode_stream(head, raw.rstrip(b"\r\n") if not (length and length.isdigit()) else raw)
+            else:
+                head = body
+            obj = PdfObject(head.strip(), stream)
+            # Spätere Revisionen (inkrementelle Updates) überschreiben frühere
+            self.objects[number] = obj
+            if stream is not None and re.search(rb"/Type\s*/ObjStm", head):
+                object_streams.append(obj)
+        
+        for container in object_streams:
+            self._parse_object_stream(container)
+    
+    def _parse_object_stream(self, container: PdfObject) -> None:
+        count, first = container.get(b"N"), container.get(b"First")
+        if not (count and first and count.isdigit() and first.isdigit()):
+            return
+        data = container.stream
+        header = data[:int(first)].split()
+        for i in range(0, min(len(header), 2 * int(count)) - 1, 2):
+            number = int(header[i])
+            start = int(first) + int(header[i + 1])
+            end = int(first) + int(header[i + 3]) if i + 3 < len(header) else len(data)
+            if number not in self.objects:
+                self.objects[number] = PdfObject(data[start:end].strip())
+    
+    def resolve(self, value: Optional[bytes]) -> Optional[PdfObject]:
+        if value is None:
+            return None
+        match = _REF_PATTERN.match(value)
+        if match:
+            return self.objects.get(int(match.group(1)))
+        return PdfObject(value)
+    
+    def pages(self) -> Iterator[PdfObject]:
+        """Seiten in Dokumentreihenfolge über den Seitenbaum"""
+        root = next(
+            (obj for obj in self.objects.values() if re.search(rb"/Type\s*/Catalog\b", obj.head)),
+            None
+        )
+        pages_root = self.objects.get(root.ref(b"Pages")) if root else None
+        if pages_root is None:
+            return
+        stack: List[Tuple[PdfObject, Optional[bytes]]] = [(pages_root, None)]
+        seen = set()
+        while stack:
+            node, inherited_resources = stack.pop()
+            if id(node) in seen:
+                continue
+            seen.add(id(node))
+            resources = node.get(b"Resources") or inherited_resources
+            kids = node.get(b"Kids")
+            if kids is not None:
+                children = [self.objects.get(int(number)) for number in _REF_PATTERN.findall(kids)]
+                stack.extend((child, resources) for child in reversed(children) if child is not None)
+            else:
+                if resources is not None and node.get(b"Resources") is None:
+                    node = PdfObject(node.head + b" /Resources " + resources, node.stream)
+                yield node
+    
+    def page_content(self, page: PdfObject) -> bytes:
+        contents = page.get(b"Contents")
+        if contents is None:
+            return b""
+        resolved = self.resolve(contents)
+        # Contents kann ein (indirektes) Array von Streams sein
+        if resolved is not None and resolved.stream is None and resolved.head.startswith(b"["):
+            contents = resolved.head
+        parts = []
+        for number in _REF_PATTERN.findall(contents):
+            obj = self.objects.get(int(number))
+            if obj is not None and obj.stream is not None:
+                parts.append(obj.stream)
+        return b"\n".join(parts)
+    
+    def page_fonts(self, page: PdfObject) -> Dict[bytes, "FontDecoder"]:
+        fonts: Dict[bytes, FontDecoder] = {}
+        resources = self.resolve(page.get(b"Resources"))
+        font_dict = self.resolve(resources.get(b"Font")) if resources else None
+        if font_dict is None:
+            return fonts
+        for name, number in re.findall(rb"/([^\s/<>\[\]()]+)\s+(\d+)\s+\d+\s+R", font_dict.head):
+            font = self.objects.get(int(number))
+            if font is None:
+                continue
+            cmap = self.objects.get(font.ref(b"ToUnicode")) if font.ref(b"ToUnicode") else None
+            composite = re.search(rb"/Subtype\s*/Type0\b", font.head) is not None
+            fonts[name] = FontDecoder(cmap.stream if cmap is not None else None, composite=composite)
+        return fonts
+
+
+class FontDecoder:
+    """Übersetzt String-Bytes eines Fonts nach Unicode (ToUnicode-CMap oder cp1252)"""
+    
+    def __init__(self, cmap: Optional[bytes] = None, composite: bool = False):
+        self.mapping: Dict[bytes, str] = {}
+        self.code_length = 1
+        # CID-Fonts ohne ToUnicode lassen sich nicht zuverlässig dekodieren
+        self.composite = composite
+        if cmap:
+            self._parse_cmap(cmap)
+    
+    def _parse_cmap(self, cmap: bytes) -> None:
+        def hex_bytes(value: bytes) -> bytes:
+            return bytes.fromhex(value.decode("ascii"))
+        
+        def hex_text(value: bytes) -> str:
+            return hex_bytes(value).decode("utf-16-be", errors="ignore")
+        
+        for block in re.findall(rb"beginbfchar(.*?)endbfchar", cmap, re.DOTALL):
+            for source, target in re.findall(rb"<([0-9A-Fa-f]+)>\s*<([0-9A-Fa-f]*)>", block):
+                self.mapping[hex_bytes(source)] = hex_text(target)
+        for block in re.findall(rb"beginbfrange(.*?)endbfrange", cmap, re.DOTALL):
+            for start, end, target in re.findall(
+                rb"<([0-9A-Fa-f]+)>\s*<([0-9A-Fa-f]+)>\s*(<[0-9A-Fa-f]*>|\[[^\]]*\])", block
+            ):
+                width = len(start) // 2
+                low, high = int(start, 16), int(end, 16)
+                if high - low > 0xFFFF:
+                    continue
+                if target.startswith(b"["):
+                    targets = re.findall(rb"<([0-9A-Fa-f]*)>", target)
+                    for offset, value in enumerate(targets[:high - low + 1]):
+                        self.mapping[(low + offset).to_bytes(width, "big")] = hex_text(value)
+                else:
+                    base = hex_bytes(target[1:-1])
+                    for offset in range(high - low + 1):
+                        shifted = (int.from_bytes(base, "big") + offset).to_bytes(len(base), "big") if base else b""
+                        self.mapping[(low + offset).to_bytes(width, "big")] = shifted.decode("utf-16-be", errors="ignore")
+        if self.mapping:
+            self.code_length = max(len(code) for code in self.mapping)
+    
+    def decode(self, data: bytes) -> str:
+        if not self.mapping:
+            return "" if self.composite else data.decode("cp1252", errors="replace")
+        chars = []
+        step = self.code_length
+        for i in range(0, len(data) - step + 1, step):
+            chars.append(self.mapping.get(data[i:i + step], ""))
+        return "".join(chars)
+
+
+_LATIN_FALLBACK = FontDecoder()
+
+
+def _tokens(content: bytes) -> Iterator[Union[bytes, Tuple[str, bytes], list]]:
+    """Tokenizer für Content-Streams: Strings als ('s', bytes), Arrays als list, sonst Operator/Operand-bytes"""
+    i = 0
+    length = len(content)
+    stack: List[list] = []
+    
+    def emit(token):
+        if stack:
+            stack[-1].append(token)
+            return None
+        return token
+    
+    while i < length:
+        char = content[i]
+        if char in _WHITESPACE:
+            i += 1
+        elif char == 0x25:  # % Kommentar
+            while i < length and content[i] not in b"\r\n":
+                i += 1
+        elif char == 0x28:  # ( Literal-String
+            depth, i, out = 1, i + 1, bytearray()
+            while i < length and depth:
+                c = content[i]
+                if c == 0x5C:  # Backslash
+                    i += 1
+                    if i >= length:
+                        break
+                    e = content[i]
+                    escapes = {0x6E: 10, 0x72: 13, 0x74: 9, 0x62: 8, 0x66: 12}
+                    if e in escapes:
+                        out.append(escapes[e])
+                    elif 0x30 <= e <= 0x37:
+                        digits = content[i:i + 3]
+                        octal = re.match(rb"[0-7]{1,3}", digits).group(0)
+                        out.append(int(octal, 8) & 0xFF)
+                        i += len(octal) - 1
+                    elif e in b"\r\n":
+                        if e == 0x0D and content[i + 1:i + 2] == b"\n":
+                            i += 1
+                    else:
+                        out.append(e)
+                elif c == 0x28:
+                    depth += 1
+                    out.append(c)
+                elif c == 0x29:
+                    depth -= 1
+                    if depth:
+                        out.append(c)
+                else:
+                    out.append(c)
+                i += 1
+            token = emit(("s", bytes(out)))
+            if token is not None:
+                yield token
+        elif char == 0x3C and content[i + 1:i + 2] != b"<":  # <hex>
+            end = content.find(b">", i)
+            end = length if end < 0 else end
+            hex_digits = re.sub(rb"[^0-9A-Fa-f]", b"", content[i + 1:end])
+            if len(hex_digits) % 2:
+                hex_digits += b"0"
+            token = emit(("s", bytes.fromhex(hex_digits.decode("ascii"))))
+            if token is not None:
+                yield token
+            i = end + 1
+        elif char == 0x5B:  # [
+            stack.append([])
+            i += 1
+        elif char == 0x5D:  # ]
+            i += 1
+            if stack:
+                array = stack.pop()
+                token = emit(array)
+                if token is not None:
+                    yield token
+        elif content.startswith(b"<<", i) or content.startswith(b">>", i):
+            i += 2
+        else:
+            start = i
+            i += 1
+            while i < length and content[i] not in _WHITESPACE and content[i] not in _DELIMITERS:
+                i += 1
+            token = emit(content[start:i])
+            if token is not None:
+                yield token
+        # Inline-Bilder überspringen (BI ... ID <binär> EI)
+        if not stack and content[i - 2:i] == b"ID" and content[i - 3:i - 2] in _WHITESPACE:
+            end = content.find(b"EI", i)
+            i = length if end < 0 else end + 2
+
+
+def _page_text(content: bytes, fonts: Dict[bytes, FontDecoder]) -> str:
+    out: List[str] = []
+    operands: list = []
+    decoder = _LATIN_FALLBACK
+    last_y: Optional[float] = None
+    
+    def show(token) -> None:
+        if isinstance(token, tuple):
+            out.append(decoder.decode(token[1]))
+        elif isinstance(token, list):
+            for part in token:
+                if isinstance(part, tuple):
+                    out.append(decoder.decode(part[1]))
+                elif isinstance(part, bytes):
+                    try:
+                        # Große negative Abstände in TJ-Arrays sind Wortzwischenräume
+                        if float(part) < -200:
+                            out.append(" ")
+                    except ValueError:
+                        pass
+    
+    for token in _tokens(content):
+        if isinstance(token, bytes) and token[:1].isalpha() or token in (b"'", b'"'):
+            operator = token
+            if operator == b"Tf" and len(operands) >= 2 and isinstance(operands[-2], bytes):
+                decoder = fonts.get(operands[-2].lstrip(b"/"), _LATIN_FALLBACK)
+            elif operator in (b"Tj", b"TJ") and operands:
+                show(operands[-1])
+            elif operator in (b"'", b'"') and operands:
+                out.append("\n")
+                show(operands[-1])
+            elif operator in (b"Td", b"TD") and len(operands) >= 2:
+                try:
+                    if abs(float(operands[-1])) > 0.1:
+                        out.append("\n")
+                    elif float(operands[-2]) > 0:
+                        out.append(" ")
+                except (TypeError, ValueError):
+                    pass
+            elif operator == b"Tm" and len(operands) >= 6:
+                # Neue Zeile nur bei geänderter y-Position, sonst Wortabstand
+                try:
+                    y = float(operands[-1])
+                except (TypeError, ValueError):
+                    y = None
+                out.append("\n" if y is None or last_y is None or abs(y - last_y) > 0.1 else " ")
+                last_y = y
+            elif operator in (b"T*", b"ET"):
+                out.append("\n")
+            operands = []
+        else:
+            operands.append(token)
+    
+    text = "".join(out)
+    text = re.sub(r"[ \t]+", " ", text)
+    return re.sub(r"\s*\n\s*", "\n", text).strip()
+
+
+def extract_text(source: Union[Path, bytes], max_pages: int = 3) -> List[str]:
+    """
+    Liefert den Text der ersten max_pages Seiten (eine Zeichenkette pro Seite).
+    Leere Liste bei verschlüsselten oder nicht lesbaren PDFs.
+    """
+    data = source.read_bytes() if isinstance(source, Path) else source
+    try:
+        document = PdfDocument(data)
+    except Exception:
+        return []
+    if document.encrypted:
+        return []
+    
+    pages: List[str] = []
+    for page in document.pages():
+        if len(pages) >= max_pages:
+            break
+        try:
+            pages.append(_page_text(document.page_content(page), document.page_fonts(page)))
+        except Exception:
+            pages.append("")
+    return pages
\ No newline at end of file
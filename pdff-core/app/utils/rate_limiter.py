@@ -0,0 +1,72 @@
+from typing import Optional
+import asyncio
+import time
+
+
+class _Bucket:
+    """Token-Bucket mit kontinuierlicher Auffüllung (rate pro Minute, Kapazität = rate)"""
+    
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.level = self.capacity
+        self.updated = time.monotonic()
+    
+    def refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+    
+    def wait_time(self, amount: float) -> float:
+        """Sekunden, bis amount verfügbar ist (0 = sofort)"""
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self.rate
+
+
+class RateLimiter:
+    """
+    Async-Ratenbegrenzung für Requests und Tokens pro Minute (0 = unbegrenzt).
+    acquire() reserviert eine Schätzung, settle() verrechnet danach den
+    tatsächlichen Verbrauch - Mehrverbrauch bremst die folgenden Aufrufe.
+    Wartende werden in Ankunftsreihenfolge bedient.
+    """
+    
+    def __init__(self, requests_per_minute: float = 0, tokens_per_minute: float = 0):
+        self._requests: Optional[_Bucket] = _Bucket(requests_per_minute) if requests_per_minute > 0 else None
+        self._tokens: Optional[_Bucket] = _Bucket(tokens_per_minute) if tokens_per_minute > 0 else None
+        self._lock = asyncio.Lock()
+    
+    async def acquire(self, tokens: int = 0) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                wait = 0.0
+                if self._requests is not None:
+                    self._requests.refill(now)
+                    wait = max(wait, self._requests.wait_time(1))
+                if self._tokens is not None:
+                    self._tokens.refill(now)
+                    # Einzelne Anfragen größer als die Kapazität dürfen nicht ewig warten
+                    wait = max(wait, self._tokens.wait_time(min(tokens, self._tokens.capacity)))
+                if wait <= 0:
+                    break
+                await asyncio.sleep(wait)
+            
+            if self._requests is not None:
+                self._requests.level -= 1
+            if self._tokens is not None:
+                self._tokens.level -= tokens
+    
+    def settle(self, estimated_tokens: int, actual_tokens: int) -> None:
+        """Verrechnet die Differenz zwischen geschätzten und tatsächlichen Tokens"""
+        if self._tokens is not None:
+            self._tokens.refill(time.monotonic())
+            self._tokens.level = min(self._tokens.capacity, self._tokens.level + estimated_tokens - actual_tokens)
+    
+    def penalize(self, seconds: float) -> None:
+        """Leert die Buckets für seconds Sekunden (z.B. nach HTTP 429 mit Retry-After)"""
+        now = time.monotonic()
+        for bucket in (self._requests, self._tokens):
+            if bucket is not None:
+                bucket.refill(now)
+                bucket.level = min(bucket.level, -seconds * bucket.rate)
\ No newline at end of file
@@ -0,0 +1,182 @@
+"""
+Dateien, die sich mehrere Prozesse teilen (z.B. uvicorn --workers N auf demselben Archiv).
+
+FileLock serialisiert über flock (zusätzlich threadsicher), SharedAppendFile hängt
+Zeilen unter diesem Lock an und folgt einem von einem anderen Prozess ersetzten
+oder rotierten Pfad, FileTail liest neu angehängte Zeilen einer solchen Datei.
+"""
+from pathlib import Path
+from typing import List, Optional, Tuple
+import fcntl
+import os
+import threading
+
+
+class FileLock:
+    """
+    Exklusiver Lock über flock auf eine Lock-Datei.
+    flock gilt pro offenem File Descriptor - Threads desselben Prozesses
+    werden daher zusätzlich über einen Thread-Lock serialisiert.
+    """
+    
+    def __init__(self, path: Path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._fd: Optional[int] = None
+    
+    def acquire(self, blocking: bool = True) -> bool:
+        """Holt den Lock; mit blocking=False wird False geliefert, wenn ein anderer ihn hält"""
+        if not self._lock.acquire(blocking):
+            return False
+        try:
+            if self._fd is None:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT | os.O_CLOEXEC, 0o644)
+            fcntl.flock(self._fd, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            self._lock.release()
+            return False
+        except BaseException:
+            self._lock.release()
+            raise
+        return True
+    
+    def release(self) -> None:
+        fcntl.flock(self._fd, fcntl.LOCK_UN)
+        self._lock.release()
+    
+    def write_owner(self, text: str) -> None:
+        """Schreibt eine Kennung des Halters in die Lock-Datei (nur mit gehaltenem Lock, zur Diagnose)"""
+        os.ftruncate(self._fd, 0)
+        os.pwrite(self._fd, text.encode("utf-8"), 0)
+    
+    def read_owner(self) -> str:
+        try:
+            return self.path.read_text(encoding="utf-8").strip()
+        except FileNotFoundError:
+            return ""
+    
+    def close(self) -> None:
+        with self._lock:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+    
+    def __enter__(self) -> "FileLock":
+        self.acquire()
+        return self
+    
+    def __exit__(self, *exc_info) -> None:
+        self.release()
+
+
+class SharedAppendFile:
+    """
+    Append-only Datei mehrerer Prozesse. Jeder Schreibvorgang ist ein einzelnes
+    write() unter dem FileLock. Hat ein anderer Prozess den Pfad inzwischen
+    ersetzt (Kompaktierung, Rotation), wird vor dem Schreiben neu geöffnet -
+    sonst landeten die Zeilen in der verwaisten alten Datei.
+    """
+    
+    def __init__(self, path: Path, lock: Optional[FileLock] = None):
+        self.path = path
+        self.lock = lock or FileLock(path.with_name(f".{path.name}.lock"))
+        self._fd: Optional[int] = None
+    
+    def _ensure_open(self) -> int:
+        """Öffnet (erneut), falls nötig; Lock muss gehalten werden"""
+        if self._fd is not None:
+            try:
+                if os.stat(self.path).st_ino == os.fstat(self._fd).st_ino:
+                    return self._fd
+            except FileNotFoundError:
+                pass
+            os.close(self._fd)
+        self._fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT | os.O_CLOEXEC, 0o644)
+        return self._fd
+    
+    def append(self, data: bytes) -> int:
+        """Hängt data an und gibt die neue Dateigröße zurück"""
+        with self.lock:
+            return self.append_locked(data)
+    
+    def append_locked(self, data: bytes) -> int:
+        """Wie append(), der Lock wird bereits gehalten"""
+        return self.position_locked(data)[1]
+    
+    def position_locked(self, data: bytes = b"") -> Tuple[int, int]:
+        """Hängt data an und liefert (Inode, Dateigröße) danach; der Lock wird bereits gehalten"""
+        fd = self._ensure_open()
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view):]
+        stat_result = os.fstat(fd)
+        return stat_result.st_ino, stat_result.st_size
+    
+    def close(self) -> None:
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+        self.lock.close()
+
+
+class FileTail:
+    """
+    Liest die seit dem letzten Aufruf angehängten vollständigen Zeilen einer Datei.
+    Wurde der Pfad ersetzt, wird die alte Datei noch bis zum Ende gelesen und
+    danach die neue von vorn - so geht beim Rotieren keine Zeile verloren.
+    start beginnt an einem bekannten Zeilenanfang statt am Anfang bzw. Ende.
+    """
+    
+    def __init__(self, path: Path, from_end: bool = True, start: Optional[int] = None):
+        self.path = path
+        self._file = None
+        self._buffer = b""
+        self._open(from_end, start)
+    
+    def _open(self, from_end: bool, start: Optional[int] = None) -> bool:
+        try:
+            self._file = open(self.path, "rb")
+        except FileNotFoundError:
+            self._file = None
+            return False
+        if start is not None:
+            self._file.seek(start)
+        elif from_end:
+            self._file.seek(0, os.SEEK_END)
+        self._buffer = b""
+        return True
+    
+    def _replaced(self) -> bool:
+        try:
+            inode = os.stat(self.path).st_ino
+        except FileNotFoundError:
+            return False
+        return self._file is None or inode != os.fstat(self._file.fileno()).st_ino
+    
+    def read_lines(self) -> List[bytes]:
+        """Neue vollständige Zeilen (ohne Zeilenende); eine unvollständige letzte Zeile bleibt im Puffer"""
+        lines: List[bytes] = []
+        while True:
+            self._read_into(lines)
+            if not self._replaced():
+                return lines
+            if self._file is not None:
+                # Nach dem Ersetzen schreibt niemand mehr in die alte Datei - einmal bis zum Ende lesen,
+                # ein unvollständiger Rest gehört zu einem abgebrochenen Schreibvorgang
+                self._read_into(lines)
+                self._file.close()
+            if not self._open(from_end=False):
+                return lines
+    
+    def _read_into(self, lines: List[bytes]) -> None:
+        if self._file is None:
+            return
+        data = self._buffer + self._file.read()
+        *complete, self._buffer = data.split(b"\n")
+        lines.extend(line for line in complete if line)
+    
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
\ No newline at end of file
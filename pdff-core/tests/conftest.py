@@ -0,0 +1,131 @@
+"""Gemeinsame Fixtures: API-Router bzw. Extraktion gegen eine eigene Collection und ein Archiv in tmp_path"""
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence
+import asyncio
+import os
+import tempfile
+import time
+import pytest
+
+# app.dependencies legt beim Import Services für die Standard-Verzeichnisse an: nicht unter /data
+_DATA = Path(tempfile.mkdtemp(prefix="pdff-tests-"))
+for _name in ("in", "archive", "out"):
+    os.environ.setdefault(f"PDFF_DATA_{_name.upper()}", str(_DATA / _name))
+
+
+class Api(NamedTuple):
+    client: "TestClient"
+    collection: "DocumentCollection"
+    storage: "LocalStorageService"
+
+
+@pytest.fixture
+def api(tmp_path):
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from app import dependencies
+    from app.api.v1 import api_v1_router
+    from app.models import DocumentCollection
+    from app.services import AsyncStorageService, LocalStorageService
+    
+    collection = DocumentCollection()
+    storage = LocalStorageService(tmp_path / "in", tmp_path / "archive", tmp_path / "out")
+    async_storage = AsyncStorageService(storage, io_workers=2, metadata_workers=1)
+    app = FastAPI()
+    app.include_router(api_v1_router)
+    app.dependency_overrides[dependencies.get_collection] = lambda: collection
+    app.dependency_overrides[dependencies.get_storage] = lambda: storage
+    app.dependency_overrides[dependencies.get_async_storage] = lambda: async_storage
+    yield Api(TestClient(app), collection, storage)
+    async_storage.shutdown()
+
+
+class ProviderCall(NamedTuple):
+    document_id: "UUID"
+    fields: tuple
+    page_text: Optional[List[str]]
+    at: float
+
+
+def scripted_provider(answer: Dict[str, Any], errors: Sequence[Exception] = (), latency: float = 0.0):
+    """
+    Provider ohne Netzwerk: liefert answer (auf die angefragten Felder beschränkt),
+    wirft vorher der Reihe nach errors und zählt gleichzeitig laufende Aufrufe.
+    """
+    from app.services import ExtractionProvider
+    
+    class ScriptedProvider(ExtractionProvider):
+        name = "scripted"
+        model = "test-model"
+        
+        def __init__(self):
+            self.errors = list(errors)
+            self.calls: List[ProviderCall] = []
+            self.running = 0
+            self.peak = 0
+        
+        async def extract(self, document, pdf_path, fields, page_text=None):
+            self.calls.append(ProviderCall(document.id, tuple(fields), page_text, time.monotonic()))
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+            try:
+                await asyncio.sleep(latency)
+                if self.errors:
+                    raise self.errors.pop(0)
+            finally:
+                self.running -= 1
+            return self._result(answer, fields, 100, 10)
+    
+    return ScriptedProvider()
+
+
+class Extraction:
+    """Collection, Archiv und Job-Journal in tmp_path; engine() baut eine ExtractionEngine darauf"""
+    
+    def __init__(self, root: Path):
+        from app.models import DocumentCollection
+        from app.services import AsyncStorageService, LocalStorageService
+        
+        self.root = root
+        self.collection = DocumentCollection()
+        self.storage = LocalStorageService(root / "in", root / "archive", root / "out")
+        self.async_storage = AsyncStorageService(self.storage, io_workers=2, metadata_workers=1)
+    
+    def add(self, pdf: Optional[bytes] = b"%PDF-1.4\n%%EOF\n", **fields) -> "Document":
+        """Document mit archivierter PDF (pdf=None: ohne Datei)"""
+        from app.models import Document
+        
+        fields.setdefault("original_filename", "scan.pdf")
+        document = Document(**fields)
+        self.collection.add(document)
+        if pdf is not None:
+            self.storage.archive_path(document.id, existing=False).write_bytes(pdf)
+        return document
+    
+    def engine(self, provider, cache_entries: Optional[int] = None, **options) -> "ExtractionEngine":
+        from app.services import ExtractionCache, ExtractionEngine, ExtractionJobStore
+        
+        options.setdefault("text_layer", False)
+        options.setdefault("backoff_base", 0.01)
+        if cache_entries is not None:
+            options["cache"] = ExtractionCache(self.root / "archive", cache_entries)
+        return ExtractionEngine(
+            self.async_storage, self.collection, provider, ExtractionJobStore(self.root / "archive"), **options
+        )
+
+
+async def wait_until(condition, timeout: float = 10.0) -> bool:
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while not condition():
+        if loop.time() > deadline:
+            return False
+        await asyncio.sleep(0.01)
+    return True
+
+
+@pytest.fixture
+def extraction(tmp_path):
+    setup = Extraction(tmp_path)
+    yield setup
+    setup.async_storage.shutdown()
\ No newline at end of file
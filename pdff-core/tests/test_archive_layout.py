@@ -0,0 +1,128 @@
+"""Archive-Layout: Shard-Pfade, Lesen beider Layouts während der Migration, fortsetzbare Migration"""
+from pathlib import Path
+from typing import List
+from uuid import UUID
+import os
+import pytest
+from app.models import Document, DocumentCollection
+from app.services import ArchiveLayout, LocalStorageService, ShardedLayout, create_archive_layout
+from app.services.archive_layout import iter_flat_files, migrate_archive
+from app.services.metadata_store import JsonFileMetadataStore
+from app.tools import layout as layout_tool
+
+DOCUMENT_ID = UUID("0123abcd-0000-4000-8000-000000000001")
+PDF = b"%PDF-1.4\n%%EOF\n"
+
+
+def flat_archive(directory: Path, count: int) -> List[Document]:
+    """Archive im alten Layout: {id}.pdf und {id}.json direkt im Verzeichnis"""
+    documents = [Document(original_filename=f"scan_{n}.pdf", correspondent=f"Firma {n}") for n in range(count)]
+    directory.mkdir(parents=True, exist_ok=True)
+    store = JsonFileMetadataStore(directory)
+    for document in documents:
+        store.put(document)
+        (directory / f"{document.id}.pdf").write_bytes(PDF)
+    return documents
+
+
+@pytest.mark.parametrize("spec, name, levels", [("flat", "flat", 0), ("sharded", "sharded", 2), ("sharded:1", "sharded:1", 1), ("sharded:3", "sharded:3", 3)])
+def test_create_archive_layout(spec, name, levels):
+    layout = create_archive_layout(spec)
+    assert (layout.name, layout.levels, str(layout)) == (name, levels, name)
+
+
+@pytest.mark.parametrize("spec", ["", "flat:2", "sharded:0", "sharded:4", "sharded:x", "baum"])
+def test_create_archive_layout_rejects(spec):
+    with pytest.raises(ValueError):
+        create_archive_layout(spec)
+
+
+def test_sharded_paths(tmp_path):
+    layout = ShardedLayout()
+    assert layout.relative(DOCUMENT_ID, ".pdf") == Path("01", "23", f"{DOCUMENT_ID}.pdf")
+    assert ShardedLayout(1).relative(DOCUMENT_ID, ".json") == Path("01", f"{DOCUMENT_ID}.json")
+    assert ArchiveLayout().path(tmp_path, DOCUMENT_ID, ".pdf") == tmp_path / f"{DOCUMENT_ID}.pdf"
+    
+    sharded = layout.path(tmp_path, DOCUMENT_ID, ".pdf")
+    flat = tmp_path / f"{DOCUMENT_ID}.pdf"
+    assert list(layout.candidates(tmp_path, DOCUMENT_ID, ".pdf")) == [sharded, flat]
+    # Weder noch: Ziel im Layout; nur flach: der alte Pfad; danach wieder das Layout
+    assert layout.resolve(tmp_path, DOCUMENT_ID, ".pdf") == sharded
+    flat.write_bytes(PDF)
+    assert layout.resolve(tmp_path, DOCUMENT_ID, ".pdf") == flat
+    layout.ensure_parent(sharded)
+    assert sharded.parent.is_dir()
+    sharded.write_bytes(PDF)
+    assert layout.resolve(tmp_path, DOCUMENT_ID, ".pdf") == sharded
+
+
+def test_iter_files_prefers_sharded_copy(tmp_path):
+    layout = ShardedLayout()
+    documents = flat_archive(tmp_path, 3)
+    # Abbruch zwischen link und unlink: beide Namen existieren, gelesen wird nur die Shard-Fassung
+    interrupted = layout.path(tmp_path, documents[0].id, ".json")
+    layout.ensure_parent(interrupted)
+    os.link(tmp_path / f"{documents[0].id}.json", interrupted)
+    
+    files = list(layout.iter_files(tmp_path, "*.json"))
+    assert sorted(files) == sorted([interrupted] + [tmp_path / f"{document.id}.json" for document in documents[1:]])
+
+
+def test_storage_reads_both_layouts(tmp_path):
+    documents = flat_archive(tmp_path / "archive", 4)
+    storage = LocalStorageService(tmp_path / "in", tmp_path / "archive", tmp_path / "out", archive_layout=ShardedLayout())
+    collection = storage.load_documents(DocumentCollection())
+    assert {document.id for document in collection.all()} == {document.id for document in documents}
+    
+    # Bestand noch flach gefunden, Änderungen landen im Layout und verdecken die flache Fassung
+    document = collection.get(documents[0].id)
+    assert storage.get_pdf_path(document) == tmp_path / "archive" / f"{document.id}.pdf"
+    collection.update(document, {"topic": "Strom"})
+    storage.update_metadata(document)
+    sharded = storage.archive_layout.path(tmp_path / "archive", document.id, ".json")
+    assert sharded.is_file()
+    reloaded = storage.load_documents(DocumentCollection())
+    assert reloaded.get(document.id).topic == "Strom"
+    assert len(reloaded) == 4
+    
+    # Löschen entfernt beide Fassungen, sonst tauchte das Document wieder auf
+    storage.metadata_store.delete(document.id)
+    assert not sharded.exists() and not (tmp_path / "archive" / f"{document.id}.json").exists()
+    assert len(storage.load_documents(DocumentCollection())) == 3
+
+
+def test_migrate_archive(tmp_path):
+    documents = flat_archive(tmp_path, 5)
+    (tmp_path / "notizen.txt").write_text("bleibt")
+    layout = ShardedLayout()
+    # Der laufende Service hat bereits eine neuere Fassung im Layout geschrieben
+    newer = documents[0].model_copy(update={"topic": "Strom"})
+    JsonFileMetadataStore(tmp_path, layout=layout).put(newer)
+    
+    reported = []
+    assert migrate_archive(tmp_path, layout, batch_size=4, progress=reported.append) == 10
+    assert reported == [4, 8]
+    assert not list(iter_flat_files(tmp_path))
+    assert (tmp_path / "notizen.txt").exists()
+    for document in documents:
+        assert layout.path(tmp_path, document.id, ".pdf").read_bytes() == PDF
+    loaded = {document.id: document for document in JsonFileMetadataStore(tmp_path, layout=layout).load_all()}
+    assert len(loaded) == 5
+    assert loaded[newer.id].topic == "Strom"
+    
+    # Erneuter Lauf: nichts mehr zu tun
+    assert migrate_archive(tmp_path, layout) == 0
+    with pytest.raises(ValueError):
+        migrate_archive(tmp_path, ArchiveLayout())
+
+
+def test_layout_command(tmp_path):
+    documents = flat_archive(tmp_path, 3)
+    assert layout_tool.main(["--archive", str(tmp_path), "status"]) == 0
+    assert layout_tool.main(["--archive", str(tmp_path), "migrate", "--layout", "sharded:1", "--batch-size", "2"]) == 0
+    assert not list(iter_flat_files(tmp_path))
+    assert all(ShardedLayout(1).path(tmp_path, document.id, ".pdf").is_file() for document in documents)
+    
+    for spec in ("flat", "baum"):
+        with pytest.raises(SystemExit):
+            layout_tool.main(["--archive", str(tmp_path), "migrate", "--layout", spec])
\ No newline at end of file
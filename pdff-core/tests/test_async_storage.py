@@ -0,0 +1,107 @@
+"""AsyncStorageService: Datei-Operationen in eigenen Executoren, belegte Speicherungen, begrenzte Bulk-Parallelität"""
+from pathlib import Path
+import asyncio
+import threading
+import time
+import pytest
+from app.models import Document, DocumentCollection
+from app.services import AsyncStorageService, LocalStorageService
+
+
+@pytest.fixture
+def storage(tmp_path):
+    storage = LocalStorageService(tmp_path / "in", tmp_path / "archive", tmp_path / "out")
+    async_storage = AsyncStorageService(storage, io_workers=4, metadata_workers=1)
+    yield async_storage
+    async_storage.shutdown()
+
+
+def archived(storage: AsyncStorageService, collection: DocumentCollection, name: str = "scan.pdf") -> Document:
+    document = Document(original_filename=name, document_type="Rechnung", correspondent="Stadtwerke")
+    collection.add(document)
+    storage.storage.archive_path(document.id, existing=False).write_bytes(b"%PDF-1.4 " + name.encode())
+    return document
+
+
+def blocking_writes(storage: AsyncStorageService) -> threading.Event:
+    """write_output wartet, bis das Event gesetzt ist"""
+    release = threading.Event()
+    write_output = storage.storage.write_output
+    
+    def blocked(*args) -> Path:
+        assert release.wait(5)
+        return write_output(*args)
+    storage.storage.write_output = blocked
+    return release
+
+
+def test_save_does_not_block_the_loop_and_keeps_concurrent_changes(storage):
+    collection = DocumentCollection()
+    document = archived(storage, collection)
+    release = blocking_writes(storage)
+    
+    async def run():
+        plan = storage.claim_save(collection, document)
+        assert plan.filename == document.generated_filename and plan.previous_filename is None
+        assert document.version == 1
+        # Während der Kopie: ein zweiter Save wird abgewiesen, ein PATCH nicht
+        assert storage.claim_save(collection, document) is None
+        save = asyncio.create_task(storage.save_to_output(collection, plan))
+        await asyncio.sleep(0.1)
+        assert not save.done()
+        collection.update(document, {"topic": "Strom"})
+        release.set()
+        path = await save
+        assert path.read_bytes() == b"%PDF-1.4 scan.pdf"
+        assert (document.topic, document.current_filename, document.version) == ("Strom", path.name, 2)
+        stored, = storage.storage.metadata_store.load_all()
+        assert (stored.topic, stored.current_filename, stored.version) == ("Strom", path.name, 2)
+        # Wieder frei
+        assert storage.claim_save(collection, document) is not None
+    asyncio.run(run())
+
+
+def test_failed_save_releases_the_claim(storage):
+    collection = DocumentCollection()
+    document = archived(storage, collection)
+    storage.storage.archive_path(document.id).unlink()
+    
+    async def run():
+        plan = storage.claim_save(collection, document)
+        with pytest.raises(FileNotFoundError):
+            await storage.save_to_output(collection, plan)
+        assert storage.claim_save(collection, document) is not None
+    asyncio.run(run())
+    assert not document.is_saved
+
+
+def test_bulk_operations_limit_parallelism(storage):
+    collection = DocumentCollection()
+    documents = [archived(storage, collection, f"scan_{n}.pdf") for n in range(12)]
+    storage.storage.archive_path(documents[5].id).unlink()
+    running, peak = 0, 0
+    lock = threading.Lock()
+    write_output = storage.storage.write_output
+    
+    def counting(*args) -> Path:
+        nonlocal running, peak
+        with lock:
+            running += 1
+            peak = max(peak, running)
+        try:
+            time.sleep(0.02)
+            return write_output(*args)
+        finally:
+            with lock:
+                running -= 1
+    storage.storage.write_output = counting
+    
+    async def run():
+        plans = [storage.claim_save(collection, document) for document in documents]
+        return await storage.save_many_to_output(collection, plans, max_workers=3)
+    outcomes = asyncio.run(run())
+    
+    assert peak == 3
+    assert isinstance(outcomes.pop(documents[5].id), FileNotFoundError)
+    assert all(isinstance(outcome, Path) and outcome.exists() for outcome in outcomes.values())
+    assert sum(document.is_saved for document in documents) == 11
\ No newline at end of file
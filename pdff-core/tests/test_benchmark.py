@@ -0,0 +1,128 @@
+"""Benchmark-Suite: Korpus-Erzeugung, Kennzahlen, Vergleich mit der Baseline und ein kompletter Lauf"""
+import argparse
+import json
+import pytest
+from app.services import ShardedLayout, create_archive_layout
+from app.services.metadata_store import create_metadata_store
+from app.tools import benchmark
+from app.tools.benchmark import RESULT_SCHEMA, compare, percentile, summarize
+from app.tools.corpus import CorpusGenerator, generate_corpus, load_manifest, parse_count
+
+
+def result(**metrics) -> dict:
+    return {"schema": RESULT_SCHEMA, "meta": {"count": 100, "backend": "json", "collection_store": "objects"}, "metrics": metrics}
+
+
+def test_percentiles_and_summary():
+    samples = [0.001 * n for n in range(1, 101)]
+    assert percentile(samples, 0.5) == pytest.approx(0.05)
+    assert percentile(samples, 0.95) == pytest.approx(0.095)
+    assert percentile([0.3], 0.95) == 0.3
+    assert summarize("nav", [0.002, 0.001, 0.003, 0.002]) == {
+        "nav_p50_ms": 2.0, "nav_p95_ms": 3.0, "nav_max_ms": 3.0, "nav_per_second": 500.0,
+    }
+
+
+@pytest.mark.parametrize("value, count", [("1000", 1000), ("10k", 10_000), ("1.5M", 1_500_000), ("100_000", 100_000)])
+def test_parse_count(value, count):
+    assert parse_count(value) == count
+
+
+@pytest.mark.parametrize("value", ["", "k", "zehn", "0", "-5"])
+def test_parse_count_rejects(value):
+    with pytest.raises(argparse.ArgumentTypeError):
+        parse_count(value)
+
+
+def test_compare_with_margin_and_noise():
+    baseline = result(nav_p50_ms=1.0, list_p50_ms=10.0, save_per_second=100.0, rss_end_mb=100.0, removed_p50_ms=1.0)
+    current = result(nav_p50_ms=1.4, list_p50_ms=12.5, save_per_second=79.0, rss_end_mb=119.0, added_p50_ms=5.0)
+    regressions, lines = compare(baseline, current, margin=0.2, noise_ms=0.5)
+    # +40% bei 1 ms liegt im Rauschen, +25% bei 10 ms nicht; Durchsatz: kleiner ist schlechter
+    assert regressions == ["list_p50_ms", "save_per_second"]
+    assert any("removed_p50_ms" in line and "fehlt" in line for line in lines)
+    assert not any("added_p50_ms" in line for line in lines)
+    
+    regressions, _ = compare(baseline, current, margin=0.3, noise_ms=0.1)
+    assert regressions == ["nav_p50_ms"]
+
+
+def test_compare_command(tmp_path, capsys):
+    baseline, current = tmp_path / "baseline.json", tmp_path / "result.json"
+    baseline.write_text(json.dumps(result(list_p50_ms=10.0)))
+    current.write_text(json.dumps(result(list_p50_ms=11.0)))
+    assert benchmark.main(["compare", str(baseline), str(current)]) == 0
+    assert "Keine Regressionen" in capsys.readouterr().out
+    assert benchmark.main(["compare", str(baseline), str(current), "--margin", "0.05"]) == 1
+    assert "1 Regression(en): list_p50_ms" in capsys.readouterr().out
+    
+    baseline.write_text(json.dumps({**result(), "schema": RESULT_SCHEMA + 1}))
+    assert benchmark.main(["compare", str(baseline), str(current)]) == 2
+
+
+def test_corpus_is_deterministic():
+    first, second = CorpusGenerator(seed=4, count=300), CorpusGenerator(seed=4, count=300)
+    documents = list(first.documents(300))
+    assert [document.model_dump() for document in documents] == [document.model_dump() for document in second.documents(300)]
+    assert [document.id for document in documents] != [document.id for document in CorpusGenerator(seed=5, count=300).documents(300)]
+    
+    complete = [document for document in documents if document.is_complete]
+    assert 0.6 < len(complete) / len(documents) < 0.8
+    assert any(document.is_saved for document in complete)
+    assert all(document.version > 0 for document in documents if document.field_sources)
+
+
+@pytest.mark.parametrize("backend, pdfs, layout", [("json", "unique", "flat"), ("journal", "link", "sharded"), ("json", "none", "flat")])
+def test_generate_corpus(tmp_path, backend, pdfs, layout):
+    manifest = generate_corpus(tmp_path, 120, seed=2, backend=backend, pdfs=pdfs, layout=layout, batch_size=50)
+    assert load_manifest(tmp_path) == manifest
+    assert (manifest.count, manifest.backend, manifest.pdfs) == (120, backend, pdfs)
+    assert manifest.layout == create_archive_layout(layout).name
+    
+    archive_layout = create_archive_layout(layout)
+    store = create_metadata_store(backend, tmp_path / "archive", layout=archive_layout)
+    try:
+        documents = list(store.load_all())
+    finally:
+        store.close()
+    assert len(documents) == 120
+    pdf_paths = [archive_layout.resolve(tmp_path / "archive", document.id, ".pdf") for document in documents]
+    if pdfs == "none":
+        assert not any(path.exists() for path in pdf_paths)
+    else:
+        assert all(path.read_bytes().startswith(b"%PDF-1.4") for path in pdf_paths)
+    if pdfs == "link":
+        # Geteilter Blob, aber eindeutige Hashes (sonst wären alle Documents Duplikate)
+        assert pdf_paths[0].stat().st_nlink == 120
+        assert len({document.content_hash for document in documents}) == 120
+    if isinstance(archive_layout, ShardedLayout):
+        assert not list((tmp_path / "archive").glob("*.pdf"))
+    
+    with pytest.raises(FileExistsError):
+        generate_corpus(tmp_path, 10)
+    with pytest.raises(ValueError):
+        generate_corpus(tmp_path / "neu", 10, pdfs="kopie")
+
+
+def test_run_against_baseline(tmp_path, monkeypatch, capfd):
+    # run setzt das Layout des Korpus für den Mess-Prozess
+    monkeypatch.setenv("PDFF_ARCHIVE_LAYOUT", "flat")
+    workdir, output = tmp_path / "korpus", tmp_path / "baseline.json"
+    scenario = ["--requests", "10", "--pages", "2", "--bulk-size", "20", "--bulk-rounds", "1", "--saves", "5"]
+    assert benchmark.main(["run", "--workdir", str(workdir), "--count", "200", "--output", str(output), *scenario]) == 0
+    
+    baseline = json.loads(output.read_text())
+    assert baseline["schema"] == RESULT_SCHEMA
+    assert (baseline["meta"]["count"], baseline["meta"]["backend"]) == (200, "json")
+    metrics = baseline["metrics"]
+    for name in ("cold_start_seconds", "navigation_p95_ms", "list_walk_page_p50_ms", "preview_filename_per_second",
+                 "bulk_patch_documents_per_second", "save_p50_ms", "bulk_save_documents_per_second", "rss_peak_mb"):
+        assert metrics[name] > 0, name
+    assert (workdir / "corpus.json").exists()
+    
+    # Unmöglich gute Baseline: der zweite Lauf (auf demselben Korpus) meldet Regressionen
+    baseline["metrics"] = {name: (1e9 if name.endswith("_per_second") else 1e-9) for name in metrics}
+    output.write_text(json.dumps(baseline))
+    capfd.readouterr()
+    assert benchmark.main(["run", "--workdir", str(workdir), "--baseline", str(output), *scenario]) == 1
+    assert "REGRESSION" in capfd.readouterr().out
\ No newline at end of file
@@ -0,0 +1,98 @@
+"""Bulk-Operationen: Auswahl per IDs oder Filter, Ergebnisse und Teilfehler pro Document"""
+from uuid import uuid4
+import pytest
+from app.config import settings
+from app.models import Document
+
+
+@pytest.fixture
+def documents(api):
+    documents = [
+        Document(original_filename=f"scan_{n}.pdf", document_type="Rechnung" if n % 2 else None)
+        for n in range(6)
+    ]
+    api.collection.add_many(documents)
+    return documents
+
+
+@pytest.mark.parametrize("body", [
+    {"update": {"topic": "Strom"}},
+    {"update": {"topic": "Strom"}, "filter": {}},
+    {"update": {"topic": "Strom"}, "filter": {"correspondent": None}},
+])
+def test_selection_must_not_default_to_everything(api, documents, body):
+    response = api.client.patch("/api/v1/documents/bulk", json=body)
+    assert response.status_code == 400
+    assert all(document.topic is None for document in documents)
+
+
+def test_filter_selects_matching_documents(api, documents):
+    response = api.client.patch("/api/v1/documents/bulk", json={"filter": {"document_type": "Rechnung"}, "update": {"topic": "Strom"}})
+    assert response.status_code == 200
+    assert response.json()["succeeded"] == 3
+    assert {document.topic for document in documents if document.document_type} == {"Strom"}
+    assert {document.topic for document in documents if not document.document_type} == {None}
+
+
+def test_partial_failures_are_reported_per_document(api, documents):
+    stale, current, unversioned = documents[:3]
+    api.collection.update(stale, {"correspondent": "Zwischendurch geändert"})
+    missing = uuid4()
+    response = api.client.patch("/api/v1/documents/bulk", json={
+        "ids": [str(stale.id), str(current.id), str(unversioned.id), str(missing)],
+        "versions": {str(stale.id): stale.version - 1, str(current.id): current.version},
+        "update": {"correspondent": "Stadtwerke"}
+    })
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["total"], body["succeeded"], body["failed"]) == (4, 2, 2)
+    results = {result["id"]: result for result in body["results"]}
+    assert results[str(missing)]["status_code"] == 404
+    assert results[str(stale.id)]["status_code"] == 412
+    assert f"current version {stale.version}" in results[str(stale.id)]["detail"]
+    assert results[str(current.id)]["status_code"] == results[str(unversioned.id)]["status_code"] == 200
+    assert results[str(current.id)]["document"]["metadata"]["correspondent"] == "Stadtwerke"
+    
+    # Nur die erfolgreichen Änderungen sind im Speicher und im Backend
+    assert stale.correspondent == "Zwischendurch geändert"
+    stored = {document.id: document for document in api.storage.metadata_store.load_all()}
+    assert set(stored) == {current.id, unversioned.id}
+    assert stored[current.id].correspondent == "Stadtwerke"
+
+
+def test_bulk_save_reports_incomplete_documents(api, documents):
+    incomplete = documents[0]
+    response = api.client.post("/api/v1/documents/bulk/save", json={"ids": [str(incomplete.id)]})
+    result = response.json()["results"][0]
+    assert (result["success"], result["status_code"]) == (False, 400)
+    assert not incomplete.is_saved
+
+def test_bulk_save_writes_outputs_and_reports_missing_files(api):
+    documents = [Document(original_filename=f"scan_{n}.pdf", document_type="Rechnung", correspondent="Stadtwerke", topic=f"Strom {n}") for n in range(4)]
+    api.collection.add_many(documents)
+    for document in documents[:3]:
+        api.storage.archive_path(document.id, existing=False).write_bytes(b"%PDF-1.4 " + document.topic.encode())
+    
+    response = api.client.post("/api/v1/documents/bulk/save", json={"filter": {"document_type": "Rechnung"}})
+    body = response.json()
+    assert (body["total"], body["succeeded"], body["failed"]) == (4, 3, 1)
+    results = {result["id"]: result for result in body["results"]}
+    assert results[str(documents[3].id)]["status_code"] == 404
+    assert not documents[3].is_saved
+    for document in documents[:3]:
+        result = results[str(document.id)]
+        assert result["status_code"] == 200 and document.is_saved
+        output = api.storage.data_out / document.current_filename
+        assert result["output_path"] == str(output)
+        assert output.read_bytes() == b"%PDF-1.4 " + document.topic.encode()
+        assert result["document"]["version"] == document.version
+
+
+def test_bulk_limit(api, documents, monkeypatch):
+    monkeypatch.setattr(settings, "bulk_max_items", 3)
+    too_many = api.client.patch("/api/v1/documents/bulk", json={"ids": [str(document.id) for document in documents], "update": {"topic": "Strom"}})
+    assert too_many.status_code == 400
+    by_filter = api.client.patch("/api/v1/documents/bulk", json={"filter": {"unsaved": True}, "update": {"topic": "Strom"}})
+    assert by_filter.status_code == 400
+    assert "max 3" in by_filter.json()["detail"]
+    assert all(document.topic is None for document in documents)
\ No newline at end of file
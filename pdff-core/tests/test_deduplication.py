@@ -0,0 +1,108 @@
+"""Deduplizierung beim Ingest: Content-Hash-Index und Duplikat-Policies"""
+from pathlib import Path
+import hashlib
+import pytest
+from app.models import Document, DocumentCollection
+from app.services import JournalMetadataStore, LocalStorageService
+
+PDF = b"%PDF-1.4\nInhalt\n%%EOF\n"
+PDF_HASH = hashlib.sha256(PDF).hexdigest()
+
+
+def make_storage(tmp_path: Path, policy: str) -> LocalStorageService:
+    storage = LocalStorageService(tmp_path / "in", tmp_path / "archive", tmp_path / "out", duplicate_policy=policy)
+    storage.data_in.mkdir(exist_ok=True)
+    return storage
+
+
+def ingest(storage: LocalStorageService, collection: DocumentCollection, name: str, content: bytes = PDF):
+    path = storage.data_in / name
+    path.write_bytes(content)
+    result = storage.ingest_file(collection, path)
+    assert not path.exists()
+    return result
+
+
+def test_skip_returns_existing_document(tmp_path):
+    storage, collection = make_storage(tmp_path, "skip"), DocumentCollection()
+    original = ingest(storage, collection, "scan.pdf")
+    assert original.created and original.document.content_hash == PDF_HASH
+    
+    duplicate = ingest(storage, collection, "nochmal.pdf")
+    assert (duplicate.created, duplicate.duplicate_of, duplicate.document) == (False, original.document.id, original.document)
+    assert len(collection) == 1
+    # Keine verwaiste Staging-Datei im Archive
+    assert sorted(path.name for path in storage.data_archive.glob("*.pdf")) == [f"{original.document.id}.pdf"]
+    
+    other = ingest(storage, collection, "anders.pdf", PDF + b"% anders\n")
+    assert other.created and other.duplicate_of is None
+
+
+def test_link_copies_metadata_and_shares_blob(tmp_path):
+    storage, collection = make_storage(tmp_path, "link"), DocumentCollection()
+    original = ingest(storage, collection, "scan.pdf").document
+    collection.update(original, {"document_type": "Rechnung", "correspondent": "Stadtwerke"})
+    
+    result = ingest(storage, collection, "kopie.pdf")
+    duplicate = result.document
+    assert result.created and result.duplicate_of == original.id
+    assert duplicate.duplicate_of == original.id
+    assert (duplicate.document_type, duplicate.correspondent) == ("Rechnung", "Stadtwerke")
+    assert duplicate.original_filename == "kopie.pdf"
+    assert storage.archive_path(duplicate.id).samefile(storage.archive_path(original.id))
+    # Das Original bleibt der Treffer für weitere Duplikate
+    assert collection.find_by_hash(PDF_HASH) is original
+    
+    # Durable gespeichert: nach dem Neustart mit demselben Hash-Index
+    reloaded = DocumentCollection()
+    reloaded.add_many(storage.metadata_store.load_all())
+    assert reloaded.find_by_hash(PDF_HASH).id == original.id
+    reloaded.remove(original.id)
+    assert reloaded.find_by_hash(PDF_HASH).id == duplicate.id
+    reloaded.remove(duplicate.id)
+    assert reloaded.find_by_hash(PDF_HASH) is None
+
+
+def test_keep_creates_independent_document(tmp_path):
+    storage, collection = make_storage(tmp_path, "keep"), DocumentCollection()
+    original = ingest(storage, collection, "scan.pdf").document
+    result = ingest(storage, collection, "scan.pdf")
+    assert result.created and result.duplicate_of == original.id
+    assert result.document.duplicate_of is None
+    assert result.document.content_hash == PDF_HASH
+    assert len(collection) == 2
+
+
+def test_metadata_failure_takes_the_blob_back(tmp_path):
+    storage, collection = make_storage(tmp_path, "keep"), DocumentCollection()
+    
+    def failing(document: Document) -> None:
+        raise OSError("Platte voll")
+    storage.metadata_store.put_durable = failing
+    path = storage.data_in / "scan.pdf"
+    path.write_bytes(PDF)
+    with pytest.raises(OSError):
+        storage.ingest_file(collection, path)
+    # Zurück im Eingang, keine PDF ohne Metadaten im Archive
+    assert path.read_bytes() == PDF
+    assert not list(storage.data_archive.glob("*.pdf"))
+    assert len(collection) == 0
+
+
+def test_backfill_fills_missing_hashes(tmp_path):
+    storage = LocalStorageService(tmp_path / "in", tmp_path / "archive", tmp_path / "out", metadata_store=JournalMetadataStore(tmp_path / "archive"))
+    legacy = [Document(original_filename=f"alt_{n}.pdf") for n in range(3)]
+    for n, document in enumerate(legacy):
+        storage.archive_path(document.id, existing=False).write_bytes(PDF + bytes([n]))
+    without_file = Document(original_filename="ohne_pdf.pdf")
+    collection = DocumentCollection()
+    collection.add_many(legacy + [without_file])
+    
+    assert storage.backfill_content_hashes(collection) == 3
+    assert storage.backfill_content_hashes(collection) == 0
+    for n, document in enumerate(legacy):
+        assert document.content_hash == hashlib.sha256(PDF + bytes([n])).hexdigest()
+        assert collection.find_by_hash(document.content_hash) is document
+    assert without_file.content_hash is None
+    stored = {document.id: document.content_hash for document in storage.metadata_store.load_all()}
+    assert stored == {document.id: document.content_hash for document in legacy}
\ No newline at end of file
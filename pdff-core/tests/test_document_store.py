@@ -0,0 +1,146 @@
+"""CompactDocumentStore gegen ObjectDocumentStore: gleiche Documents, gleiche Sichten und Filter"""
+from datetime import date, datetime, timedelta, timezone
+from uuid import uuid4
+import gc
+import hashlib
+import random
+import pytest
+from app.models import CompactDocumentStore, Document, DocumentFilter, FieldSource, ObjectDocumentStore, SavedAs
+
+ROW_FIELDS = (
+    "id", "original_filename", "content_hash", "duplicate_of", "document_type", "correspondent",
+    "topic", "customer_id", "document_number", "document_date", "version", "is_complete", "is_saved",
+)
+
+
+def make_document(rng: random.Random) -> Document:
+    def maybe(value):
+        return value if rng.random() < 0.7 else None
+    
+    def timestamp() -> datetime:
+        value = datetime(2024, 1, 1) + timedelta(microseconds=rng.randrange(10 ** 14))
+        # Naive und zeitzonenbehaftete Zeitpunkte (auch negative Offsets)
+        if rng.random() < 0.3:
+            value = value.replace(tzinfo=timezone(timedelta(minutes=rng.choice([-300, 0, 60, 330]))))
+        return value
+    
+    extracted = timestamp()
+    field_sources = {}
+    for field in rng.sample(["document_type", "correspondent", "topic", "document_date"], rng.randrange(5)):
+        field_sources[field] = FieldSource(
+            source=rng.choice(["text", "llm", "manual"]),
+            detail=maybe(rng.choice(["fake/test-model", "date-rule", "Übersicht"])),
+            page=maybe(rng.randrange(1, 40)),
+            # Die Felder einer Extraktion teilen sich meist den Zeitpunkt
+            recorded_at=extracted if rng.random() < 0.6 else timestamp()
+        )
+    hashes = [
+        hashlib.sha256(str(rng.random()).encode()).hexdigest(),
+        hashlib.sha256(str(rng.random()).encode()).hexdigest().upper(),
+        "kein-sha256",
+        None,
+    ]
+    return Document(
+        original_filename=rng.choice(["scan.pdf", "Rechnung März.pdf", "ä ö ü ß 😀.pdf", f"{uuid4()}.pdf"]),
+        saved_as=[
+            SavedAs(filename=f"2024010{n}_Stadtwerke_Strom_Rechnung.pdf", timestamp=timestamp())
+            for n in range(rng.randrange(3))
+        ],
+        content_hash=rng.choice(hashes),
+        duplicate_of=uuid4() if rng.random() < 0.1 else None,
+        document_type=maybe(rng.choice(["Rechnung", "Vertrag", "Bescheid"])),
+        correspondent=maybe(rng.choice(["Stadtwerke", "Telekom", "Finanzamt", ""])),
+        topic=maybe(rng.choice(["Strom", "Mobilfunk", "Einkommensteuer 2023"])),
+        customer_id=maybe(f"K-{rng.randrange(10 ** 6)}"),
+        document_number=maybe(f"R-{rng.randrange(10 ** 6)}"),
+        document_date=maybe(date(2020, 1, 1) + timedelta(days=rng.randrange(2000))),
+        field_sources=field_sources,
+        version=rng.randrange(50)
+    )
+
+
+@pytest.fixture
+def stores():
+    rng = random.Random(23)
+    documents = [make_document(rng) for _ in range(300)]
+    objects, compact = ObjectDocumentStore(), CompactDocumentStore()
+    for document in documents:
+        objects.put(document)
+        # Kopie ohne Sicht: get() muss das Document aus den Spalten erzeugen
+        compact.put(document.model_copy(deep=True), view=False)
+    gc.collect()
+    return rng, objects, compact
+
+
+def assert_same(objects: ObjectDocumentStore, compact: CompactDocumentStore) -> None:
+    assert len(objects) == len(compact)
+    for document in objects.documents():
+        assert document.id in compact
+        restored = compact.get(document.id)
+        assert restored.model_dump() == document.model_dump()
+        assert restored.model_dump_json() == document.model_dump_json()
+        row = compact.row(document.id)
+        for field in ROW_FIELDS:
+            assert getattr(row, field) == getattr(document, field), field
+    rows = {row.id: row for row in compact.rows()}
+    assert rows.keys() == {document.id for document in objects.documents()}
+
+
+def test_round_trip_matches_object_store(stores):
+    _, objects, compact = stores
+    assert_same(objects, compact)
+
+
+def test_views_stay_identical_while_referenced(stores):
+    _, objects, compact = stores
+    document_id = next(iter(objects.documents())).id
+    view = compact.get(document_id)
+    assert compact.get(document_id) is view
+    # Nicht zurückgeschriebene Änderungen gelten für row(), nicht für rows()
+    view.correspondent = "Geändert"
+    assert compact.row(document_id).correspondent == "Geändert"
+    assert {row.id: row.correspondent for row in compact.rows()}[document_id] == objects.get(document_id).correspondent
+    compact.put(view)
+    del view
+    gc.collect()
+    assert compact.get(document_id).correspondent == "Geändert"
+
+
+def test_updates_and_slot_reuse(stores):
+    rng, objects, compact = stores
+    for document in rng.sample(objects.documents(), 100):
+        changed = make_document(rng)
+        for field in ("saved_as", "content_hash", "duplicate_of", "correspondent", "document_date", "field_sources", "version"):
+            setattr(document, field, getattr(changed, field))
+        compact.put(document.model_copy(deep=True), view=False)
+    for document in rng.sample(objects.documents(), 120):
+        popped = compact.pop(document.id)
+        assert popped.model_dump() == objects.pop(document.id).model_dump()
+        assert compact.pop(document.id) is None
+    # Neue Documents in den freien Slots dürfen nichts von den alten erben
+    for _ in range(120):
+        document = make_document(rng)
+        objects.put(document)
+        compact.put(document.model_copy(deep=True), view=False)
+    gc.collect()
+    assert_same(objects, compact)
+
+
+@pytest.mark.parametrize("document_filter", [
+    DocumentFilter(),
+    DocumentFilter(unprocessed=True),
+    DocumentFilter(unprocessed=False, unsaved=True),
+    DocumentFilter(unsaved=False),
+    DocumentFilter(document_type="Rechnung"),
+    DocumentFilter(document_type="Rechnung", correspondent="Stadtwerke"),
+    DocumentFilter(correspondent="Unbekannt"),
+    DocumentFilter(date_from=date(2021, 3, 1)),
+    DocumentFilter(date_from=date(2021, 3, 1), date_to=date(2022, 2, 28), unprocessed=False),
+    DocumentFilter(date_to=date(2020, 1, 1)),
+])
+def test_matcher_matches_object_store(stores, document_filter):
+    _, objects, compact = stores
+    expected = objects.matcher(document_filter)
+    actual = compact.matcher(document_filter)
+    for document in objects.documents():
+        assert actual(document.id) == expected(document.id)
\ No newline at end of file
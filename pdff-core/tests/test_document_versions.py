@@ -0,0 +1,96 @@
+"""Document-Versionen über HTTP: ETag und 304 beim Lesen, If-Match mit 412 bei PATCH und Save"""
+import pytest
+from app.models import Document
+
+PDF = b"%PDF-1.4\n%%EOF\n"
+
+
+@pytest.fixture
+def document(api) -> Document:
+    document = Document(original_filename="scan.pdf", document_type="Rechnung", correspondent="Stadtwerke")
+    api.collection.add(document)
+    api.storage.archive_path(document.id, existing=False).write_bytes(PDF)
+    return document
+
+
+def url(document: Document, suffix: str = "") -> str:
+    return f"/api/v1/documents/{document.id}{suffix}"
+
+
+def test_get_sends_version_etag(api, document):
+    response = api.client.get(url(document))
+    assert response.status_code == 200
+    etag = response.headers["etag"]
+    assert etag == f'"v{document.version}"'
+    assert response.headers["cache-control"] == "private, no-cache"
+    assert response.json()["version"] == document.version
+    
+    for header in (etag, f'"v999", {etag}', f"W/{etag}", "*"):
+        response = api.client.get(url(document), headers={"If-None-Match": header})
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["etag"] == etag
+    
+    # Nach einer Änderung ist der alte ETag veraltet
+    api.collection.update(document, {"topic": "Strom"})
+    response = api.client.get(url(document), headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] == f'"v{document.version}"' != etag
+    assert response.json()["metadata"]["topic"] == "Strom"
+
+
+def test_patch_with_if_match(api, document):
+    etag = api.client.get(url(document)).headers["etag"]
+    response = api.client.patch(url(document), json={"topic": "Strom"}, headers={"If-Match": etag})
+    assert response.status_code == 200
+    new_etag = response.headers["etag"]
+    assert new_etag == f'"v{document.version}"' != etag
+    assert response.json()["version"] == document.version
+    
+    # Zweiter Client mit dem alten Stand: kein stilles Überschreiben
+    response = api.client.patch(url(document), json={"topic": "Gas"}, headers={"If-Match": etag})
+    assert response.status_code == 412
+    assert response.headers["etag"] == new_etag
+    assert document.topic == "Strom"
+    assert str(document.version) in response.json()["detail"]
+    
+    # If-Match vergleicht stark, "*" passt immer, ohne Header wird nicht geprüft
+    assert api.client.patch(url(document), json={"topic": "Gas"}, headers={"If-Match": f"W/{new_etag}"}).status_code == 412
+    assert api.client.patch(url(document), json={"topic": "Gas"}, headers={"If-Match": f'"v0", {new_etag}'}).status_code == 200
+    assert api.client.patch(url(document), json={"topic": "Wasser"}, headers={"If-Match": "*"}).status_code == 200
+    assert api.client.patch(url(document), json={"topic": "Fernwärme"}).status_code == 200
+    assert document.topic == "Fernwärme"
+    assert document.field_sources["topic"].source == "manual"
+
+
+def test_save_with_if_match(api, document):
+    etag = api.client.get(url(document)).headers["etag"]
+    api.client.patch(url(document), json={"topic": "Strom"})
+    
+    # Metadaten seit dem Lesen geändert: nichts wird nach data_out geschrieben
+    response = api.client.post(url(document, "/save"), headers={"If-Match": etag})
+    assert response.status_code == 412
+    assert not list(api.storage.data_out.iterdir())
+    
+    etag = response.headers["etag"]
+    response = api.client.post(url(document, "/save"), headers={"If-Match": etag})
+    assert response.status_code == 200
+    saved = response.json()
+    assert response.headers["etag"] == f'"v{saved["version"]}"' != etag
+    assert (api.storage.data_out / saved["generated_filename"]).read_bytes() == PDF
+    
+    # Dasselbe If-Match ein zweites Mal: der erste Save hat die Version erhöht
+    assert api.client.post(url(document, "/save"), headers={"If-Match": etag}).status_code == 412
+    assert len(list(api.storage.data_out.iterdir())) == 1
+
+
+def test_unknown_and_incomplete_documents(api, document):
+    missing = Document(original_filename="fehlt.pdf")
+    assert api.client.get(url(missing), headers={"If-None-Match": "*"}).status_code == 404
+    assert api.client.patch(url(missing), json={"topic": "Strom"}, headers={"If-Match": '"v0"'}).status_code == 404
+    
+    incomplete = Document(original_filename="unvollständig.pdf")
+    api.collection.add(incomplete)
+    etag = api.client.get(url(incomplete)).headers["etag"]
+    assert api.client.post(url(incomplete, "/save"), headers={"If-Match": etag}).status_code == 400
+    assert api.client.post(url(incomplete, "/save"), headers={"If-Match": '"v99"'}).status_code == 412
\ No newline at end of file
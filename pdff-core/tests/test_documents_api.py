@@ -0,0 +1,120 @@
+"""Documents-API: Cursor-Paginierung, Filter und Suche über den Router"""
+from datetime import date
+from typing import List
+import base64
+import json
+import pytest
+from app.models import Document, SavedAs
+
+
+def cursor_for(key: list) -> str:
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode()
+
+
+def add_documents(collection, count: int) -> List[Document]:
+    documents = [Document(original_filename=f"rechnung_{n:02d}.pdf", correspondent="Stadtwerke") for n in range(count)]
+    collection.add_many(documents)
+    return documents
+
+
+@pytest.mark.parametrize("path", ["/api/v1/documents", "/api/v1/documents/search?q=rechnung"])
+def test_cursor_pages_through_all_documents(api, path):
+    documents = add_documents(api.collection, 25)
+    seen, cursor = [], None
+    while True:
+        separator = "&" if "?" in path else "?"
+        response = api.client.get(f"{path}{separator}limit=10" + (f"&cursor={cursor}" if cursor else ""))
+        assert response.status_code == 200
+        seen += response.json()["document_ids"]
+        cursor = response.json()["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == [str(document.id) for document in sorted(documents, key=lambda d: d.original_filename)]
+
+
+@pytest.mark.parametrize("path", ["/api/v1/documents", "/api/v1/documents/search"])
+@pytest.mark.parametrize("cursor", [
+    cursor_for(["rechnung_03.pdf", "keine-uuid"]),
+    cursor_for(["rechnung_03.pdf", 42]),
+    cursor_for(["rechnung_03.pdf"]),
+    "kein base64!",
+])
+def test_tampered_cursor_is_rejected(api, path, cursor):
+    add_documents(api.collection, 5)
+    response = api.client.get(path, params={"cursor": cursor})
+    assert response.status_code == 400
+    assert "Invalid cursor" in response.json()["detail"]
+
+
+@pytest.mark.parametrize("params, expected", [
+    ({}, 12),
+    ({"unsaved": True}, 8),
+    ({"unsaved": False}, 4),
+    ({"unprocessed": True}, 6),
+    ({"document_type": "Rechnung"}, 6),
+    ({"document_type": "Rechnung", "unsaved": True}, 4),
+    ({"date_from": "2024-01-04", "date_to": "2024-01-06"}, 3),
+    ({"correspondent": "Unbekannt"}, 0),
+])
+def test_count_is_number_of_filter_matches(api, params, expected):
+    documents = [
+        Document(
+            original_filename=f"scan_{n:02d}.pdf",
+            document_type="Rechnung" if n % 2 else None,
+            correspondent="Stadtwerke",
+            document_date=date(2024, 1, n + 1),
+            saved_as=[SavedAs(filename=f"saved_{n}.pdf")] if n % 3 == 0 else []
+        )
+        for n in range(12)
+    ]
+    api.collection.add_many(documents)
+    
+    response = api.client.get("/api/v1/documents", params={**params, "limit": 2})
+    body = response.json()
+    assert body["count"] == expected
+    assert len(body["document_ids"]) == min(2, expected)
+    
+    # Zählung und Seiten stimmen überein
+    paged, cursor = 0, None
+    while True:
+        body = api.client.get("/api/v1/documents", params={**params, "limit": 5, **({"cursor": cursor} if cursor else {})}).json()
+        assert body["count"] == expected
+        paged += len(body["document_ids"])
+        cursor = body["next_cursor"]
+        if cursor is None:
+            break
+    assert paged == expected
+
+@pytest.mark.parametrize("fields, expected", [
+    ("original_filename", {"id", "original_filename"}),
+    ("correspondent,metadata.topic", {"id", "metadata"}),
+    ("metadata,version", {"id", "metadata", "version"}),
+    (" is_saved , ", {"id", "is_saved"}),
+])
+def test_projection(api, fields, expected):
+    add_documents(api.collection, 3)
+    items = api.client.get("/api/v1/documents", params={"fields": fields}).json()["items"]
+    assert {frozenset(item) for item in items} == {frozenset(expected)}
+    if fields == "correspondent,metadata.topic":
+        assert items[0]["metadata"] == {"correspondent": "Stadtwerke", "topic": None}
+    if fields.startswith("metadata,"):
+        assert set(items[0]["metadata"]) == {"document_type", "correspondent", "topic", "customer_id", "document_number", "document_date"}
+
+
+def test_unknown_projection_field(api):
+    response = api.client.get("/api/v1/documents", params={"fields": "original_filename,passwort"})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Unknown field: passwort"
+
+
+def test_cursor_is_stable_while_documents_change(api):
+    documents = add_documents(api.collection, 10)
+    page = api.client.get("/api/v1/documents", params={"limit": 4}).json()
+    # Vor und nach der Cursor-Position eingefügt bzw. entfernt
+    api.collection.add(Document(original_filename="a_vorne.pdf"))
+    api.collection.add(Document(original_filename="z_hinten.pdf"))
+    api.collection.remove(documents[1].id)
+    api.collection.remove(documents[6].id)
+    rest = api.client.get("/api/v1/documents", params={"limit": 100, "cursor": page["next_cursor"]}).json()
+    names = [item["original_filename"] for item in rest["items"]]
+    assert names == [f"rechnung_{n:02d}.pdf" for n in (4, 5, 7, 8, 9)] + ["z_hinten.pdf"]
\ No newline at end of file
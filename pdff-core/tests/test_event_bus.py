@@ -0,0 +1,124 @@
+"""EventBus: Reihenfolge auch aus Worker-Threads, Replay nach Reconnect, reset bei Lücken, Backpressure, SSE-Frames"""
+from typing import List
+import asyncio
+import json
+from app.api.v1.events import stream_events
+from app.models import Document, DocumentCollection
+from app.services import EventBus
+
+
+class ConnectedRequest:
+    async def is_disconnected(self) -> bool:
+        return False
+
+
+def publish(bus: EventBus, count: int) -> List[Document]:
+    documents = [Document(original_filename=f"scan_{n}.pdf") for n in range(count)]
+    for document in documents:
+        bus.publish_change("created", document)
+    return documents
+
+
+def test_replay_after_reconnect():
+    bus = EventBus(replay_size=3)
+    publish(bus, 2)
+    event_id = f"{bus.epoch}-1"
+    subscription, missed, gap = bus.subscribe(event_id)
+    assert ([event.seq for event in missed], gap) == ([2], False)
+    assert subscription.last_seq == 2
+    assert bus.parse_event_id(f"{bus.epoch}-2") == 2
+    
+    # Älteste verpasste Events sind aus dem Puffer gefallen: Client muss neu laden
+    publish(bus, 4)
+    _, missed, gap = bus.subscribe(event_id)
+    assert ([event.seq for event in missed], gap) == ([4, 5, 6], True)
+    _, missed, gap = bus.subscribe(f"{bus.epoch}-3")
+    assert ([event.seq for event in missed], gap) == ([4, 5, 6], False)
+    _, missed, gap = bus.subscribe(f"{bus.epoch}-6")
+    assert (missed, gap) == ([], False)
+    
+    # IDs eines früheren Prozesses, unbekannte Nummern und Unsinn: ab jetzt mit reset
+    for foreign in ("0badc0de-2", f"{bus.epoch}-99", "kaputt"):
+        _, missed, gap = bus.subscribe(foreign)
+        assert (missed, gap) == ([], True)
+    _, missed, gap = bus.subscribe(None)
+    assert (missed, gap) == ([], False)
+
+
+def test_collection_changes_arrive_in_order():
+    bus = EventBus()
+    collection = DocumentCollection()
+    collection.change_listeners.append(bus.publish_change)
+    
+    async def main():
+        bus.attach(asyncio.get_running_loop())
+        subscription, _, _ = bus.subscribe()
+        document = Document(original_filename="scan.pdf")
+        collection.add(document)
+        # Änderungen aus Worker-Threads werden im Loop zugestellt
+        await asyncio.to_thread(collection.update, document, {"topic": "Strom", "correspondent": "Stadtwerke"})
+        collection.remove(document.id)
+        events = [await asyncio.wait_for(subscription.queue.get(), 1) for _ in range(3)]
+        bus.unsubscribe(subscription)
+        return document, events
+    document, events = asyncio.run(main())
+    
+    assert [(event.seq, event.type) for event in events] == [(1, "created"), (2, "updated"), (3, "removed")]
+    assert {event.document_id for event in events} == {document.id}
+    assert events[1].fields == ["correspondent", "topic"]
+    assert events[1].version == events[0].version + 1
+    assert (bus.published_total, bus.subscribers) == (3, 0)
+
+
+def test_slow_client_is_dropped():
+    bus = EventBus(client_queue_size=2)
+    
+    async def main():
+        bus.attach(asyncio.get_running_loop())
+        slow, _, _ = bus.subscribe()
+        fast, _, _ = bus.subscribe()
+        for _ in range(3):
+            publish(bus, 1)
+            await asyncio.sleep(0)
+            while not fast.queue.empty():
+                fast.queue.get_nowait()
+        await asyncio.sleep(0)
+        return slow, fast
+    slow, fast = asyncio.run(main())
+    
+    # Ausstehende Events verworfen, Stream-Ende signalisiert; der Client setzt per Replay fort
+    assert slow.closed
+    assert slow.queue.get_nowait() is None and slow.queue.empty()
+    assert not fast.closed
+    assert (bus.subscribers, bus.dropped_clients_total) == (1, 1)
+    _, missed, gap = bus.subscribe(f"{bus.epoch}-0")
+    assert ([event.seq for event in missed], gap) == ([1, 2, 3], False)
+
+
+def test_stream_frames():
+    bus = EventBus(replay_size=1)
+    documents = publish(bus, 2)
+    
+    async def main():
+        bus.attach(asyncio.get_running_loop())
+        stream = stream_events(bus, ConnectedRequest(), f"{bus.epoch}-0")
+        frames = [await stream.__anext__() for _ in range(3)]
+        bus.publish_change("updated", documents[0], ("topic",))
+        frames.append(await asyncio.wait_for(stream.__anext__(), 1))
+        # Herunterfahren beendet den Stream und meldet den Client ab
+        bus.close()
+        frames += [frame async for frame in stream]
+        return frames
+    retry, reset, missed, live = asyncio.run(main())
+    
+    assert retry.startswith("retry: ") and retry.endswith("\n\n")
+    lines = reset.splitlines()
+    assert lines[:2] == [f"id: {bus.epoch}-2", "event: reset"]
+    assert json.loads(lines[2].removeprefix("data: "))["seq"] == 2
+    lines = missed.splitlines()
+    assert lines[:2] == [f"id: {bus.epoch}-2", "event: created"]
+    assert json.loads(lines[2].removeprefix("data: "))["document_id"] == str(documents[1].id)
+    lines = live.splitlines()
+    assert lines[:2] == [f"id: {bus.epoch}-3", "event: updated"]
+    assert json.loads(lines[2].removeprefix("data: "))["fields"] == ["topic"]
+    assert bus.subscribers == 0
\ No newline at end of file
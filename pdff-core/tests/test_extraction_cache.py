@@ -0,0 +1,140 @@
+"""ExtractionCache: LRU mit Journal über Neustarts, Treffer in der Engine ohne Provider-Aufruf"""
+from datetime import date
+import asyncio
+import hashlib
+from conftest import scripted_provider, wait_until
+from app.models import FieldSource
+from app.services import ExtractionCache, ExtractionResult
+from app.services.extraction_cache import cache_key
+
+ANSWER = {"document_type": "Rechnung", "correspondent": "Stadtwerke", "topic": "Strom", "document_date": "2024-03-01"}
+CONTENT_HASH = hashlib.sha256(b"rechnung").hexdigest()
+
+
+def result(topic: str) -> ExtractionResult:
+    return ExtractionResult(
+        fields={"topic": topic, "document_date": date(2024, 3, 1)},
+        sources={"topic": FieldSource(source="llm", detail="scripted/test-model")},
+        input_tokens=100
+    )
+
+
+def test_lru_eviction_and_counters(tmp_path):
+    cache = ExtractionCache(tmp_path, max_entries=3)
+    cache.load()
+    for key in "abc":
+        cache.put(key, result(key))
+    assert cache.get("a").fields == {"topic": "a", "document_date": date(2024, 3, 1)}
+    assert cache.get("x") is None
+    assert cache.get("x", count_miss=False) is None
+    
+    # "a" wurde zuletzt genutzt: "b" fliegt
+    cache.put("d", result("d"))
+    assert cache.get("b") is None
+    assert [cache.get(key).fields["topic"] for key in "acd"] == ["a", "c", "d"]
+    assert (len(cache), cache.hits, cache.misses, cache.evictions) == (3, 4, 2, 1)
+    cache.close()
+
+
+def test_journal_survives_restart(tmp_path):
+    cache = ExtractionCache(tmp_path, max_entries=3)
+    cache.load()
+    for key in "abcde":
+        cache.put(key, result(key))
+    cache.get("c")
+    cache.close()
+    
+    restarted = ExtractionCache(tmp_path, max_entries=3)
+    assert restarted.load() == 3
+    assert restarted.get("a") is None and restarted.get("b") is None
+    cached = restarted.get("c")
+    assert cached.fields["document_date"] == date(2024, 3, 1)
+    assert cached.sources["topic"].detail == "scripted/test-model"
+    assert cached.input_tokens == 100
+    # Nach dem Laden kompaktiert
+    lines = (tmp_path / ExtractionCache.FILENAME).read_text(encoding="utf-8").splitlines()
+    assert len(lines) == 3
+    restarted.put("f", result("f"))
+    assert restarted.get("d") is None
+    restarted.close()
+    
+    # Kleinere Kapazität beim Neustart: nur die zuletzt geschriebenen bleiben
+    smaller = ExtractionCache(tmp_path, max_entries=2)
+    assert smaller.load() == 2
+    assert smaller.get("c") is None
+    assert [smaller.get(key).fields["topic"] for key in "ef"] == ["e", "f"]
+    smaller.close()
+
+
+def test_journal_is_rewritten_when_it_grows(tmp_path):
+    cache = ExtractionCache(tmp_path, max_entries=2)
+    cache.load()
+    for n in range(20):
+        cache.put(f"key {n}", result(str(n)))
+    cache.close()
+    lines = (tmp_path / ExtractionCache.FILENAME).read_text(encoding="utf-8").splitlines()
+    assert len(lines) <= 2 * 2 + 2
+    
+    restarted = ExtractionCache(tmp_path, max_entries=2)
+    assert restarted.load() == 2
+    assert restarted.get("key 19").fields["topic"] == "19"
+    restarted.close()
+
+
+def test_key_covers_provider_model_and_prompt():
+    provider = scripted_provider(ANSWER)
+    key = cache_key(CONTENT_HASH, provider)
+    assert key == f"{CONTENT_HASH}:scripted:test-model:{provider.prompt_version}"
+    provider.model = "anderes-modell"
+    assert cache_key(CONTENT_HASH, provider) != key
+    assert cache_key(CONTENT_HASH, provider, "rules1-p3") != cache_key(CONTENT_HASH, provider)
+
+
+def test_engine_serves_identical_content_from_cache(extraction):
+    first = extraction.add(content_hash=CONTENT_HASH)
+    provider = scripted_provider(ANSWER)
+    
+    async def process(*documents):
+        engine = extraction.engine(provider, cache_entries=10)
+        await engine.start()
+        try:
+            jobs = [engine.enqueue(document.id) for document in documents]
+            assert await wait_until(lambda: all(engine.get_job(job.id).state == "succeeded" for job in jobs))
+            return jobs, engine.stats()
+        finally:
+            await engine.stop()
+    
+    (job,), stats = asyncio.run(process(first))
+    assert not job.cache_hit
+    assert (stats.cache_hits, stats.cache_misses, stats.cache_entries) == (0, 1, 1)
+    assert len(provider.calls) == 1
+    
+    # Gleicher Inhalt nach einem Neustart: kein Provider-Aufruf, gleiche Werte
+    second = extraction.add(content_hash=CONTENT_HASH, original_filename="kopie.pdf")
+    (job,), stats = asyncio.run(process(second))
+    assert job.cache_hit
+    assert job.applied_fields == ["correspondent", "document_date", "document_type", "topic"]
+    assert (stats.cache_hits, stats.succeeded_total, stats.tokens_total) == (1, 1, 0)
+    assert len(provider.calls) == 1
+    assert (second.correspondent, second.document_date) == ("Stadtwerke", date(2024, 3, 1))
+    assert second.field_sources["correspondent"].detail == "scripted/test-model"
+
+
+def test_partial_results_are_not_cached(extraction):
+    # Nur die fehlenden Felder angefragt: das Ergebnis taugt nicht für andere Documents
+    partial = extraction.add(content_hash=CONTENT_HASH, correspondent="Manuell")
+    without_hash = extraction.add()
+    provider = scripted_provider(ANSWER)
+    engine = extraction.engine(provider, cache_entries=10)
+    
+    async def body():
+        await engine.start()
+        try:
+            jobs = [engine.enqueue(document.id) for document in (partial, without_hash)]
+            assert await wait_until(lambda: all(engine.get_job(job.id).state == "succeeded" for job in jobs))
+        finally:
+            await engine.stop()
+    asyncio.run(body())
+    
+    assert len(provider.calls) == 2
+    assert engine.stats().cache_entries == 0
\ No newline at end of file
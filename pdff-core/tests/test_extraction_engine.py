@@ -0,0 +1,160 @@
+"""ExtractionEngine: Retries mit Backoff, Retry-After, aufgeben, Parallelität, Neustart und Rate-Limit"""
+from datetime import date
+import asyncio
+import time
+from conftest import scripted_provider, wait_until
+from app.models import FieldSource
+from app.services import ExtractionError, ExtractionJobStore
+from app.utils.rate_limiter import RateLimiter
+
+ANSWER = {"document_type": "Rechnung", "correspondent": "Stadtwerke", "topic": "Strom", "document_date": "2024-03-01"}
+
+
+def finished(engine, *jobs) -> bool:
+    return all(engine.get_job(job.id).state in ("succeeded", "failed") for job in jobs)
+
+
+def run(engine, body):
+    async def main():
+        await engine.start()
+        try:
+            return await body()
+        finally:
+            await engine.stop()
+    return asyncio.run(main())
+
+
+def test_retries_then_fills_only_empty_fields(extraction):
+    document = extraction.add(correspondent="Manuell", field_sources={"correspondent": FieldSource(source="manual")})
+    provider = scripted_provider(ANSWER, errors=[ExtractionError("503", retryable=True)] * 2)
+    engine = extraction.engine(provider)
+    
+    async def body():
+        job = engine.enqueue(document.id)
+        assert await wait_until(lambda: finished(engine, job))
+        return job, engine.stats()
+    job, stats = run(engine, body)
+    
+    assert (job.state, job.attempts, job.error) == ("succeeded", 3, None)
+    assert (stats.succeeded_total, stats.retries_total, stats.failed_total) == (1, 2, 0)
+    assert stats.tokens_total == 110
+    # Bereits gefüllte Felder werden gar nicht erst angefragt
+    assert all("correspondent" not in call.fields for call in provider.calls)
+    assert job.applied_fields == ["document_date", "document_type", "topic"]
+    assert document.correspondent == "Manuell"
+    assert (document.document_type, document.document_date) == ("Rechnung", date(2024, 3, 1))
+    assert document.field_sources["topic"].detail == "scripted/test-model"
+    assert document.field_sources["correspondent"].source == "manual"
+    stored = {stored.id: stored for stored in extraction.storage.metadata_store.load_all()}
+    assert stored[document.id].topic == "Strom"
+
+
+def test_retry_after_is_a_lower_bound(extraction):
+    document = extraction.add()
+    provider = scripted_provider(ANSWER, errors=[ExtractionError("429", retryable=True, retry_after=0.3)])
+    engine = extraction.engine(provider, backoff_base=0.001)
+    
+    async def body():
+        job = engine.enqueue(document.id)
+        assert await wait_until(lambda: engine.stats().waiting_for_retry == 1)
+        assert job.state == "queued" and job.error == "429"
+        assert await wait_until(lambda: finished(engine, job))
+        return job
+    job = run(engine, body)
+    
+    assert job.state == "succeeded"
+    first, second = provider.calls
+    assert second.at - first.at >= 0.3
+
+
+def test_gives_up(extraction):
+    permanent, exhausted, missing = extraction.add(), extraction.add(), extraction.add(pdf=None)
+    provider = scripted_provider(ANSWER, errors=[
+        ExtractionError("Ungültige Antwort"),
+        ExtractionError("503", retryable=True),
+        ExtractionError("503", retryable=True),
+    ])
+    engine = extraction.engine(provider, concurrency=1, max_attempts=2)
+    
+    async def body():
+        jobs = [engine.enqueue(document.id) for document in (permanent, exhausted, missing)]
+        assert await wait_until(lambda: finished(engine, *jobs))
+        # Fehlgeschlagene Documents lassen sich erneut einreihen
+        retry = engine.enqueue(permanent.id)
+        assert retry is not jobs[0]
+        assert await wait_until(lambda: finished(engine, retry))
+        return jobs
+    jobs = run(engine, body)
+    
+    assert [(job.state, job.attempts) for job in jobs] == [("failed", 1), ("failed", 2), ("failed", 1)]
+    assert jobs[0].error == "Ungültige Antwort"
+    assert jobs[1].error == "Giving up after 2 attempts: 503"
+    assert jobs[2].error == "PDF file not found in archive"
+    assert (engine.stats().failed_total, engine.stats().succeeded_total) == (3, 1)
+    assert len(provider.calls) == 4
+
+
+def test_concurrency_limit_and_one_job_per_document(extraction):
+    documents = [extraction.add(original_filename=f"scan_{n}.pdf") for n in range(8)]
+    provider = scripted_provider(ANSWER, latency=0.05)
+    engine = extraction.engine(provider, concurrency=3)
+    
+    async def body():
+        jobs = [engine.enqueue(document.id) for document in documents]
+        assert engine.enqueue(documents[0].id) is jobs[0]
+        assert await wait_until(lambda: finished(engine, *jobs))
+        return jobs
+    jobs = run(engine, body)
+    
+    assert all(job.state == "succeeded" for job in jobs)
+    assert provider.peak == 3
+    assert len(provider.calls) == 8
+
+
+def test_jobs_resume_after_restart(extraction):
+    documents = [extraction.add(original_filename=f"scan_{n}.pdf") for n in range(3)]
+    provider = scripted_provider(ANSWER)
+    
+    # Ohne Worker eingereiht: die Jobs stehen nur im Journal
+    async def enqueue():
+        engine = extraction.engine(provider)
+        jobs = [engine.enqueue(document.id) for document in documents]
+        engine.job_store.close()
+        return jobs
+    queued = asyncio.run(enqueue())
+    assert not provider.calls
+    
+    engine = extraction.engine(provider)
+    
+    async def body():
+        assert await wait_until(lambda: finished(engine, *queued))
+    run(engine, body)
+    assert {job.id for job in engine.list_jobs(state="succeeded")} == {job.id for job in queued}
+    assert sorted(call.document_id for call in provider.calls) == sorted(document.id for document in documents)
+    
+    # Abgeschlossene Jobs bleiben im Journal, werden aber nicht erneut ausgeführt
+    jobs = ExtractionJobStore(extraction.root / "archive").load()
+    assert {job.state for job in jobs.values()} == {"succeeded"}
+
+
+def test_rate_limiter_waits_for_budget():
+    async def main():
+        limiter = RateLimiter(requests_per_minute=600, tokens_per_minute=60_000)
+        started = time.monotonic()
+        await limiter.acquire(60_000)
+        assert time.monotonic() - started < 0.05
+        # Weniger verbraucht als geschätzt: die Differenz steht sofort wieder zur Verfügung
+        limiter.settle(60_000, 59_000)
+        await limiter.acquire(500)
+        assert time.monotonic() - started < 0.05
+        
+        # Budget leer: 200 Tokens bei 1000 pro Sekunde
+        await limiter.acquire(700)
+        assert time.monotonic() - started >= 0.15
+        
+        # Retry-After leert die Buckets: 0.2s plus ein Request bei 10 pro Sekunde
+        limiter.penalize(0.2)
+        penalized = time.monotonic()
+        await limiter.acquire(0)
+        assert time.monotonic() - penalized >= 0.25
+    asyncio.run(main())
\ No newline at end of file
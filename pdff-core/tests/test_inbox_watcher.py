@@ -0,0 +1,132 @@
+"""InboxWatcher: Debouncing, Fehlschläge und Fallback auf Polling"""
+from pathlib import Path
+import asyncio
+import time
+import pytest
+from app.models import DocumentCollection
+from app.services import InboxWatcher, LocalStorageService
+from app.services import inbox_watcher
+
+PDF = b"%PDF-1.4\n%%EOF\n"
+
+
+@pytest.fixture
+def storage(tmp_path):
+    storage = LocalStorageService(tmp_path / "in", tmp_path / "archive", tmp_path / "out")
+    storage.data_in.mkdir()
+    return storage
+
+
+async def until(condition, timeout: float = 5.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        await asyncio.sleep(0.02)
+    return True
+
+
+def failing_on(storage: LocalStorageService, name: str) -> None:
+    """Ingest einer bestimmten Datei schlägt fehl (z.B. defekte PDF)"""
+    ingest_file = storage.ingest_file
+    
+    def ingest(collection, path: Path):
+        if path.name == name:
+            raise ValueError("defekt")
+        return ingest_file(collection, path)
+    storage.ingest_file = ingest
+
+
+@pytest.mark.parametrize("mode", ["inotify", "poll"])
+def test_failed_files_are_forgotten_once_deleted(storage, mode):
+    failing_on(storage, "defekt.pdf")
+    watcher = InboxWatcher(storage, DocumentCollection(), mode=mode, poll_interval=0.05, debounce_seconds=0.05)
+    defect = storage.data_in / "defekt.pdf"
+    
+    async def run():
+        await watcher.start()
+        defect.write_bytes(PDF)
+        (storage.data_in / "gut.pdf").write_bytes(PDF)
+        assert await until(lambda: watcher.stats().ingested_total == 1 and watcher.stats().failed_total == 1)
+        assert defect in watcher._failed
+        # Unverändert: kein erneuter Versuch
+        await asyncio.sleep(0.3)
+        assert watcher.stats().failed_total == 1
+        
+        defect.unlink()
+        assert await until(lambda: not watcher._failed)
+        await watcher.stop()
+    asyncio.run(run())
+
+def test_files_are_ingested_only_once_stable(storage):
+    collection = DocumentCollection()
+    watcher = InboxWatcher(storage, collection, mode="poll", poll_interval=0.05, debounce_seconds=0.4)
+    growing = storage.data_in / "scanner.pdf"
+    
+    async def run():
+        await watcher.start()
+        # Ein Scanner, der noch schreibt: jede Änderung startet das Debouncing neu
+        with growing.open("wb") as output:
+            for _ in range(8):
+                output.write(PDF)
+                output.flush()
+                await asyncio.sleep(0.1)
+                assert watcher.stats().ingested_total == 0
+                assert watcher.stats().debouncing == 1
+        (storage.data_in / "notiz.txt").write_text("keine PDF")
+        assert await until(lambda: watcher.stats().ingested_total == 1)
+        await watcher.stop()
+    asyncio.run(run())
+    
+    document, = collection.all()
+    assert document.original_filename == "scanner.pdf"
+    assert storage.archive_path(document.id).read_bytes() == PDF * 8
+    assert [path.name for path in storage.data_in.iterdir()] == ["notiz.txt"]
+
+
+def test_falls_back_to_polling_without_inotify(storage, monkeypatch):
+    def unavailable(directory):
+        raise OSError(38, "inotify_init1 fehlgeschlagen")
+    monkeypatch.setattr(inbox_watcher, "_Inotify", unavailable)
+    (storage.data_in / "vorhanden.pdf").write_bytes(PDF)
+    watcher = InboxWatcher(storage, DocumentCollection(), mode="auto", poll_interval=0.05, debounce_seconds=0.05)
+    
+    async def run():
+        await watcher.start()
+        assert watcher.stats().mode == "poll"
+        (storage.data_in / "neu.pdf").write_bytes(PDF)
+        assert await until(lambda: watcher.stats().ingested_total == 2)
+        await watcher.stop()
+        assert watcher.stats().mode == "stopped" and not watcher.stats().running
+        
+        # Ausdrücklich inotify verlangt: kein stiller Fallback
+        with pytest.raises(OSError):
+            await InboxWatcher(storage, DocumentCollection(), mode="inotify").start()
+    asyncio.run(run())
+
+
+def test_full_queue_applies_backpressure(storage):
+    release = asyncio.Event()
+    ingest_file = storage.ingest_file
+    
+    async def run():
+        loop = asyncio.get_running_loop()
+        
+        def blocked(collection, path):
+            asyncio.run_coroutine_threadsafe(release.wait(), loop).result()
+            return ingest_file(collection, path)
+        storage.ingest_file = blocked
+        watcher = InboxWatcher(storage, DocumentCollection(), mode="poll", poll_interval=0.05, debounce_seconds=0.05, queue_size=2, concurrency=1)
+        for n in range(6):
+            (storage.data_in / f"scan_{n}.pdf").write_bytes(PDF)
+        await watcher.start()
+        assert await until(lambda: watcher.stats().queue_full)
+        await asyncio.sleep(0.2)
+        stats = watcher.stats()
+        # Einer in Arbeit, zwei in der Queue, der Rest wartet (nichts verloren)
+        assert (stats.in_flight, stats.queue_depth, stats.queue_capacity) == (1, 2, 2)
+        release.set()
+        assert await until(lambda: watcher.stats().ingested_total == 6)
+        assert watcher.stats().throughput_per_minute == 6
+        await watcher.stop()
+    asyncio.run(run())
\ No newline at end of file
@@ -0,0 +1,169 @@
+"""JournalMetadataStore: Replay nach abgeschnittenem Record, Kompaktierung, Backend-Prüfung beim Start"""
+from pathlib import Path
+from typing import Dict
+from uuid import UUID
+import shutil
+import pytest
+from app.models import Document
+from app.services import JournalMetadataStore, ShardedLayout
+from app.services import metadata_store
+from app.services.metadata_store import JsonFileMetadataStore, check_metadata_backend, migrate_metadata
+
+
+def make_documents(count: int) -> Dict[UUID, Document]:
+    documents = [Document(original_filename=f"scan_{n}.pdf", correspondent=f"Firma {n % 7}", version=n) for n in range(count)]
+    return {document.id: document for document in documents}
+
+
+def loaded(directory: Path, **options) -> Dict[UUID, dict]:
+    store = JournalMetadataStore(directory, **options)
+    try:
+        return {document.id: document.model_dump() for document in store.load_all()}
+    finally:
+        store.close()
+
+
+def dumped(documents: Dict[UUID, Document]) -> Dict[UUID, dict]:
+    return {document_id: document.model_dump() for document_id, document in documents.items()}
+
+
+def test_replay_skips_torn_last_record(tmp_path):
+    documents = make_documents(20)
+    store = JournalMetadataStore(tmp_path)
+    store.put_many(documents.values())
+    store.close()
+    
+    journal = tmp_path / JournalMetadataStore.JOURNAL_NAME
+    data = journal.read_bytes()
+    # Absturz mitten im Anhängen: letzter Record ohne Ende
+    torn = next(iter(documents.values())).model_copy(update={"correspondent": "verloren"})
+    record = b'{"op": "put", "id": "' + str(torn.id).encode() + b'", "doc": ' + torn.model_dump_json().encode() + b"}"
+    journal.write_bytes(data + record[:len(record) // 2])
+    
+    assert loaded(tmp_path) == dumped(documents)
+
+
+def test_appends_after_torn_record_survive(tmp_path):
+    documents = make_documents(5)
+    store = JournalMetadataStore(tmp_path)
+    store.put_many(documents.values())
+    store.close()
+    with (tmp_path / JournalMetadataStore.JOURNAL_NAME).open("a", encoding="utf-8") as journal:
+        journal.write('{"op": "put", "id": "')
+    
+    # Nach dem Neustart angehängte Records dürfen nicht mit dem Rest verworfen werden
+    store = JournalMetadataStore(tmp_path)
+    list(store.load_all())
+    added = make_documents(3)
+    store.put_many(added.values())
+    removed = next(iter(documents))
+    store.delete(removed)
+    store.close()
+    
+    documents.update(added)
+    del documents[removed]
+    assert loaded(tmp_path) == dumped(documents)
+
+
+def test_compaction_keeps_latest_state(tmp_path):
+    documents = make_documents(30)
+    store = JournalMetadataStore(tmp_path, compact_threshold=25)
+    store.put_many(list(documents.values())[:20])
+    # Schwelle erreicht: Snapshot schreiben, Journal leeren
+    store.put_many(list(documents.values())[20:])
+    assert (tmp_path / JournalMetadataStore.SNAPSHOT_NAME).exists()
+    assert (tmp_path / JournalMetadataStore.JOURNAL_NAME).stat().st_size == 0
+    
+    # Überschreiben und Löschen nach dem Snapshot
+    changed = list(documents.values())[:5]
+    for document in changed:
+        document.correspondent = "Geändert"
+    store.put_many(changed)
+    for document_id in list(documents)[25:]:
+        store.delete(document_id)
+        del documents[document_id]
+    store.close()
+    assert loaded(tmp_path) == dumped(documents)
+    
+    store = JournalMetadataStore(tmp_path)
+    store.compact()
+    store.close()
+    assert (tmp_path / JournalMetadataStore.JOURNAL_NAME).stat().st_size == 0
+    snapshot = (tmp_path / JournalMetadataStore.SNAPSHOT_NAME).read_text(encoding="utf-8").splitlines()
+    assert len(snapshot) == len(documents)
+    assert loaded(tmp_path) == dumped(documents)
+
+
+def test_crash_before_journal_is_emptied(tmp_path):
+    documents = make_documents(10)
+    store = JournalMetadataStore(tmp_path)
+    store.put_many(documents.values())
+    store.delete(next(iter(documents)))
+    store.close()
+    del documents[next(iter(documents))]
+    journal = tmp_path / JournalMetadataStore.JOURNAL_NAME
+    backup = tmp_path / "journal.backup"
+    shutil.copy(journal, backup)
+    
+    store = JournalMetadataStore(tmp_path)
+    store.compact()
+    store.close()
+    # Snapshot ersetzt, Journal aber noch nicht geleert: Records werden erneut (idempotent) angewendet
+    shutil.copy(backup, journal)
+    assert loaded(tmp_path) == dumped(documents)
+
+
+def test_backend_check_points_to_migration(tmp_path):
+    documents = make_documents(3)
+    json_store = JsonFileMetadataStore(tmp_path)
+    json_store.put_many(documents.values())
+    json_store.close()
+    
+    check_metadata_backend("json", tmp_path)
+    with pytest.raises(RuntimeError, match="migrate --from json --to journal"):
+        check_metadata_backend("journal", tmp_path)
+    
+    migrate_metadata(JsonFileMetadataStore(tmp_path), JournalMetadataStore(tmp_path))
+    check_metadata_backend("journal", tmp_path)
+    assert loaded(tmp_path) == dumped(documents)
+    
+    for path in tmp_path.glob("*.json"):
+        path.unlink()
+    with pytest.raises(RuntimeError, match="migrate --from journal --to json"):
+        check_metadata_backend("json", tmp_path)
+
+
+def test_backend_check_scans_only_when_needed(tmp_path, monkeypatch):
+    layout = ShardedLayout()
+    json_store = JsonFileMetadataStore(tmp_path, layout=layout)
+    json_store.put_many(make_documents(3).values())
+    json_store.close()
+    # Nur in den Shard-Verzeichnissen, daneben fremde .json-Dateien
+    (tmp_path / "settings.json").write_text("{}")
+    assert not list(tmp_path.glob("*-*.json"))
+    with pytest.raises(RuntimeError, match="migrate --from json --to journal"):
+        check_metadata_backend("journal", tmp_path, layout)
+    
+    # Mit Journal (bzw. ohne beim JSON-Backend) wird das Archive nicht durchsucht
+    def scan(*args):
+        raise AssertionError("Archive durchsucht")
+    monkeypatch.setattr(metadata_store, "_has_json_metadata", scan)
+    check_metadata_backend("json", tmp_path, layout)
+    (tmp_path / JournalMetadataStore.JOURNAL_NAME).touch()
+    check_metadata_backend("journal", tmp_path, layout)
+
+
+def test_compaction_keeps_appends_of_other_processes(tmp_path):
+    # Zwei Instanzen wie zwei Worker-Prozesse auf demselben Journal
+    first, second = JournalMetadataStore(tmp_path), JournalMetadataStore(tmp_path)
+    a0, b1, a2, b3, a4 = make_documents(5).values()
+    first.put(a0)
+    first.compact()
+    second.put(b1)
+    first.put(a2)
+    second.compact()
+    second.put(b3)
+    first.put(a4)
+    first.close()
+    second.close()
+    assert loaded(tmp_path) == dumped({document.id: document for document in (a0, b1, a2, b3, a4)})
\ No newline at end of file
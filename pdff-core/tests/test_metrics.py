@@ -0,0 +1,139 @@
+"""Kennzahlen: Prometheus-Textformat, Zählen aus vielen Threads, Latenz je Routen-Template"""
+from typing import Dict, List
+from uuid import uuid4
+import re
+import threading
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.api.metrics import router as metrics_router
+from app.api.v1 import api_v1_router
+from app.utils.metrics import CONTENT_TYPE, HTTP_REQUEST_SECONDS, MetricsMiddleware, MetricsRegistry
+
+SAMPLE = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)(\{([a-zA-Z_]\w*="(?:[^"\\\n]|\\[\\n"])*",?)*\})? (-?[0-9.e+-]+|\+Inf|NaN)$')
+
+
+def parse(text: str) -> Dict[str, List[str]]:
+    """Prüft die Exposition Zeile für Zeile und liefert die Samples je Metrik (HELP und TYPE davor)"""
+    assert text.endswith("\n")
+    samples: Dict[str, List[str]] = {}
+    types: Dict[str, str] = {}
+    lines = text[:-1].split("\n")
+    for index, line in enumerate(lines):
+        if line.startswith("# HELP "):
+            name = line.split(" ")[2]
+            assert lines[index + 1].startswith(f"# TYPE {name} "), line
+            assert name not in types, f"{name} doppelt"
+            types[name] = lines[index + 1].split(" ")[3]
+            samples[name] = []
+            continue
+        if line.startswith("# TYPE "):
+            continue
+        match = SAMPLE.match(line)
+        assert match, line
+        name = match.group(1)
+        family = re.sub(r"_(bucket|sum|count)$", "", name) if name not in types else name
+        assert family in types, f"{name} ohne HELP/TYPE"
+        samples[family].append(line)
+    return samples
+
+
+def test_exposition_format():
+    registry = MetricsRegistry()
+    counter = registry.counter("test_requests_total", "Requests", ("path",))
+    counter.labels('/a "b"\\c\n').inc()
+    counter.labels("/").inc(2.5)
+    histogram = registry.histogram("test_seconds", "Dauer", buckets=(1.0, 0.5, 2))
+    for value in (0.5, 0.7, 1.0, 3.0):
+        histogram.observe(value)
+    registry.gauge_callback("test_ready", "Bereit", lambda: 1)
+    registry.gauge_callback("test_disabled", "Ohne Dienst", lambda: None)
+    registry.counter_callback("test_files_total", "Dateien", lambda: {("ok",): 3, ("failed",): 1}, ("result",))
+    
+    text = registry.render()
+    samples = parse(text)
+    assert samples["test_requests_total"] == [
+        'test_requests_total{path="/"} 2.5',
+        'test_requests_total{path="/a \\"b\\"\\\\c\\n"} 1',
+    ]
+    # Kumulierte Buckets, Grenzen inklusiv, Buckets sortiert
+    assert samples["test_seconds"] == [
+        'test_seconds_bucket{le="0.5"} 1',
+        'test_seconds_bucket{le="1"} 3',
+        'test_seconds_bucket{le="2"} 3',
+        'test_seconds_bucket{le="+Inf"} 4',
+        "test_seconds_sum 5.2",
+        "test_seconds_count 4",
+    ]
+    assert samples["test_ready"] == ["test_ready 1"]
+    assert "test_disabled" not in text
+    assert samples["test_files_total"] == ['test_files_total{result="failed"} 1', 'test_files_total{result="ok"} 3']
+    assert "# TYPE test_files_total counter" in text and "# TYPE test_ready gauge" in text
+
+
+def test_registration():
+    registry = MetricsRegistry()
+    counter = registry.counter("test_total", "Zähler", ("kind",))
+    assert registry.counter("test_total", "Zähler", ("kind",)) is counter
+    with pytest.raises(ValueError):
+        registry.histogram("test_total", "Zähler", ("kind",))
+    with pytest.raises(ValueError):
+        registry.counter("test_total", "Zähler", ("other",))
+    with pytest.raises(ValueError):
+        counter.labels("a", "b")
+    # Neu registrierte Callbacks ersetzen die alten
+    registry.gauge_callback("test_gauge", "Wert", lambda: 1)
+    registry.gauge_callback("test_gauge", "Wert", lambda: 2)
+    assert "test_gauge 2" in registry.render()
+
+
+def test_counts_from_many_threads():
+    registry = MetricsRegistry()
+    counter = registry.counter("test_total", "Zähler")
+    histogram = registry.histogram("test_seconds", "Dauer", ("worker",), buckets=(0.1,))
+    child = histogram.labels("a")
+    barrier = threading.Barrier(8)
+    
+    def work():
+        barrier.wait()
+        for _ in range(5000):
+            counter.inc()
+            child.observe(0.05)
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert counter.labels().value == 40000
+    cumulative, total, count = child.snapshot()
+    assert (cumulative, count) == ([40000, 40000], 40000)
+    assert total == pytest.approx(2000)
+
+
+def requests_recorded(method: str, route: str, status: str) -> int:
+    return HTTP_REQUEST_SECONDS.labels(method, route, status).snapshot()[2]
+
+
+def test_middleware_labels_route_templates(api):
+    app = FastAPI()
+    app.include_router(api_v1_router)
+    app.include_router(metrics_router)
+    app.dependency_overrides = api.client.app.dependency_overrides
+    app.add_middleware(MetricsMiddleware, exclude=("/metrics",))
+    client = TestClient(app)
+    route = "/api/v1/documents/{document_id}"
+    before = requests_recorded("GET", route, "404"), requests_recorded("GET", "unmatched", "404")
+    
+    for _ in range(3):
+        assert client.get(f"/api/v1/documents/{uuid4()}").status_code == 404
+    assert client.get("/gibt-es-nicht").status_code == 404
+    assert requests_recorded("GET", route, "404") == before[0] + 3
+    assert requests_recorded("GET", "unmatched", "404") == before[1] + 1
+    
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == CONTENT_TYPE
+    samples = parse(response.text)
+    assert any(f'route="{route}"' in line for line in samples["pdff_http_request_duration_seconds"])
+    assert not any('route="/metrics"' in line for line in samples["pdff_http_request_duration_seconds"])
+    assert "pdff_documents" in samples and "pdff_archive_ready" in samples
\ No newline at end of file
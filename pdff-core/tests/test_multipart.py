@@ -0,0 +1,132 @@
+"""StreamingMultipartParser: beliebig geteilte Chunks, abgeschnittene Bodies, Header-Parameter"""
+from typing import Iterable, List, Optional, Tuple
+import asyncio
+import random
+import pytest
+from app.utils.multipart import MultipartError, StreamingMultipartParser, parse_header_params
+
+BOUNDARY = "----pdffBoundary7MA4YWxk"
+CONTENT_TYPE = f"multipart/form-data; boundary={BOUNDARY}"
+
+# Inhalte, die dem Delimiter ähneln, ohne einer zu sein
+TRICKY = b"%PDF-1.7\r\n--" + BOUNDARY[:-1].encode() + b"\r\n\r\n--" + b"\r\n" * 3 + bytes(range(256)) + b"\r\n-"
+
+
+def build_body(parts: Iterable[Tuple[str, Optional[str], bytes]]) -> bytes:
+    body = b"preamble, wird ignoriert\r\n"
+    for name, filename, content in parts:
+        disposition = f'form-data; name="{name}"'
+        if filename is not None:
+            disposition += f"; {filename}"
+        body += f"--{BOUNDARY}\r\nContent-Disposition: {disposition}\r\nContent-Type: application/pdf\r\n\r\n".encode()
+        body += content + b"\r\n"
+    return body + f"--{BOUNDARY}--\r\n".encode()
+
+
+async def _stream(chunks: List[bytes]):
+    for chunk in chunks:
+        yield chunk
+
+
+def split(body: bytes, sizes: Iterable[int]) -> List[bytes]:
+    chunks, pos = [], 0
+    for size in sizes:
+        if pos >= len(body):
+            break
+        chunks.append(body[pos:pos + size])
+        pos += size
+    if pos < len(body):
+        chunks.append(body[pos:])
+    return chunks
+
+
+def parse(chunks: List[bytes], read: Optional[set] = None) -> List[Tuple[Optional[str], Optional[str], Optional[bytes]]]:
+    """(name, filename, Inhalt) je Teil; Teile außerhalb von read werden ungelesen übersprungen"""
+    async def run():
+        parser = StreamingMultipartParser(_stream(chunks), CONTENT_TYPE)
+        result = []
+        async for part in parser.parts():
+            content = None
+            if read is None or part.name in read:
+                content = b"".join([chunk async for chunk in part.chunks()])
+            result.append((part.name, part.filename, content))
+        return result
+    return asyncio.run(run())
+
+
+PARTS = [
+    ("files", 'filename="eins.pdf"', TRICKY),
+    ("files", "filename=\"zwei \\\"b\\\";c.pdf\"; filename*=UTF-8''Rechnung%20M%C3%A4rz.pdf", b"x" * 500 + TRICKY),
+    ("note", None, b""),
+    ("files", "filename*=utf-8''%E2%82%AC-Beleg.pdf; filename=\"euro.pdf\"", b"\r\n"),
+]
+EXPECTED = [
+    ("files", "eins.pdf", TRICKY),
+    ("files", "Rechnung März.pdf", b"x" * 500 + TRICKY),
+    ("note", None, b""),
+    ("files", "€-Beleg.pdf", b"\r\n"),
+]
+
+
+def test_single_chunk():
+    assert parse([build_body(PARTS)]) == EXPECTED
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, len(BOUNDARY) + 3, len(BOUNDARY) + 4, 64, 4096])
+def test_fixed_chunk_sizes(size):
+    body = build_body(PARTS)
+    assert parse(split(body, [size] * len(body))) == EXPECTED
+
+
+def test_boundary_split_at_every_position():
+    body = build_body(PARTS)
+    for pos in range(len(body)):
+        assert parse([body[:pos], body[pos:]]) == EXPECTED, pos
+
+
+def test_random_chunks_and_skipped_parts():
+    body = build_body(PARTS)
+    rng = random.Random(8)
+    for _ in range(200):
+        chunks = split(body, (rng.randrange(1, 80) for _ in range(len(body))))
+        # Empfangene Chunks dürfen auch leer sein
+        chunks.insert(rng.randrange(len(chunks)), b"")
+        assert parse(chunks) == EXPECTED
+        skipped = parse(chunks, read={"note"})
+        assert [(name, filename) for name, filename, _ in skipped] == [(name, filename) for name, filename, _ in EXPECTED]
+
+
+def test_truncated_body_raises():
+    body = build_body(PARTS)
+    # Ohne das abschließende "--" nach dem letzten Delimiter ist der Body unvollständig
+    complete = body.rindex(b"--\r\n") + 2
+    for cut in range(complete):
+        with pytest.raises(MultipartError):
+            parse(split(body[:cut], [997] * len(body)))
+    assert parse([body[:complete]]) == EXPECTED
+
+
+def test_malformed_requests():
+    with pytest.raises(MultipartError):
+        StreamingMultipartParser(_stream([]), "multipart/form-data")
+    with pytest.raises(MultipartError):
+        parse([f"--{BOUNDARY}XX\r\n".encode()])
+    oversized = f"--{BOUNDARY}\r\nX-Padding: {'a' * 20000}".encode()
+    with pytest.raises(MultipartError, match="too large"):
+        parse(split(oversized, [1024] * 30))
+
+
+@pytest.mark.parametrize("value, expected", [
+    ('form-data; name="files"; filename="a.pdf"', {"name": "files", "filename": "a.pdf"}),
+    ('form-data; name=files; filename=a.pdf', {"name": "files", "filename": "a.pdf"}),
+    ('form-data; filename="semi;colon \\"quoted\\".pdf"', {"filename": 'semi;colon "quoted".pdf'}),
+    ("attachment; filename*=UTF-8''%C3%9Cbersicht%202024.pdf", {"filename": "Übersicht 2024.pdf"}),
+    ("attachment; filename*=iso-8859-1'de'%FCber.pdf", {"filename": "über.pdf"}),
+    # filename* hat Vorrang, unabhängig von der Reihenfolge
+    ("attachment; filename*=UTF-8''neu.pdf; filename=\"alt.pdf\"", {"filename": "neu.pdf"}),
+    ("attachment; filename=\"alt.pdf\"; filename*=UTF-8''neu.pdf", {"filename": "neu.pdf"}),
+    ("multipart/form-data; boundary=abc; charset=utf-8", {"boundary": "abc", "charset": "utf-8"}),
+    ("attachment", {}),
+])
+def test_header_params(value, expected):
+    assert parse_header_params(value) == expected
\ No newline at end of file
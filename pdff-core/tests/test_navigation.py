@@ -0,0 +1,95 @@
+"""Navigations-Indizes der DocumentCollection gegen eine sortierte Referenzliste"""
+from typing import List
+import random
+import pytest
+from app.models import Document, DocumentCollection, SavedAs
+from app.models.document_collection import NAVIGATION_FILTERS
+from app.models.sorted_index import SortedIndex
+
+NAMES = ["rechnung", "Rechnung", "vertrag", "ä-scan", "scan", "a", "z"]
+
+
+def make_document(rng: random.Random) -> Document:
+    return Document(
+        # Gleiche Namen: die ID entscheidet die Reihenfolge
+        original_filename=f"{rng.choice(NAMES)}_{rng.randrange(20)}.pdf",
+        document_type=rng.choice([None, "Rechnung"]),
+        correspondent=rng.choice([None, "Stadtwerke"]),
+        saved_as=[SavedAs(filename="x.pdf")] if rng.random() < 0.3 else []
+    )
+
+
+def reference(collection: DocumentCollection, name: str) -> List[Document]:
+    predicate = NAVIGATION_FILTERS[name]
+    return sorted(
+        (document for document in collection.all() if predicate(document)),
+        key=lambda document: (document.original_filename, str(document.id))
+    )
+
+
+def assert_navigation(collection: DocumentCollection, rng: random.Random) -> None:
+    documents = collection.all()
+    for name in NAVIGATION_FILTERS:
+        expected = reference(collection, name)
+        assert collection.count(name) == len(expected)
+        ids = [document.id for document in expected]
+        for document in rng.sample(documents, min(40, len(documents))):
+            window = collection.navigate(document.id, name, window=2)
+            if document.id in ids:
+                pos = ids.index(document.id)
+                assert (window.position, window.total) == (pos + 1, len(ids))
+                after = pos + 1
+            else:
+                # Nicht im Filter: an seiner Sortierposition eingeordnet
+                key = (document.original_filename, str(document.id))
+                pos = sum(1 for other in expected if (other.original_filename, str(other.id)) < key)
+                assert (window.position, window.total) == (pos + 1, len(ids) + 1)
+                after = pos
+            assert [other.id for other in window.previous] == ids[max(pos - 2, 0):pos][::-1]
+            assert [other.id for other in window.next] == ids[after:after + 2]
+
+
+@pytest.mark.parametrize("store", ["objects", "compact"])
+def test_indexes_follow_changes_after_add_many(store):
+    rng = random.Random(2)
+    collection = DocumentCollection(store=store)
+    assert collection.add_many([make_document(rng) for _ in range(300)]) == []
+    assert_navigation(collection, rng)
+    
+    # Inkrementelle Pflege nach dem (verzögerten) Aufbau
+    for document in rng.sample(collection.all(), 80):
+        changed = make_document(rng)
+        collection.update(document, {
+            "original_filename": changed.original_filename,
+            "document_type": changed.document_type,
+            "correspondent": changed.correspondent,
+        })
+    for document in rng.sample(collection.all(), 50):
+        document.add_saved_filename("neu.pdf")
+        collection.refresh(document)
+    for document in rng.sample(collection.all(), 60):
+        assert collection.remove(document.id)
+    for _ in range(60):
+        collection.add(make_document(rng))
+    assert_navigation(collection, rng)
+    
+    # Erneutes add_many: doppelte IDs werden übersprungen, Indizes neu aufgebaut
+    existing = collection.all()[0]
+    skipped = collection.add_many([existing.model_copy(), make_document(rng)])
+    assert [document.id for document in skipped] == [existing.id]
+    assert_navigation(collection, rng)
+
+
+def test_sorted_index_operations():
+    index = SortedIndex()
+    index.rebuild([5, 1, 3, 3])
+    assert index.slice(0, 10) == [1, 3, 5]
+    index.insert(4)
+    index.insert(4)
+    assert index.slice(-5, 10) == [1, 3, 4, 5]
+    assert index.position(4) == (2, True)
+    assert index.position(2) == (1, False)
+    assert index.discard(3) and not index.discard(3)
+    assert (index.at(0), index.at(3), index.at(-1)) == (1, None, None)
+    assert list(index.iter_from(1)) == [4, 5]
+    assert len(index) == 3 and 5 in index and 3 not in index
\ No newline at end of file
@@ -0,0 +1,122 @@
+"""Ausgabe nach /data/out: freie Dateinamen (OutputNameIndex), exklusive Belegung und Materialisierung"""
+from concurrent.futures import ThreadPoolExecutor
+import os
+import pytest
+from app.models import Document
+from app.services import LocalStorageService, OutputNameIndex
+from app.utils.file_ops import materialize_file
+
+
+def test_externally_deleted_names_are_reused(tmp_path):
+    (tmp_path / "Rechnung.pdf").touch()
+    index = OutputNameIndex(tmp_path)
+    for expected in ("Rechnung(1).pdf", "Rechnung(2).pdf", "Rechnung(3).pdf"):
+        assert index.reserve("Rechnung.pdf") == expected
+        (tmp_path / expected).touch()
+    
+    # Gelöscht, ohne dass der Index davon erfährt
+    (tmp_path / "Rechnung.pdf").unlink()
+    assert index.reserve("Rechnung.pdf") == "Rechnung.pdf"
+    (tmp_path / "Rechnung.pdf").touch()
+    
+    # Übersprungene Nummern werden beim Weiterzählen geprüft
+    index.release("Rechnung(2).pdf")
+    assert index.reserve("Rechnung.pdf") == "Rechnung(2).pdf"
+    (tmp_path / "Rechnung(3).pdf").unlink()
+    assert index.reserve("Rechnung.pdf") == "Rechnung(3).pdf"
+    assert index.reserve("Rechnung.pdf") == "Rechnung(4).pdf"
+    assert "Rechnung(3).pdf" in index
+
+
+def test_suffixes_continue_after_existing_files(tmp_path):
+    for name in ("Rechnung.pdf", "Rechnung(1).pdf", "Rechnung(2).pdf", "Vertrag", ".Rechnung(3).pdf.tmp"):
+        (tmp_path / name).touch()
+    index = OutputNameIndex(tmp_path)
+    
+    def reserve(filename: str) -> str:
+        # Wie write_output: die Datei entsteht direkt nach der Reservierung
+        reserved = index.reserve(filename)
+        (tmp_path / reserved).touch()
+        return reserved
+    assert reserve("Rechnung.pdf") == "Rechnung(3).pdf"
+    assert reserve("Rechnung.pdf") == "Rechnung(4).pdf"
+    assert reserve("Vertrag") == "Vertrag(1)"
+    assert reserve("Neu.pdf") == "Neu.pdf"
+    assert reserve("Neu.pdf") == "Neu(1).pdf"
+    
+    # Freigegebene Nummern werden wieder vergeben, kleinste zuerst
+    for name in ("Rechnung(4).pdf", "Rechnung(1).pdf"):
+        (tmp_path / name).unlink()
+        index.release(name)
+    assert reserve("Rechnung.pdf") == "Rechnung(1).pdf"
+    assert reserve("Rechnung.pdf") == "Rechnung(4).pdf"
+    
+    index.mark_used("Rechnung(5).pdf")
+    (tmp_path / "Rechnung(5).pdf").touch()
+    assert reserve("Rechnung.pdf") == "Rechnung(6).pdf"
+    assert ".Rechnung(3).pdf.tmp" not in index
+
+
+@pytest.fixture
+def storage(tmp_path):
+    return LocalStorageService(tmp_path / "in", tmp_path / "archive", tmp_path / "out")
+
+
+def archived(storage: LocalStorageService, content: bytes) -> Document:
+    document = Document(original_filename="scan.pdf", document_type="Rechnung", correspondent="Stadtwerke")
+    storage.archive_path(document.id, existing=False).write_bytes(content)
+    return document
+
+
+def test_names_claimed_by_others_are_skipped(storage):
+    document = archived(storage, b"%PDF eins")
+    filename = document.generated_filename
+    first = storage.save_to_output(document)
+    assert first.name == filename
+    # Von außen (oder von einem anderen Worker-Prozess) angelegt, dem Index unbekannt
+    stem, suffix = os.path.splitext(filename)
+    (storage.data_out / f"{stem}(1){suffix}").write_bytes(b"fremd")
+    
+    other = archived(storage, b"%PDF zwei")
+    assert storage.save_to_output(other).name == f"{stem}(2){suffix}"
+    assert (storage.data_out / f"{stem}(1){suffix}").read_bytes() == b"fremd"
+    
+    # Erneutes Speichern ersetzt die eigene vorige Ausgabe und gibt deren Namen frei
+    assert storage.save_to_output(document).name == filename
+    assert [saved.filename for saved in document.saved_as] == [filename, filename]
+    assert {path.name for path in storage.data_out.iterdir()} == {filename, f"{stem}(1){suffix}", f"{stem}(2){suffix}"}
+
+
+def test_concurrent_saves_get_distinct_names(storage):
+    documents = [archived(storage, f"%PDF {n}".encode()) for n in range(20)]
+    with ThreadPoolExecutor(8) as executor:
+        paths = list(executor.map(lambda document: storage.write_output(document.id, "Gleich.pdf"), documents))
+    assert len({path.name for path in paths}) == 20
+    for document, path in zip(documents, paths):
+        assert path.read_bytes() == storage.archive_path(document.id).read_bytes()
+
+
+def test_failed_materialization_releases_the_name(storage):
+    document = archived(storage, b"%PDF")
+    storage.archive_path(document.id).unlink()
+    with pytest.raises(FileNotFoundError):
+        storage.write_output(document.id, "Rechnung.pdf")
+    storage.output_materialization = "unbekannt"
+    document = archived(storage, b"%PDF")
+    with pytest.raises(ValueError):
+        storage.write_output(document.id, "Rechnung.pdf")
+    storage.output_materialization = "copy"
+    assert storage.write_output(document.id, "Rechnung.pdf").name == "Rechnung.pdf"
+    assert list(storage.data_out.iterdir()) == [storage.data_out / "Rechnung.pdf"]
+
+
+@pytest.mark.parametrize("mode, shared", [("hardlink", True), ("copy", False), ("reflink", False), ("auto", True)])
+def test_materialization_modes(tmp_path, mode, shared):
+    source, target = tmp_path / "quelle.pdf", tmp_path / "ziel.pdf"
+    source.write_bytes(b"%PDF-1.4 Inhalt")
+    target.write_bytes(b"Platzhalter")
+    method = materialize_file(source, target, mode)
+    assert target.read_bytes() == source.read_bytes()
+    assert target.samefile(source) == shared
+    assert (method == "hardlink") == shared
+    assert [path.name for path in tmp_path.iterdir() if path.name.startswith(".")] == []
\ No newline at end of file
@@ -0,0 +1,94 @@
+"""PDF-Auslieferung: Range-Requests, ETag/Last-Modified und bedingte GETs"""
+from uuid import uuid4
+import os
+import pytest
+from app.models import Document
+from app.utils.http_cache import etag_matches, file_etag, not_modified
+
+CONTENT = b"%PDF-1.4\n" + bytes(range(256)) * 40 + b"\n%%EOF\n"
+
+
+@pytest.fixture
+def pdf(api):
+    document = Document(original_filename="Rechnung März.pdf")
+    api.collection.add(document)
+    api.storage.archive_path(document.id, existing=False).write_bytes(CONTENT)
+    return document
+
+
+def pdf_url(document: Document) -> str:
+    return f"/api/v1/documents/{document.id}/pdf"
+
+
+def test_full_response_with_validators(api, pdf):
+    response = api.client.get(pdf_url(pdf))
+    assert response.status_code == 200
+    assert response.content == CONTENT
+    assert response.headers["content-type"] == "application/pdf"
+    assert response.headers["content-disposition"].startswith("inline")
+    assert response.headers["accept-ranges"] == "bytes"
+    stat_result = api.storage.archive_path(pdf.id).stat()
+    assert response.headers["etag"] == file_etag(str(pdf.id), stat_result)
+    assert response.headers["last-modified"]
+
+
+@pytest.mark.parametrize("header, start, end", [
+    ("bytes=0-99", 0, 99),
+    ("bytes=100-", 100, len(CONTENT) - 1),
+    ("bytes=-50", len(CONTENT) - 50, len(CONTENT) - 1),
+    (f"bytes=1000-{len(CONTENT) + 500}", 1000, len(CONTENT) - 1),
+])
+def test_range_requests(api, pdf, header, start, end):
+    response = api.client.get(pdf_url(pdf), headers={"Range": header})
+    assert response.status_code == 206
+    assert response.content == CONTENT[start:end + 1]
+    assert response.headers["content-range"] == f"bytes {start}-{end}/{len(CONTENT)}"
+
+
+def test_unsatisfiable_range(api, pdf):
+    response = api.client.get(pdf_url(pdf), headers={"Range": f"bytes={len(CONTENT) + 10}-"})
+    assert response.status_code == 416
+
+
+def test_conditional_get(api, pdf):
+    first = api.client.get(pdf_url(pdf))
+    etag, last_modified = first.headers["etag"], first.headers["last-modified"]
+    
+    for headers in ({"If-None-Match": etag}, {"If-None-Match": f'"anderer", W/{etag}'}, {"If-Modified-Since": last_modified}):
+        response = api.client.get(pdf_url(pdf), headers=headers)
+        assert response.status_code == 304, headers
+        assert response.content == b""
+        assert response.headers["etag"] == etag
+    
+    # If-None-Match hat Vorrang vor If-Modified-Since
+    response = api.client.get(pdf_url(pdf), headers={"If-None-Match": '"veraltet"', "If-Modified-Since": last_modified})
+    assert response.status_code == 200
+    
+    # Geänderte Datei: neuer ETag, der alte passt nicht mehr
+    path = api.storage.archive_path(pdf.id)
+    path.write_bytes(CONTENT + b"% Nachtrag\n")
+    stat_result = path.stat()
+    os.utime(path, ns=(stat_result.st_atime_ns, stat_result.st_mtime_ns + 10 ** 9))
+    response = api.client.get(pdf_url(pdf), headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+
+
+def test_missing_document_or_file(api, pdf):
+    assert api.client.get(f"/api/v1/documents/{uuid4()}/pdf").status_code == 404
+    api.storage.archive_path(pdf.id).unlink()
+    response = api.client.get(pdf_url(pdf))
+    assert response.status_code == 404
+    assert response.json()["detail"] == "PDF file not found in archive"
+
+
+def test_etag_comparison():
+    assert etag_matches('"a", "b"', '"b"')
+    assert etag_matches("*", '"b"')
+    assert etag_matches('W/"b"', '"b"')
+    # If-Match vergleicht stark
+    assert not etag_matches('W/"b"', '"b"', weak=False)
+    assert not etag_matches(None, '"b"')
+    assert not not_modified('"b"', 1000.0, None, "kein Datum")
+    assert not_modified('"b"', 1000.5, None, "Thu, 01 Jan 1970 00:16:40 GMT")
+    assert not not_modified('"b"', 1001.0, None, "Thu, 01 Jan 1970 00:16:40 GMT")
\ No newline at end of file
@@ -0,0 +1,147 @@
+"""SearchIndex gegen einen linearen Scan über dieselben Documents"""
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Set
+from uuid import UUID
+import random
+import pytest
+from app.models import Document, SearchIndex
+from app.models import search_index
+from app.models.search_index import MIN_PREFIX_LENGTH, document_terms, tokenize
+
+WORDS = [
+    "rechnung", "rechnungen", "rente", "rentenversicherung", "raten", "stadtwerke",
+    "strom", "steuer", "steuerbescheid", "telekom", "techniker", "vertrag", "versicherung",
+    "mahnung", "kfz", "a1", "a2", "b7",
+]
+DATE_START = date(2023, 1, 1)
+
+
+def make_document(rng: random.Random) -> Document:
+    def words(count: int) -> Optional[str]:
+        return " ".join(rng.choice(WORDS) for _ in range(count)) or None
+    
+    return Document(
+        original_filename=f"{rng.choice(WORDS)}_{rng.randrange(100)}.pdf",
+        correspondent=words(rng.randrange(3)),
+        topic=words(rng.randrange(3)),
+        document_type=rng.choice([None, "Rechnung", "Bescheid", "Vertrag"]),
+        document_number=rng.choice([None, f"R-{rng.randrange(1000)}"]),
+        document_date=None if rng.random() < 0.15 else DATE_START + timedelta(days=rng.randrange(3 * 365))
+    )
+
+
+def linear_search(
+    documents: Dict[UUID, Document],
+    query: str = "",
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    prefix: bool = True
+) -> Set[UUID]:
+    """Referenz: jedes Document einzeln prüfen"""
+    tokens = list(dict.fromkeys(tokenize(query)))
+    prefix_token = None
+    if prefix and tokens and (len(tokens[-1]) >= MIN_PREFIX_LENGTH or len(tokens) > 1):
+        prefix_token = tokens.pop()
+    matched = set()
+    for document in documents.values():
+        terms = document_terms(document)
+        if not all(token in terms for token in tokens):
+            continue
+        if prefix_token is not None and not any(term.startswith(prefix_token) for term in terms):
+            continue
+        if date_from is not None or date_to is not None:
+            value = document.document_date
+            if value is None or (date_from and value < date_from) or (date_to and value > date_to):
+                continue
+        matched.add(document.id)
+    return matched
+
+
+def found(index: SearchIndex, documents: Dict[UUID, Document], **query) -> Set[UUID]:
+    matches = index.search(**query)
+    if matches.slots is not None:
+        result = set(matches.document_ids())
+        assert matches.total == len(result)
+    else:
+        result = {document_id for document_id in documents if document_id in matches}
+        assert matches.total <= len(result) if not matches.exact else matches.total == len(result)
+    return result
+
+
+def month_ranges() -> List[tuple]:
+    ranges = []
+    for year in (2023, 2024, 2025):
+        for month in (1, 2, 6, 12):
+            first = date(year, month, 1)
+            following = date(year + month // 12, month % 12 + 1, 1)
+            ranges.append((first, following - timedelta(days=1)))
+    # Über Monatsgrenzen und angeschnittene Monate
+    ranges += [
+        (date(2023, 1, 15), date(2023, 3, 10)),
+        (date(2024, 2, 28), date(2024, 3, 1)),
+        (date(2023, 11, 30), date(2025, 1, 2)),
+        (None, date(2023, 6, 30)),
+        (date(2025, 6, 1), None),
+        (date(2024, 5, 5), date(2024, 5, 5)),
+        (date(2030, 1, 1), None),
+    ]
+    return ranges
+
+
+QUERIES = [
+    "", "rechnung", "rech", "re", "r", "rechnung r", "steuer st", "strom stadtwerke",
+    "versicherung ren", "a1", "a", "kfz mahnung", "r 1", "unbekannt", "te",
+]
+
+
+@pytest.fixture(params=[7, 42])
+def corpus(request):
+    rng = random.Random(request.param)
+    documents = [make_document(rng) for _ in range(400)]
+    index = SearchIndex()
+    index.rebuild(documents)
+    return rng, index, {document.id: document for document in documents}
+
+
+def assert_all_queries(index: SearchIndex, documents: Dict[UUID, Document], materialize_limit: Optional[int] = None) -> None:
+    for query in QUERIES:
+        for prefix in (True, False):
+            assert found(index, documents, query=query, prefix=prefix) == linear_search(documents, query, prefix=prefix), query
+    for date_from, date_to in month_ranges():
+        for query in ("", "rechnung", "re", "steuer st"):
+            expected = linear_search(documents, query, date_from, date_to)
+            actual = found(index, documents, query=query, date_from=date_from, date_to=date_to, materialize_limit=materialize_limit)
+            assert actual == expected, (query, date_from, date_to)
+
+
+def test_rebuild_matches_linear_scan(corpus):
+    _, index, documents = corpus
+    assert_all_queries(index, documents)
+    assert_all_queries(index, documents, materialize_limit=10)
+
+
+def test_incremental_updates_match_linear_scan(corpus):
+    rng, index, documents = corpus
+    for document in rng.sample(list(documents.values()), 100):
+        changed = make_document(rng)
+        for field in ("correspondent", "topic", "document_type", "document_date"):
+            setattr(document, field, getattr(changed, field))
+        index.index(document)
+    for document_id in rng.sample(list(documents), 80):
+        index.remove(document_id)
+        del documents[document_id]
+    # Neue Documents übernehmen die freigewordenen Slots
+    for _ in range(50):
+        document = make_document(rng)
+        documents[document.id] = document
+        index.index(document)
+    
+    assert len(index) == len(documents)
+    assert_all_queries(index, documents)
+
+
+def test_broad_prefixes_fall_back_to_candidate_checks(corpus, monkeypatch):
+    _, index, documents = corpus
+    # Jeder Präfix gilt als zu allgemein: Prüfung pro Document bzw. pro Kandidat
+    monkeypatch.setattr(search_index, "MAX_PREFIX_TERMS", 1)
+    assert_all_queries(index, documents)
\ No newline at end of file
@@ -0,0 +1,144 @@
+"""Eingabevorschläge: Radix-Baum gegen Brute Force, Fortschreiben per Change-Listener, Aufbau ohne verlorene Änderungen"""
+from collections import Counter
+from typing import Dict, List, Tuple
+import random
+import pytest
+from app import dependencies
+from app.models import Document, DocumentCollection
+from app.services import Suggestion, SuggestionService, SuggestionTrie
+from app.services.suggestion_service import normalize_key
+
+WORDS = ["Stadtwerke", "Stadt", "Städtische", "Sparkasse", "Spar", "Telekom", "Tele", "T", "Ärztekammer", "Aerzte"]
+
+
+def expected(counts: Dict[str, int], prefix: str, limit: int) -> List[Tuple[str, int]]:
+    """Brute Force: Schreibweisen je Schlüssel zusammengefasst, häufigste zuerst"""
+    keyed: Dict[str, Counter] = {}
+    for value, count in counts.items():
+        if count > 0 and normalize_key(value):
+            keyed.setdefault(normalize_key(value), Counter())[value] += count
+    prefix = normalize_key(prefix)
+    entries = [
+        (-sum(variants.values()), min(variants, key=lambda v: (-variants[v], v)))
+        for key, variants in keyed.items() if key.startswith(prefix)
+    ]
+    return [(value, -count) for count, value in sorted(entries)[:limit]]
+
+
+def suggested(trie: SuggestionTrie, prefix: str, limit: int) -> List[Tuple[str, int]]:
+    return [(item.value, item.count) for item in trie.suggest(prefix, limit)]
+
+
+def random_value(rng: random.Random) -> str:
+    value = rng.choice(WORDS)
+    if rng.random() < 0.6:
+        value += rng.choice([" ", "_", "-", "  "]) + rng.choice(WORDS + ["München", "Muenchen", "GmbH", "2024"])
+    return value.upper() if rng.random() < 0.1 else value
+
+
+@pytest.mark.parametrize("value, key", [
+    ("Stadtwerke_München", "stadtwerke muenchen"),
+    ("  Stadtwerke - Muenchen ", "stadtwerke muenchen"),
+    ("STRASSE", "strasse"),
+    ("Straße", "strasse"),
+    ("___", ""),
+    ("x" * 150, "x" * 100),
+])
+def test_normalize_key(value, key):
+    assert normalize_key(value) == key
+
+
+def test_trie_matches_brute_force():
+    rng = random.Random(17)
+    counts: Counter = Counter()
+    incremental = SuggestionTrie(size=5)
+    for _ in range(600):
+        value = random_value(rng)
+        counts[value] += 1
+        incremental.add(value)
+    built = SuggestionTrie.build(dict(counts), size=5)
+    prefixes = ["", "s", "st", "STADT", "stadt w", "stadt_w", "ae", "ä", "t", "tele", "x", "sparkasse m"]
+    for prefix in prefixes:
+        for limit in (1, 3, 5):
+            assert suggested(built, prefix, limit) == expected(counts, prefix, limit), prefix
+            assert suggested(incremental, prefix, limit) == expected(counts, prefix, limit), prefix
+    assert built.keys == incremental.keys == len({normalize_key(value) for value in counts})
+    
+    # Entfernen bis auf wenige Werte: Listen werden auf dem Pfad neu berechnet
+    for value in list(counts):
+        if rng.random() < 0.8:
+            for trie in (built, incremental):
+                trie.add(value, -counts[value])
+            del counts[value]
+    for prefix in prefixes:
+        assert suggested(built, prefix, 5) == expected(counts, prefix, 5), prefix
+        assert suggested(incremental, prefix, 5) == expected(counts, prefix, 5), prefix
+    assert built.keys == incremental.keys == len({normalize_key(value) for value in counts})
+
+
+def test_variants_share_a_key():
+    trie = SuggestionTrie()
+    for value in ["Stadtwerke München"] * 3 + ["Stadtwerke_Muenchen"] * 2 + ["Stadtwerke Berlin"]:
+        trie.add(value)
+    assert suggested(trie, "stadtwerke m", 10) == [("Stadtwerke München", 5)]
+    assert suggested(trie, "Stadtwerke", 10) == [("Stadtwerke München", 5), ("Stadtwerke Berlin", 1)]
+    trie.add("Stadtwerke München", -3)
+    assert suggested(trie, "stadtwerke", 10) == [("Stadtwerke_Muenchen", 2), ("Stadtwerke Berlin", 1)]
+    assert suggested(trie, "unbekannt", 10) == []
+
+
+def test_service_follows_collection_changes():
+    collection = DocumentCollection()
+    service = SuggestionService(size=5)
+    service.attach(collection)
+    documents = [Document(original_filename=f"scan_{n}.pdf", correspondent="Stadtwerke", document_type="Rechnung") for n in range(3)]
+    for document in documents:
+        collection.add(document)
+    assert service.suggest("correspondent", "st") == [Suggestion(value="Stadtwerke", count=3)]
+    
+    collection.update(documents[0], {"correspondent": "Telekom", "topic": "Mobilfunk"})
+    collection.remove(documents[1].id)
+    assert service.suggest("correspondent", "") == [Suggestion(value="Stadtwerke", count=1), Suggestion(value="Telekom", count=1)]
+    assert service.suggest("topic", "mob") == [Suggestion(value="Mobilfunk", count=1)]
+    assert service.suggest("document_type", "r") == [Suggestion(value="Rechnung", count=2)]
+    assert service.stats() == {"correspondent": 2, "document_type": 1, "topic": 1, "customer_id": 0}
+    with pytest.raises(KeyError):
+        service.suggest("document_date", "")
+
+
+def test_rebuild_keeps_changes_made_while_counting():
+    collection = DocumentCollection()
+    documents = [Document(original_filename=f"scan_{n}.pdf", correspondent="Stadtwerke") for n in range(4)]
+    collection.add_many(documents)
+    service = SuggestionService()
+    service.attach(collection)
+    assert not service.ready
+    
+    count_values = collection.count_values
+    
+    def count_then_change(*args, **kwargs):
+        counters = count_values(*args, **kwargs)
+        # Änderung nach dem Zählen, bevor die neuen Bäume übernommen sind
+        collection.update(documents[0], {"correspondent": "Telekom"})
+        return counters
+    collection.count_values = count_then_change
+    service.rebuild(collection)
+    
+    assert service.ready
+    assert service.suggest("correspondent", "") == [Suggestion(value="Stadtwerke", count=3), Suggestion(value="Telekom", count=1)]
+
+
+def test_api(api):
+    service = SuggestionService()
+    service.attach(api.collection)
+    api.client.app.dependency_overrides[dependencies.get_suggestions] = lambda: service
+    for n, correspondent in enumerate(["Stadtwerke München", "Stadtwerke München", "Stadtbibliothek"]):
+        api.collection.add(Document(original_filename=f"scan_{n}.pdf", correspondent=correspondent))
+    
+    response = api.client.get("/api/v1/suggestions/correspondent", params={"q": "stadtwerke m", "limit": 5})
+    assert response.status_code == 200
+    assert response.json() == {"field": "correspondent", "ready": False, "items": [{"value": "Stadtwerke München", "count": 2}]}
+    items = api.client.get("/api/v1/suggestions/correspondent", params={"q": "STADT"}).json()["items"]
+    assert [item["value"] for item in items] == ["Stadtwerke München", "Stadtbibliothek"]
+    assert api.client.get("/api/v1/suggestions/document_date").status_code == 404
+    assert api.client.get("/api/v1/suggestions/topic", params={"limit": 0}).status_code == 422
\ No newline at end of file
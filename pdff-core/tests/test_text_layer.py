@@ -0,0 +1,97 @@
+"""Text-Layer vor dem LLM: Regeln für Datum und Nummern, Provider nur für offene Felder und nur mit Text"""
+from datetime import date
+import asyncio
+import pytest
+from conftest import scripted_provider, wait_until
+from app.services.text_rules import extract_with_rules
+from app.tools.corpus import placeholder_pdf
+from app.utils.pdf_text import extract_text
+
+ANSWER = {
+    "document_type": "Rechnung", "correspondent": "Stadtwerke", "topic": "Strom",
+    "document_number": "vom Provider", "document_date": "2020-01-01",
+}
+INVOICE = "Rechnungsnummer: R-2024-0815 Kundennummer: KD-4711 Datum: 01.03.2024 Stadtwerke Musterstadt"
+
+
+@pytest.mark.parametrize("pages, expected", [
+    ([INVOICE], {"document_date": date(2024, 3, 1), "document_number": "R-2024-0815", "customer_id": "KD-4711"}),
+    (["Schreiben vom 3. März 2024", "Seite 2\nRechnung Nr. 12345."], {"document_date": date(2024, 3, 3), "document_number": "12345"}),
+    # Unplausible Jahre zählen nicht, mehrere Daten ohne Label sind nicht eindeutig
+    (["Gegründet 01.01.1850, Stand 2.2.2024"], {"document_date": date(2024, 2, 2)}),
+    (["Zeitraum 01.02.2024 bis 29.02.2024"], {}),
+    (["Invoice date: 2024-05-17\nCustomer ID: C-99812"], {"document_date": date(2024, 5, 17), "customer_id": "C-99812"}),
+    ([], {}),
+])
+def test_rules(pages, expected):
+    assert {name: match.value for name, match in extract_with_rules(pages).items()} == expected
+
+
+def test_rules_report_page():
+    matches = extract_with_rules(["Anschreiben ohne Angaben", "Belegnummer: B-2024/17"])
+    assert (matches["document_number"].rule, matches["document_number"].page) == ("document_number_label", 2)
+
+
+def test_reads_text_layer():
+    assert extract_text(placeholder_pdf(INVOICE)) == [INVOICE]
+    assert extract_text(b"%PDF-1.4\n%%EOF\n") == []
+
+
+def extract(extraction, document, **options):
+    provider = scripted_provider(ANSWER)
+    engine = extraction.engine(provider, text_layer=True, **options)
+    
+    async def main():
+        await engine.start()
+        try:
+            job = engine.enqueue(document.id)
+            assert await wait_until(lambda: engine.get_job(job.id).state == "succeeded")
+            return job, engine.stats()
+        finally:
+            await engine.stop()
+    job, stats = asyncio.run(main())
+    return provider, job, stats
+
+
+def test_rules_first_then_provider_with_text(extraction):
+    document = extraction.add(pdf=placeholder_pdf(INVOICE))
+    provider, job, stats = extract(extraction, document)
+    
+    (call,) = provider.calls
+    assert call.fields == ("document_type", "correspondent", "topic")
+    assert call.page_text == [INVOICE]
+    # Regel-Treffer haben Vorrang vor dem Provider
+    assert (document.document_date, document.document_number, document.customer_id) == (date(2024, 3, 1), "R-2024-0815", "KD-4711")
+    assert document.correspondent == "Stadtwerke"
+    source = document.field_sources["document_date"]
+    assert (source.source, source.detail, source.page) == ("text", "date_label", 1)
+    assert document.field_sources["topic"].source == "llm"
+    assert len(job.applied_fields) == 6
+    assert (stats.text_fields_total, stats.llm_fields_total, stats.llm_skipped_total) == (3, 3, 0)
+
+
+def test_provider_is_skipped_when_rules_complete_document(extraction):
+    document = extraction.add(pdf=placeholder_pdf(INVOICE), document_type="Rechnung", correspondent="Stadtwerke", topic="Strom")
+    provider, job, stats = extract(extraction, document)
+    
+    assert not provider.calls
+    assert job.applied_fields == ["customer_id", "document_date", "document_number"]
+    assert (stats.llm_skipped_total, stats.tokens_total) == (1, 0)
+
+
+def test_short_or_large_text_layer_sends_pdf(extraction):
+    # Zu wenig Text für den Provider: Regeln gelten trotzdem, der Provider bekommt die PDF
+    short = extraction.add(pdf=placeholder_pdf("Datum: 01.03.2024"))
+    provider, _, _ = extract(extraction, short)
+    assert provider.calls[0].page_text is None
+    assert "document_date" not in provider.calls[0].fields
+    assert short.document_date == date(2024, 3, 1)
+    
+    # Über text_max_bytes wird der Text-Layer gar nicht gelesen
+    large = extraction.add(pdf=placeholder_pdf(INVOICE))
+    provider, _, stats = extract(extraction, large, text_max_bytes=100)
+    assert provider.calls[0].page_text is None
+    assert "document_date" in provider.calls[0].fields
+    assert large.document_date == date(2020, 1, 1)
+    assert large.field_sources["document_date"].source == "llm"
+    assert stats.text_fields_total == 0
\ No newline at end of file
@@ -0,0 +1,166 @@
+"""Vorschaubilder: PNG-Kodierung, inhaltsadressierter Cache, einmaliges Rendern paralleler Abrufe, API mit ETag"""
+from typing import List, Optional
+import asyncio
+import hashlib
+import struct
+import threading
+import time
+import zlib
+import pytest
+from app import dependencies
+from app.models import Document
+from app.services import AsyncStorageService, LocalStorageService, ThumbnailService, THUMBNAIL_SIZES
+from app.services import thumbnail_service
+from app.tools.corpus import placeholder_pdf
+from app.utils.pdf_render import PageNotFound, RenderError, RenderUnavailable, encode_png, render_page, renderer_available
+
+PDF = placeholder_pdf("Rechnung Stadtwerke")
+
+needs_renderer = pytest.mark.skipif(not renderer_available(), reason="pypdfium2 nicht installiert")
+
+
+def png_size(png: bytes) -> tuple:
+    assert png[:8] == b"\x89PNG\r\n\x1a\n"
+    length, kind = struct.unpack(">I4s", png[8:16])
+    assert kind == b"IHDR"
+    data = png[16:16 + length]
+    assert struct.unpack(">I", png[16 + length:20 + length])[0] == zlib.crc32(kind + data)
+    return struct.unpack(">II", data[:8])
+
+
+def test_encode_png():
+    # 2x2 RGB mit Zeilen-Padding (stride 8)
+    pixels = bytes([255, 0, 0, 0, 255, 0, 9, 9, 0, 0, 255, 255, 255, 255, 9, 9])
+    png = encode_png(pixels, 2, 2, stride=8)
+    assert png_size(png) == (2, 2)
+    idat_length = struct.unpack(">I", png[33:37])[0]
+    assert png[37:41] == b"IDAT"
+    raw = zlib.decompress(png[41:41 + idat_length])
+    assert raw == b"\x00" + pixels[:6] + b"\x00" + pixels[8:14]
+    assert png.endswith(b"IEND\xaeB`\x82")
+
+
+@needs_renderer
+def test_render_page():
+    assert png_size(render_page(PDF, 1, 240))[0] == 240
+    with pytest.raises(PageNotFound):
+        render_page(PDF, 2)
+    with pytest.raises(RenderError):
+        render_page(b"kein PDF")
+
+
+class Thumbnails:
+    def __init__(self, root):
+        self.storage = LocalStorageService(root / "in", root / "archive", root / "out")
+        self.async_storage = AsyncStorageService(self.storage, io_workers=2, metadata_workers=1)
+        self.service = ThumbnailService(self.async_storage, root / "thumbnails", workers=4)
+    
+    def add(self, pdf: bytes = PDF, content_hash: Optional[str] = None) -> Document:
+        document = Document(original_filename="scan.pdf", content_hash=content_hash)
+        self.storage.archive_path(document.id, existing=False).write_bytes(pdf)
+        return document
+
+
+@pytest.fixture
+def thumbnails(tmp_path):
+    setup = Thumbnails(tmp_path)
+    yield setup
+    setup.service.close()
+    setup.async_storage.shutdown()
+
+
+@pytest.fixture
+def render_calls(monkeypatch) -> List[int]:
+    """Zählt Render-Aufrufe und verlangsamt sie, damit sich parallele Abrufe überschneiden"""
+    calls = []
+    lock = threading.Lock()
+    
+    def slow_render(source, page=1, width=240):
+        with lock:
+            calls.append(page)
+        time.sleep(0.1)
+        return render_page(source, page, width)
+    monkeypatch.setattr(thumbnail_service, "render_page", slow_render)
+    return calls
+
+
+@needs_renderer
+def test_parallel_requests_render_once(thumbnails, render_calls):
+    content_hash = hashlib.sha256(PDF).hexdigest()
+    first, copy = thumbnails.add(content_hash=content_hash), thumbnails.add(content_hash=content_hash)
+    
+    async def main():
+        return await asyncio.gather(*(thumbnails.service.get(document) for document in [first, copy] * 4))
+    results = asyncio.run(main())
+    
+    # Inhaltsgleiche Documents teilen sich das Bild
+    assert {path for path, _ in results} == {thumbnails.service.path_for(ThumbnailService.cache_key(first, 1, 240))}
+    assert render_calls == [1]
+    assert thumbnails.service.rendered_total == 1
+    path = results[0][0]
+    assert path.name == f"{content_hash}-p1-w240-r1.png"
+    assert png_size(path.read_bytes())[0] == THUMBNAIL_SIZES["small"]
+    assert not list(path.parent.glob("*.tmp"))
+    
+    # Aus dem Cache, ohne erneut zu rendern
+    asyncio.run(thumbnails.service.get(copy))
+    assert render_calls == [1]
+
+
+@needs_renderer
+def test_pregenerated_on_ingest(thumbnails, render_calls):
+    document = thumbnails.add()
+    thumbnails.service.notify_ingested(document)
+    thumbnails.service.notify_ingested(document)
+    path, _ = asyncio.run(thumbnails.service.get(document))
+    assert ThumbnailService.cache_key(document, 1, 240) == f"id-{document.id}-p1-w240-r1"
+    assert path.is_file()
+    assert render_calls == [1]
+
+
+@needs_renderer
+def test_failures(thumbnails, tmp_path):
+    broken = thumbnails.add(pdf=b"kein PDF")
+    missing = Document(original_filename="fehlt.pdf")
+    
+    async def main():
+        with pytest.raises(PageNotFound):
+            await thumbnails.service.get(thumbnails.add(), page=3)
+        with pytest.raises(RenderError):
+            await thumbnails.service.get(broken)
+        with pytest.raises(FileNotFoundError):
+            await thumbnails.service.get(missing)
+    asyncio.run(main())
+    assert thumbnails.service.failed_total == 3
+    
+    disabled = ThumbnailService(thumbnails.async_storage, tmp_path / "aus", enabled=False)
+    with pytest.raises(RenderUnavailable):
+        asyncio.run(disabled.get(broken))
+    disabled.close()
+
+
+@needs_renderer
+def test_api(api, tmp_path):
+    service = ThumbnailService(AsyncStorageService(api.storage), tmp_path / "thumbnails")
+    api.client.app.dependency_overrides[dependencies.get_thumbnails] = lambda: service
+    document = Document(original_filename="scan.pdf")
+    api.collection.add(document)
+    api.storage.archive_path(document.id, existing=False).write_bytes(PDF)
+    path = f"/api/v1/documents/{document.id}/thumbnail"
+    
+    response = api.client.get(path, params={"size": "medium"})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "image/png"
+    assert png_size(response.content)[0] == THUMBNAIL_SIZES["medium"]
+    assert "immutable" in response.headers["cache-control"]
+    etag = response.headers["etag"]
+    assert etag == f'"id-{document.id}-p1-w600-r1"'
+    
+    assert api.client.get(path, params={"size": "medium"}, headers={"If-None-Match": etag}).status_code == 304
+    assert api.client.get(path, headers={"If-None-Match": etag}).status_code == 200
+    assert api.client.get(path, params={"size": "huge"}).status_code == 400
+    assert api.client.get(path, params={"page": 2}).status_code == 404
+    assert api.client.get(path, params={"page": 0}).status_code == 422
+    assert api.client.get(f"/api/v1/documents/{Document(original_filename='x.pdf').id}/thumbnail").status_code == 404
+    service.close()
+    service.storage.shutdown()
\ No newline at end of file
@@ -0,0 +1,221 @@
+"""Mehrere Worker-Prozesse auf einem Archiv: Leader-Wahl per flock und Abgleich über den Change-Feed"""
+from pathlib import Path
+from typing import Any, Dict
+import json
+import signal
+import subprocess
+import sys
+import time
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+
+# Ein Worker-Prozess wie in main.py (ohne HTTP): Befehle als JSON-Zeilen auf stdin, Antworten auf stdout
+WORKER = r"""
+import asyncio, json, sys
+from pathlib import Path
+from uuid import UUID
+from app.models import Document, DocumentCollection, VersionConflict
+from app.services import JournalMetadataStore, LocalStorageService, WorkerCoordinator, worker_coordination
+from app.services.metadata_store import WriteBehindMetadataStore
+
+root, checkpoint_interval = Path(sys.argv[1]), float(sys.argv[2])
+worker_coordination._CHECKPOINT_INTERVAL = checkpoint_interval
+coordinator = WorkerCoordinator(root / "archive" / ".pdff", poll_interval=0.05)
+store = WriteBehindMetadataStore(JournalMetadataStore(root / "archive"), flush_interval=60.0)
+storage = LocalStorageService(root / "in", root / "archive", root / "out", metadata_store=store)
+collection = DocumentCollection(version_lock=coordinator.version_lock)
+coordinator.attach(collection, storage)
+coordinator.open()
+leader = coordinator.try_lead()
+collection.add_many(store.load_all())
+asyncio.run(coordinator.start())
+
+def reply(**values):
+    print(json.dumps(values), flush=True)
+
+reply(worker_id=coordinator.worker_id, leader=leader)
+for line in sys.stdin:
+    command = json.loads(line)
+    if command["cmd"] == "add":
+        documents = [Document(original_filename=f"{command['prefix']}_{n}.pdf") for n in range(command["count"])]
+        for document in documents:
+            collection.add(document)
+            store.put(document)
+        reply(ids=[str(document.id) for document in documents])
+    elif command["cmd"] == "patch":
+        document = collection.get(UUID(command["id"]))
+        try:
+            collection.update(document, command["changes"], command.get("expected_version"))
+        except VersionConflict:
+            reply(conflict=True, version=document.version)
+            continue
+        store.put(document)
+        reply(conflict=False, version=document.version)
+    elif command["cmd"] == "state":
+        reply(state={str(document.id): [document.correspondent, document.version] for document in collection.all()})
+    elif command["cmd"] == "status":
+        reply(**coordinator.status().model_dump())
+    elif command["cmd"] == "lead":
+        reply(leader=coordinator.try_lead())
+    elif command["cmd"] == "close":
+        store.close()
+        coordinator.close()
+        reply()
+        break
+"""
+
+
+class Worker:
+    def __init__(self, root: Path, checkpoint_interval: float = 10.0):
+        self.process = subprocess.Popen(
+            [sys.executable, "-c", WORKER, str(root), str(checkpoint_interval)],
+            cwd=ROOT, stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True
+        )
+        ready = self._read()
+        self.worker_id: str = ready["worker_id"]
+        self.leader: bool = ready["leader"]
+    
+    def _read(self) -> Dict[str, Any]:
+        line = self.process.stdout.readline()
+        assert line, "Worker-Prozess beendet"
+        return json.loads(line)
+    
+    def call(self, cmd: str, **values) -> Dict[str, Any]:
+        self.process.stdin.write(json.dumps({"cmd": cmd, **values}) + "\n")
+        self.process.stdin.flush()
+        return self._read()
+    
+    def state(self) -> Dict[str, list]:
+        return self.call("state")["state"]
+    
+    def close(self) -> None:
+        if self.process.poll() is None:
+            self.call("close")
+            self.process.wait(10)
+    
+    def kill(self) -> None:
+        self.process.send_signal(signal.SIGKILL)
+        self.process.wait(10)
+
+
+def wait_for(condition, timeout: float = 10.0):
+    deadline = time.monotonic() + timeout
+    while True:
+        result = condition()
+        if result or time.monotonic() > deadline:
+            return result
+        time.sleep(0.05)
+
+
+@pytest.fixture
+def workers(tmp_path):
+    started = []
+    
+    def start(**options) -> Worker:
+        worker = Worker(tmp_path, **options)
+        started.append(worker)
+        return worker
+    yield start
+    for worker in started:
+        if worker.process.poll() is None:
+            worker.kill()
+
+
+def converged(*workers: Worker) -> bool:
+    states = [worker.state() for worker in workers]
+    return all(state == states[0] for state in states)
+
+
+def test_leader_election_and_takeover(workers):
+    first = workers()
+    second = workers()
+    assert first.leader and not second.leader
+    assert second.call("status")["leader_id"] == first.worker_id
+    assert not second.call("lead")["leader"]
+    
+    # Der Lock endet mit dem Prozess, auch ohne geordnetes Beenden
+    first.kill()
+    assert wait_for(lambda: second.call("lead")["leader"])
+    status = second.call("status")
+    assert status["leader"] and status["leader_id"] == second.worker_id
+
+
+def test_changes_converge_across_processes(workers, tmp_path):
+    first, second = workers(), workers()
+    ids = first.call("add", count=20, prefix="a")["ids"]
+    ids += second.call("add", count=5, prefix="b")["ids"]
+    assert wait_for(lambda: len(first.state()) == len(second.state()) == 25)
+    
+    for index, document_id in enumerate(ids):
+        worker = first if index % 2 else second
+        worker.call("patch", id=document_id, changes={"correspondent": f"Firma {index}"})
+    # Gleichzeitige Änderungen desselben Documents: in beiden Prozessen gewinnt derselbe Stand
+    for round_number in range(10):
+        first.call("patch", id=ids[0], changes={"correspondent": f"A{round_number}"})
+        second.call("patch", id=ids[0], changes={"correspondent": f"B{round_number}"})
+    assert wait_for(lambda: converged(first, second))
+    
+    # Ein später startender Worker sieht auch Änderungen, die noch im Write-Behind der anderen liegen
+    third = workers()
+    assert not third.leader
+    assert wait_for(lambda: converged(first, second, third))
+    assert third.state()[ids[1]][0] == "Firma 1"
+    for worker in (first, second, third):
+        worker.close()
+    
+    # Nach dem geordneten Beenden stehen alle Stände im Backend
+    restarted = workers()
+    assert restarted.call("status")["applied_total"] == 0
+    assert len(restarted.state()) == 25
+    assert restarted.state()[ids[1]][0] == "Firma 1"
+
+
+def test_checkpoints_skip_durable_records(workers, tmp_path):
+    first, second = workers(checkpoint_interval=0.2), workers(checkpoint_interval=0.2)
+    ids = first.call("add", count=30, prefix="a")["ids"]
+    assert wait_for(lambda: len(second.state()) == 30)
+    for document_id in ids:
+        second.call("patch", id=document_id, changes={"correspondent": "Stadtwerke"})
+    assert wait_for(lambda: converged(first, second))
+    
+    feed = tmp_path / "archive" / ".pdff" / "changes.jsonl"
+    checkpoints_path = feed.with_name("changes.checkpoints.json")
+    
+    def checkpointed() -> bool:
+        checkpoints = json.loads(checkpoints_path.read_text())
+        return all(
+            checkpoints.get(worker.worker_id, {}).get("offset") == feed.stat().st_size
+            for worker in (first, second)
+        )
+    assert wait_for(checkpointed)
+    
+    # Alle Records stehen im Backend: der neue Worker beginnt am Ende des Feeds
+    third = workers()
+    assert converged(first, second, third)
+    assert third.call("status")["applied_total"] == 0
+    first.call("patch", id=ids[0], changes={"correspondent": "Neu"})
+    assert wait_for(lambda: third.state()[ids[0]][0] == "Neu")
+    
+    third.close()
+    assert third.worker_id not in json.loads(checkpoints_path.read_text())
+
+
+def test_if_match_is_checked_across_processes(workers):
+    first, second = workers(), workers()
+    document_id = first.call("add", count=1, prefix="a")["ids"][0]
+    assert wait_for(lambda: document_id in second.state())
+    version = second.state()[document_id][1]
+    
+    # Beide Prozesse kennen dieselbe Version: nur eine Änderung darf darauf aufbauen
+    results = [
+        first.call("patch", id=document_id, changes={"correspondent": "Erster"}, expected_version=version),
+        second.call("patch", id=document_id, changes={"correspondent": "Zweiter"}, expected_version=version),
+    ]
+    assert [result["conflict"] for result in results] == [False, True]
+    assert results[1]["version"] == results[0]["version"] == version + 1
+    
+    # Mit der neuen Version gelingt es auch im anderen Prozess
+    assert not second.call("patch", id=document_id, changes={"correspondent": "Zweiter"}, expected_version=version + 1)["conflict"]
+    assert wait_for(lambda: converged(first, second))
+    assert first.state()[document_id] == ["Zweiter", version + 2]
\ No newline at end of file
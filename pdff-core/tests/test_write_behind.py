@@ -0,0 +1,161 @@
+"""WriteBehindMetadataStore: zusammengefasste Writes, Group Commit und Schreiben beim Beenden"""
+from typing import Dict, Iterable, Iterator, List
+from uuid import UUID
+import threading
+import pytest
+from app.models import Document
+from app.services import JsonFileMetadataStore
+from app.services.metadata_store import MetadataStore, WriteBehindMetadataStore
+
+
+class RecordingStore(MetadataStore):
+    """Backend im Speicher, das Batches und syncs mitschreibt"""
+    
+    def __init__(self):
+        self.documents: Dict[UUID, str] = {}
+        self.batches: List[List[UUID]] = []
+        self.syncs = 0
+        self.closed = False
+        self.fail = False
+        self.written = threading.Event()
+    
+    def load_all(self) -> Iterator[Document]:
+        return iter([Document.model_validate_json(data) for data in self.documents.values()])
+    
+    def put(self, document: Document) -> None:
+        self.put_many([document])
+    
+    def put_many(self, documents: Iterable[Document]) -> None:
+        documents = list(documents)
+        if self.fail:
+            raise OSError("Platte voll")
+        self.batches.append([document.id for document in documents])
+        for document in documents:
+            self.documents[document.id] = document.model_dump_json()
+        self.written.set()
+    
+    def delete(self, document_id: UUID) -> None:
+        self.documents.pop(document_id, None)
+    
+    def sync(self) -> None:
+        self.syncs += 1
+    
+    def close(self) -> None:
+        self.closed = True
+
+
+def stored(inner: RecordingStore, document: Document) -> Document:
+    return Document.model_validate_json(inner.documents[document.id])
+
+
+def test_repeated_puts_are_coalesced():
+    inner = RecordingStore()
+    store = WriteBehindMetadataStore(inner, flush_interval=60.0)
+    documents = [Document(original_filename=f"scan_{n}.pdf") for n in range(3)]
+    for keystroke in "Stadtwerke":
+        for document in documents:
+            document.correspondent = (document.correspondent or "") + keystroke
+            store.put(document)
+    assert inner.batches == [] and store.pending == 3
+    
+    assert store.flush() == 3
+    assert inner.batches == [[document.id for document in documents]] and inner.syncs == 1
+    assert stored(inner, documents[0]).correspondent == "Stadtwerke"
+    assert (store.puts_total, store.writes_total, store.flushes_total) == (30, 3, 1)
+    assert store.flush() == 0 and inner.syncs == 1
+    store.close()
+    assert inner.closed
+
+
+def test_flushes_on_interval_and_on_backlog():
+    inner = RecordingStore()
+    store = WriteBehindMetadataStore(inner, flush_interval=0.05)
+    document = Document(original_filename="scan.pdf")
+    store.put(document)
+    assert inner.written.wait(2)
+    assert inner.batches == [[document.id]]
+    store.close()
+    
+    inner = RecordingStore()
+    store = WriteBehindMetadataStore(inner, flush_interval=60.0, max_pending=5)
+    store.put_many(Document(original_filename=f"scan_{n}.pdf") for n in range(5))
+    assert inner.written.wait(2)
+    assert len(inner.batches[0]) == 5
+    store.close()
+
+
+def test_close_writes_pending_and_rejects_puts():
+    inner = RecordingStore()
+    store = WriteBehindMetadataStore(inner, flush_interval=60.0)
+    document = Document(original_filename="scan.pdf")
+    store.put(document)
+    store.close()
+    assert document.id in inner.documents and inner.closed
+    with pytest.raises(RuntimeError):
+        store.put(document)
+
+
+def test_failed_flush_keeps_newer_state():
+    inner = RecordingStore()
+    store = WriteBehindMetadataStore(inner, flush_interval=60.0)
+    document = Document(original_filename="scan.pdf", correspondent="alt")
+    store.put(document)
+    inner.fail = True
+    with pytest.raises(OSError):
+        store.flush()
+    assert store.pending == 1
+    
+    newer = document.model_copy(update={"correspondent": "neu"})
+    store.put(newer)
+    inner.fail = False
+    assert store.flush() == 1
+    assert stored(inner, document).correspondent == "neu"
+
+
+def test_delete_and_durable_put_bypass_the_queue():
+    inner = RecordingStore()
+    store = WriteBehindMetadataStore(inner, flush_interval=60.0)
+    deleted, durable = Document(original_filename="weg.pdf"), Document(original_filename="neu.pdf")
+    store.put(deleted)
+    store.delete(deleted.id)
+    store.put(durable)
+    store.put_durable(durable)
+    assert list(inner.documents) == [durable.id] and inner.syncs == 1
+    assert store.flush() == 0
+    # load_all sieht auch noch ausstehende Änderungen
+    pending = Document(original_filename="ausstehend.pdf")
+    store.put(pending)
+    assert {document.id for document in store.load_all()} == {durable.id, pending.id}
+
+
+def test_json_files_are_replaced_atomically(tmp_path):
+    inner = JsonFileMetadataStore(tmp_path, fsync=True)
+    store = WriteBehindMetadataStore(inner, flush_interval=60.0)
+    documents = [Document(original_filename=f"scan_{n}.pdf") for n in range(20)]
+    store.put_many(documents)
+    stop = threading.Event()
+    torn = []
+    
+    def read() -> None:
+        # Leser sehen immer vollständiges JSON, nie halb geschriebene Dateien
+        while not stop.is_set():
+            for path in tmp_path.glob("*.json"):
+                try:
+                    Document.model_validate_json(path.read_bytes())
+                except FileNotFoundError:
+                    pass
+                except ValueError:
+                    torn.append(path)
+    reader = threading.Thread(target=read)
+    reader.start()
+    for round_number in range(20):
+        for document in documents:
+            document.topic = f"Runde {round_number}" * 50
+        store.put_many(documents)
+        store.flush()
+    stop.set()
+    reader.join()
+    store.close()
+    assert torn == []
+    assert not [path for path in tmp_path.iterdir() if path.name.endswith(".tmp")]
+    assert {document.topic for document in JsonFileMetadataStore(tmp_path).load_all()} == {"Runde 19" * 50}
\ No newline at end of file